@@ -320,7 +320,8 @@ async function createComponents(connectionDefinition: ConnectionDefinition): Pro
     sendDataToHistorian,
     historianKinesisDatastreamName,
     siteName,
-    osPlatform
+    osPlatform,
+    publisherSettings
   } = connectionDefinition;
 
   try {
@@ -370,6 +371,7 @@ async function createComponents(connectionDefinition: ConnectionDefinition): Pro
     createComponentParameters.sendDataToTimestream = sendDataToTimestream;
     createComponentParameters.sendDataToHistorian = sendDataToHistorian;
     createComponentParameters.historianKinesisDatastreamName = historianKinesisDatastreamName;
+    createComponentParameters.publisherSettings = publisherSettings;
 
     const publisherComponentResponse = await greengrassV2Handler.createComponent(createComponentParameters);
     newComponents.push(publisherComponentResponse.componentName);
@@ -10,7 +10,7 @@ import {
   CreateComponentRecipeResponse,
   ComponentManifest
 } from '../types/greengrass-v2-handler-types';
-import { MachineProtocol } from '../types/solution-common-types';
+import { MachineProtocol, PublisherSettings, TimestreamRecordFormat } from '../types/solution-common-types';
 import { GreengrassCoreDeviceOsPlatform } from '../types/connection-builder-types';
 
 const { ARTIFACT_BUCKET, KINESIS_STREAM, TIMESTREAM_KINESIS_STREAM, COLLECTOR_ID } = process.env;
@@ -60,7 +60,8 @@ export class GreengrassV2ComponentBuilder {
       sendDataToKinesisStreams,
       sendDataToTimestream,
       sendDataToHistorian,
-      historianKinesisDatastreamName
+      historianKinesisDatastreamName,
+      publisherSettings
     } = params;
 
     // By default, all components have the Greengrass Nucleus and stream manager as dependencies.
@@ -108,6 +109,7 @@ export class GreengrassV2ComponentBuilder {
        * 2. publisher components have the IoT SiteWise edge publisher as a dependency to send data to IoT SiteWise.
        * 3. publisher components have the IoT SiteWise edge collector OPC UA as a dependency when the machine protocol is OPC UA.
        * 4. publisher components have the data destination environment variables.
+       * 5. publisher components have the publisher settings environment variables.
        */
       componentName = `${componentName}-publisher`;
       topic = `${topic}/#`;
@@ -134,11 +136,15 @@ export class GreengrassV2ComponentBuilder {
         sendDataToHistorian
       );
 
+      // Set the publisher settings metadata, which a deployment can override through the component configuration.
+      GreengrassV2ComponentBuilder.setPublisherSettingsMetadata(connectionMetadata, publisherSettings);
+
       // Set the environment variables for the publisher component.
       GreengrassV2ComponentBuilder.setComponentEnvironmentVariables(
         componentEnvironmentVariables,
         protocol,
-        historianKinesisDatastreamName
+        historianKinesisDatastreamName,
+        connectionName
       );
     } else {
       if (params.protocol == MachineProtocol.OPCDA) {
@@ -195,6 +201,13 @@ export class GreengrassV2ComponentBuilder {
                 resources: [topic]
               }
             },
+            'aws.greengrass.ipc.pubsub': {
+              [`${componentName}:pubsub:1`]: {
+                policyDescription: `Allows access to publish the metrics of ${componentName} to the local topic.`,
+                operations: ['aws.greengrass#PublishToTopic'],
+                resources: [`m2c2/metrics/${connectionName}`]
+              }
+            },
             'aws.greengrass.SecretManager': {
               [`${componentName}:secrets:1`]: {
                 policyDescription: `Allows access to secrets ${componentName}.`,
@@ -227,10 +240,37 @@ export class GreengrassV2ComponentBuilder {
     connectionMetadata.sendDataToHistorian = sendDataToHistorian ? 'Yes' : '';
   }
 
+  /**
+   * Sets the publisher settings metadata. The settings which are not set keep the publisher defaults.
+   * @param connectionMetadata The connection metadata
+   * @param publisherSettings The publisher settings of the connection definition
+   */
+  private static setPublisherSettingsMetadata(
+    connectionMetadata: ComponentConnectionMetadata,
+    publisherSettings: PublisherSettings = {}
+  ) {
+    const {
+      metricsEnabled,
+      iotTopicBatching,
+      sitewiseMaxBufferedEntries,
+      timestreamRecordFormat,
+      targetCursors,
+      conversionWorkers
+    } = publisherSettings;
+
+    connectionMetadata.metricsEnabled = metricsEnabled ? 'true' : 'false';
+    connectionMetadata.iotTopicBatching = iotTopicBatching ? 'true' : 'false';
+    connectionMetadata.sitewiseMaxBufferedEntries = String(sitewiseMaxBufferedEntries ?? 1);
+    connectionMetadata.timestreamRecordFormat = timestreamRecordFormat ?? TimestreamRecordFormat.SINGLE;
+    connectionMetadata.targetCursors = targetCursors ? 'true' : 'false';
+    connectionMetadata.conversionWorkers = String(conversionWorkers ?? 0);
+  }
+
   private static setComponentEnvironmentVariables(
     componentEnvironmentVariables: Record<string, string>,
     protocol: MachineProtocol,
-    historianKinesisDatastreamName: string
+    historianKinesisDatastreamName: string,
+    connectionName: string
   ) {
     componentEnvironmentVariables.KINESIS_STREAM_NAME = KINESIS_STREAM;
     componentEnvironmentVariables.PROTOCOL = protocol;
@@ -245,6 +285,16 @@ export class GreengrassV2ComponentBuilder {
       ? historianKinesisDatastreamName
       : '';
     componentEnvironmentVariables.COLLECTOR_ID = COLLECTOR_ID;
+    componentEnvironmentVariables.METRICS_ENABLED = '{configuration:/connectionMetadata/metricsEnabled}';
+    componentEnvironmentVariables.METRICS_TOPIC = `m2c2/metrics/${connectionName}`;
+    componentEnvironmentVariables.IOT_TOPIC_BATCHING = '{configuration:/connectionMetadata/iotTopicBatching}';
+    componentEnvironmentVariables.SITEWISE_MAX_BUFFERED_ENTRIES =
+      '{configuration:/connectionMetadata/sitewiseMaxBufferedEntries}';
+    componentEnvironmentVariables.TIMESTREAM_RECORD_FORMAT =
+      '{configuration:/connectionMetadata/timestreamRecordFormat}';
+    componentEnvironmentVariables.PUBLISHER_TARGET_CURSORS = '{configuration:/connectionMetadata/targetCursors}';
+    componentEnvironmentVariables.PUBLISHER_CONVERSION_WORKERS =
+      '{configuration:/connectionMetadata/conversionWorkers}';
   }
 
   public static constructManifest(
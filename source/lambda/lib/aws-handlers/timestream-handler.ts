@@ -31,6 +31,9 @@ export default class TimestreamHandler {
       Records: params.records,
       TableName: params.tableName
     };
+    if (params.commonAttributes) {
+      writeRecordsRequest.CommonAttributes = params.commonAttributes;
+    }
 
     await timestreamWrite.writeRecords(writeRecordsRequest).promise();
   }
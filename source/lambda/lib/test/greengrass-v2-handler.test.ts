@@ -9,7 +9,7 @@ import {
   CreateComponentRecipeRequest,
   CreateDeploymentRequest
 } from '../types/greengrass-v2-handler-types';
-import { MachineProtocol } from '../types/solution-common-types';
+import { MachineProtocol, TimestreamRecordFormat } from '../types/solution-common-types';
 import * as utils from '../utils';
 import { GreengrassCoreDeviceOsPlatform } from '../types/connection-builder-types';
 
@@ -141,6 +141,64 @@ describe('Unit tests of createComponent() function', () => {
     expect(sleepSpy).not.toHaveBeenCalled();
   });
 
+  test('Test to set the publisher settings environment variables', () => {
+    const publisherParams: CreateComponentRecipeRequest = {
+      ...params,
+      componentType: ComponentType.PUBLISHER,
+      protocol: MachineProtocol.OPCDA,
+      sendDataToTimestream: true
+    };
+
+    // Without publisher settings, the publisher defaults are kept.
+    let recipe = GreengrassV2ComponentBuilder.createRecipe(publisherParams);
+    expect(recipe.ComponentConfiguration.DefaultConfiguration.connectionMetadata).toEqual(
+      expect.objectContaining({
+        metricsEnabled: 'false',
+        iotTopicBatching: 'false',
+        sitewiseMaxBufferedEntries: '1',
+        timestreamRecordFormat: TimestreamRecordFormat.SINGLE,
+        targetCursors: 'false',
+        conversionWorkers: '0'
+      })
+    );
+    expect(recipe.Manifests[0].Lifecycle.Setenv).toEqual(
+      expect.objectContaining({
+        METRICS_ENABLED: '{configuration:/connectionMetadata/metricsEnabled}',
+        METRICS_TOPIC: `m2c2/metrics/${mockValues.connectionName}`,
+        IOT_TOPIC_BATCHING: '{configuration:/connectionMetadata/iotTopicBatching}',
+        SITEWISE_MAX_BUFFERED_ENTRIES: '{configuration:/connectionMetadata/sitewiseMaxBufferedEntries}',
+        TIMESTREAM_RECORD_FORMAT: '{configuration:/connectionMetadata/timestreamRecordFormat}',
+        PUBLISHER_TARGET_CURSORS: '{configuration:/connectionMetadata/targetCursors}',
+        PUBLISHER_CONVERSION_WORKERS: '{configuration:/connectionMetadata/conversionWorkers}'
+      })
+    );
+
+    publisherParams.publisherSettings = {
+      metricsEnabled: true,
+      iotTopicBatching: true,
+      sitewiseMaxBufferedEntries: 10,
+      timestreamRecordFormat: TimestreamRecordFormat.MULTI,
+      targetCursors: true,
+      conversionWorkers: 2
+    };
+    recipe = GreengrassV2ComponentBuilder.createRecipe(publisherParams);
+    expect(recipe.ComponentConfiguration.DefaultConfiguration.connectionMetadata).toEqual(
+      expect.objectContaining({
+        metricsEnabled: 'true',
+        iotTopicBatching: 'true',
+        sitewiseMaxBufferedEntries: '10',
+        timestreamRecordFormat: TimestreamRecordFormat.MULTI,
+        targetCursors: 'true',
+        conversionWorkers: '2'
+      })
+    );
+
+    // The collector does not read the publisher settings.
+    recipe = GreengrassV2ComponentBuilder.createRecipe({ ...publisherParams, componentType: ComponentType.COLLECTOR });
+    expect(recipe.ComponentConfiguration.DefaultConfiguration.connectionMetadata.metricsEnabled).toBeUndefined();
+    expect(recipe.Manifests[0].Lifecycle.Setenv.METRICS_ENABLED).toBeUndefined();
+  });
+
   test('Test success to create a collector component within retry number when TooManyRequestsException happens', async () => {
     const retryNumber = 2;
     const recipe = GreengrassV2ComponentBuilder.createRecipe(params);
@@ -49,6 +49,33 @@ describe('Unit tests of write() function', () => {
     });
   });
 
+  test('Test success to write records with common attributes', async () => {
+    mockAwsTimestreamWrite.writeRecords.mockImplementation(() => ({
+      promise() {
+        return Promise.resolve();
+      }
+    }));
+    const commonAttributes = {
+      Dimensions: [{ Name: 'site', Value: 'mock-site' }],
+      TimeUnit: 'MILLISECONDS'
+    };
+    const request: WriteRecordsRequest = {
+      databaseName: database,
+      tableName: table,
+      records: mockRecords,
+      commonAttributes
+    };
+
+    await timestream.write(request);
+    expect(mockAwsTimestreamWrite.writeRecords).toHaveBeenCalledTimes(1);
+    expect(mockAwsTimestreamWrite.writeRecords).toHaveBeenCalledWith({
+      CommonAttributes: commonAttributes,
+      DatabaseName: database,
+      Records: mockRecords,
+      TableName: table
+    });
+  });
+
   test('Test failure to write records', async () => {
     mockAwsTimestreamWrite.writeRecords.mockImplementation(() => ({
       promise() {
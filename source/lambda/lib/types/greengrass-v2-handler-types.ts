@@ -1,7 +1,7 @@
 // Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 // SPDX-License-Identifier: Apache-2.0
 
-import { ConnectionControl, ConnectionDefinition, MachineProtocol } from './solution-common-types';
+import { ConnectionControl, ConnectionDefinition, MachineProtocol, PublisherSettings } from './solution-common-types';
 import {
   ComponentDependencyType,
   ComponentDeploymentSpecification,
@@ -34,6 +34,7 @@ export interface CreateComponentRecipeRequest {
   sendDataToTimestream?: boolean;
   sendDataToHistorian?: boolean;
   historianKinesisDatastreamName?: string;
+  publisherSettings?: PublisherSettings;
   osPlatform: string;
 }
 
@@ -85,6 +86,12 @@ export interface ComponentConnectionMetadata {
   sendDataToTimestream?: string;
   sendDataToHistorian?: string;
   historianKinesisDatastreamName?: string;
+  metricsEnabled?: string;
+  iotTopicBatching?: string;
+  sitewiseMaxBufferedEntries?: string;
+  timestreamRecordFormat?: string;
+  targetCursors?: string;
+  conversionWorkers?: string;
 }
 
 export interface ComponentManifest {
@@ -61,6 +61,25 @@ export interface ConnectionDefinition {
   siteName?: string;
   historianKinesisDatastreamName?: string;
   osPlatform?: string;
+  publisherSettings?: PublisherSettings;
+}
+
+/**
+ * The optional tuning of the publisher component. The settings without a value keep the publisher defaults.
+ * @interface PublisherSettings
+ */
+export interface PublisherSettings {
+  metricsEnabled?: boolean;
+  iotTopicBatching?: boolean;
+  sitewiseMaxBufferedEntries?: number;
+  timestreamRecordFormat?: TimestreamRecordFormat;
+  targetCursors?: boolean;
+  conversionWorkers?: number;
+}
+
+export enum TimestreamRecordFormat {
+  SINGLE = 'single',
+  MULTI = 'multi'
 }
 
 export interface CommonDefinition {
@@ -7,6 +7,7 @@ export interface WriteRecordsRequest {
   databaseName: string;
   tableName: string;
   records: TimestreamWrite.Records;
+  commonAttributes?: TimestreamWrite.Record;
 }
 
 export interface ListTablesRequest {
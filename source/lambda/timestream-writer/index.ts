@@ -28,17 +28,39 @@ type EventMessage = {
   Records: KinesisRecord[];
 };
 
+type Quality = 'Good' | 'GOOD' | 'Bad' | 'BAD' | 'Uncertain' | 'UNCERTAIN';
+
 type DataType = {
   area: string;
   machine: string;
   process: string;
-  quality: 'Good' | 'GOOD' | 'Bad' | 'BAD' | 'Uncertain' | 'UNCERTAIN';
+  quality: Quality;
   site: string;
   tag: string;
   timestamp: number;
   value: unknown;
 };
 
+/**
+ * The samples of a machine grouped by timestamp and quality, when the publisher `TIMESTREAM_RECORD_FORMAT` is `multi`.
+ */
+type MultiMeasureDataType = {
+  area: string;
+  machine: string;
+  process: string;
+  site: string;
+  measures: {
+    quality: Quality;
+    timestamp: number;
+    values: Record<string, unknown>;
+  }[];
+};
+
+type WriteBatch = {
+  commonAttributes?: TimestreamWrite.Record;
+  records: TimestreamWrite.Record[];
+};
+
 /**
  * The Lambda function consumes the Kinesis data stream records and store the data in Timestream.
  * @param event Kinesis data stream record event containing machine data
@@ -50,12 +72,20 @@ export async function handler(event: EventMessage): Promise<void> {
 
   while (Records.length > 0) {
     const timestreamRecords: TimestreamWrite.Record[] = [];
+    const multiMeasureBatches: WriteBatch[] = [];
 
     Records.splice(0, MAX_WRITE_RECORDS).forEach((record: KinesisRecord) => {
       try {
-        const data: DataType = JSON.parse(Buffer.from(record.kinesis.data, 'base64').toString());
-        validateRecord(data);
-        timestreamRecords.push(parseToTimestream(data));
+        const data: DataType | MultiMeasureDataType = JSON.parse(
+          Buffer.from(record.kinesis.data, 'base64').toString()
+        );
+
+        if ('measures' in data) {
+          multiMeasureBatches.push(...parseMultiMeasureToTimestream(data));
+        } else {
+          validateRecord(data);
+          timestreamRecords.push(parseToTimestream(data));
+        }
       } catch (error) {
         logger.log(
           LoggingLevel.ERROR,
@@ -68,17 +98,32 @@ export async function handler(event: EventMessage): Promise<void> {
     });
 
     if (timestreamRecords.length > 0) {
-      try {
-        const params: WriteRecordsRequest = {
-          databaseName: TIMESTREAM_DATABASE,
-          tableName: TIMESTREAM_TABLE,
-          records: timestreamRecords
-        };
-        await timestream.write(params);
-      } catch (error) {
-        logger.log(LoggingLevel.ERROR, 'Error occurred while storing data into Timestream: ', error);
-      }
+      await writeBatch({ records: timestreamRecords });
+    }
+
+    for (const batch of multiMeasureBatches) {
+      await writeBatch(batch);
+    }
+  }
+}
+
+/**
+ * Writes a batch of records in Timestream. The errors are logged.
+ * @param batch The records, and their common attributes
+ */
+async function writeBatch(batch: WriteBatch): Promise<void> {
+  try {
+    const params: WriteRecordsRequest = {
+      databaseName: TIMESTREAM_DATABASE,
+      tableName: TIMESTREAM_TABLE,
+      records: batch.records
+    };
+    if (batch.commonAttributes) {
+      params.commonAttributes = batch.commonAttributes;
     }
+    await timestream.write(params);
+  } catch (error) {
+    logger.log(LoggingLevel.ERROR, 'Error occurred while storing data into Timestream: ', error);
   }
 }
 
@@ -147,6 +192,72 @@ export function parseToTimestream(record: DataType): TimestreamWrite.Record {
   };
 }
 
+/**
+ * Parses the grouped samples of a machine to Timestream write batches.
+ * The machine dimensions and the time unit are sent once per batch as common attributes,
+ * and every sample is written as the same single-measure record as `parseToTimestream` writes.
+ * Invalid samples are logged and skipped.
+ * @param record Kinesis record data
+ * @returns Timestream write batches of up to 100 records
+ */
+export function parseMultiMeasureToTimestream(record: MultiMeasureDataType): WriteBatch[] {
+  const { area, machine, process, site, measures } = record;
+
+  if (!Array.isArray(measures)) {
+    throw new LambdaError({
+      message: 'Measures are missing.',
+      name: 'ValidationError',
+      statusCode: 400
+    });
+  }
+
+  const timestreamRecords: TimestreamWrite.Record[] = [];
+  for (const { quality, timestamp, values } of measures) {
+    for (const [tag, value] of Object.entries(values ?? {})) {
+      const data: DataType = { area, machine, process, quality, site, tag, timestamp, value };
+
+      let measureValueType: string;
+      try {
+        validateRecord(data);
+        measureValueType = getTimestreamValueType(value);
+      } catch (error) {
+        logger.log(
+          LoggingLevel.ERROR,
+          'Error occurred while parsing a sample, sample: ',
+          JSON.stringify(data),
+          ', error: ',
+          error
+        );
+        continue;
+      }
+
+      timestreamRecords.push({
+        Dimensions: [createDimension('quality', quality)],
+        MeasureName: tag,
+        MeasureValue: `${value}`,
+        MeasureValueType: measureValueType,
+        Time: `${timestamp}`
+      });
+    }
+  }
+
+  const commonAttributes: TimestreamWrite.Record = {
+    Dimensions: [
+      createDimension('site', site),
+      createDimension('area', area),
+      createDimension('process', process),
+      createDimension('machine', machine)
+    ],
+    TimeUnit: 'MILLISECONDS'
+  };
+  const batches: WriteBatch[] = [];
+  for (let i = 0; i < timestreamRecords.length; i += MAX_WRITE_RECORDS) {
+    batches.push({ commonAttributes, records: timestreamRecords.slice(i, i + MAX_WRITE_RECORDS) });
+  }
+
+  return batches;
+}
+
 /**
  * Creates a Timestream record dimension.
  * @param name The name of dimension
@@ -2,7 +2,7 @@
 // SPDX-License-Identifier: Apache-2.0
 
 import { consoleErrorSpy, mockTimestreamHandler } from './mock';
-import { handler, parseToTimestream } from '../index';
+import { handler, parseMultiMeasureToTimestream, parseToTimestream } from '../index';
 import { LambdaError } from '../../lib/errors';
 
 const A_DAY_MS = 60 * 60 * 24 * 1000 + 1;
@@ -488,3 +488,115 @@ test('Test failure to write records in Timestream table due to write failure', a
     'Failure'
   );
 });
+
+test('Test success to write multi-measure records with common attributes', async () => {
+  mockTimestreamHandler.write.mockResolvedValue(undefined);
+  const values: Record<string, unknown> = {};
+  for (let i = 0; i < 150; i++) {
+    values[`tag-${i}`] = value[i % value.length];
+  }
+  const record = {
+    area: 'mock-area',
+    machine: 'mock-machine',
+    process: 'mock-process',
+    site: 'mock-site',
+    measures: [
+      { quality: 'Good', timestamp: A_DAY_MS - 1, values },
+      { quality: 'invalid', timestamp: A_DAY_MS - 1, values: { 'invalid-tag': 1 } }
+    ]
+  };
+  const event = {
+    Records: [
+      {
+        kinesis: {
+          data: Buffer.from(JSON.stringify(record)).toString('base64')
+        }
+      }
+    ]
+  };
+  const commonAttributes = {
+    Dimensions: [
+      { Name: 'site', Value: 'mock-site' },
+      { Name: 'area', Value: 'mock-area' },
+      { Name: 'process', Value: 'mock-process' },
+      { Name: 'machine', Value: 'mock-machine' }
+    ],
+    TimeUnit: 'MILLISECONDS'
+  };
+  const timestreamRecords = Object.entries(values).map(([tag, tagValue]) => {
+    const { Dimensions, MeasureName, MeasureValue, MeasureValueType, Time } = parseToTimestream({
+      area: 'mock-area',
+      machine: 'mock-machine',
+      process: 'mock-process',
+      quality: 'Good',
+      site: 'mock-site',
+      tag,
+      timestamp: A_DAY_MS - 1,
+      value: tagValue
+    });
+    return { Dimensions: Dimensions.slice(4), MeasureName, MeasureValue, MeasureValueType, Time };
+  });
+
+  await handler(event);
+  expect(parseMultiMeasureToTimestream(<never>record)).toHaveLength(2);
+  expect(mockTimestreamHandler.write).toHaveBeenCalledTimes(2);
+  expect(mockTimestreamHandler.write).toHaveBeenNthCalledWith(1, {
+    commonAttributes,
+    databaseName: 'mock-timestream-database',
+    records: timestreamRecords.slice(0, 100),
+    tableName: 'mock-timestream-table'
+  });
+  expect(mockTimestreamHandler.write).toHaveBeenNthCalledWith(2, {
+    commonAttributes,
+    databaseName: 'mock-timestream-database',
+    records: timestreamRecords.slice(100),
+    tableName: 'mock-timestream-table'
+  });
+  // The invalid sample is skipped
+  expect(consoleErrorSpy).toHaveBeenCalledTimes(2);
+});
+
+test('Test to skip a multi-measure sample with an unsupported value type', async () => {
+  mockTimestreamHandler.write.mockResolvedValue(undefined);
+  const record = {
+    area: 'mock-area',
+    machine: 'mock-machine',
+    process: 'mock-process',
+    site: 'mock-site',
+    measures: [{ quality: 'Good', timestamp: A_DAY_MS - 1, values: { 'register-list': [1, 2, 3], 'valid-tag': 1 } }]
+  };
+  const event = {
+    Records: [
+      {
+        kinesis: {
+          data: Buffer.from(JSON.stringify(record)).toString('base64')
+        }
+      }
+    ]
+  };
+
+  await handler(event);
+  // The other samples of the machine are written
+  expect(mockTimestreamHandler.write).toHaveBeenCalledTimes(1);
+  expect(mockTimestreamHandler.write.mock.calls[0][0].records).toEqual([
+    {
+      Dimensions: [{ Name: 'quality', Value: 'Good' }],
+      MeasureName: 'valid-tag',
+      MeasureValue: '1',
+      MeasureValueType: 'DOUBLE',
+      Time: `${A_DAY_MS - 1}`
+    }
+  ]);
+  expect(consoleErrorSpy).toHaveBeenCalledTimes(1);
+  expect(consoleErrorSpy).toHaveBeenCalledWith(
+    '[timestream-putter]',
+    'Error occurred while parsing a sample, sample: ',
+    expect.stringContaining('register-list'),
+    ', error: ',
+    new LambdaError({
+      message: 'The value type, object, is currently not supported.',
+      name: 'UnsupportedType',
+      statusCode: 400
+    })
+  );
+});
@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures how the payload conversion scales with the worker processes of the conversion pool.
+    Every destination is enabled, so a message is converted for SiteWise, Kinesis, the IoT topic, Timestream and
+    the historian. Only the conversion is measured, the converted payloads are not written.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_conversion_pool.py [--messages 20000] [--batch 100] [--workers 1,2,4]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_publisher"))
+
+from conversion_pool import ConversionPool  # noqa: E402
+from payload_router import PayloadRouter  # noqa: E402
+
+# The routers cannot reach Stream Manager outside of Greengrass, which does not matter for the conversion.
+# The spawned workers import this module as well, so their logging is disabled too.
+logging.disable(logging.CRITICAL)
+
+ROUTER_PARAMETERS = {
+    "protocol": "opcda",
+    "connection_name": "benchmark",
+    "hierarchy": {
+        "site_name": "site",
+        "area": "area",
+        "process": "process",
+        "machine_name": "machine"
+    },
+    "destinations": {
+        "send_to_sitewise": True,
+        "send_to_kinesis_stream": True,
+        "send_to_iot_topic": True,
+        "send_to_timestream": True,
+        "send_to_historian": True
+    },
+    "destination_streams": {
+        "sitewise_stream": "SiteWise_Stream",
+        "kinesis_sm_stream": "m2c2_kinesis_stream",
+        "timestream_kinesis_stream": "m2c2_timestream_stream"
+    },
+    "max_stream_size": 5368706371,
+    "kinesis_data_stream": "benchmark",
+    "timestream_kinesis_data_stream": "benchmark",
+    "historian_data_stream": "benchmark",
+    "collector_id": "benchmark"
+}
+
+
+def build_payloads(message_count: int) -> list:
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    payloads = []
+
+    for i in range(message_count):
+        alias = f"site/area/process/machine/tag-{i % 200}"
+        payloads.append(json.dumps({
+            "alias": alias,
+            "messages": [
+                {
+                    "name": alias,
+                    "value": float(i * 10 + j),
+                    "quality": "Good",
+                    "timestamp": str(start + datetime.timedelta(milliseconds=i * 10 + j))
+                }
+                for j in range(10)
+            ]
+        }).encode("utf-8"))
+
+    return payloads
+
+
+def measure_in_process(payloads: list) -> float:
+    router = PayloadRouter(**ROUTER_PARAMETERS)
+    start = time.perf_counter()
+    for payload in payloads:
+        router.convert_payload(payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def measure_pool(payloads: list, batch_size: int, workers: int) -> float:
+    conversion_pool = ConversionPool(ROUTER_PARAMETERS, workers)
+    # Starts the workers before the measurement
+    for future in [conversion_pool.submit(payloads[:1]) for _ in range(workers)]:
+        future.result()
+
+    start = time.perf_counter()
+    pending = deque()
+    for i in range(0, len(payloads), batch_size):
+        pending.append(conversion_pool.submit(payloads[i:i + batch_size]))
+        # The publisher commits the batches in order, with up to two batches per worker in the pool
+        while len(pending) >= 2 * workers:
+            pending.popleft().result()
+    while pending:
+        pending.popleft().result()
+    rate = len(payloads) / (time.perf_counter() - start)
+
+    conversion_pool.shutdown()
+    return rate
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--messages", type=int, default=20000)
+    arg_parser.add_argument("--batch", type=int, default=100)
+    arg_parser.add_argument("--workers", default="1,2,4",
+                            help="comma separated worker counts")
+    args = arg_parser.parse_args()
+
+    payloads = build_payloads(args.messages)
+
+    print(f"messages: {args.messages} (10 values each), batch: {args.batch}, cores: {os.cpu_count()}")
+    in_process_rate = measure_in_process(payloads)
+    print(f"in process:  {in_process_rate:10,.0f} messages/s")
+    for workers in [int(workers) for workers in args.workers.split(",")]:
+        rate = measure_pool(payloads, args.batch, workers)
+        print(f"{workers:2d} workers:  {rate:10,.0f} messages/s ({rate / in_process_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the throughput and the latency of the whole pipeline, without Greengrass:
+        synthetic connector -> MessageSender -> connection stream -> m2c2_publisher -> destination exports
+    Stream Manager and the IPC client are the in-process simulators of `benchmarks/simulators`.
+    The connector posts `--batches` message batches over `--tags` tags, at `--rate` batches per second
+    or as fast as it can, and every sample is stamped with the time it was created.
+    Per destination, it reports the samples per second, from the first sample to the last export,
+    and the p50/p99 latency from the creation of a sample to its export. It also reports the peak RSS of the process.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_end_to_end.py [--batches 5000] [--tags 100] [--samples-per-batch 1] [--rate 0]
+            [--destinations kinesis,sitewise,iot_topic] [--queue-size 0] [--timestream-format single]
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_publisher"))
+
+# The connector reads its connection from the component environment variables when it is imported
+CONNECTION = {
+    "CONNECTION_NAME": "benchmark",
+    "CONNECTION_GG_STREAM_NAME": "m2c2_benchmark_stream",
+    "PROTOCOL": "opcda",
+    "SITE_NAME": "site-london",
+    "AREA": "packaging-floor-1",
+    "PROCESS": "bottling",
+    "MACHINE_NAME": "filler-machine-01",
+    "KINESIS_STREAM_NAME": "benchmark-kinesis",
+    "TIMESTREAM_KINESIS_STREAM": "benchmark-timestream",
+    "HISTORIAN_KINESIS_STREAM": "benchmark-historian",
+    "COLLECTOR_ID": "benchmark",
+    # The benchmarks do not spool to the Greengrass work directory
+    "MESSAGE_SPOOL_MAX_SIZE": "0"
+}
+os.environ.update(CONNECTION)
+
+from greengrasssdk.stream_manager import (  # noqa: E402
+    ExportDefinition,
+    IoTSiteWiseConfig,
+    MessageStreamDefinition,
+    StrategyOnFull
+)
+from boilerplate.messaging.message import Message  # noqa: E402
+from boilerplate.messaging.message_batch import MessageBatch  # noqa: E402
+from boilerplate.messaging.message_sender import MessageSender  # noqa: E402
+from converters.solution_time import parse_timestamp  # noqa: E402
+from simulators import EXPORT_IOT_SITEWISE, EXPORT_KINESIS, simulated_greengrass  # noqa: E402
+from utils import StreamManagerHelperClient  # noqa: E402
+from utils.metrics import Histogram  # noqa: E402
+import m2c2_publisher  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+DESTINATIONS = {
+    "kinesis": "SEND_TO_KINESIS_STREAM",
+    "sitewise": "SEND_TO_SITEWISE",
+    "iot_topic": "SEND_TO_IOT_TOPIC",
+    "timestream": "SEND_TO_TIMESTREAM"
+}
+# The SiteWise publisher component creates its stream in a deployment
+SITEWISE_STREAM_SIZE = 268435456
+
+
+def create_sitewise_stream(stream_manager) -> None:
+    stream_manager.create_message_stream(MessageStreamDefinition(
+        name=m2c2_publisher.sitewise_stream,
+        max_size=SITEWISE_STREAM_SIZE,
+        strategy_on_full=StrategyOnFull.OverwriteOldestData,
+        export_definition=ExportDefinition(iot_sitewise=[IoTSiteWiseConfig(identifier="SiteWise")])
+    ))
+
+
+def run_connector(batches: int, tags: int, samples_per_batch: int, rate: float, queue_size: int) -> int:
+    """
+    Posts the message batches like a connector does, and returns the number of samples
+    """
+    sender = MessageSender(queue_size=queue_size)
+    interval = 1 / rate if rate else 0
+    next_post = time.perf_counter()
+
+    for index in range(batches):
+        if interval:
+            time.sleep(max(0, next_post - time.perf_counter()))
+            next_post += interval
+
+        messages = [
+            Message(float(index), "Good", datetime.now(timezone.utc).isoformat(sep=" "))
+            for _ in range(samples_per_batch)
+        ]
+        sender.post_message_batch(MessageBatch(f"Channel1.Device1.Tag{index % tags}", messages, "benchmark"))
+
+    sender.flush()
+    return batches * samples_per_batch
+
+
+def run_publisher(publisher, stop_event: threading.Event, errors: list) -> None:
+    try:
+        publisher.start()
+        while not stop_event.is_set():
+            publisher.poll()
+        publisher.router_client.flush(force=True)
+    except Exception as err:
+        errors.append(err)
+
+
+def wait_for_publisher(publisher, stream_manager, timeout: float) -> bool:
+    """
+    Waits until the publisher has read every message of the connection stream, and holds no buffered data
+    """
+    stream_name = CONNECTION["CONNECTION_GG_STREAM_NAME"]
+    newest_sequence_number = stream_manager.describe_message_stream(stream_name).storage_status.newest_sequence_number
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if publisher.sequence_number is not None and publisher.sequence_number > newest_sequence_number \
+                and not publisher.router_client.has_pending():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def solution_times(payload: dict) -> list:
+    return [parse_timestamp(message["timestamp"]).timestamp() for message in payload["messages"]]
+
+
+def sample_times(destination: str, stream_manager, ipc_client) -> list:
+    """
+    :return: For every exported sample, the time it was created and the time it was exported (in epoch seconds)
+    """
+    times = []
+
+    if destination == "kinesis":
+        for record in stream_manager.recorder.get_records(EXPORT_KINESIS, m2c2_publisher.kinesis_sm_stream):
+            times.extend((sample_time, record.export_time) for sample_time in solution_times(json.loads(record.data)))
+    elif destination == "timestream":
+        for record in stream_manager.recorder.get_records(EXPORT_KINESIS, m2c2_publisher.timestream_kinesis_stream):
+            data = json.loads(record.data)
+            # Single-measure records hold one sample, multi-measure records the samples of every measure
+            measures = data.get("measures", [{"timestamp": data.get("timestamp"), "values": [None]}])
+            times.extend((measure["timestamp"] / 1000, record.export_time)
+                         for measure in measures for _ in measure["values"])
+    elif destination == "sitewise":
+        for record in stream_manager.recorder.get_records(EXPORT_IOT_SITEWISE, m2c2_publisher.sitewise_stream):
+            data = json.loads(record.data)
+            for entry in data.get("entries", [data]):
+                times.extend((value["timestamp"]["timeInSeconds"] + value["timestamp"]["offsetInNanos"] / 1e9,
+                              record.export_time) for value in entry["propertyValues"])
+    elif destination == "iot_topic":
+        for publish in ipc_client.get_iot_core_publishes():
+            payload = json.loads(publish.payload)
+            # A batch holds several payloads
+            for tag_payload in payload.get("payloads", [payload]):
+                times.extend((sample_time, publish.publish_time) for sample_time in solution_times(tag_payload))
+    return times
+
+
+def report(destination: str, times: list, samples: int) -> None:
+    if not times:
+        print(f"{destination:<11} {0:>9,} {'-':>12} {'-':>9} {'-':>9}")
+        return
+
+    latency = Histogram()
+    for sample_time, export_time in times:
+        latency.record((export_time - sample_time) * 1000)
+    snapshot = latency.snapshot()
+    elapsed = max(export_time for _, export_time in times) - min(sample_time for sample_time, _ in times)
+
+    missing = f"  ({samples - len(times):,} missing)" if len(times) < samples else ""
+    print(f"{destination:<11} {len(times):>9,} {len(times) / elapsed:>12,.0f} {snapshot['p50']:>9.2f} "
+          f"{snapshot['p99']:>9.2f}{missing}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--batches", type=int, default=5000)
+    arg_parser.add_argument("--tags", type=int, default=100)
+    arg_parser.add_argument("--samples-per-batch", type=int, default=1)
+    arg_parser.add_argument("--rate", type=float, default=0, help="message batches per second, 0 for no limit")
+    arg_parser.add_argument("--destinations", default="kinesis,sitewise,iot_topic",
+                            help=f"comma-separated, from {', '.join(DESTINATIONS)}")
+    arg_parser.add_argument("--queue-size", type=int, default=0,
+                            help="message queue size of the connector, 0 writes the batches synchronously")
+    arg_parser.add_argument("--timestream-format", default="single", choices=["single", "multi"])
+    arg_parser.add_argument("--timeout", type=float, default=60,
+                            help="maximum time the publisher takes to catch up after the connector (in seconds)")
+    args = arg_parser.parse_args()
+
+    destinations = [destination.strip() for destination in args.destinations.split(",") if destination.strip()]
+    unknown = set(destinations) - set(DESTINATIONS)
+    if unknown:
+        arg_parser.error(f"unknown destinations: {', '.join(sorted(unknown))}")
+
+    connection = dict(CONNECTION)
+    connection.update({DESTINATIONS[destination]: "true" for destination in destinations})
+    m2c2_publisher.TIMESTREAM_RECORD_FORMAT = args.timestream_format
+
+    with tempfile.TemporaryDirectory() as work_dir, simulated_greengrass() as (stream_manager, ipc_client):
+        # The checkpoints of the publisher are written to a temporary directory
+        m2c2_publisher.WORK_BASE_DIR = work_dir
+        m2c2_publisher.smh_client = StreamManagerHelperClient()
+        create_sitewise_stream(stream_manager)
+        publisher = m2c2_publisher.create_connection_publisher(connection)
+
+        stop_event = threading.Event()
+        errors = []
+        publisher_thread = threading.Thread(target=run_publisher, args=(publisher, stop_event, errors), daemon=True)
+
+        publisher_thread.start()
+        start = time.perf_counter()
+        samples = run_connector(args.batches, args.tags, args.samples_per_batch, args.rate, args.queue_size)
+        connector_seconds = time.perf_counter() - start
+        caught_up = wait_for_publisher(publisher, stream_manager, args.timeout)
+        stop_event.set()
+        publisher_thread.join()
+
+        print(f"samples: {samples:,} ({args.batches:,} batches, {args.tags} tags), "
+              f"connector: {samples / connector_seconds:,.0f} samples/s")
+        if errors or not caught_up:
+            print(f"publisher {'failed: ' + str(errors[0]) if errors else 'did not catch up in time'}")
+        print(f"{'destination':<11} {'samples':>9} {'samples/s':>12} {'p50 ms':>9} {'p99 ms':>9}")
+        for destination in destinations:
+            report(destination, sample_times(destination, stream_manager, ipc_client), samples)
+
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
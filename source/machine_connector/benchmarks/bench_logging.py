@@ -0,0 +1,77 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the publisher conversion throughput with logging at INFO, and the cost of a repeated error.
+    Every destination is enabled, so a message is converted for SiteWise, Kinesis, the IoT topic, Timestream and
+    the historian. The components configure their logging themselves, and their log output, stdout,
+    is redirected to a temporary file while measuring.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_logging.py [--messages 20000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_publisher"))
+
+from bench_conversion_pool import ROUTER_PARAMETERS, build_payloads  # noqa: E402
+
+# The conversion pool benchmark disables the logging on import
+logging.disable(logging.NOTSET)
+os.environ["LOG_LEVEL"] = "INFO"
+
+
+def measure_conversion(payloads: list) -> float:
+    from payload_router import PayloadRouter
+
+    router = PayloadRouter(**ROUTER_PARAMETERS)
+    start = time.perf_counter()
+    for payload in payloads:
+        router.convert_payload(payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def measure_repeated_error(count: int) -> float:
+    logger = logging.getLogger("RepeatedError")
+    start = time.perf_counter()
+    for i in range(count):
+        logger.error("Failed to publish message %d to the IoT topic. Error: %s", i, "timeout")
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--messages", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    payloads = build_payloads(args.messages)
+
+    stdout = sys.stdout
+    with tempfile.NamedTemporaryFile("w") as log_file:
+        sys.stdout = log_file
+        try:
+            conversion_rate = measure_conversion(payloads)
+            error_rate = measure_repeated_error(args.messages)
+            # Writes the queued records
+            logging.shutdown()
+        finally:
+            sys.stdout = stdout
+        log_file.flush()
+        log_size = os.path.getsize(log_file.name)
+
+    print(f"messages: {args.messages} (10 values each)")
+    print(f"conversion at INFO:  {conversion_rate:12,.0f} messages/s")
+    print(f"repeated error:      {error_rate:12,.0f} records/s")
+    print(f"log written:         {log_size / 1024:12,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the append and replay throughput of the message spool.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_message_spool.py [--records 20000] [--fsync]
+
+    Throughput targets for a gateway class device (without fsync):
+        append: 20,000 message batches/s
+        replay: 20,000 message batches/s
+    The process exits with 1 when a target is missed.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.message_spool import MessageSpool  # noqa: E402
+
+APPEND_TARGET = 20000
+REPLAY_TARGET = 20000
+
+
+def build_message_batch(index: int) -> dict:
+    return {
+        "alias": f"site/area/process/machine/tag-{index % 100}",
+        "sourceId": "benchmark",
+        "messages": [
+            {"value": index, "quality": "GOOD",
+                "timestamp": "2022-01-01 00:00:00.000000"}
+            for _ in range(10)
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--fsync", action="store_true")
+    args = parser.parse_args()
+
+    message_batches = [build_message_batch(i) for i in range(args.records)]
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        spool = MessageSpool(spool_dir, fsync=args.fsync)
+
+        start = time.perf_counter()
+        for message_batch in message_batches:
+            spool.append(message_batch)
+        append_rate = args.records / (time.perf_counter() - start)
+        spool_size = spool.size
+
+        start = time.perf_counter()
+        replayed = spool.replay(lambda data: None)
+        replay_rate = replayed / (time.perf_counter() - start)
+        spool.close()
+
+    print(f"records: {args.records}, spool size: {spool_size} bytes, fsync: {args.fsync}")
+    print(f"append: {append_rate:,.0f} message batches/s (target {APPEND_TARGET:,})")
+    print(f"replay: {replay_rate:,.0f} message batches/s (target {REPLAY_TARGET:,})")
+
+    if not args.fsync and (append_rate < APPEND_TARGET or replay_rate < REPLAY_TARGET):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
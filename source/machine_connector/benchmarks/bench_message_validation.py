@@ -0,0 +1,111 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the message validation of the connectors on payloads with many data point messages.
+    The compiled validation is compared with a per-entry validation, which rebuilds the validations
+    and parses the timestamp with dateutil for every data point message.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_message_validation.py [--entries 10000] [--rounds 5] [--connector opcda]
+"""
+
+import argparse
+import copy
+import datetime
+import logging
+import os
+import sys
+import time
+
+from unittest.mock import MagicMock, patch
+
+from dateutil import parser
+
+CONNECTORS = {
+    "opcda": "m2c2_opcda_connector",
+    "osipi": "m2c2_osipi_connector"
+}
+
+
+def build_message(entry_count: int) -> dict:
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    alias = "site/area/process/machine/tag"
+    return {
+        "alias": alias,
+        "messages": [
+            {
+                "name": alias,
+                "timestamp": str(start + datetime.timedelta(milliseconds=i)),
+                "value": float(i),
+                "quality": "Good"
+            }
+            for i in range(entry_count)
+        ]
+    }
+
+
+def validate_per_entry(validation, message: dict) -> None:
+    """
+    The validation of every data point message before the validations were compiled
+    """
+    vals = validation.vals
+    for entry in message["messages"]:
+        if validation.find_missing_keys(entry, vals.messages_required_keys()):
+            raise ValueError("missing keys")
+        if not validation.valid_val(entry, vals.msgs_validations()):
+            raise ValueError("invalid value")
+        parser.parse(entry["timestamp"])
+        if entry["name"] != message["alias"]:
+            raise ValueError("name is not alias")
+
+
+def measure(function, message: dict, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        try:
+            function(message)
+        except Exception:
+            pass
+    return len(message["messages"]) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--entries", type=int, default=10000)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    arg_parser.add_argument("--connector", choices=CONNECTORS.keys(), default="opcda")
+    args = arg_parser.parse_args()
+
+    machine_connector = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, machine_connector)
+    sys.path.insert(0, os.path.join(machine_connector, CONNECTORS[args.connector]))
+    from validations.message_validation import MessageValidation
+
+    logging.disable(logging.CRITICAL)
+    # The hierarchy of the published error messages
+    for key in ("SITE_NAME", "AREA", "PROCESS", "MACHINE_NAME"):
+        os.environ.setdefault(key, "benchmark")
+    with patch("utils.AWSEndpointClient.__init__", return_value=None):
+        validation = MessageValidation("benchmark/topic")
+    validation.connector_client = MagicMock()
+
+    message = build_message(args.entries)
+    # Every tenth data point message has a malformed timestamp
+    invalid_message = copy.deepcopy(message)
+    for entry in invalid_message["messages"][::10]:
+        entry["timestamp"] = "Invalid"
+
+    print(f"connector: {args.connector}, entries: {args.entries}, rounds: {args.rounds}")
+    per_entry_rate = measure(lambda m: validate_per_entry(validation, m), message, args.rounds)
+    print(f"per entry:          {per_entry_rate:12,.0f} entries/s")
+    compiled_rate = measure(validation.validate_schema, message, args.rounds)
+    print(f"compiled:           {compiled_rate:12,.0f} entries/s ({compiled_rate / per_entry_rate:.1f}x)")
+
+    validation.connector_client.reset_mock()
+    invalid_rate = measure(validation.validate_schema, invalid_message, args.rounds)
+    publishes = validation.connector_client.publish_message_to_iot_topic.call_count / args.rounds
+    print(f"compiled, invalid:  {invalid_rate:12,.0f} entries/s ({publishes:.0f} error publish per payload)")
+
+
+if __name__ == "__main__":
+    main()
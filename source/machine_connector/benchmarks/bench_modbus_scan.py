@@ -0,0 +1,186 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the scan cycles of the Modbus TCP connector against a local Modbus TCP server.
+    `ModbusDataCollectionController` polls `--secondaries` secondaries every `--frequency` seconds,
+    with `--commands` read commands of `--count` values each, through `PyModbusClient`.
+    The server answers every request after `--latency-ms`, from a register map of `--registers` values per kind,
+    or from the JSON register map of `--register-map`, see `simulators/modbus_server.py`.
+    The connector writes its message batches to the simulated Stream Manager of `benchmarks/simulators`.
+    It reports:
+        - the achieved scan rate, against the configured one,
+        - the jitter: the spread of the time between the cycles of a secondary, and its deviation from the frequency,
+        - the Modbus requests per cycle, and the reads which returned no data,
+        - the threads of the connector process, and its CPU usage.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_modbus_scan.py [--secondaries 4] [--commands 4] [--count 10] [--frequency 0.1]
+            [--latency-ms 2] [--seconds 10]
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_modbus_tcp_connector"))
+
+# The connector reads its connection from the component environment variables when it is imported
+CONNECTION = {
+    "CONNECTION_NAME": "benchmark",
+    "CONNECTION_GG_STREAM_NAME": "m2c2_benchmark_stream",
+    "SITE_NAME": "site-london",
+    "AREA": "packaging-floor-1",
+    "PROCESS": "bottling",
+    "MACHINE_NAME": "filler-machine-01",
+    # The benchmarks do not spool to the Greengrass work directory
+    "MESSAGE_SPOOL_MAX_SIZE": "0"
+}
+os.environ.update(CONNECTION)
+
+from boilerplate.messaging.message_sender import MessageSender  # noqa: E402
+from modbus_data_collection_controller import ModbusDataCollectionController  # noqa: E402
+from modbus_secondary_config import modbusSecondaryConfig  # noqa: E402
+from simulators import simulated_greengrass  # noqa: E402
+from simulators.modbus_server import ModbusServerProcess, create_register_map  # noqa: E402
+from utils import AWSEndpointClient  # noqa: E402
+from utils.metrics import Histogram  # noqa: E402
+import config  # noqa: E402
+
+# The connector logs a warning per read without data, which would slow down the scan cycles
+logging.disable(logging.CRITICAL)
+
+COMMANDS = ["readHoldingRegisters", "readInputRegisters", "readCoils", "readDiscreteInputs"]
+# Time between the thread count samples (in seconds)
+THREAD_SAMPLE_INTERVAL = 0.05
+
+
+class InstrumentedController(ModbusDataCollectionController):
+    """
+    Records the start time of every scan cycle, per secondary
+    """
+
+    def __init__(self, message_sender: MessageSender, connector_client: AWSEndpointClient):
+        super().__init__(message_sender, connector_client)
+        self.cycle_starts = defaultdict(list)
+        self.cycle_ms = Histogram()
+
+    def _execute_data_retrieval(self, modbus_secondary_config: modbusSecondaryConfig,
+                                message_batches: dict = {}) -> dict:
+        start = time.perf_counter()
+        try:
+            return super()._execute_data_retrieval(modbus_secondary_config, message_batches)
+        finally:
+            self.cycle_starts[modbus_secondary_config.secondary_address].append(start)
+            self.cycle_ms.record((time.perf_counter() - start) * 1000)
+
+
+def create_secondary_config(secondary_address: int, commands: int, count: int, frequency: float,
+                            port: int) -> modbusSecondaryConfig:
+    return modbusSecondaryConfig({
+        "secondaryAddress": secondary_address,
+        "frequencyInSeconds": frequency,
+        "commandConfig": {command: {"address": 0, "count": count} for command in COMMANDS[:commands]}
+    }, "127.0.0.1", port, "benchmark")
+
+
+def count_stream_messages(stream_manager) -> int:
+    stream_name = CONNECTION["CONNECTION_GG_STREAM_NAME"]
+    if stream_name not in stream_manager.list_streams():
+        return 0
+    return stream_manager.describe_message_stream(stream_name).storage_status.newest_sequence_number + 1
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--secondaries", type=int, default=4)
+    arg_parser.add_argument("--commands", type=int, default=4, choices=range(1, len(COMMANDS) + 1),
+                            help="read commands per secondary")
+    arg_parser.add_argument("--count", type=int, default=10, help="values per read command")
+    arg_parser.add_argument("--frequency", type=float, default=0.1, help="time between the scan cycles (in seconds)")
+    arg_parser.add_argument("--latency-ms", type=float, default=2, help="response time of the server")
+    arg_parser.add_argument("--registers", type=int, default=100, help="values per kind in the register map")
+    arg_parser.add_argument("--register-map", help="JSON file of the register map, instead of --registers")
+    arg_parser.add_argument("--seconds", type=float, default=10)
+    args = arg_parser.parse_args()
+
+    if args.register_map:
+        with open(args.register_map, encoding="utf-8") as register_map_file:
+            register_map = json.load(register_map_file)
+    else:
+        register_map = create_register_map(args.registers)
+
+    with ModbusServerProcess(register_map, args.latency_ms) as server, \
+            simulated_greengrass() as (stream_manager, ipc_client):
+        controller = InstrumentedController(MessageSender(), AWSEndpointClient())
+        secondary_configs = [
+            create_secondary_config(address, args.commands, args.count, args.frequency, server.port)
+            for address in range(1, args.secondaries + 1)
+        ]
+
+        baseline_threads = threading.active_count()
+        thread_counts = []
+        config.control = "start"
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        for secondary_config in secondary_configs:
+            controller.data_collection_control(secondary_config)
+
+        end = start + args.seconds
+        while time.perf_counter() < end and config.control == "start":
+            thread_counts.append(threading.active_count() - baseline_threads)
+            time.sleep(THREAD_SAMPLE_INTERVAL)
+        stopped_by_errors = config.control != "start"
+        elapsed = time.perf_counter() - start
+        cpu_seconds = time.process_time() - cpu_start
+
+        # The scheduled cycles see the stop control and end
+        config.control = "stop"
+        time.sleep(args.frequency + 0.5)
+        messages = count_stream_messages(stream_manager)
+        requests = server.requests
+
+    # The rates count the cycles which started in the measured time, the reads count every cycle
+    window_end = start + elapsed
+    cycles = sum(1 for starts in controller.cycle_starts.values() for cycle_start in starts if cycle_start < window_end)
+    intervals = [(later - earlier) * 1000 for starts in controller.cycle_starts.values()
+                 for earlier, later in zip(starts, starts[1:])]
+    cycle_ms = controller.cycle_ms.snapshot()
+    target_rate = args.secondaries / args.frequency
+    all_cycles = sum(len(starts) for starts in controller.cycle_starts.values())
+    reads = all_cycles * args.commands
+
+    print(f"secondaries: {args.secondaries}, commands: {args.commands} x {args.count} values, "
+          f"frequency: {args.frequency}s, server latency: {args.latency_ms} ms, {elapsed:.1f}s")
+    if stopped_by_errors:
+        print("the connector stopped after repeated read errors")
+    print(f"scan rate:        {cycles / elapsed:,.1f} cycles/s (configured {target_rate:,.1f}, "
+          f"{cycles / elapsed / target_rate * 100:.0f}%)")
+    if intervals:
+        interval_ms = Histogram()
+        for interval in intervals:
+            interval_ms.record(interval)
+        interval_snapshot = interval_ms.snapshot()
+        print(f"cycle interval:   p50 {interval_snapshot['p50']:.2f} ms, p99 {interval_snapshot['p99']:.2f} ms, "
+              f"stdev {statistics.pstdev(intervals):.2f} ms, "
+              f"mean deviation from the frequency {statistics.mean(intervals) - args.frequency * 1000:+.2f} ms")
+    if cycle_ms["count"]:
+        print(f"cycle duration:   p50 {cycle_ms['p50']:.2f} ms, p99 {cycle_ms['p99']:.2f} ms")
+    print(f"requests/cycle:   {requests / all_cycles if all_cycles else 0:.2f} "
+          f"({requests:,} requests, {max(0, reads - messages):,} of {reads:,} reads without data)")
+    print(f"threads:          mean {statistics.mean(thread_counts) if thread_counts else 0:.1f}, "
+          f"max {max(thread_counts, default=0)} (above the {baseline_threads} threads before the scan)")
+    print(f"CPU:              {cpu_seconds / elapsed * 100:.1f}% of a core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures how the OSI PI connector backfills after an outage, against the local PI Web API stand-in
+    of `simulators/pi_web_api.py`, which records a value per tag every `--sample-interval-ms`.
+    For every scenario of `--tags` tags and `--outages` outage lengths, the time log of the connector starts
+    the outage length before now, and the connector runs its `data_collection_control` loop
+    until a request is no longer behind now, with `--max-request-duration` seconds per request
+    and `--catchup-frequency` seconds between the catch-up requests.
+    The connector writes its message batches to the simulated Stream Manager of `benchmarks/simulators`.
+    Every scenario runs in its own process, and it reports:
+        - the points the connector fetched, against the points the server recorded in the requested time ranges,
+        - the points the connector posted to the connection stream,
+        - the backfill throughput (fetched points per second), and the time to catch up with now,
+        - the time spent in the requests, in `convert_batch_response_to_dicts`, and in `send_osi_pi_data`,
+        - the peak RSS of the scenario process, and its growth during the backfill.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_osipi_catchup.py [--tags 10,100] [--outages 600,3600] [--sample-interval-ms 1000]
+            [--max-request-duration 60] [--catchup-frequency 0.1] [--latency-ms 0] [--timeout 300]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_osipi_connector"))
+
+# The connector reads its connection from the component environment variables when it is imported
+CONNECTION = {
+    "CONNECTION_NAME": "benchmark",
+    "CONNECTION_GG_STREAM_NAME": "m2c2_benchmark_stream",
+    "SITE_NAME": "site-london",
+    "AREA": "packaging-floor-1",
+    "PROCESS": "bottling",
+    "MACHINE_NAME": "filler-machine-01"
+}
+os.environ.update(CONNECTION)
+
+from greengrasssdk.stream_manager import NotEnoughMessagesException, ReadMessagesOptions  # noqa: E402
+from simulators import simulated_greengrass  # noqa: E402
+from simulators.pi_web_api import PiWebApiServerProcess, expected_samples  # noqa: E402
+import m2c2_osipi_connector as connector  # noqa: E402
+
+# The connector logs every request, and the traceback of every failed one, which the report counts instead
+logging.disable(logging.CRITICAL)
+
+# Messages read from the connection stream at once
+READ_BATCH = 1000
+
+
+class CatchupRecorder:
+    """
+    Wraps the PI connector of the connector module, and records its catch-up requests
+    """
+
+    def __init__(self, osi_pi_connector, sample_interval_ms: int):
+        self.sample_interval_ms = sample_interval_ms
+        self.requests = 0
+        self.failed_requests = 0
+        self.points_fetched = 0
+        self.points_expected = 0
+        self.request_seconds = 0.0
+        self.convert_seconds = 0.0
+        self.send_seconds = 0.0
+        self.caught_up = threading.Event()
+        self.caught_up_time = None
+        self._time_range = None
+
+        time_helper = osi_pi_connector.time_helper
+        get_calculated_time_range = time_helper.get_calculated_time_range
+        write_datetime_to_time_log = time_helper.write_datetime_to_time_log
+        get_historical_data_batch = osi_pi_connector.get_historical_data_batch
+
+        def recorded_time_range(*args, **kwargs):
+            self._time_range = get_calculated_time_range(*args, **kwargs)
+            return self._time_range
+
+        def recorded_data_batch(web_ids, start_time, end_time):
+            start = time.perf_counter()
+            response = get_historical_data_batch(web_ids=web_ids, start_time=start_time, end_time=end_time)
+            self.request_seconds += time.perf_counter() - start
+            self.requests += 1
+            self.points_expected += expected_samples(len(web_ids), start_time, end_time, self.sample_interval_ms)
+            if response is None:
+                self.failed_requests += 1
+            else:
+                self.points_fetched += sum(len(pi_response.records) for pi_response in response)
+            return response
+
+        def recorded_time_log(d_time):
+            write_datetime_to_time_log(d_time)
+            # The time log is written once a request has been sent, and a request which is not behind now ends it
+            if self._time_range is not None and not self._time_range[2] and not self.caught_up.is_set():
+                self.caught_up_time = time.perf_counter()
+                self.caught_up.set()
+
+        time_helper.get_calculated_time_range = recorded_time_range
+        time_helper.write_datetime_to_time_log = recorded_time_log
+        osi_pi_connector.get_historical_data_batch = recorded_data_batch
+
+    def timed(self, function, attribute: str):
+        """
+        :return: The function, adding its run time to the attribute
+        """
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                setattr(self, attribute, getattr(self, attribute) + time.perf_counter() - start)
+        return timed_function
+
+
+def create_connection_data(api_url: str, tags: int, args: argparse.Namespace) -> dict:
+    return {
+        "connectionName": CONNECTION["CONNECTION_NAME"],
+        "protocol": "osiPi",
+        "osiPi": {
+            "apiUrl": api_url,
+            "serverName": "benchmark",
+            "authMode": "ANONYMOUS",
+            "verifySSL": False,
+            "tags": [f"Benchmark.Tag{index}" for index in range(tags)],
+            "requestFrequency": args.request_frequency,
+            "catchupFrequency": args.catchup_frequency,
+            "maxRequestDuration": args.max_request_duration,
+            "queryOffset": 0
+        }
+    }
+
+
+def count_posted_points(stream_manager) -> int:
+    """
+    :return: The values of the message batches in the connection stream
+    """
+    stream_name = CONNECTION["CONNECTION_GG_STREAM_NAME"]
+    if stream_name not in stream_manager.list_streams():
+        return 0
+
+    points = 0
+    sequence_number = 0
+    while True:
+        try:
+            messages = stream_manager.read_messages(stream_name, ReadMessagesOptions(
+                desired_start_sequence_number=sequence_number, min_message_count=1,
+                max_message_count=READ_BATCH, read_timeout_millis=0))
+        except NotEnoughMessagesException:
+            return points
+
+        for message in messages:
+            points += len(json.loads(message.payload).get("messages", []))
+        sequence_number = messages[-1].sequence_number + 1
+
+
+def run_scenario(tags: int, outage: float, args: argparse.Namespace, result_pipe) -> None:
+    """
+    Backfills one outage in the scenario process, and sends the results through the pipe
+    """
+    # The time log of the connector is relative to the working directory
+    with tempfile.TemporaryDirectory() as work_dir, \
+            PiWebApiServerProcess(sample_interval_ms=args.sample_interval_ms, latency_ms=args.latency_ms) as server, \
+            simulated_greengrass() as (stream_manager, ipc_client):
+        os.chdir(work_dir)
+        connection_data = create_connection_data(server.api_url, tags, args)
+        connector.device_connect(connection_data)
+
+        osi_pi_connector = connector.osi_pi_connector
+        osi_pi_connector.time_helper.write_datetime_to_time_log(
+            datetime.now(timezone.utc) - timedelta(seconds=outage))
+        recorder = CatchupRecorder(osi_pi_connector, args.sample_interval_ms)
+
+        pi_connector_sdk = sys.modules["pi_connector_sdk.osi_pi_connector"]
+        pi_connector_sdk.convert_batch_response_to_dicts = recorder.timed(
+            pi_connector_sdk.convert_batch_response_to_dicts, "convert_seconds")
+        connector.send_osi_pi_data = recorder.timed(connector.send_osi_pi_data, "send_seconds")
+
+        start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        connector.control = "start"
+        start = time.perf_counter()
+        connector.data_collection_control(connection_data)
+        recorder.caught_up.wait(args.timeout)
+        # The scheduled request sees the stop control and ends
+        connector.control = "stop"
+        elapsed = (recorder.caught_up_time or time.perf_counter()) - start
+        connector.message_sender.flush()
+
+        result_pipe.send({
+            "caught_up": recorder.caught_up.is_set(),
+            "elapsed": elapsed,
+            "requests": recorder.requests,
+            "failed_requests": recorder.failed_requests,
+            "points_fetched": recorder.points_fetched,
+            "points_expected": recorder.points_expected,
+            "points_posted": count_posted_points(stream_manager),
+            "server_requests": server.requests,
+            "request_seconds": recorder.request_seconds,
+            "convert_seconds": recorder.convert_seconds,
+            "send_seconds": recorder.send_seconds,
+            "start_rss": start_rss,
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        })
+
+
+def run_in_process(tags: int, outage: float, args: argparse.Namespace) -> dict:
+    """
+    Runs a scenario in its own process, so every scenario reports its own peak RSS
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=run_scenario, args=(tags, outage, args, sender))
+    process.start()
+    sender.close()
+
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+    return result
+
+
+def parse_list(value: str, value_type: type) -> list:
+    return [value_type(item) for item in value.split(",") if item.strip()]
+
+
+def report(tags: int, outage: float, result: dict) -> None:
+    if result is None:
+        print(f"{tags:>6} {outage:>9,.0f}  the scenario process failed")
+        return
+
+    elapsed = result["elapsed"]
+    caught_up = f"{elapsed:>11.2f}" if result["caught_up"] else f"{'>' + format(elapsed, '.0f'):>11}"
+    print(f"{tags:>6} {outage:>9,.0f} {result['requests']:>8,} {result['points_fetched']:>10,} "
+          f"{result['points_expected']:>10,} {result['points_posted']:>10,} "
+          f"{result['points_fetched'] / elapsed if elapsed else 0:>10,.0f} {caught_up} "
+          f"{result['request_seconds']:>9.2f} {result['convert_seconds']:>9.2f} {result['send_seconds']:>9.2f} "
+          f"{result['peak_rss'] / 1024:>9,.1f} {(result['peak_rss'] - result['start_rss']) / 1024:>+8,.1f}")
+    if result["failed_requests"]:
+        print(f"{'':>16} {result['failed_requests']:,} of the requests failed")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--tags", default="10,100", help="comma-separated tag counts")
+    arg_parser.add_argument("--outages", default="600,3600", help="comma-separated outage lengths (in seconds)")
+    arg_parser.add_argument("--sample-interval-ms", type=int, default=1000,
+                            help="time between the recorded values of a tag")
+    arg_parser.add_argument("--max-request-duration", type=float, default=60,
+                            help="maximum time range of a request (in seconds)")
+    arg_parser.add_argument("--catchup-frequency", type=float, default=0.1,
+                            help="time between the requests while catching up (in seconds)")
+    arg_parser.add_argument("--request-frequency", type=float, default=1,
+                            help="time between the requests once caught up (in seconds)")
+    arg_parser.add_argument("--latency-ms", type=float, default=0, help="response time of the server")
+    arg_parser.add_argument("--timeout", type=float, default=300,
+                            help="maximum time a scenario takes to catch up (in seconds)")
+    args = arg_parser.parse_args()
+
+    print(f"sample interval: {args.sample_interval_ms} ms, max request duration: {args.max_request_duration}s, "
+          f"catch-up frequency: {args.catchup_frequency}s, server latency: {args.latency_ms} ms")
+    print(f"{'tags':>6} {'outage s':>9} {'requests':>8} {'fetched':>10} {'expected':>10} {'posted':>10} "
+          f"{'points/s':>10} {'caught up s':>11} {'request s':>9} {'convert s':>9} {'send s':>9} "
+          f"{'peak MiB':>9} {'growth':>8}")
+    for tags in parse_list(args.tags, int):
+        for outage in parse_list(args.outages, float):
+            report(tags, outage, run_in_process(tags, outage, args))
+
+
+if __name__ == "__main__":
+    main()
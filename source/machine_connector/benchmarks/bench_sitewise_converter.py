@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Compares the throughput of the SiteWise converter with the previous per-message converter.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_sitewise_converter.py [--payloads 2000] [--messages 10]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_publisher"))
+
+from dateutil import parser  # noqa: E402
+from converters.sitewise_converter import SiteWiseConverter  # noqa: E402
+
+
+def previous_sw_required_format(payload):
+    """The per-message conversion the converter used before the type cache and the batch time conversion."""
+    sitewise_message = {
+        "propertyAlias": payload["alias"],
+        "propertyValues": []
+    }
+
+    for message in payload["messages"]:
+        converted_time = parser.parse(message["timestamp"])
+        timestamp = {
+            "timeInSeconds": int(converted_time.timestamp()),
+            "offsetInNanos": converted_time.microsecond * 1000
+        }
+        value = {}
+        message_value = message["value"]
+        message_value_type = type(message_value)
+
+        if message_value_type == str:
+            value["stringValue"] = message_value
+        elif message_value_type == int:
+            value["integerValue"] = message_value
+        elif message_value_type == float:
+            value["doubleValue"] = message_value
+        elif message_value_type == bool:
+            value["booleanValue"] = message_value
+
+        sitewise_message["propertyValues"].append({
+            "value": value,
+            "timestamp": timestamp,
+            "quality": message["quality"].upper()
+        })
+
+    return sitewise_message
+
+
+def build_payloads(payload_count: int, message_count: int) -> list:
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    payloads = []
+
+    for i in range(payload_count):
+        alias = f"site/area/process/machine/tag-{i % 200}"
+        payloads.append({
+            "alias": alias,
+            "messages": [
+                {
+                    "name": alias,
+                    "value": float(i * message_count + j),
+                    "quality": "Good",
+                    "timestamp": str(start + datetime.timedelta(milliseconds=i * message_count + j))
+                }
+                for j in range(message_count)
+            ]
+        })
+
+    return payloads
+
+
+def measure(convert, payloads: list) -> float:
+    start = time.perf_counter()
+    for payload in payloads:
+        convert(payload)
+    return sum(len(payload["messages"]) for payload in payloads) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--payloads", type=int, default=2000)
+    arg_parser.add_argument("--messages", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    payloads = build_payloads(args.payloads, args.messages)
+    converter = SiteWiseConverter()
+
+    previous_rate = measure(previous_sw_required_format, payloads)
+    current_rate = measure(converter.sw_required_entries, payloads)
+
+    print(f"payloads: {args.payloads}, messages per payload: {args.messages}")
+    print(f"previous converter: {previous_rate:,.0f} values/s")
+    print(f"current converter:  {current_rate:,.0f} values/s ({current_rate / previous_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
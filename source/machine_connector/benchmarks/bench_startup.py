@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Profiles the cold start of the connectors and the publisher, to track the time to the first sample
+    after a Greengrass deployment. Every component is started in a new Python process with `-X importtime`:
+        - the import of the component module, and its slowest imports,
+        - the startup phases of the component, e.g. `connect_clients`, from the startup profiler.
+    Outside of Greengrass, the Stream Manager and IPC connections fail, and the error is shown with the phases.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_startup.py [--components opcda,osipi,modbus,publisher] [--top 8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MACHINE_CONNECTOR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MACHINE_CONNECTOR)
+
+from utils.startup_profiler import summarize_import_times  # noqa: E402
+
+COMPONENTS = {
+    "opcda": "m2c2_opcda_connector",
+    "osipi": "m2c2_osipi_connector",
+    "modbus": "m2c2_modbus_tcp_connector",
+    "publisher": "m2c2_publisher"
+}
+
+# Imports the component, and connects its clients like its `main` does
+PROFILE_SCRIPT = """
+import json, logging, time
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+import {module} as component
+import_ms = (time.perf_counter() - start) * 1000
+error = None
+try:
+    if hasattr(component, "connect_clients"):
+        component.connect_clients()
+    else:
+        with component.startup_profiler.phase("connect_clients"):
+            component.StreamManagerHelperClient()
+except BaseException as err:
+    error = f"{{type(err).__name__}}: {{err}}"
+print(json.dumps({{"import_ms": import_ms, "error": error, **component.startup_profiler.report()}}))
+"""
+
+
+def profile(component_dir: str) -> tuple:
+    env = dict(os.environ, PYTHONPATH=MACHINE_CONNECTOR, CONNECTION_NAME="benchmark",
+               CONNECTION_GG_STREAM_NAME="m2c2_benchmark_stream", SITE_NAME="site", AREA="area",
+               PROCESS="process", MACHINE_NAME="machine")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT.format(module=component_dir)],
+        cwd=os.path.join(MACHINE_CONNECTOR, component_dir), env=env, capture_output=True, text=True, timeout=300)
+
+    stderr_lines = result.stderr.splitlines()
+    stdout_lines = result.stdout.splitlines()
+    if result.returncode != 0 or not stdout_lines:
+        return None, stderr_lines
+    return json.loads(stdout_lines[-1]), stderr_lines
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--components", default=",".join(COMPONENTS.keys()),
+                            help="comma separated components")
+    arg_parser.add_argument("--top", type=int, default=8,
+                            help="number of slowest imports to show")
+    args = arg_parser.parse_args()
+
+    for component in args.components.split(","):
+        report, stderr_lines = profile(COMPONENTS[component])
+        print(f"== {component}")
+
+        if report is None:
+            errors = [line for line in stderr_lines if not line.startswith("import time:")]
+            print(f"   failed to start: {errors[-1] if errors else 'unknown error'}")
+            continue
+
+        print(f"   import:           {report['import_ms']:8.1f} ms")
+        for name, value in report["marks"].items():
+            print(f"   {name + ' at':<17} {value:8.1f} ms since the process start")
+        for name, value in report["phases"].items():
+            print(f"   {name + ':':<17} {value:8.1f} ms")
+        if report["error"]:
+            print(f"   connect error:    {report['error']}")
+
+        print("   slowest imports:")
+        for name, cumulative_ms in summarize_import_times(stderr_lines, args.top, COMPONENTS[component]):
+            print(f"     {cumulative_ms:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Compares the idle CPU and the end-to-end latency of the publisher stream reads:
+        polling:   non-blocking reads of one message, with a 10 ms sleep between reads (the previous read loop)
+        long-poll: reads which wait in Stream Manager for up to --timeout-ms, and take up to 100 messages
+    The reads go through `StreamManagerHelperClient` to an in-memory stream which blocks like Stream Manager does.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_stream_read.py [--idle-seconds 3] [--rate 200] [--busy-seconds 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greengrasssdk.stream_manager import NotEnoughMessagesException  # noqa: E402
+from utils.metrics import Histogram  # noqa: E402
+from utils import stream_manager_helper  # noqa: E402
+
+STREAM_NAME = "benchmark_stream"
+
+
+class StreamMessage:
+    __slots__ = ("sequence_number", "payload")
+
+    def __init__(self, sequence_number: int, payload: float):
+        self.sequence_number = sequence_number
+        self.payload = payload
+
+
+class InMemoryStreamClient:
+    """
+    Serves `read_messages` like Stream Manager: the read waits until `min_message_count` messages
+    are available or `read_timeout_millis` passes, and raises `NotEnoughMessagesException` otherwise.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.condition = threading.Condition()
+
+    def append_message(self, payload: float) -> None:
+        with self.condition:
+            self.messages.append(StreamMessage(len(self.messages), payload))
+            self.condition.notify_all()
+
+    def read_messages(self, stream_name, options):
+        start = options.desired_start_sequence_number
+        deadline = time.monotonic() + (options.read_timeout_millis or 0) / 1000
+
+        with self.condition:
+            while len(self.messages) - start < options.min_message_count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise NotEnoughMessagesException(
+                        "desired starting sequence number is greater than the last sequence number of the stream")
+                self.condition.wait(remaining)
+
+            end = len(self.messages) if options.max_message_count is None else start + options.max_message_count
+            return self.messages[start:end]
+
+    def close(self):
+        pass
+
+
+def polling_read(smh_client, sequence_number: int, timeout_ms: int) -> list:
+    messages = smh_client.read_from_stream(STREAM_NAME, sequence_number, 1)
+    time.sleep(0.01)
+    return messages
+
+
+def long_poll_read(smh_client, sequence_number: int, timeout_ms: int) -> list:
+    return smh_client.read_from_stream(
+        STREAM_NAME, sequence_number, 1, max_message_count=100, read_timeout_millis=timeout_ms)
+
+
+def run(read, idle_seconds: float, busy_seconds: float, rate: int, timeout_ms: int) -> dict:
+    # The helper connects to the in-memory stream instead of Stream Manager
+    stream_manager_helper.StreamManagerClient = InMemoryStreamClient
+    smh_client = stream_manager_helper.StreamManagerHelperClient()
+    stream_client = smh_client.client
+    latency = Histogram()
+    stop_event = threading.Event()
+    result = {}
+
+    def consume():
+        sequence_number = 0
+        idle_cpu_start = time.thread_time()
+        idle_reads = 0
+        idle_end = time.monotonic() + idle_seconds
+
+        while not stop_event.is_set():
+            messages = read(smh_client, sequence_number, timeout_ms)
+            now = time.perf_counter()
+            for message in messages:
+                if message.payload is None:
+                    continue
+                latency.record((now - message.payload) * 1000)
+            sequence_number += len(messages)
+
+            if idle_end is not None:
+                idle_reads += 1
+                if time.monotonic() >= idle_end:
+                    result["idle_cpu"] = (time.thread_time() - idle_cpu_start) / idle_seconds
+                    result["idle_reads"] = idle_reads / idle_seconds
+                    idle_end = None
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+
+    # Quiet period, then a steady message rate
+    time.sleep(idle_seconds + timeout_ms / 1000)
+    interval = 1 / rate
+    next_append = time.perf_counter()
+    busy_end = next_append + busy_seconds
+    while next_append < busy_end:
+        time.sleep(max(0, next_append - time.perf_counter()))
+        stream_client.append_message(time.perf_counter())
+        next_append += interval
+
+    time.sleep(0.1)
+    stop_event.set()
+    # Wakes up a waiting long-poll read
+    stream_client.append_message(None)
+    consumer.join()
+
+    result["latency"] = latency.snapshot()
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--idle-seconds", type=float, default=3)
+    arg_parser.add_argument("--busy-seconds", type=float, default=3)
+    arg_parser.add_argument("--rate", type=int, default=200, help="messages per second")
+    arg_parser.add_argument("--timeout-ms", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    print(f"idle: {args.idle_seconds}s, busy: {args.busy_seconds}s at {args.rate} messages/s")
+    for name, read in (("polling", polling_read), ("long-poll", long_poll_read)):
+        result = run(read, args.idle_seconds, args.busy_seconds, args.rate, args.timeout_ms)
+        latency = result["latency"]
+        print(f"{name:10} idle CPU: {result['idle_cpu'] * 100:6.2f}%  idle reads: {result['idle_reads']:6.1f}/s  "
+              f"latency p50: {latency['p50']:6.2f} ms  p99: {latency['p99']:6.2f} ms  "
+              f"(messages: {latency['count']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+    Measures the bytes per sample of the Timestream records in the `single` and `multi` record formats:
+        - the Kinesis records the publisher writes to the Timestream stream,
+        - the WriteRecords requests the timestream-writer Lambda function sends for them.
+    The connection polls every tag at the same timestamps, and a payload holds the samples of a tag for `--polls` polls.
+    Run it from the `source/machine_connector` directory:
+        python3 benchmarks/bench_timestream_records.py [--tags 50] [--polls 10] [--max-samples 500]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "m2c2_publisher"))
+
+from converters.timestream_converter import TimestreamConverter  # noqa: E402
+from targets.kinesis_target import KinesisTarget  # noqa: E402
+
+# The target cannot reach Stream Manager outside of Greengrass, which does not matter for the conversion
+logging.disable(logging.CRITICAL)
+
+HIERARCHY = {
+    "site_name": "site-london",
+    "area": "packaging-floor-1",
+    "process": "bottling",
+    "machine_name": "filler-machine-01"
+}
+# The Timestream WriteRecords limit, see the timestream-writer Lambda function
+MAX_WRITE_RECORDS = 100
+
+
+def build_payloads(tags: int, polls: int) -> list:
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    prefix = "{site_name}/{area}/{process}/{machine_name}".format(**HIERARCHY)
+    payloads = []
+
+    for tag in range(tags):
+        alias = f"{prefix}/Channel1.Device1.Tag{tag}"
+        payloads.append({
+            "alias": alias,
+            "messages": [
+                {
+                    "name": alias,
+                    "value": float(tag * 1000 + poll) + 0.25,
+                    "quality": "Good",
+                    "timestamp": str(start + datetime.timedelta(seconds=poll))
+                }
+                for poll in range(polls)
+            ]
+        })
+    return payloads
+
+
+def dimension(name: str, value) -> dict:
+    return {"Name": name, "Value": f"{value}"}
+
+
+def measure(tag: str, value, quality: str, timestamp, dimensions: list) -> dict:
+    return {
+        "Dimensions": dimensions + [dimension("quality", quality)],
+        "MeasureName": tag,
+        "MeasureValue": f"{value}",
+        "MeasureValueType": "DOUBLE",
+        "Time": f"{timestamp}"
+    }
+
+
+def single_write_requests(kinesis_records: list) -> list:
+    """
+    The WriteRecords requests of the timestream-writer for single-measure records
+    """
+    records = [
+        {**measure(record["tag"], record["value"], record["quality"], record["timestamp"], [
+            dimension("site", record["site"]),
+            dimension("area", record["area"]),
+            dimension("process", record["process"]),
+            dimension("machine", record["machine"])
+        ]), "TimeUnit": "MILLISECONDS"}
+        for record in kinesis_records
+    ]
+    return [{"Records": records[i:i + MAX_WRITE_RECORDS]} for i in range(0, len(records), MAX_WRITE_RECORDS)]
+
+
+def multi_write_requests(kinesis_records: list) -> list:
+    """
+    The WriteRecords requests of the timestream-writer for multi-measure records, with common attributes
+    """
+    requests = []
+    for record in kinesis_records:
+        common_attributes = {
+            "Dimensions": [
+                dimension("site", record["site"]),
+                dimension("area", record["area"]),
+                dimension("process", record["process"]),
+                dimension("machine", record["machine"])
+            ],
+            "TimeUnit": "MILLISECONDS"
+        }
+        records = [
+            measure(tag, value, grouped["quality"], grouped["timestamp"], [])
+            for grouped in record["measures"] for tag, value in grouped["values"].items()
+        ]
+        requests.extend({"CommonAttributes": common_attributes, "Records": records[i:i + MAX_WRITE_RECORDS]}
+                        for i in range(0, len(records), MAX_WRITE_RECORDS))
+    return requests
+
+
+def size(items: list) -> int:
+    return sum(len(json.dumps(item).encode("utf-8")) for item in items)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--tags", type=int, default=50)
+    arg_parser.add_argument("--polls", type=int, default=10)
+    arg_parser.add_argument("--max-samples", type=int, default=500,
+                            help="maximum number of samples per multi-measure record")
+    args = arg_parser.parse_args()
+
+    target = KinesisTarget("benchmark", "opcda", HIERARCHY, "m2c2_timestream_stream", 5368706371, "benchmark",
+                           is_timestream_kinesis=True)
+    single_records = []
+    for payload in build_payloads(args.tags, args.polls):
+        single_records.extend(target.convert(payload))
+    samples = len(single_records)
+
+    converter = TimestreamConverter()
+    multi_records = []
+    for i in range(0, samples, args.max_samples):
+        multi_records.extend(converter.convert_multi_measure_format(single_records[i:i + args.max_samples]))
+
+    single_requests = single_write_requests(single_records)
+    multi_requests = multi_write_requests(multi_records)
+
+    print(f"samples: {samples} ({args.tags} tags, {args.polls} polls)")
+    print(f"{'format':<8} {'kinesis records':>16} {'kinesis B/sample':>17} {'write requests':>15} "
+          f"{'write B/sample':>15}")
+    for name, kinesis_records, requests in [("single", single_records, single_requests),
+                                            ("multi", multi_records, multi_requests)]:
+        print(f"{name:<8} {len(kinesis_records):>16,} {size(kinesis_records) / samples:>17.1f} "
+              f"{len(requests):>15,} {size(requests) / samples:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from contextlib import contextmanager
+
+import awsiot.greengrasscoreipc
+
+from utils import client as connector_client
+from utils import stream_manager_helper
+
+from .ipc import PublishRecord, SimulatedIpcClient
+from .stream_manager import (
+    EXPORT_IOT_SITEWISE,
+    EXPORT_KINESIS,
+    ExportRecord,
+    ExportRecorder,
+    SimulatedStreamManager,
+    SimulatedStreamManagerClient
+)
+
+
+@contextmanager
+def simulated_greengrass(stream_manager: SimulatedStreamManager = None, ipc_client: SimulatedIpcClient = None):
+    """
+    Connects the Stream Manager helper clients and the connector clients created within the context
+    to the simulators instead of Greengrass.
+
+    :param stream_manager: The simulated Stream Manager, a new one by default
+    :param ipc_client: The simulated IPC client, a new one by default
+    :return: The simulated Stream Manager and IPC client
+    """
+    stream_manager = stream_manager or SimulatedStreamManager()
+    ipc_client = ipc_client or SimulatedIpcClient()
+
+    stream_manager_client = stream_manager_helper.StreamManagerClient
+    ipc_connect = awsiot.greengrasscoreipc.connect
+    stream_manager_helper.StreamManagerClient = stream_manager.client
+    awsiot.greengrasscoreipc.connect = lambda *args, **kwargs: ipc_client
+    # The IPC client of the process connects again, to the simulator
+    connector_client._ipc_client = None
+
+    try:
+        yield stream_manager, ipc_client
+    finally:
+        stream_manager_helper.StreamManagerClient = stream_manager_client
+        awsiot.greengrasscoreipc.connect = ipc_connect
+        connector_client._ipc_client = None
@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+
+from collections import namedtuple
+from concurrent.futures import Future
+
+"""
+    An in-process Greengrass IPC client, which records the messages published to IoT Core and to the local topics.
+    A publish completes once it is recorded, so the publish pipeline of `AWSEndpointClient` never waits.
+"""
+
+PublishRecord = namedtuple("PublishRecord", ["topic", "payload", "qos", "publish_time"])
+
+
+class _PublishOperation:
+    def __init__(self, record_function):
+        self._record_function = record_function
+        self._response = Future()
+
+    def activate(self, request) -> Future:
+        self._record_function(request)
+        self._response.set_result(None)
+        return self._response
+
+    def get_response(self) -> Future:
+        return self._response
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedIpcClient:
+    """
+    Records the publishes of the `new_publish_to_iot_core` and `new_publish_to_topic` operations,
+    with the time they were published (in epoch seconds)
+    """
+
+    def __init__(self):
+        self._iot_core_publishes = []
+        self._local_publishes = []
+        self._lock = threading.Lock()
+
+    def new_publish_to_iot_core(self) -> _PublishOperation:
+        return _PublishOperation(self._record_iot_core_publish)
+
+    def new_publish_to_topic(self) -> _PublishOperation:
+        return _PublishOperation(self._record_local_publish)
+
+    def get_iot_core_publishes(self) -> list:
+        """
+        :return: The messages published to IoT Core, with their payload in bytes
+        """
+        with self._lock:
+            return list(self._iot_core_publishes)
+
+    def get_local_publishes(self) -> list:
+        """
+        :return: The messages published to the local topics, with their JSON message
+        """
+        with self._lock:
+            return list(self._local_publishes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._iot_core_publishes.clear()
+            self._local_publishes.clear()
+
+    def close(self) -> None:
+        pass
+
+    def _record_iot_core_publish(self, request) -> None:
+        record = PublishRecord(request.topic_name, request.payload, request.qos, time.time())
+        with self._lock:
+            self._iot_core_publishes.append(record)
+
+    def _record_local_publish(self, request) -> None:
+        record = PublishRecord(request.topic, request.publish_message.json_message.message, None, time.time())
+        with self._lock:
+            self._local_publishes.append(record)
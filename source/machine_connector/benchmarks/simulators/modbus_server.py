@@ -0,0 +1,69 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+
+from .server_process import ServerProcess
+
+"""
+    A local Modbus TCP server for the benchmarks, served by pymodbus in a separate process,
+    so its CPU time is not counted in the connector process.
+    Every request waits for the configured latency before it is answered, like a device which takes time to reply.
+    The server answers every unit ID from the same register map: the connector client sends its requests to the
+    default unit ID.
+"""
+
+
+def create_register_map(size: int) -> dict:
+    """
+    :param size: The number of coils, discrete inputs, holding registers and input registers
+    :return: A register map with changing bits and register values
+    """
+    return {
+        "coils": [index % 2 == 0 for index in range(size)],
+        "discrete_inputs": [index % 3 == 0 for index in range(size)],
+        "holding_registers": [index % 65536 for index in range(size)],
+        "input_registers": [(index * 7) % 65536 for index in range(size)]
+    }
+
+
+def _serve(register_map: dict, latency_ms: float, port, requests, ready) -> None:
+    from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+    from pymodbus.server.sync import ModbusTcpServer
+
+    class LatencySlaveContext(ModbusSlaveContext):
+        def getValues(self, fc_as_hex, address, count=1):
+            with requests.get_lock():
+                requests.value += 1
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            return super().getValues(fc_as_hex, address, count)
+
+    # The data blocks start at address 0, and the slave context addresses them from 1
+    slave_context = LatencySlaveContext(
+        co=ModbusSequentialDataBlock(0, [False] + list(register_map.get("coils", []))),
+        di=ModbusSequentialDataBlock(0, [False] + list(register_map.get("discrete_inputs", []))),
+        hr=ModbusSequentialDataBlock(0, [0] + list(register_map.get("holding_registers", []))),
+        ir=ModbusSequentialDataBlock(0, [0] + list(register_map.get("input_registers", [])))
+    )
+    server = ModbusTcpServer(ModbusServerContext(slaves=slave_context, single=True),
+                             address=("127.0.0.1", 0), allow_reuse_address=True)
+    port.value = server.server_address[1]
+    ready.set()
+    server.serve_forever()
+
+
+class ModbusServerProcess(ServerProcess):
+    """
+    Runs the local Modbus TCP server in a separate process, on a free port of the loopback interface
+    """
+    name = "Modbus server"
+
+    def __init__(self, register_map: dict, latency_ms: float = 0):
+        """
+        :param register_map: The coils, discrete inputs, holding and input registers, see `create_register_map`
+        :param latency_ms: The time every request waits before it is answered (in milliseconds)
+        """
+        super().__init__(_serve, register_map, latency_ms)
+        self.register_map = register_map
+        self.latency_ms = latency_ms
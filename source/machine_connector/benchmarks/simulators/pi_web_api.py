@@ -0,0 +1,235 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import base64
+import json
+import math
+import re
+import time
+import zlib
+
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .server_process import ServerProcess
+
+"""
+    A local stand-in for the PI Web API endpoints the OSI PI connector uses, served in a separate process:
+        - `GET points?path=\\\\{server}\\{tag}`: the PI point of a tag,
+        - `GET points/multiple?webId=...`: the PI points of several web IDs,
+        - `GET streamsets/recorded?webId=...&startTime=...&endTime=...`: the recorded values of several PI points.
+    Every tag exists, and records a value every `sample_interval_ms`, aligned on the epoch, so the history is
+    deterministic: the same request always gets the same values. The web ID of a tag encodes its name.
+    Like the PI Web API, a stream returns at most `maxCount` values, 1000 by default.
+"""
+
+DEFAULT_MAX_COUNT = 1000
+WEB_ID_PREFIX = "P1DP"
+# Times relative to now, e.g. `*-1d`
+_RELATIVE_TIME = re.compile(r"^\*\s*([+-])\s*(\d+(?:\.\d+)?)\s*([smhd])$")
+_TIME_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def tag_to_web_id(tag_name: str) -> str:
+    return WEB_ID_PREFIX + base64.urlsafe_b64encode(tag_name.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def web_id_to_tag(web_id: str) -> str:
+    encoded = web_id[len(WEB_ID_PREFIX):]
+    return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8")
+
+
+def parse_time(value: str) -> datetime:
+    """
+    :param value: `*` for now, a time relative to now, e.g. `*-1d`, or an ISO 8601 time, UTC without a time zone
+    :return: The time
+    """
+    value = value.strip()
+    if value == "*":
+        return datetime.now(timezone.utc)
+
+    relative = _RELATIVE_TIME.match(value)
+    if relative:
+        sign, amount, unit = relative.groups()
+        offset = timedelta(**{_TIME_UNITS[unit]: float(amount)})
+        return datetime.now(timezone.utc) + (offset if sign == "+" else -offset)
+
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def sample_indexes(start_time: datetime, end_time: datetime, sample_interval_ms: int) -> range:
+    """
+    :return: The indexes of the samples recorded from the start time to the end time, both included.
+        Sample `index` is recorded `index * sample_interval_ms` after the epoch.
+    """
+    start_ms = start_time.timestamp() * 1000
+    end_ms = end_time.timestamp() * 1000
+    return range(math.ceil(start_ms / sample_interval_ms), math.floor(end_ms / sample_interval_ms) + 1)
+
+
+def expected_samples(tags: int, start_time: datetime, end_time: datetime, sample_interval_ms: int) -> int:
+    """
+    :return: The number of values the tags recorded from the start time to the end time
+    """
+    return tags * len(sample_indexes(start_time, end_time, sample_interval_ms))
+
+
+def recorded_value(tag_name: str, index: int) -> dict:
+    """
+    :return: The PI timed value of sample `index` of the tag
+    """
+    seed = zlib.crc32(tag_name.encode("utf-8"))
+    return {
+        "Value": round(seed % 1000 + 10 * math.sin(index / 10), 4),
+        "Good": (seed + index) % 50 != 0,
+        "Questionable": False,
+        "Substituted": False,
+        "Annotated": False,
+        "UnitsAbbreviation": ""
+    }
+
+
+def pi_point(server_name: str, tag_name: str) -> dict:
+    web_id = tag_to_web_id(tag_name)
+    return {
+        "WebId": web_id,
+        "Id": zlib.crc32(tag_name.encode("utf-8")),
+        "Name": tag_name,
+        "Path": f"\\\\{server_name}\\{tag_name}",
+        "Descriptor": "",
+        "PointClass": "classic",
+        "PointType": "Float64",
+        "DigitalSetName": "",
+        "EngineeringUnits": "",
+        "Span": 100.0,
+        "Zero": 0.0,
+        "Step": False,
+        "Future": False,
+        "DisplayDigits": -5,
+        "Links": {}
+    }
+
+
+class PiWebApiRequestHandler(BaseHTTPRequestHandler):
+    # Set on the handler class of a server
+    server_name = "benchmark"
+    sample_interval_ms = 1000
+    latency_ms = 0
+    requests = None
+
+    def do_GET(self):
+        if self.requests is not None:
+            with self.requests.get_lock():
+                self.requests.value += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        url = urlparse(self.path)
+        path = url.path.rstrip("/").lower()
+        query = {key.lower(): values for key, values in parse_qs(url.query).items()}
+
+        try:
+            if path.endswith("/streamsets/recorded"):
+                body = self.get_recorded(query)
+            elif path.endswith("/points/multiple"):
+                body = self.get_points_multiple(query)
+            elif path.endswith("/points"):
+                body = self.get_point_by_path(query)
+            else:
+                self.send_json(404, {"Errors": [f"The resource {url.path} is not served by the simulator"]})
+                return
+        except (KeyError, ValueError) as err:
+            self.send_json(400, {"Errors": [f"Bad request: {err}"]})
+            return
+
+        self.send_json(200, body)
+
+    def get_point_by_path(self, query: dict) -> dict:
+        path = query["path"][0]
+        tag_name = path.rsplit("\\", 1)[-1]
+        return pi_point(self.server_name, tag_name)
+
+    def get_points_multiple(self, query: dict) -> dict:
+        items = []
+        for web_id in query["webid"]:
+            items.append({
+                "Identifier": web_id,
+                "IdentifierType": "WebId",
+                "Object": pi_point(self.server_name, web_id_to_tag(web_id)),
+                "Exception": None
+            })
+        return {"Items": items, "Links": {}}
+
+    def get_recorded(self, query: dict) -> dict:
+        start_time = parse_time(query.get("starttime", ["*-1d"])[0])
+        end_time = parse_time(query.get("endtime", ["*"])[0])
+        max_count = int(query.get("maxcount", [DEFAULT_MAX_COUNT])[0])
+        indexes = sample_indexes(start_time, end_time, self.sample_interval_ms)[:max_count]
+
+        items = []
+        for web_id in query["webid"]:
+            tag_name = web_id_to_tag(web_id)
+            items.append({
+                "WebId": web_id,
+                "Name": tag_name,
+                "Path": f"\\\\{self.server_name}\\{tag_name}",
+                "Links": {},
+                "Items": [
+                    {"Timestamp": self.format_time(index), **recorded_value(tag_name, index)}
+                    for index in indexes
+                ],
+                "UnitsAbbreviation": ""
+            })
+        return {"Items": items, "Links": {}}
+
+    def format_time(self, index: int) -> str:
+        epoch = datetime(1970, 1, 1)
+        return (epoch + timedelta(milliseconds=index * self.sample_interval_ms)).isoformat() + "Z"
+
+    def send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(server_name: str, sample_interval_ms: int, latency_ms: float, port, requests, ready) -> None:
+    handler = type("Handler", (PiWebApiRequestHandler,), {
+        "server_name": server_name,
+        "sample_interval_ms": sample_interval_ms,
+        "latency_ms": latency_ms,
+        "requests": requests
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    port.value = server.server_address[1]
+    ready.set()
+    server.serve_forever()
+
+
+class PiWebApiServerProcess(ServerProcess):
+    """
+    Runs the PI Web API stand-in in a separate process, on a free port of the loopback interface
+    """
+    name = "PI Web API server"
+
+    def __init__(self, server_name: str = "benchmark", sample_interval_ms: int = 1000, latency_ms: float = 0):
+        """
+        :param server_name: The PI Data Archive server name of the point paths
+        :param sample_interval_ms: The time between the recorded values of a tag (in milliseconds)
+        :param latency_ms: The time every request waits before it is answered (in milliseconds)
+        """
+        super().__init__(_serve, server_name, sample_interval_ms, latency_ms)
+        self.server_name = server_name
+        self.sample_interval_ms = sample_interval_ms
+        self.latency_ms = latency_ms
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/piwebapi"
@@ -0,0 +1,60 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import multiprocessing
+
+
+class ServerProcess:
+    """
+    Runs a local server of the benchmarks in a separate process, so its CPU time and memory
+    are not counted in the benchmarked process.
+    The serve function binds a free port of the loopback interface, sets `port`, sets `ready`, and serves forever.
+    It counts the requests it gets in `requests`.
+    """
+    name = "server"
+
+    def __init__(self, serve_function, *serve_args):
+        """
+        :param serve_function: Called with the serve arguments, and the shared `port`, `requests` and `ready`
+        :param serve_args: The arguments of the serve function
+        """
+        self._serve_function = serve_function
+        self._serve_args = serve_args
+        self._port = multiprocessing.Value("i", 0)
+        self._requests = multiprocessing.Value("L", 0)
+        self._ready = multiprocessing.Event()
+        self._process = None
+
+    @property
+    def port(self) -> int:
+        return self._port.value
+
+    @property
+    def requests(self) -> int:
+        """
+        :return: The number of requests the server has received
+        """
+        return self._requests.value
+
+    def start(self, timeout: float = 10) -> None:
+        self._process = multiprocessing.Process(
+            target=self._serve_function,
+            args=(*self._serve_args, self._port, self._requests, self._ready),
+            daemon=True)
+        self._process.start()
+        if not self._ready.wait(timeout):
+            self.stop()
+            raise RuntimeError(f"The {self.name} did not start in time")
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
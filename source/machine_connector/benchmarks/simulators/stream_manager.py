@@ -0,0 +1,232 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+
+from collections import deque, namedtuple
+
+from greengrasssdk.stream_manager import (
+    InvalidRequestException,
+    MessageStreamDefinition,
+    NotEnoughMessagesException,
+    ReadMessagesOptions,
+    RequestPayloadTooLargeException,
+    ResourceNotFoundException,
+    StrategyOnFull,
+    StreamManagerException
+)
+from greengrasssdk.stream_manager.data import Message, MessageStreamInfo
+
+"""
+    An in-process Stream Manager, which serves the `StreamManagerClient` calls of the solution:
+        - the messages of a stream get increasing sequence numbers, from 0,
+        - `read_messages` waits up to the read timeout for the minimum number of messages,
+          returns up to the maximum number, and raises `NotEnoughMessagesException` otherwise,
+        - a full stream overwrites its oldest messages, or rejects new ones, as its strategy on full tells,
+        - the messages appended to a stream with Kinesis or IoT SiteWise exports are recorded by the `ExportRecorder`.
+    The exports are recorded when the message is appended, so the export batching of Stream Manager is not simulated.
+"""
+
+EXPORT_KINESIS = "kinesis"
+EXPORT_IOT_SITEWISE = "iot_sitewise"
+
+ExportRecord = namedtuple("ExportRecord",
+                          ["export_type", "identifier", "stream_name", "sequence_number", "data", "export_time"])
+
+
+class ExportRecorder:
+    """
+    Records the messages Stream Manager would export, with the time they were exported (in epoch seconds)
+    """
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, export_type: str, identifier: str, stream_name: str, sequence_number: int, data: bytes) -> None:
+        record = ExportRecord(export_type, identifier, stream_name, sequence_number, data, time.time())
+        with self._lock:
+            self._records.append(record)
+
+    def get_records(self, export_type: str = None, stream_name: str = None) -> list:
+        """
+        :param export_type: `kinesis` or `iot_sitewise`, `None` for every export type
+        :param stream_name: The stream name, `None` for every stream
+        :return: The recorded exports, in export order
+        """
+        with self._lock:
+            records = list(self._records)
+        return [record for record in records
+                if (export_type is None or record.export_type == export_type)
+                and (stream_name is None or record.stream_name == stream_name)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+class _Stream:
+    def __init__(self, definition: MessageStreamDefinition):
+        self.definition = definition
+        self.messages = deque()
+        self.next_sequence_number = 0
+        self.total_bytes = 0
+        # Guards the stream, and wakes up the reads waiting for messages
+        self.condition = threading.Condition()
+
+        export_definition = definition.export_definition
+        self.exports = []
+        if export_definition is not None:
+            self.exports.extend((EXPORT_KINESIS, config.identifier)
+                                for config in export_definition.kinesis or [] if not config.disabled)
+            self.exports.extend((EXPORT_IOT_SITEWISE, config.identifier)
+                                for config in export_definition.iot_sitewise or [] if not config.disabled)
+
+
+class SimulatedStreamManager:
+    """
+    The streams and the exports of the simulated Stream Manager, shared by the clients in the process
+    """
+
+    def __init__(self, recorder: ExportRecorder = None):
+        """
+        :param recorder: Records the exports, a new recorder by default
+        """
+        self.recorder = recorder or ExportRecorder()
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def client(self) -> 'SimulatedStreamManagerClient':
+        """
+        :return: A client of the simulated Stream Manager, used in place of `StreamManagerClient()`
+        """
+        return SimulatedStreamManagerClient(self)
+
+    def list_streams(self) -> list:
+        with self._lock:
+            return list(self._streams.keys())
+
+    def create_message_stream(self, definition: MessageStreamDefinition) -> None:
+        with self._lock:
+            if definition.name in self._streams:
+                raise InvalidRequestException(f"Message stream {definition.name} already exists")
+            self._streams[definition.name] = _Stream(definition)
+
+    def delete_message_stream(self, stream_name: str) -> None:
+        with self._lock:
+            if self._streams.pop(stream_name, None) is None:
+                raise ResourceNotFoundException(f"Message stream {stream_name} does not exist")
+
+    def append_message(self, stream_name: str, data: bytes) -> int:
+        stream = self._get_stream(stream_name)
+        definition = stream.definition
+
+        with stream.condition:
+            if len(data) > definition.max_size:
+                raise RequestPayloadTooLargeException(
+                    f"The message of {len(data)} bytes exceeds the size of stream {stream_name}")
+
+            while stream.total_bytes + len(data) > definition.max_size:
+                if definition.strategy_on_full != StrategyOnFull.OverwriteOldestData:
+                    raise StreamManagerException(f"Message stream {stream_name} is full")
+                stream.total_bytes -= len(stream.messages.popleft().payload)
+
+            sequence_number = stream.next_sequence_number
+            stream.messages.append(Message(stream_name=stream_name, sequence_number=sequence_number,
+                                           ingest_time=int(time.time() * 1000), payload=data))
+            stream.next_sequence_number += 1
+            stream.total_bytes += len(data)
+            stream.condition.notify_all()
+
+        for export_type, identifier in stream.exports:
+            self.recorder.record(export_type, identifier, stream_name, sequence_number, data)
+        return sequence_number
+
+    def read_messages(self, stream_name: str, options: ReadMessagesOptions = None) -> list:
+        options = options or ReadMessagesOptions()
+        stream = self._get_stream(stream_name)
+        min_message_count = options.min_message_count or 1
+        max_message_count = options.max_message_count or min_message_count
+        deadline = time.monotonic() + (options.read_timeout_millis or 0) / 1000
+
+        with stream.condition:
+            while True:
+                # The read starts from the oldest message when the desired ones were overwritten
+                oldest_sequence_number = stream.next_sequence_number - len(stream.messages)
+                start = max(options.desired_start_sequence_number or 0, oldest_sequence_number)
+                if stream.next_sequence_number - start >= min_message_count:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if start >= stream.next_sequence_number:
+                        raise NotEnoughMessagesException(
+                            "the desired starting sequence number is greater than the last sequence number "
+                            "of the stream")
+                    raise NotEnoughMessagesException("the stream does not hold the minimum number of messages")
+                stream.condition.wait(remaining)
+
+            offset = start - oldest_sequence_number
+            end = min(len(stream.messages), offset + max_message_count)
+            return [stream.messages[index] for index in range(offset, end)]
+
+    def describe_message_stream(self, stream_name: str) -> MessageStreamInfo:
+        stream = self._get_stream(stream_name)
+
+        with stream.condition:
+            # An empty stream reports the sequence number of its next message as the oldest one
+            storage_status = MessageStreamInfo.storageStatus(
+                oldest_sequence_number=stream.next_sequence_number - len(stream.messages),
+                newest_sequence_number=stream.next_sequence_number - 1,
+                total_bytes=stream.total_bytes)
+
+        return MessageStreamInfo(definition=stream.definition, storage_status=storage_status, export_statuses=[])
+
+    def _get_stream(self, stream_name: str) -> _Stream:
+        with self._lock:
+            stream = self._streams.get(stream_name)
+        if stream is None:
+            raise ResourceNotFoundException(f"Message stream {stream_name} does not exist")
+        return stream
+
+
+class SimulatedStreamManagerClient:
+    """
+    Serves the `StreamManagerClient` calls of the solution from a simulated Stream Manager
+    """
+
+    def __init__(self, stream_manager: SimulatedStreamManager):
+        self.stream_manager = stream_manager
+        self.connected = True
+
+    def list_streams(self) -> list:
+        self._check_connected()
+        return self.stream_manager.list_streams()
+
+    def create_message_stream(self, definition: MessageStreamDefinition) -> None:
+        self._check_connected()
+        self.stream_manager.create_message_stream(definition)
+
+    def delete_message_stream(self, stream_name: str) -> None:
+        self._check_connected()
+        self.stream_manager.delete_message_stream(stream_name)
+
+    def append_message(self, stream_name: str, data: bytes) -> int:
+        self._check_connected()
+        return self.stream_manager.append_message(stream_name, data)
+
+    def read_messages(self, stream_name: str, options: ReadMessagesOptions = None) -> list:
+        self._check_connected()
+        return self.stream_manager.read_messages(stream_name, options)
+
+    def describe_message_stream(self, stream_name: str) -> MessageStreamInfo:
+        self._check_connected()
+        return self.stream_manager.describe_message_stream(stream_name)
+
+    def close(self) -> None:
+        self.connected = False
+
+    def _check_connected(self) -> None:
+        if not self.connected:
+            raise StreamManagerException("Client is closed")
@@ -1,20 +1,151 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import os
+import atexit
+import copy
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+
+from logging.handlers import QueueHandler, QueueListener
+from utils.metrics import get_registry
+
+"""
+    The logging of the components is configured once per process, on the first `get_logger` call:
+        - The records are handed to a queue, and a listener thread writes them to stdout,
+          so the data threads do not wait for the log output.
+        - Repeated warnings and errors are rate limited per call site: a call site logs at most
+          `LOG_RATE_LIMIT_BURST` records per `LOG_RATE_LIMIT_INTERVAL` seconds, and the next record
+          after the interval tells how many were suppressed.
+    Log with lazily formatted messages, e.g. `logger.debug("Read %d messages", count)`,
+    so the message is only formatted when the record is logged.
+"""
+
+# Log level from component environment variables
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Maximum number of records waiting for the listener thread, the newer records are dropped when it is full
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Maximum number of warnings and errors per call site and interval, 0 disables the rate limit
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+# Rate limit interval (in seconds)
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "60"))
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits the records of each call site from the level on, e.g. an error logged for every message of a stream.
+    """
+
+    def __init__(self, burst: int = LOG_RATE_LIMIT_BURST, interval: float = LOG_RATE_LIMIT_INTERVAL,
+                 level: int = logging.WARNING):
+        """
+        :param burst: The maximum number of records per call site and interval
+        :param interval: The interval (in seconds)
+        :param level: The lowest level which is rate limited
+        """
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.level = level
+
+        # Call site: [interval start, records in the interval, suppressed records in the interval]
+        self._call_sites = {}
+        self._lock = threading.Lock()
+        self._suppressed = get_registry().counter("logging.suppressed")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level or self.burst <= 0:
+            return True
+
+        call_site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._call_sites.get(call_site)
+            if state is None or now - state[0] >= self.interval:
+                suppressed = state[2] if state else 0
+                self._call_sites[call_site] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                self._suppressed.inc()
+                return False
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Only merges the message arguments in the logging thread. The listener thread formats the record.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._dropped = get_registry().counter("logging.dropped")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The arguments may change after the call, so the message is merged now.
+        # The exception is rendered now as well, as its traceback does not outlive the handler.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._dropped.inc()
+
+
+def configure_logging(stream=None, level: str = None) -> None:
+    """
+    Configures the logging of the process, the first call only.
+
+    :param stream: The log output, stdout by default
+    :param level: The root log level, `LOG_LEVEL` by default
+    """
+    global _listener
+
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        level = level or LOG_LEVEL
+        valid_level = isinstance(logging.getLevelName(level.upper()), int)
+
+        output_handler = logging.StreamHandler(stream or sys.stdout)
+        output_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level.upper() if valid_level else logging.INFO)
+        root_logger.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, output_handler)
+        _listener.start()
+        # Writes the queued records before the process exits
+        atexit.register(_listener.stop)
+
+    if not valid_level:
+        logging.getLogger(__name__).warning(
+            "Invalid log level %s, using the INFO log level", level)
 
 
-def get_logger(class_name: str):
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    try:
-        print(f"setting log level to: {LOG_LEVEL}")
-        logging.basicConfig(stream=sys.stdout, level=LOG_LEVEL)
-    except Exception as err:
-        print("Setting log level failed...using default log level")
-        print(err)
-        logging.basicConfig(stream=sys.stdout, level="INFO")
-    logger = logging.getLogger(class_name)
-    logger.info(f"Using Log Level: {LOG_LEVEL}")
-    return logger
+def get_logger(class_name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(class_name)
@@ -1,7 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import dateutil.parser as parser
+from datetime import datetime
 
 from utils.custom_exception import ValidationException
 
@@ -24,6 +24,14 @@ class Message:
 
     def _validate_timestamp(self) -> None:
         try:
+            # ISO timestamps, the usual case, are parsed without dateutil, which is imported when it is needed
+            datetime.fromisoformat(self.timestamp)
+            return
+        except ValueError:
+            pass
+
+        try:
+            import dateutil.parser as parser
             parser.parse(self.timestamp)
         except Exception as e:
             self._raise_validation_error(e)
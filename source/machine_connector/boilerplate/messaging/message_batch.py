@@ -5,6 +5,8 @@ import os
 
 from boilerplate.messaging.message import Message
 from utils.custom_exception import ValidationException
+from utils.metadata_template import MetadataTemplate
+from utils.trace import TRACE_KEY, TraceSampler
 
 # Site name from component environment variables
 SITE_NAME = os.getenv("SITE_NAME")
@@ -15,15 +17,25 @@ PROCESS = os.getenv("PROCESS")
 # Machine name from component environment variables
 MACHINE_NAME = os.getenv("MACHINE_NAME")
 
+# Builds the aliases of the tags
+_metadata_template = MetadataTemplate(SITE_NAME, AREA, PROCESS, MACHINE_NAME)
+# Picks the message batches whose stages are traced, see `utils.trace`
+_trace_sampler = TraceSampler()
+
 
 class MessageBatch:
 
     def __init__(self, tag: str, messages: 'list[Message]', source_id: str) -> None:
-        self.alias = f"{SITE_NAME}/{AREA}/{PROCESS}/{MACHINE_NAME}/{tag}"
+        self.alias = _metadata_template.alias(tag) if isinstance(tag, str) else None
         self.messages = self._get_messages_as_dict(messages)
         self.sourceId = source_id
         self.validate(tag, messages)
 
+        # Only a traced batch carries a trace, so the payload of the other batches is unchanged
+        trace = _trace_sampler.start()
+        if trace is not None:
+            setattr(self, TRACE_KEY, trace)
+
     def validate(self, tag: str, messages: 'list[Message]') -> None:
         if (isinstance(self.alias, str) == False
             or isinstance(tag, str) == False
@@ -0,0 +1,169 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Union
+
+from boilerplate.messaging.message_batch import MessageBatch
+
+# Overflow policies applied when a new batch does not fit into the queue
+OVERFLOW_POLICY_BLOCK = "block"
+OVERFLOW_POLICY_DROP_OLDEST = "drop_oldest"
+OVERFLOW_POLICY_SPILL = "spill"
+OVERFLOW_POLICIES = [
+    OVERFLOW_POLICY_BLOCK,
+    OVERFLOW_POLICY_DROP_OLDEST,
+    OVERFLOW_POLICY_SPILL
+]
+
+
+class MessageQueue:
+    """
+    Bounded in-memory queue of message batches waiting to be written to Stream Manager.
+
+    The queue is bounded by the number of messages it holds, not by the number of batches.
+    Pending batches for the same alias are coalesced into a single batch, so a tag costs one
+    stream append no matter how many poll cycles happened while the sender was busy.
+    Batches are handed out oldest first. The ownership of a batch passes to the queue on `put`.
+    Once the queue is closed, `get` hands out the remaining batches and then returns `None` without waiting.
+    """
+
+    def __init__(self, max_messages: int, overflow_policy: str = OVERFLOW_POLICY_BLOCK,
+                 spill_callback: Callable[[MessageBatch], None] = None):
+        """
+        :param max_messages: The maximum number of messages held by the queue
+        :param overflow_policy: `block`, `drop_oldest` or `spill`
+        :param spill_callback: Receives the evicted batches when the overflow policy is `spill`
+        :raises: :err:`ValueError` when the configuration is invalid
+        """
+        if max_messages <= 0:
+            raise ValueError(
+                f"The queue size must be greater than 0: {max_messages}")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unsupported overflow policy: {overflow_policy}")
+        if overflow_policy == OVERFLOW_POLICY_SPILL and spill_callback is None:
+            raise ValueError(
+                "A spill callback is required for the spill overflow policy")
+
+        self.max_messages = max_messages
+        self.overflow_policy = overflow_policy
+        self.spill_callback = spill_callback
+
+        self.dropped_messages = 0
+        self.spilled_messages = 0
+
+        # (alias, source ID) -> [message batch, enqueue time of the oldest coalesced batch]
+        self._pending = OrderedDict()
+        self._depth = 0
+        self._unfinished = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def depth(self) -> int:
+        """The number of messages waiting in the queue."""
+        return self._depth
+
+    @property
+    def batches(self) -> int:
+        """The number of batches waiting in the queue."""
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the queue has been closed."""
+        return self._closed
+
+    def put(self, message_batch: MessageBatch, timeout: Union[float, None] = None) -> bool:
+        """
+        Enqueues a message batch, coalescing it with a pending batch for the same alias.
+        A batch larger than the whole queue is accepted once the queue is empty.
+
+        :param message_batch: The message batch to enqueue
+        :param timeout: The maximum time to wait for room with the `block` policy, `None` waits forever
+        :return: `False` when the batch was dropped because there was no room before the timeout
+        """
+        size = len(message_batch.messages)
+
+        with self._condition:
+            if self.overflow_policy == OVERFLOW_POLICY_BLOCK:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self._is_full(size):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.dropped_messages += size
+                        return False
+                    self._condition.wait(remaining)
+            else:
+                while self._is_full(size):
+                    _, (oldest_batch, _) = self._pending.popitem(last=False)
+                    self._depth -= len(oldest_batch.messages)
+                    self._unfinished -= 1
+
+                    if self.overflow_policy == OVERFLOW_POLICY_DROP_OLDEST:
+                        self.dropped_messages += len(oldest_batch.messages)
+                    else:
+                        self.spilled_messages += len(oldest_batch.messages)
+                        # The evicted batch is spilled before the consumer can take a newer batch,
+                        # so the consumer finds it in the spill target and writes it first.
+                        self.spill_callback(oldest_batch)
+
+            key = (message_batch.alias, message_batch.sourceId)
+            pending = self._pending.get(key)
+            if pending:
+                pending[0].messages.extend(message_batch.messages)
+            else:
+                self._pending[key] = [message_batch, time.monotonic()]
+                self._unfinished += 1
+
+            self._depth += size
+            self._condition.notify_all()
+
+        return True
+
+    def get(self, timeout: Union[float, None] = None) -> Union[tuple, None]:
+        """
+        Dequeues the oldest message batch.
+
+        :param timeout: The maximum time to wait for a batch, `None` waits forever
+        :return: The message batch and its enqueue time from `time.monotonic()`,
+            or `None` on timeout or when the queue is closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending or self._closed, timeout) or not self._pending:
+                return None
+
+            _, (message_batch, enqueue_time) = self._pending.popitem(last=False)
+            self._depth -= len(message_batch.messages)
+            self._condition.notify_all()
+
+            return message_batch, enqueue_time
+
+    def close(self) -> None:
+        """Closes the queue, which wakes up the consumers waiting for a batch."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def task_done(self) -> None:
+        """Marks a batch returned by `get` as processed."""
+        with self._condition:
+            self._unfinished -= 1
+            self._condition.notify_all()
+
+    def join(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Waits until every enqueued batch has been processed.
+
+        :param timeout: The maximum time to wait, `None` waits forever
+        :return: `True` when the queue has been drained
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._unfinished <= 0, timeout)
+
+    def _is_full(self, size: int) -> bool:
+        return self._depth > 0 and self._depth + size > self.max_messages
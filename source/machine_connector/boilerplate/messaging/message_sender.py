@@ -3,21 +3,37 @@
 
 from inspect import trace
 import os
-import traceback
+import threading
+import time
 from greengrasssdk.stream_manager import ExportDefinition
 
-from utils import StreamManagerHelperClient, AWSEndpointClient, InitMessage
+from utils import StreamManagerHelperClient, AWSEndpointClient
+from utils.metadata_template import MetadataTemplate
+from utils.constants import WORK_BASE_DIR
+from utils.message_spool import MessageSpool, DEFAULT_MAX_SIZE
+from utils.metrics import get_registry
+from utils.startup_profiler import FIRST_SAMPLE, get_startup_profiler
+from utils.trace import APPEND, ENQUEUE, TRACE_KEY, stamp
 from boilerplate.messaging.message_batch import MessageBatch
+from boilerplate.messaging.message_queue import MessageQueue, OVERFLOW_POLICY_BLOCK
 import boilerplate.messaging.announcements as announcements
 import boilerplate.logging.logger as ConnectorLogging
 
 
 class MessageSender:
 
-    def __init__(self):
+    def __init__(self, queue_size: int = None, overflow_policy: str = None):
+        """
+        :param queue_size: The maximum number of messages buffered for the background sender.
+            When it is 0, message batches are written synchronously by the caller.
+            Defaults to the `MESSAGE_QUEUE_SIZE` environment variable, or 0.
+        :param overflow_policy: `block`, `drop_oldest` or `spill` when the queue is full.
+            Defaults to the `MESSAGE_QUEUE_OVERFLOW_POLICY` environment variable, or `block`.
+        """
         self._smh_client = StreamManagerHelperClient()
         self._connector_client = AWSEndpointClient()
         self.logger = ConnectorLogging.get_logger(self.__class__.__name__)
+        self._startup_profiler = get_startup_profiler()
 
         self.MAX_STREAM_SIZE = 5368706371  # 5G
         self.CONNECTION_GG_STREAM_NAME = os.getenv("CONNECTION_GG_STREAM_NAME")
@@ -31,9 +47,168 @@ class MessageSender:
         self.PROCESS = os.getenv("PROCESS")
         # Machine name from component environment variables
         self.MACHINE_NAME = os.getenv("MACHINE_NAME")
+        # The metadata of the info and error messages
+        self._metadata_template = MetadataTemplate(
+            self.SITE_NAME, self.AREA, self.PROCESS, self.MACHINE_NAME, self.CONNECTION_NAME)
+
+        # Background sender configuration
+        self.MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", "0")) \
+            if queue_size is None else queue_size
+        self.MESSAGE_QUEUE_OVERFLOW_POLICY = os.getenv("MESSAGE_QUEUE_OVERFLOW_POLICY", OVERFLOW_POLICY_BLOCK) \
+            if overflow_policy is None else overflow_policy
+        # Seconds the background sender waits for a batch before replaying the spool
+        self.SENDER_IDLE_TIMEOUT = 1
+
+        # Message spool for the data which cannot be written to Stream Manager, 0 disables it
+        self.MESSAGE_SPOOL_MAX_SIZE = int(
+            os.getenv("MESSAGE_SPOOL_MAX_SIZE", str(DEFAULT_MAX_SIZE)))
+        self.MESSAGE_SPOOL_DIR = f"{WORK_BASE_DIR}/m2c2-{self.CONNECTION_NAME}/spool"
+        # Number of spooled message batches replayed at a time
+        self.SPOOL_REPLAY_BATCH = 100
+
+        self._stream_exists = False
+        self._spool = None
+        self._spool_lock = threading.Lock()
+        self._gauges_lock = threading.Lock()
+        self._written_batches = 0
+        self._last_latency_ms = 0
+        self._max_latency_ms = 0
+        self._message_queue = None
+        self._sender_thread = None
+
+        # The queue gauges are published to the metrics registry when metrics are enabled
+        metrics = get_registry()
+        self._registry_gauges = {
+            name: metrics.gauge(f"message_sender.{name}") for name in self.get_queue_gauges()
+        } if metrics.enabled else {}
+
+        # The data spooled before a restart is replayed before any new data is written
+        if self.MESSAGE_SPOOL_MAX_SIZE > 0:
+            self._open_spool()
+
+        if self.MESSAGE_QUEUE_SIZE > 0:
+            self._message_queue = MessageQueue(
+                max_messages=self.MESSAGE_QUEUE_SIZE,
+                overflow_policy=self.MESSAGE_QUEUE_OVERFLOW_POLICY,
+                spill_callback=self._spill_message_batch
+            )
+            self._sender_thread = threading.Thread(
+                target=self._run_sender, name=self.__class__.__name__, daemon=True)
+            self._sender_thread.start()
 
     def post_message_batch(self, message_batch: MessageBatch) -> None:
+        """
+        Posts the message batch to the connection stream.
+        When the background sender is enabled, this only enqueues the batch.
+        """
+        stamp(getattr(message_batch, TRACE_KEY, None), ENQUEUE)
+        if self._message_queue is None or self._message_queue.closed:
+            self._write_message_batch(message_batch.__dict__)
+        elif not self._message_queue.put(message_batch):
+            self.logger.error(
+                "Message queue is full, dropping the message batch for %s", message_batch.alias)
+        self._startup_profiler.mark(FIRST_SAMPLE)
+        self._publish_gauges()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until the background sender has written every queued message batch.
+
+        :param timeout: The maximum time to wait, `None` waits forever
+        :return: `True` when the queue has been drained
+        """
+        if self._message_queue is None:
+            return True
+        return self._message_queue.join(timeout)
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Stops the background sender once it has written every queued message batch, and closes the spool.
+        The message batches posted afterwards are written synchronously.
+
+        :param timeout: The maximum time to wait for the background sender, `None` waits forever
+        :return: `True` when the background sender has stopped
+        """
+        if self._sender_thread is not None:
+            self._message_queue.close()
+            self._sender_thread.join(timeout)
+
+            if self._sender_thread.is_alive():
+                self.logger.warning(
+                    f"The background message sender did not stop within {timeout} seconds")
+                return False
+
+        with self._spool_lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+        return True
+
+    def get_queue_gauges(self) -> dict:
+        """
+        Returns the background sender gauges.
+        Latency is the time between enqueueing a batch and writing it to Stream Manager.
+        """
+        with self._gauges_lock:
+            gauges = {
+                "queue_depth": 0,
+                "queue_batches": 0,
+                "dropped_messages": 0,
+                "spilled_messages": 0,
+                "spooled_bytes": 0,
+                "written_batches": self._written_batches,
+                "last_latency_ms": self._last_latency_ms,
+                "max_latency_ms": self._max_latency_ms
+            }
+
+        if self._message_queue is not None:
+            gauges["queue_depth"] = self._message_queue.depth
+            gauges["queue_batches"] = self._message_queue.batches
+            gauges["dropped_messages"] = self._message_queue.dropped_messages
+            gauges["spilled_messages"] = self._message_queue.spilled_messages
+
+        if self._spool is not None:
+            gauges["spooled_bytes"] = self._spool.size
+
+        return gauges
+
+    def _publish_gauges(self) -> None:
+        if not self._registry_gauges:
+            return
+
+        for name, value in self.get_queue_gauges().items():
+            self._registry_gauges[name].set(value)
+
+    def _write_message_batch(self, data: dict) -> bool:
+        """
+        Writes the data to the connection stream.
+        While older data waits in the spool, the spool is replayed first and new data is queued behind it,
+        so the data reaches the stream in order. Data which cannot be written is spooled.
+
+        :return: `True` when the data was written to the stream
+        """
         try:
+            if self._spool is not None and not self._spool.is_empty():
+                self._replay_spool()
+
+                if not self._spool.is_empty():
+                    self._spool_data(data)
+                    return False
+
+            self._write_to_stream(data)
+            return True
+        except Exception as err:
+            # The stream might have been removed, so check it again on the next write.
+            self._stream_exists = False
+            self.logger.error(
+                "Failed to publish message to Stream Manager. Error: %s", err, exc_info=True
+            )
+            self._spool_data(data)
+            return False
+
+    def _write_to_stream(self, data: dict) -> None:
+        if not self._stream_exists:
             avail_streams = self._smh_client.list_streams()
 
             if self.CONNECTION_GG_STREAM_NAME not in avail_streams:
@@ -44,15 +219,88 @@ class MessageSender:
                 self._smh_client.create_stream(
                     self.CONNECTION_GG_STREAM_NAME, self.MAX_STREAM_SIZE, gg_exports
                 )
+            self._stream_exists = True
+
+        stamp(data.get(TRACE_KEY), APPEND)
+        self._smh_client.write_to_stream(
+            self.CONNECTION_GG_STREAM_NAME, data)
+
+    def _run_sender(self) -> None:
+        while True:
+            try:
+                item = self._message_queue.get(self.SENDER_IDLE_TIMEOUT)
+
+                if item is None:
+                    if self._message_queue.closed:
+                        return
+                    if self._spool is not None and not self._spool.is_empty():
+                        self._replay_spool()
+                    continue
+
+                message_batch, enqueue_time = item
+                try:
+                    if self._write_message_batch(message_batch.__dict__):
+                        self._record_latency(enqueue_time)
+                finally:
+                    self._message_queue.task_done()
+                    self._publish_gauges()
+            except Exception as err:
+                self.logger.error(
+                    "Unexpected error in the background message sender: %s", err)
+
+    def _record_latency(self, enqueue_time: float) -> None:
+        latency_ms = (time.monotonic() - enqueue_time) * 1000
+
+        with self._gauges_lock:
+            self._written_batches += 1
+            self._last_latency_ms = latency_ms
+            self._max_latency_ms = max(self._max_latency_ms, latency_ms)
 
-            self._smh_client.write_to_stream(
-                self.CONNECTION_GG_STREAM_NAME, message_batch.__dict__)
+    def _spill_message_batch(self, message_batch: MessageBatch) -> None:
+        self._spool_data(message_batch.__dict__)
 
+    def _spool_data(self, data: dict) -> None:
+        if self.MESSAGE_SPOOL_MAX_SIZE <= 0:
+            self.logger.error(
+                "The message spool is disabled, dropping the message batch")
+            return
+
+        try:
+            self._open_spool()
+            self._spool.append(data)
         except Exception as err:
-            self.logger.error(traceback.format_exc())
             self.logger.error(
-                f"Failed to publish message to Stream Manager. Error: {err}"
-            )
+                "Failed to spool the message batch to disk. Error: %s", err)
+
+    def _open_spool(self) -> None:
+        """
+        Opens the message spool, which recovers the data spooled before a restart.
+        When it cannot be opened, it is opened again on the next spooled message batch.
+        """
+        try:
+            with self._spool_lock:
+                if self._spool is None:
+                    self._spool = MessageSpool(
+                        self.MESSAGE_SPOOL_DIR, max_size=self.MESSAGE_SPOOL_MAX_SIZE)
+
+                    if not self._spool.is_empty():
+                        self.logger.info(
+                            f"Found {self._spool.size} bytes of spooled message batches, replaying them first")
+        except Exception as err:
+            self.logger.error(
+                "Failed to open the message spool. Error: %s", err)
+
+    def _replay_spool(self) -> None:
+        """
+        Replays a chunk of the spooled data to the connection stream.
+        Replay stops at the first failure, which is raised to the caller.
+        """
+        replayed = self._spool.replay(
+            self._write_to_stream, self.SPOOL_REPLAY_BATCH)
+
+        if replayed:
+            self.logger.info(
+                f"Replayed {replayed} spooled message batches to Stream Manager")
 
     def post_info_message(self, message: str) -> None:
         try:
@@ -96,7 +344,4 @@ class MessageSender:
         }
 
     def _generate_non_data_message(self, message: str) -> dict:
-        init_message = InitMessage()
-        user_message = init_message.init_user_message()
-        user_message["message"] = message
-        return user_message
+        return {**self._metadata_template.user_message, "message": message}
@@ -2,9 +2,16 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import json
+import logging
+import queue
+import sys
 
 from unittest import mock, TestCase
-from boilerplate.logging.logger import get_logger
+from boilerplate.logging.logger import RateLimitFilter, _NonBlockingQueueHandler, configure_logging, get_logger
+
+
+def create_record(message: str, *args, level: int = logging.ERROR, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord("test", level, "test_logger.py", lineno, message, args, None)
 
 
 class TestLogger(TestCase):
@@ -15,3 +22,80 @@ class TestLogger(TestCase):
 
         # Assert
         logger.info("test-log")
+
+    def test_configure_logging_once(self):
+        # Arrange
+        configure_logging()
+        root_handlers = list(logging.getLogger().handlers)
+
+        # Act
+        get_logger("test-class-name")
+        configure_logging()
+
+        # Assert, the logging is configured on the first call only
+        self.assertEqual(logging.getLogger().handlers, root_handlers)
+        self.assertEqual(
+            len([handler for handler in logging.getLogger().handlers
+                 if isinstance(handler, _NonBlockingQueueHandler)]), 1)
+
+    def test_rate_limit_filter(self):
+        # Arrange
+        rate_limit_filter = RateLimitFilter(burst=2, interval=60)
+
+        # Act
+        with mock.patch("boilerplate.logging.logger.time.monotonic", return_value=100):
+            results = [rate_limit_filter.filter(create_record("error %s", i)) for i in range(5)]
+            other_call_site = rate_limit_filter.filter(create_record("error", lineno=20))
+            info = rate_limit_filter.filter(create_record("info", level=logging.INFO))
+        with mock.patch("boilerplate.logging.logger.time.monotonic", return_value=161):
+            record = create_record("error %s", 5)
+            after_interval = rate_limit_filter.filter(record)
+
+        # Assert
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertTrue(other_call_site)
+        self.assertTrue(info)
+        self.assertTrue(after_interval)
+        self.assertEqual(record.getMessage(), "error 5 (3 similar messages suppressed)")
+
+    def test_rate_limit_filter_disabled(self):
+        rate_limit_filter = RateLimitFilter(burst=0)
+
+        self.assertTrue(all(rate_limit_filter.filter(create_record("error")) for _ in range(100)))
+
+    def test_queue_handler(self):
+        # Arrange
+        log_queue = queue.Queue(1)
+        handler = _NonBlockingQueueHandler(log_queue)
+        payload = {"value": 1}
+
+        # Act
+        handler.handle(create_record("payload %s", payload))
+        payload["value"] = 2
+        # The queue is full, so the record is dropped instead of blocking the caller
+        handler.handle(create_record("dropped"))
+
+        # Assert, the message holds the arguments of the call
+        record = log_queue.get_nowait()
+        self.assertEqual(record.getMessage(), "payload {'value': 1}")
+        self.assertIsNone(record.args)
+        self.assertTrue(log_queue.empty())
+
+    def test_queue_handler_exception(self):
+        # Arrange
+        log_queue = queue.Queue()
+        handler = _NonBlockingQueueHandler(log_queue)
+
+        try:
+            raise ValueError("test-error")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, "test_logger.py", 10, "failed", None,
+                                       sys.exc_info())
+
+        # Act
+        handler.handle(record)
+
+        # Assert, the traceback is rendered before the record leaves the logging thread
+        queued_record = log_queue.get_nowait()
+        self.assertIsNone(queued_record.exc_info)
+        self.assertIn("ValueError: test-error", logging.Formatter().format(queued_record))
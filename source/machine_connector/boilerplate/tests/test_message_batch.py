@@ -86,3 +86,17 @@ class TestMessageBatch(TestCase):
         # Act and Assert
         with self.assertRaises(ValidationException) as context:
             message_batch = MessageBatch(tag, messages, source_id)
+
+    @mock.patch("boilerplate.messaging.message_batch._trace_sampler")
+    def test_trace(self, mock_trace_sampler):
+        # Arrange
+        messages = [Message("test-value", "GOOD", str(datetime.datetime.now()))]
+        mock_trace_sampler.start.side_effect = [{"capture": 1000.0}, None]
+
+        # Act
+        traced_batch = MessageBatch("test-tag", messages, "test-source-id")
+        message_batch = MessageBatch("test-tag", messages, "test-source-id")
+
+        # Assert
+        self.assertEqual(traced_batch.__dict__["trace"], {"capture": 1000.0})
+        self.assertNotIn("trace", message_batch.__dict__)
@@ -0,0 +1,172 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import threading
+from unittest import mock, TestCase
+
+from boilerplate.messaging.message import Message
+from boilerplate.messaging.message_batch import MessageBatch
+from boilerplate.messaging.message_queue import (
+    MessageQueue,
+    OVERFLOW_POLICY_BLOCK,
+    OVERFLOW_POLICY_DROP_OLDEST,
+    OVERFLOW_POLICY_SPILL
+)
+
+
+def build_message_batch(tag: str, count: int = 1) -> MessageBatch:
+    messages = [Message(i, "GOOD", str(datetime.datetime.now()))
+                for i in range(count)]
+    return MessageBatch(tag, messages, "test-source-id")
+
+
+class TestMessageQueue(TestCase):
+
+    def test_invalid_configuration(self):
+        # Act and Assert
+        with self.assertRaises(ValueError):
+            MessageQueue(0)
+        with self.assertRaises(ValueError):
+            MessageQueue(10, "invalid-policy")
+        with self.assertRaises(ValueError):
+            MessageQueue(10, OVERFLOW_POLICY_SPILL)
+
+    def test_put_and_get(self):
+        # Arrange
+        message_queue = MessageQueue(10)
+        first_batch = build_message_batch("tag-1")
+        second_batch = build_message_batch("tag-2")
+
+        # Act
+        message_queue.put(first_batch)
+        message_queue.put(second_batch)
+
+        # Assert
+        self.assertEqual(message_queue.depth, 2)
+        self.assertEqual(message_queue.batches, 2)
+        self.assertIs(message_queue.get()[0], first_batch)
+        self.assertIs(message_queue.get()[0], second_batch)
+        self.assertEqual(message_queue.depth, 0)
+        self.assertIsNone(message_queue.get(timeout=0))
+
+    def test_coalesce_same_tag(self):
+        # Arrange
+        message_queue = MessageQueue(10)
+
+        # Act
+        message_queue.put(build_message_batch("tag-1", 2))
+        message_queue.put(build_message_batch("tag-2"))
+        message_queue.put(build_message_batch("tag-1", 3))
+
+        # Assert
+        self.assertEqual(message_queue.batches, 2)
+        self.assertEqual(message_queue.depth, 6)
+        message_batch, _ = message_queue.get()
+        self.assertEqual(len(message_batch.messages), 5)
+
+    def test_drop_oldest(self):
+        # Arrange
+        message_queue = MessageQueue(3, OVERFLOW_POLICY_DROP_OLDEST)
+
+        # Act
+        message_queue.put(build_message_batch("tag-1", 2))
+        message_queue.put(build_message_batch("tag-2"))
+        message_queue.put(build_message_batch("tag-3"))
+
+        # Assert
+        self.assertEqual(message_queue.dropped_messages, 2)
+        self.assertEqual(message_queue.depth, 2)
+        self.assertTrue(message_queue.get()[0].alias.endswith("tag-2"))
+
+    def test_spill(self):
+        # Arrange
+        spill_callback = mock.MagicMock()
+        message_queue = MessageQueue(
+            2, OVERFLOW_POLICY_SPILL, spill_callback)
+        oldest_batch = build_message_batch("tag-1", 2)
+
+        # Act
+        message_queue.put(oldest_batch)
+        message_queue.put(build_message_batch("tag-2"))
+
+        # Assert
+        spill_callback.assert_called_once_with(oldest_batch)
+        self.assertEqual(message_queue.spilled_messages, 2)
+        self.assertEqual(message_queue.depth, 1)
+
+    def test_spill_before_newer_batch(self):
+        # Arrange
+        queued_batches = []
+        message_queue = MessageQueue(
+            1, OVERFLOW_POLICY_SPILL, lambda batch: queued_batches.append(message_queue.batches))
+        message_queue.put(build_message_batch("tag-1"))
+
+        # Act
+        message_queue.put(build_message_batch("tag-2"))
+
+        # Assert, the newer batch cannot be taken before the older batch has been spilled
+        self.assertEqual(queued_batches, [0])
+
+    def test_close(self):
+        # Arrange
+        message_queue = MessageQueue(10)
+        message_queue.put(build_message_batch("tag-1"))
+        consumer = threading.Timer(0.05, message_queue.close)
+
+        # Act
+        consumer.start()
+        first_item = message_queue.get()
+        second_item = message_queue.get()
+        consumer.join()
+
+        # Assert
+        self.assertTrue(first_item[0].alias.endswith("tag-1"))
+        self.assertIsNone(second_item)
+        self.assertTrue(message_queue.closed)
+
+    def test_block_timeout(self):
+        # Arrange
+        message_queue = MessageQueue(1, OVERFLOW_POLICY_BLOCK)
+        message_queue.put(build_message_batch("tag-1"))
+
+        # Act
+        result = message_queue.put(build_message_batch("tag-2"), timeout=0.01)
+
+        # Assert
+        self.assertFalse(result)
+        self.assertEqual(message_queue.dropped_messages, 1)
+
+    def test_block_until_room(self):
+        # Arrange
+        message_queue = MessageQueue(1, OVERFLOW_POLICY_BLOCK)
+        message_queue.put(build_message_batch("tag-1"))
+        consumer = threading.Timer(0.05, message_queue.get)
+
+        # Act
+        consumer.start()
+        result = message_queue.put(build_message_batch("tag-2"), timeout=5)
+        consumer.join()
+
+        # Assert
+        self.assertTrue(result)
+        self.assertTrue(message_queue.get()[0].alias.endswith("tag-2"))
+
+    def test_oversized_batch_when_empty(self):
+        # Arrange
+        message_queue = MessageQueue(1, OVERFLOW_POLICY_BLOCK)
+
+        # Act and Assert
+        self.assertTrue(message_queue.put(
+            build_message_batch("tag-1", 5), timeout=0))
+
+    def test_join(self):
+        # Arrange
+        message_queue = MessageQueue(10)
+        message_queue.put(build_message_batch("tag-1"))
+
+        # Act and Assert
+        self.assertFalse(message_queue.join(timeout=0))
+        message_queue.get()
+        message_queue.task_done()
+        self.assertTrue(message_queue.join(timeout=0))
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
+import tempfile
 import datetime
 from unittest import mock, TestCase
 
@@ -9,6 +10,7 @@ from boilerplate.messaging.message_sender import MessageSender
 from boilerplate.messaging.message import Message
 from boilerplate.messaging.message_batch import MessageBatch
 from utils.custom_exception import ValidationException
+from utils.metrics import MetricsRegistry
 from utils import StreamManagerHelperClient, AWSEndpointClient, InitMessage
 
 
@@ -29,11 +31,25 @@ class TestMessageSender(TestCase):
         source_id = "test-source-id"
         self.message_batch = MessageBatch(tag, messages, source_id)
 
+        # The message spool is kept in a temporary work directory
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        work_dir_patcher = mock.patch(
+            "boilerplate.messaging.message_sender.WORK_BASE_DIR", self.work_dir.name)
+        work_dir_patcher.start()
+        self.addCleanup(work_dir_patcher.stop)
+
+    def build_message_batch(self, source_id: str) -> MessageBatch:
+        messages = [Message("test-value", "GOOD",
+                            str(datetime.datetime.now()))]
+        return MessageBatch("test-tag", messages, source_id)
+
     @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
     @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
     @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=[])
     @mock.patch('utils.StreamManagerHelperClient.create_stream')
-    def test_post_message_batch(self, smh_create_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_post_message_batch(self, smh_write_mock, smh_create_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
         # Arrange
         message_sender = MessageSender()
 
@@ -48,7 +64,8 @@ class TestMessageSender(TestCase):
     @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
     @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
     @mock.patch('utils.StreamManagerHelperClient.create_stream')
-    def test_post_message_batch_post_call(self, smh_create_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_post_message_batch_post_call(self, smh_write_mock, smh_create_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
         # Arrange
         message_sender = MessageSender()
 
@@ -100,3 +117,165 @@ class TestMessageSender(TestCase):
             "process": "test-process",
             "machine_name": "test-machine-name"
         })
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_post_message_batch_background(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender(queue_size=10)
+
+        # Act
+        message_sender.post_message_batch(self.message_batch)
+        drained = message_sender.flush(timeout=5)
+
+        # Assert
+        self.assertTrue(drained)
+        smh_write_mock.assert_called_once_with(
+            'test-gg-stream', self.message_batch.__dict__)
+        gauges = message_sender.get_queue_gauges()
+        self.assertEqual(gauges["queue_depth"], 0)
+        self.assertEqual(gauges["written_batches"], 1)
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_close(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender(queue_size=10)
+        message_sender.post_message_batch(self.build_message_batch("first"))
+
+        # Act
+        closed = message_sender.close(timeout=5)
+        message_sender.post_message_batch(self.build_message_batch("second"))
+
+        # Assert, the queued batch is written before the sender stops, and later batches are written synchronously
+        self.assertTrue(closed)
+        self.assertFalse(message_sender._sender_thread.is_alive())
+        self.assertIsNone(message_sender._spool)
+        self.assertEqual(
+            [call.args[1]["sourceId"]
+                for call in smh_write_mock.call_args_list],
+            ["first", "second"])
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_queue_gauges_in_registry(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        registry = MetricsRegistry(enabled=True)
+        with mock.patch("boilerplate.messaging.message_sender.get_registry", return_value=registry):
+            message_sender = MessageSender(queue_size=10)
+
+        # Act
+        message_sender.post_message_batch(self.message_batch)
+        message_sender.close(timeout=5)
+
+        # Assert
+        gauges = registry.snapshot()["gauges"]
+        self.assertEqual(gauges["message_sender.queue_depth"], 0)
+        self.assertEqual(gauges["message_sender.written_batches"], 1)
+        self.assertEqual(gauges["message_sender.dropped_messages"], 0)
+        self.assertIn("message_sender.max_latency_ms", gauges)
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_list_streams_once(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender()
+
+        # Act
+        message_sender.post_message_batch(self.message_batch)
+        message_sender.post_message_batch(self.message_batch)
+
+        # Assert
+        self.assertEqual(smh_list_mock.call_count, 1)
+        self.assertEqual(smh_write_mock.call_count, 2)
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_spool_and_replay(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender()
+        smh_write_mock.side_effect = [Exception("Stream Manager is restarting"), None, None]
+        first_data = dict(self.message_batch.__dict__, sourceId="first")
+        second_data = dict(self.message_batch.__dict__, sourceId="second")
+
+        # Act
+        first_written = message_sender._write_message_batch(first_data)
+        second_written = message_sender._write_message_batch(second_data)
+
+        # Assert
+        self.assertFalse(first_written)
+        self.assertTrue(second_written)
+        self.assertTrue(message_sender._spool.is_empty())
+        self.assertEqual(
+            [call.args[1]["sourceId"]
+                for call in smh_write_mock.call_args_list],
+            ["first", "first", "second"])
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_replay_spool_after_restart(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        smh_write_mock.side_effect = Exception("Stream Manager is down")
+        message_sender = MessageSender()
+        for source_id in ["first", "second"]:
+            message_sender.post_message_batch(self.build_message_batch(source_id))
+        smh_write_mock.reset_mock(side_effect=True)
+
+        # Act, the connector restarts before the spooled data is replayed
+        restarted_message_sender = MessageSender()
+        restarted_message_sender.post_message_batch(self.build_message_batch("third"))
+
+        # Assert
+        self.assertEqual(
+            [call.args[1]["sourceId"]
+                for call in smh_write_mock.call_args_list],
+            ["first", "second", "third"])
+        self.assertTrue(restarted_message_sender._spool.is_empty())
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream', side_effect=Exception("Stream Manager is down"))
+    def test_spool_keeps_order(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender()
+        message_sender._write_message_batch(self.message_batch.__dict__)
+
+        # Act
+        smh_write_mock.side_effect = [None, Exception("Stream Manager is down")]
+        written = message_sender._write_message_batch(
+            self.message_batch.__dict__)
+
+        # Assert
+        self.assertFalse(written)
+        self.assertFalse(message_sender._spool.is_empty())
+        self.assertEqual(smh_write_mock.call_count, 3)
+
+    @mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.__init__', return_value=None)
+    @mock.patch('utils.StreamManagerHelperClient.list_streams', return_value=['test-gg-stream'])
+    @mock.patch('utils.StreamManagerHelperClient.write_to_stream')
+    def test_post_traced_message_batch(self, smh_write_mock, smh_list_mock, smh_mock, endpoint_client_init_mock):
+        # Arrange
+        message_sender = MessageSender()
+        self.message_batch.trace = {"capture": 1000.0}
+
+        # Act
+        message_sender.post_message_batch(self.message_batch)
+
+        # Assert
+        trace = smh_write_mock.call_args.args[1]["trace"]
+        self.assertEqual(list(trace.keys()), ["capture", "enqueue", "append"])
+        self.assertLessEqual(trace["enqueue"], trace["append"])
@@ -3,15 +3,16 @@
 
 import time
 import os
-import awsiot.greengrasscoreipc
 import traceback
 
 from awsiot.greengrasscoreipc.model import (
     QOS,
     SubscribeToIoTCoreRequest
 )
-from utils import StreamManagerHelperClient, AWSEndpointClient
+from utils import AWSEndpointClient, get_ipc_client
 from utils.subscription_stream_handler import SubscriptionStreamHandler
+from utils.lazy_import import LazyObject, resolve_concurrently
+from utils.startup_profiler import get_startup_profiler
 import boilerplate.logging.logger as ConnectorLogging
 from modbus_message_handler import ModbusMessageHandler
 
@@ -33,11 +34,22 @@ TIMEOUT_IN_SECONDS = 10
 KEEP_ALIVE_SLEEP_IN_SECONDS = 10
 
 # Clients and logging
-smh_client = StreamManagerHelperClient()
 connector_client = AWSEndpointClient()
 logger = ConnectorLogging.get_logger("m2c2_modbus_tcp_connector.py")
 
-modbus_message_handler = ModbusMessageHandler()
+# The message handler connects to Stream Manager when the connector starts
+modbus_message_handler = LazyObject(ModbusMessageHandler)
+startup_profiler = get_startup_profiler()
+startup_profiler.mark("imported")
+
+
+def connect_clients() -> None:
+    """
+    Connects the message handler to Stream Manager, and the connector to Greengrass IPC, in parallel.
+    """
+    with startup_profiler.phase("connect_clients"):
+        resolve_concurrently(modbus_message_handler,
+                             LazyObject(get_ipc_client))
 
 
 def main():
@@ -56,9 +68,11 @@ def main():
         existing_configuration = connector_client.read_local_connection_configuration(
             connection_name=CONNECTION_NAME
         )
+        connect_clients()
 
         if existing_configuration and existing_configuration.get("control", None) == "start":
-            modbus_message_handler.run_message_handler(existing_configuration)
+            with startup_profiler.phase("start_connection"):
+                modbus_message_handler.run_message_handler(existing_configuration)
 
         request = SubscribeToIoTCoreRequest()
         request.topic_name = topic
@@ -67,7 +81,7 @@ def main():
         handler = SubscriptionStreamHandler(
             message_handler_callback=modbus_message_handler.run_message_handler
         )
-        ipc_client = awsiot.greengrasscoreipc.connect()
+        ipc_client = get_ipc_client()
         operation = ipc_client.new_subscribe_to_iot_core(handler)
         future = operation.activate(request)
         future.result(TIMEOUT_IN_SECONDS)
@@ -54,7 +54,7 @@ class ModbusDataCollectionController:
                 tag, message_batches, message)
         else:
             self.logger.warning(
-                f'Did not get a response for reading coils for secondary: {secondary_address}')
+                'Did not get a response for reading coils for secondary: %s', secondary_address)
         return message_batches
 
     def _read_discrete_inputs(self, message_batches: dict, address: int, count: int, secondary_address: int, modbus_host_tag: str) -> dict:
@@ -73,7 +73,7 @@ class ModbusDataCollectionController:
                 tag, message_batches, message)
         else:
             self.logger.warning(
-                f'Did not get a response for reading discrete inputs for secondary: {secondary_address}')
+                'Did not get a response for reading discrete inputs for secondary: %s', secondary_address)
         return message_batches
 
     def _read_holding_registers(self, message_batches: dict, address: int, count: int, secondary_address: int, modbus_host_tag: str) -> dict:
@@ -92,7 +92,7 @@ class ModbusDataCollectionController:
                 tag, message_batches, message)
         else:
             self.logger.warning(
-                f'Did not get a response for reading holding registers for secondary: {secondary_address}')
+                'Did not get a response for reading holding registers for secondary: %s', secondary_address)
         return message_batches
 
     def _read_input_registers(self, message_batches: dict, address: int, count: int, secondary_address: int, modbus_host_tag: str) -> dict:
@@ -111,7 +111,7 @@ class ModbusDataCollectionController:
                 tag, message_batches, message)
         else:
             self.logger.warning(
-                f'Did not get a response for reading input registers for secondary: {secondary_address}')
+                'Did not get a response for reading input registers for secondary: %s', secondary_address)
         return message_batches
 
     def _get_modbus_data(self, modbus_secondary_config: modbusSecondaryConfig, message_batches={}) -> dict:
@@ -135,13 +135,12 @@ class ModbusDataCollectionController:
     def _send_modbus_data(self, modbus_message_batches: dict) -> dict:
         try:
             for tag, message_batch in modbus_message_batches.items():
-                self.logger.debug(f'Sending message batch with tag {tag}...')
-                print("sending")
+                self.logger.debug('Sending message batch with tag %s...', tag)
                 self.message_sender.post_message_batch(message_batch)
                 modbus_message_batches = {}
         except Exception as e:
             self.logger.error(
-                f'Received error while sending modbus message batches: {e}')
+                'Received error while sending modbus message batches: %s', e)
         return modbus_message_batches
 
     def _execute_data_retrieval(self, modbus_secondary_config: modbusSecondaryConfig, message_batches: dict = {}) -> dict:
@@ -1,21 +1,16 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from pymodbus.client.sync import ModbusSerialClient
-from pymodbus.device import ModbusDeviceIdentification
-
-
-from pymodbus.client.sync import ModbusTcpClient
-from pymodbus.transaction import (
-    ModbusSocketFramer
-)
-
 import boilerplate.logging.logger as ConnectorLogging
 
 
 class PyModbusClient:
 
     def __init__(self, url: str, port: int):
+        # pymodbus is imported when the first client is created, so the connector starts without it
+        from pymodbus.client.sync import ModbusTcpClient
+        from pymodbus.transaction import ModbusSocketFramer
+
         self.client = ModbusTcpClient(
             url, port=port, framer=ModbusSocketFramer)
 
@@ -26,7 +21,7 @@ class PyModbusClient:
 
     def read_coils(self, address: int, count: int, secondary_address: int):
         self.logger.debug(
-            f'Reading coils at {address} {count} {secondary_address}')
+            'Reading coils at %s %s %s', address, count, secondary_address)
         try:
             if count is None:
                 return self.client.read_coils(address, secondary=secondary_address)
@@ -34,12 +29,12 @@ class PyModbusClient:
                 return self.client.read_coils(address, count, secondary=secondary_address)
         except Exception as e:
             self.logger.error(
-                f'Error while reading coils for secondary {secondary_address}')
+                'Error while reading coils for secondary %s', secondary_address)
             self.logger.error(e)
 
     def read_discrete_inputs(self, address: int, count: int, secondary_address: int):
         self.logger.debug(
-            f'Reading discrete inputs at {address} {count} {secondary_address}')
+            'Reading discrete inputs at %s %s %s', address, count, secondary_address)
         try:
             if count is None:
                 return self.client.read_discrete_inputs(address, secondary=secondary_address)
@@ -47,12 +42,12 @@ class PyModbusClient:
                 return self.client.read_discrete_inputs(address, count, secondary=secondary_address)
         except Exception as e:
             self.logger.error(
-                f'Error while reading discrete inputs for secondary {secondary_address}')
+                'Error while reading discrete inputs for secondary %s', secondary_address)
             self.logger.error(e)
 
     def read_holding_registers(self, address: int, count: int, secondary_address: int):
         self.logger.debug(
-            f'Reading holding registers at {address} {count} {secondary_address}')
+            'Reading holding registers at %s %s %s', address, count, secondary_address)
         try:
             if count is None:
                 return self.client.read_holding_registers(address, secondary=secondary_address)
@@ -60,12 +55,12 @@ class PyModbusClient:
                 return self.client.read_holding_registers(address, count, secondary=secondary_address)
         except Exception as e:
             self.logger.error(
-                f'Error while reading holding registers for secondary {secondary_address}')
+                'Error while reading holding registers for secondary %s', secondary_address)
             self.logger.error(e)
 
     def read_input_registers(self, address: int, count: int, secondary_address: int):
         self.logger.debug(
-            f'Reading input registers at {address} {count} {secondary_address}')
+            'Reading input registers at %s %s %s', address, count, secondary_address)
         try:
             if count is None:
                 return self.client.read_input_registers(address, secondary=secondary_address)
@@ -73,7 +68,7 @@ class PyModbusClient:
                 return self.client.read_input_registers(address, count, secondary=secondary_address)
         except Exception as e:
             self.logger.error(
-                f'Error while reading input registers for secondary {secondary_address}')
+                'Error while reading input registers for secondary %s', secondary_address)
             self.logger.error(e)
 
     def close(self):
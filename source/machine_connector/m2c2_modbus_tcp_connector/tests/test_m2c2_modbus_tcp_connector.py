@@ -1,6 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import os
 from unittest import mock, TestCase
 
 
@@ -8,7 +9,8 @@ class TestM2C2ModbusTCPConnector(TestCase):
 
     def test_main(self):
         # arrange
-        with mock.patch("utils.AWSEndpointClient.__init__", return_value=None) as mock_endpoint_client:
+        with mock.patch("utils.AWSEndpointClient.__init__", return_value=None) as mock_endpoint_client, \
+                mock.patch.dict(os.environ, {"MESSAGE_SPOOL_MAX_SIZE": "0"}):
             import m2c2_modbus_tcp_connector.m2c2_modbus_tcp_connector as connector
             self.connector = connector
             self.connector.connector_client = mock_endpoint_client.MagicMock()
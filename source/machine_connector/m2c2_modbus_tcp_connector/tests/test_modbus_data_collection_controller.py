@@ -23,6 +23,7 @@ class TestModbusDataCollectionController(TestCase):
         os.environ["MACHINE_NAME"] = "test-machine-name"
         os.environ["CONNECTION_NAME"] = "test-connection"
         os.environ["LOG_LEVEL"] = 'DEBUG'
+        os.environ["MESSAGE_SPOOL_MAX_SIZE"] = "0"
 
     @mock.patch('threading.Timer.start', return_value=None)
     @mock.patch('utils.stream_manager_helper.StreamManagerHelperClient.__init__', return_value=None)
@@ -1,6 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import os
 from unittest import mock, TestCase
 
 from m2c2_modbus_tcp_connector.modbus_message_handler import ModbusMessageHandler
@@ -9,6 +10,9 @@ import messages
 
 
 class TestModbusMessageHandler(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        os.environ["MESSAGE_SPOOL_MAX_SIZE"] = "0"
 
     def test_message_handler(self):
         with mock.patch("boilerplate.messaging.message_sender.MessageSender.post_error_message") as mock_post_error_message, \
@@ -3,21 +3,22 @@
 
 import time
 import os
-import OpenOPC
 import messages as msg
-import awsiot.greengrasscoreipc
 
 from awsiot.greengrasscoreipc.model import (
     QOS,
     SubscribeToIoTCoreRequest
 )
-from greengrasssdk.stream_manager import ExportDefinition
 from inspect import signature
 from threading import Timer
 from typing import Union
-from utils import StreamManagerHelperClient, AWSEndpointClient, InitMessage
+from utils import AWSEndpointClient, InitMessage, get_ipc_client
 from utils.subscription_stream_handler import SubscriptionStreamHandler
 from utils.custom_exception import ConnectorException
+from utils.lazy_import import LazyObject, lazy_import, resolve_concurrently
+from utils.metrics import get_registry
+from utils.startup_profiler import get_startup_profiler
+from opc_da_connection_manager import OpcDaConnectionManager
 
 from boilerplate.messaging.message import Message
 from boilerplate.messaging.message_batch import MessageBatch
@@ -29,7 +30,7 @@ import boilerplate.logging.logger as ConnectorLogging
 payload_content = []
 control = ""  # connection control variables monitored by the thread
 lock = False  # flag used to prevent concurrency
-connection = None  # OPC connection to the server
+connection_manager = None  # Keeps the OPC connection to the server
 # Measured execution time of the thread
 # used to ensure the thread has completed its execution
 ttl = 0.2
@@ -38,54 +39,86 @@ ttl = 0.2
 # Connection name from component environment variables
 CONNECTION_NAME = os.getenv("CONNECTION_NAME")
 
-# Connection retry count
-CONNECTION_RETRY = 10
-# Error retry count
+# Connection retry count, after which the circuit of the connection opens
+CONNECTION_RETRY = int(os.getenv("CONNECTION_RETRY", "10"))
+# Error retry count, after which the connection is dropped and reconnected
 ERROR_RETRY = 5
 
+# Reconnect - the connection is restored in the background, with a jittered exponential backoff
+# Maximum time before the first reconnect attempt (in seconds)
+RECONNECT_BASE_DELAY = float(os.getenv("RECONNECT_BASE_DELAY", "1"))
+# Maximum time between two reconnect attempts (in seconds)
+RECONNECT_MAX_DELAY = float(os.getenv("RECONNECT_MAX_DELAY", "30"))
+# Time between the reconnect attempts once CONNECTION_RETRY attempts failed in a row (in seconds)
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "60"))
+# Time without a successful read after which the server is pinged (in seconds)
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+
 # Max size of message stream when creating (in bytes)
 max_stream_size = 5368706371  # 5G
 
+# OpenOPC is imported, and the message sender connects to Stream Manager, when the connector starts
+OpenOPC = lazy_import("OpenOPC")
+
 # Clients and logging
-smh_client = StreamManagerHelperClient()
 connector_client = AWSEndpointClient()
 logger = ConnectorLogging.get_logger("m2c2_opcda_connector.py")
-message_sender = MessageSender()
+message_sender = LazyObject(MessageSender)
+startup_profiler = get_startup_profiler()
+# Polling cycles which found the server disconnected
+disconnected_cycles = get_registry().counter("opcda.disconnected_cycles")
+startup_profiler.mark("imported")
 
 
 def device_connect(connection_data: dict) -> None:
-    """Connect the device to OPC server."""
+    """
+    Connect the device to OPC server.
+    When the server cannot be reached, the connection manager keeps connecting in the background.
+    """
 
     try:
-        global connection
+        global connection_manager
 
-        if connection:
+        if connection_manager:
             logger.warn("connection exists, closing it...")
-            connection = None
+            connection_manager.stop()
+            connection_manager = None
             logger.warn("connection closed done.")
 
-        # Connection retries
-        for i in range(CONNECTION_RETRY):
-            try:
-                connection = OpenOPC.open_client(
-                    host=connection_data["opcDa"]["machineIp"]
-                )
-                connection.connect(
-                    opc_server=connection_data["opcDa"]["serverName"]
-                )
-                break
-            except Exception as err:
-                if i == CONNECTION_RETRY - 1:
-                    raise
+        connection_manager = OpcDaConnectionManager(
+            host=connection_data["opcDa"]["machineIp"],
+            server_name=connection_data["opcDa"]["serverName"],
+            open_client=OpenOPC.open_client,
+            base_delay=RECONNECT_BASE_DELAY,
+            max_delay=RECONNECT_MAX_DELAY,
+            failure_threshold=CONNECTION_RETRY,
+            open_seconds=CIRCUIT_OPEN_SECONDS,
+            probe_interval=HEALTH_PROBE_INTERVAL,
+            on_circuit_open=handle_circuit_open,
+            on_reconnect=handle_reconnect
+        )
 
-                logger.error(f"Connection failed to %s, retry to connect...\n %s",
-                             connection_data["opcDa"]["machineIp"], err)
-                time.sleep(i + 1)
+        if not connection_manager.start():
+            logger.error("Connection failed to %s, connecting in the background...",
+                         connection_data["opcDa"]["machineIp"])
     except Exception as err:
         logger.error(f"Connection failed. Error: {err}")
         raise ConnectorException(msg.ERR_MSG_FAIL_TO_CONNECT)
 
 
+def handle_circuit_open(error: Exception) -> None:
+    """
+    Tells the user the server cannot be reached, while the connection manager keeps trying
+    """
+    error_message = msg.ERR_MSG_LOST_CONNECTION_RETRYING.format(error, CIRCUIT_OPEN_SECONDS)
+    logger.error(error_message)
+    message_sender.post_error_message(error_message)
+
+
+def handle_reconnect(disconnected_seconds: float) -> None:
+    message_sender.post_info_message(msg.INF_MSG_CONNECTION_RESTORED.format(disconnected_seconds))
+
+
 def read_opc_da_data(tags: list, list_tags: list, payload_content: list) -> list:
     """
     Reads the OPC DA data from the server.
@@ -95,22 +128,24 @@ def read_opc_da_data(tags: list, list_tags: list, payload_content: list) -> list
     :param payload_content: The payload content list
     """
 
-    # Pull data based on explicit tags provided by the user
-    if tags:
-        payload_content.extend(
-            connection.read(tags)
-        )
-
-    # Pull data based on a wildcard pattern tags provided by the user
-    # Here, to find all tags that match the wild card, we first must list the tags, then read them
-    if list_tags:
-        for entry in list_tags:
+    with connection_manager.client() as connection:
+        # Pull data based on explicit tags provided by the user
+        if tags:
             payload_content.extend(
-                connection.read(
-                    connection.list(entry)
-                )
+                connection.read(tags)
             )
 
+        # Pull data based on a wildcard pattern tags provided by the user
+        # Here, to find all tags that match the wild card, we first must list the tags, then read them
+        if list_tags:
+            for entry in list_tags:
+                payload_content.extend(
+                    connection.read(
+                        connection.list(entry)
+                    )
+                )
+
+    connection_manager.report_success()
     return payload_content
 
 
@@ -136,8 +171,8 @@ def send_opc_da_data(payload_content: list):
                 messages_by_tag[tag] = [message]
         else:
             logger.error(
-                f'Could not process message, invalid amount of items. Received {len(datum)} items in message')
-            logger.debug(f'Improper message is: {datum}')
+                'Could not process message, invalid amount of items. Received %d items in message', len(datum))
+            logger.debug('Improper message is: %s', datum)
 
     # send each message batch
     for tag, messages in messages_by_tag.items():
@@ -170,33 +205,21 @@ def send_opc_da_data_by_iterations(payload_content: list, current_iteration: int
 def handle_get_data_error(connection_data: dict, error: Exception, error_count: int) -> int:
     """
     Handles job execution error.
-    When it exceeds the number of retry, `ERROR_RETRY`, retry to connect to OPC DA server.
-    When if fails ultimately, the connection is going to be stopped.
+    When it exceeds the number of retry, `ERROR_RETRY`, the connection is dropped,
+    and the connection manager reconnects to the OPC DA server in the background.
 
     :param connection_data: The connection data
     :param error: The error occurring while getting the data
     :param error_count: The number of error count
     :return: The number of error count
     """
-    logger.error(f"Unable to read from server: {error}")
+    logger.error("Unable to read from server: %s", error)
     error_count += 1
 
     if error_count >= ERROR_RETRY:
-        try:
-            logger.error("Connection retry to OPC DA server...")
-            device_connect(connection_data)
-            logger.warn(
-                "Connection completed. Connection starts again...")
-        except Exception as err:
-            logger.error(f"Connection retry failed: {err}")
-            logger.error("Stopping the connection.")
-
-            global control
-            control = "stop"
-
-            error_message = msg.ERR_MSG_LOST_CONNECTION_STOPPED.format(err)
-            logger.error(error_message)
-            message_sender.post_error_message(error_message)
+        logger.error("Connection retry to OPC DA server...")
+        connection_manager.disconnect(error)
+        error_count = 0
 
     return error_count
 
@@ -213,34 +236,39 @@ def data_collection_control(connection_data: dict, payload_content: list = [], i
     :param error_count: The number of error count
     """
 
-    global control, ttl, connection
+    global control, ttl, connection_manager
 
     if control == "start":
         current_error_count = error_count
         current_iteration = iteration
         opc_da_data = connection_data["opcDa"]
 
-        try:
-            start_time = time.time()
-            payload_content = read_opc_da_data(
-                tags=opc_da_data["tags"], list_tags=opc_da_data["listTags"], payload_content=payload_content
-            )
+        # While the connection manager reconnects in the background, the cycles are skipped at the same cadence
+        if not connection_manager.is_connected():
+            disconnected_cycles.inc()
+            logger.warning("Skipping the read, the OPC DA server is %s", connection_manager.state)
+        else:
+            try:
+                start_time = time.time()
+                payload_content = read_opc_da_data(
+                    tags=opc_da_data["tags"], list_tags=opc_da_data["listTags"], payload_content=payload_content
+                )
 
-            current_iteration += 1
-            current_error_count = 0
+                current_iteration += 1
+                current_error_count = 0
 
-            payload_content, current_iteration = send_opc_da_data_by_iterations(
-                payload_content=payload_content,
-                current_iteration=current_iteration,
-                iterations=opc_da_data["iterations"]
-            )
-            ttl = time.time() - start_time
-        except Exception as err:
-            current_error_count = handle_get_data_error(
-                connection_data=connection_data,
-                error=err,
-                error_count=current_error_count
-            )
+                payload_content, current_iteration = send_opc_da_data_by_iterations(
+                    payload_content=payload_content,
+                    current_iteration=current_iteration,
+                    iterations=opc_da_data["iterations"]
+                )
+                ttl = time.time() - start_time
+            except Exception as err:
+                current_error_count = handle_get_data_error(
+                    connection_data=connection_data,
+                    error=err,
+                    error_count=current_error_count
+                )
 
         Timer(
             interval=opc_da_data["interval"],
@@ -256,8 +284,8 @@ def data_collection_control(connection_data: dict, payload_content: list = [], i
         connector_client.stop_client()
 
         try:
-            connection.close()
-            connection = None
+            connection_manager.stop()
+            connection_manager = None
         except Exception:
             pass
 
@@ -417,6 +445,15 @@ def message_handler(connection_data: dict) -> None:
         raise
 
 
+def connect_clients() -> None:
+    """
+    Connects to Stream Manager and Greengrass IPC, and imports OpenOPC, in parallel.
+    """
+    with startup_profiler.phase("connect_clients"):
+        resolve_concurrently(message_sender, OpenOPC,
+                             LazyObject(get_ipc_client))
+
+
 def main():
     """
     Runs infinitely unless there is an error.
@@ -433,9 +470,11 @@ def main():
         existing_configuration = connector_client.read_local_connection_configuration(
             connection_name=CONNECTION_NAME
         )
+        connect_clients()
 
         if existing_configuration and existing_configuration.get("control", None) == "start":
-            message_handler(existing_configuration)
+            with startup_profiler.phase("start_connection"):
+                message_handler(existing_configuration)
 
         request = SubscribeToIoTCoreRequest()
         request.topic_name = topic
@@ -444,7 +483,7 @@ def main():
         handler = SubscriptionStreamHandler(
             message_handler_callback=message_handler
         )
-        ipc_client = awsiot.greengrasscoreipc.connect()
+        ipc_client = get_ipc_client()
         operation = ipc_client.new_subscribe_to_iot_core(handler)
         future = operation.activate(request)
         future.result(10)  # 10 is timeout
@@ -0,0 +1,265 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import random
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Callable
+
+import boilerplate.logging.logger as ConnectorLogging
+from utils.metrics import get_registry
+
+"""
+    Keeps the connection to the OPC DA server, and reconnects in a background thread,
+    so the polling keeps its cadence while the server is unreachable:
+        - A lost connection is retried after a jittered exponential backoff: a random time up to
+          `base_delay * 2 ^ attempts`, and no longer than `max_delay`.
+        - After `failure_threshold` failed attempts in a row, the circuit opens: the server is only tried
+          again every `open_seconds`, with a single attempt (half-open), until an attempt succeeds.
+        - While connected, a health probe pings the server when no read succeeded for `probe_interval` seconds.
+"""
+
+# Connection states
+STATE_CONNECTED = "connected"
+STATE_DISCONNECTED = "disconnected"
+STATE_OPEN = "circuit_open"
+STATE_HALF_OPEN = "half_open"
+# Numeric values of the connection state gauge
+STATE_VALUES = {STATE_CONNECTED: 0, STATE_DISCONNECTED: 1, STATE_HALF_OPEN: 2, STATE_OPEN: 3}
+
+
+class OpcDaConnectionManager:
+
+    def __init__(self, host: str, server_name: str, open_client: Callable, base_delay: float = 1,
+                 max_delay: float = 30, failure_threshold: int = 10, open_seconds: float = 60,
+                 probe_interval: float = 10, on_circuit_open: Callable[[Exception], None] = None,
+                 on_reconnect: Callable[[float], None] = None, metrics_prefix: str = "opcda",
+                 rng: random.Random = None):
+        """
+        :param host: The host of the OPC DA server
+        :param server_name: The OPC DA server name
+        :param open_client: Opens an OpenOPC client for a host, e.g. `OpenOPC.open_client`
+        :param base_delay: The maximum time before the first reconnect attempt (in seconds)
+        :param max_delay: The maximum time between two reconnect attempts (in seconds)
+        :param failure_threshold: The failed attempts in a row after which the circuit opens
+        :param open_seconds: The time between the attempts while the circuit is open (in seconds)
+        :param probe_interval: The time without a successful read after which the server is pinged (in seconds)
+        :param on_circuit_open: Called with the last error when the circuit opens
+        :param on_reconnect: Called with the time the connection was lost (in seconds) when it is restored
+            after the circuit opened
+        :param metrics_prefix: The prefix of the metric names
+        :param rng: The random generator of the backoff jitter
+        """
+        self.host = host
+        self.server_name = server_name
+        self.open_client = open_client
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.probe_interval = probe_interval
+        self.on_circuit_open = on_circuit_open
+        self.on_reconnect = on_reconnect
+        self._rng = rng or random.Random()
+
+        self.state = STATE_DISCONNECTED
+        # Failed connection attempts since the connection was lost
+        self.failed_attempts = 0
+        # The time the last lost connection took to be restored (in seconds)
+        self.last_reconnect_seconds = None
+        self._client = None
+        self._circuit_opened = False
+        self._disconnect_time = time.monotonic()
+        self._last_success = time.monotonic()
+        # Held while the client is in use, so the reads and the health probe do not overlap
+        self._client_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.logger = ConnectorLogging.get_logger(self.__class__.__name__)
+
+        metrics = get_registry()
+        self._state_gauge = metrics.gauge(f"{metrics_prefix}.connection_state")
+        self._attempts = metrics.counter(f"{metrics_prefix}.connection_attempts")
+        self._failures = metrics.counter(f"{metrics_prefix}.connection_failures")
+        self._reconnect_ms = metrics.histogram(f"{metrics_prefix}.reconnect_ms")
+        self._state_gauge.set(STATE_VALUES[self.state])
+
+    def start(self) -> bool:
+        """
+        Connects to the server, and starts the background thread, which reconnects when the connection fails.
+
+        :return: Whether the first connection attempt succeeded
+        """
+        connected = self._attempt()
+        self._thread = threading.Thread(target=self._run, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+        return connected
+
+    def stop(self) -> None:
+        """
+        Stops the background thread, and closes the connection
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        with self._client_lock:
+            self._close_client()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def is_connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    @contextmanager
+    def client(self):
+        """
+        Hands out the connected OpenOPC client, e.g. `with manager.client() as client: client.read(tags)`
+
+        :raises ConnectionError: When the server is not connected
+        """
+        with self._client_lock:
+            if self._client is None:
+                raise ConnectionError(f"Not connected to the OPC DA server {self.server_name}: {self.state}")
+            yield self._client
+
+    def report_success(self) -> None:
+        """
+        Tells the manager a read succeeded, so the health probe is not needed
+        """
+        self._last_success = time.monotonic()
+
+    def disconnect(self, error: Exception = None) -> None:
+        """
+        Drops the connection, e.g. after repeated read errors. The background thread reconnects.
+
+        :param error: The error which lost the connection
+        """
+        with self._client_lock:
+            if self.state != STATE_CONNECTED:
+                return
+            self.logger.warning("Lost the connection to the OPC DA server %s: %s", self.server_name, error)
+            self._close_client()
+            self._disconnect_time = time.monotonic()
+            self._set_state(STATE_DISCONNECTED)
+        self._wake_event.set()
+
+    def backoff_delay(self) -> float:
+        """
+        :return: The time before the next reconnect attempt (in seconds)
+        """
+        if self.state == STATE_OPEN:
+            return self.open_seconds
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** self.failed_attempts))
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            if self.state == STATE_CONNECTED:
+                wait_seconds = self._last_success + self.probe_interval - time.monotonic()
+                if wait_seconds > 0:
+                    self._wait(wait_seconds)
+                else:
+                    self._probe()
+                continue
+
+            self._wait(self.backoff_delay())
+            if not self._stop_event.is_set() and self.state != STATE_CONNECTED:
+                if self.state == STATE_OPEN:
+                    self._set_state(STATE_HALF_OPEN)
+                self._attempt()
+
+    def _wait(self, seconds: float) -> None:
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
+
+    def _attempt(self) -> bool:
+        """
+        Tries to connect once
+
+        :return: Whether the server is connected
+        """
+        self._attempts.inc()
+        client = None
+        try:
+            client = self.open_client(host=self.host)
+            client.connect(opc_server=self.server_name)
+        except Exception as err:
+            self._failures.inc()
+            self.failed_attempts += 1
+            _close_quietly(client)
+            self._on_failed_attempt(err)
+            return False
+
+        with self._client_lock:
+            if self._stop_event.is_set():
+                _close_quietly(client)
+                return False
+            self._client = client
+
+        reconnect_seconds = time.monotonic() - self._disconnect_time
+        circuit_opened = self._circuit_opened
+        self.last_reconnect_seconds = reconnect_seconds
+        self._reconnect_ms.record(reconnect_seconds * 1000)
+        self.failed_attempts = 0
+        self._circuit_opened = False
+        self._last_success = time.monotonic()
+        self._set_state(STATE_CONNECTED)
+        self.logger.info("Connected to the OPC DA server %s after %.1f seconds", self.server_name, reconnect_seconds)
+
+        if circuit_opened and self.on_reconnect is not None:
+            self.on_reconnect(reconnect_seconds)
+        return True
+
+    def _on_failed_attempt(self, error: Exception) -> None:
+        if self.state == STATE_HALF_OPEN or self.failed_attempts >= self.failure_threshold:
+            first_open = not self._circuit_opened
+            self._circuit_opened = True
+            self._set_state(STATE_OPEN)
+            self.logger.error("Connection to %s failed %d times, trying again in %s seconds: %s",
+                              self.host, self.failed_attempts, self.open_seconds, error)
+            if first_open and self.on_circuit_open is not None:
+                self.on_circuit_open(error)
+        else:
+            self.logger.warning("Connection to %s failed, retrying: %s", self.host, error)
+
+    def _probe(self) -> None:
+        """
+        Pings the server, and drops the connection when it does not answer.
+        A read in progress tells the server state as well, so the probe is skipped then.
+        """
+        if not self._client_lock.acquire(blocking=False):
+            self._last_success = time.monotonic()
+            return
+
+        try:
+            healthy = self._client is not None and self._client.ping()
+            error = None
+        except Exception as err:
+            healthy = False
+            error = err
+        finally:
+            self._client_lock.release()
+
+        if healthy:
+            self.report_success()
+        else:
+            self.disconnect(error or ConnectionError("The OPC DA server did not answer the health probe"))
+
+    def _close_client(self) -> None:
+        client, self._client = self._client, None
+        _close_quietly(client)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self._state_gauge.set(STATE_VALUES[state])
+
+
+def _close_quietly(client) -> None:
+    if client is None:
+        return
+    try:
+        client.close()
+    except Exception:
+        pass
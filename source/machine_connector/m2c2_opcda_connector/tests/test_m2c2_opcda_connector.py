@@ -102,24 +102,43 @@ class TestOpcDaConnector(TestCase):
 
     def test_device_connect(self):
         with patch("m2c2_opcda_connector.m2c2_opcda_connector.OpenOPC") as mock_open_opc, \
-                patch("m2c2_opcda_connector.m2c2_opcda_connector.time") as mock_time:
-            mock_open_opc.open_client = MagicMock()
-            mock_time.sleep.return_value = None
+                patch("m2c2_opcda_connector.m2c2_opcda_connector.OpcDaConnectionManager") as mock_manager_class:
+            mock_manager = mock_manager_class.return_value
+            mock_manager.start.return_value = True
 
             # Connection success
             self.connector.device_connect(self.connection_data)
-            mock_open_opc.open_client.assert_called()
-            mock_open_opc.open_client.assert_called_with(
-                host=self.connection_data["opcDa"]["machineIp"])
+            mock_manager_class.assert_called()
+            _, kwargs = mock_manager_class.call_args
+            self.assertEqual(kwargs["host"], self.connection_data["opcDa"]["machineIp"])
+            self.assertEqual(kwargs["server_name"], self.connection_data["opcDa"]["serverName"])
+            self.assertEqual(kwargs["open_client"], mock_open_opc.open_client)
+            mock_manager.start.assert_called()
+            self.assertEqual(self.connector.connection_manager, mock_manager)
+
+            # Connection failure, the connection manager keeps connecting in the background
+            mock_manager.start.return_value = False
+            self.connector.device_connect(self.connection_data)
+            mock_manager.stop.assert_called()
+            self.assertEqual(self.connector.connection_manager, mock_manager)
 
-            # Connection failure
-            mock_open_opc.open_client.side_effect = Exception(
-                "Failure")
+            # Invalid connection data
             with self.assertRaises(ConnectorException):
-                self.connector.device_connect(self.connection_data)
+                self.connector.device_connect({"opcDa": {}})
+
+    def test_circuit_callbacks(self):
+        with patch("boilerplate.messaging.message_sender.MessageSender.post_error_message") as mock_post_error_message, \
+                patch("boilerplate.messaging.message_sender.MessageSender.post_info_message") as mock_post_info_message:
+            self.connector.handle_circuit_open(Exception("Failure"))
+            mock_post_error_message.assert_called_with(messages.ERR_MSG_LOST_CONNECTION_RETRYING.format(
+                Exception("Failure"), self.connector.CIRCUIT_OPEN_SECONDS))
+
+            self.connector.handle_reconnect(90)
+            mock_post_info_message.assert_called_with(messages.INF_MSG_CONNECTION_RESTORED.format(90))
 
     def test_read_opc_da_data(self):
-        with patch("m2c2_opcda_connector.m2c2_opcda_connector.connection") as mock_connection:
+        with patch("m2c2_opcda_connector.m2c2_opcda_connector.connection_manager") as mock_connection_manager:
+            mock_connection = mock_connection_manager.client.return_value.__enter__.return_value
             mock_connection.read = MagicMock(
                 return_value=[self.value_tuple])
             mock_connection.list = MagicMock(
@@ -129,9 +148,10 @@ class TestOpcDaConnector(TestCase):
                 [self.tag], [self.list_tag], [])
             self.assertEquals(
                 payload_content, [self.value_tuple, self.value_tuple])
+            mock_connection_manager.report_success.assert_called()
 
     def test_handle_get_data_error(self):
-        with patch("m2c2_opcda_connector.m2c2_opcda_connector.device_connect") as mock_device_connect, \
+        with patch("m2c2_opcda_connector.m2c2_opcda_connector.connection_manager") as mock_connection_manager, \
                 patch("boilerplate.messaging.message_sender.MessageSender.post_error_message") as mock_post_error_message:
 
             # When error count is less then retry count.
@@ -140,42 +160,35 @@ class TestOpcDaConnector(TestCase):
                 {}, Exception("Failure"), 1)
             self.assertEqual(error_count, 2)
             self.assertEqual(self.connector.control, "start")
-            mock_device_connect.assert_not_called()
+            mock_connection_manager.disconnect.assert_not_called()
             mock_post_error_message.assert_not_called()
 
-            # When error count is larger then retry count.
+            # When error count is larger then retry count, the connection is dropped to reconnect.
+            error = Exception("Failure")
             error_count = self.connector.handle_get_data_error(
-                {}, Exception("Failure"), 5)
-            self.assertEqual(error_count, 6)
+                {}, error, 5)
+            self.assertEqual(error_count, 0)
             self.assertEqual(self.connector.control, "start")
-            mock_device_connect.assert_called()
+            mock_connection_manager.disconnect.assert_called_with(error)
             mock_post_error_message.assert_not_called()
 
-            # When an error happens.
-            mock_device_connect.side_effect = Exception("Failure")
-            error_count = self.connector.handle_get_data_error(
-                {}, Exception("Failure"), 5)
-            self.assertEqual(error_count, 6)
-            self.assertEqual(self.connector.control, "stop")
-            mock_device_connect.assert_called()
-            mock_post_error_message.assert_called()
-
     def test_data_collection_control(self):
         with patch("m2c2_opcda_connector.m2c2_opcda_connector.read_opc_da_data") as mock_read_opc_da_data, \
                 patch("m2c2_opcda_connector.m2c2_opcda_connector.send_opc_da_data_by_iterations") as mock_send_opc_da_data_by_iterations, \
                 patch("m2c2_opcda_connector.m2c2_opcda_connector.handle_get_data_error") as mock_handle_get_data_error, \
                 patch("boilerplate.messaging.message_sender.MessageSender.post_message_batch") as mock_post_message_batch, \
-                patch("m2c2_opcda_connector.m2c2_opcda_connector.connection") as mock_connection, \
+                patch("m2c2_opcda_connector.m2c2_opcda_connector.connection_manager") as mock_connection_manager, \
                 patch("m2c2_opcda_connector.m2c2_opcda_connector.Timer.__init__") as mock_timer:
             def reset_all_mocks():
                 mock_read_opc_da_data.reset_mock()
                 mock_send_opc_da_data_by_iterations.reset_mock()
                 mock_handle_get_data_error.reset_mock()
                 mock_post_message_batch.reset_mock()
-                mock_connection.reset_mock()
+                mock_connection_manager.reset_mock()
                 mock_timer.reset_mock()
 
             self.connector.control = "start"
+            mock_connection_manager.is_connected.return_value = True
             mock_read_opc_da_data.return_value = self.machine_message
             mock_send_opc_da_data_by_iterations.return_value = (
                 self.machine_message, 1)
@@ -217,23 +230,33 @@ class TestOpcDaConnector(TestCase):
                 args=[self.connection_data, [], 0, 1]
             )
 
+            # When the server is disconnected, the read is skipped at the same cadence
+            reset_all_mocks()
+            mock_connection_manager.is_connected.return_value = False
+            self.connector.data_collection_control(self.connection_data, [], 2, 3)
+
+            mock_read_opc_da_data.assert_not_called()
+            mock_handle_get_data_error.assert_not_called()
+            self.connector.Timer.assert_called_with(
+                interval=self.connection_data["opcDa"]["interval"],
+                function=self.connector.data_collection_control,
+                args=[self.connection_data, [], 2, 3]
+            )
+
             # Success to stop the connection
             reset_all_mocks()
             mock_read_opc_da_data.return_value = self.machine_message
-            mock_connection.close = MagicMock()
             self.connector.control = "stop"
             self.connector.data_collection_control(
                 self.connection_data, self.machine_message)
 
             self.connector.Timer.assert_not_called()
             mock_post_message_batch.assert_called()
-            mock_connection.close.assert_called()
-            self.assertEqual(self.connector.connection, None)
+            mock_connection_manager.stop.assert_called()
+            self.assertEqual(self.connector.connection_manager, None)
 
             # Failure to stop the connection
             reset_all_mocks()
-            mock_connection.close = MagicMock()
-            mock_connection.close.side_effect = Exception("Failure")
             self.connector.data_collection_control(
                 self.connection_data)
 
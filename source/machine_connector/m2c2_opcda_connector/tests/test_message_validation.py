@@ -6,7 +6,7 @@ import copy
 
 from unittest import TestCase
 from unittest.mock import patch
-from validations.message_validation import MessageValidation
+from validations.message_validation import MessageValidation, MAX_REPORTED_ERRORS
 from utils.custom_exception import ValidationException
 
 
@@ -146,3 +146,39 @@ class TestMesasgeValidation(TestCase):
             self.message_validation.validate_schema(message)
         except Exception:
             self.fail("The exception shouldn't happen.")
+
+    def test_validate_schema_batch_errors(self) -> None:
+        message = copy.deepcopy(self.message)
+        message["messages"] = [copy.deepcopy(message["messages"][0]) for _ in range(20)]
+        message["messages"][1]["quality"] = "Invalid"
+        message["messages"][5]["timestamp"] = "Invalid"
+        del message["messages"][7]["value"]
+        message["messages"][9]["name"] = "Invalid"
+
+        with self.assertRaises(ValidationException) as context:
+            self.message_validation.validate_schema(message)
+
+        # All the errors of the batch are published together
+        self.message_validation.connector_client.publish_message_to_iot_topic.assert_called_once()
+        error = str(context.exception)
+        self.assertIn("4 of 20 data point messages are invalid", error)
+        self.assertIn("Datestamp is malformed", error)
+        self.assertIn("['value']", error)
+        self.assertIn("must be the same string as `alias`", error)
+
+    def test_validate_schema_batch_errors_limit(self) -> None:
+        message = copy.deepcopy(self.message)
+        message["messages"] = [{"name": "Invalid", "timestamp": "2022-01-25 00:00:00+00:00", "value": i, "quality": "Good"}
+                               for i in range(100)]
+
+        with self.assertRaises(ValidationException) as context:
+            self.message_validation.validate_schema(message)
+
+        self.assertIn("100 of 100 data point messages are invalid", str(context.exception))
+        self.assertEqual(str(context.exception).count("'value': "), MAX_REPORTED_ERRORS)
+
+    def test_parsable(self) -> None:
+        self.assertTrue(self.message_validation.parsable({"timestamp": "2022-01-25 00:00:00.123+00:00"}))
+        # Timestamps which are not ISO 8601 are parsed by dateutil
+        self.assertTrue(self.message_validation.parsable({"timestamp": "Jan 25 2022 10:00:00 PM"}))
+        self.assertFalse(self.message_validation.parsable({"timestamp": "Invalid"}))
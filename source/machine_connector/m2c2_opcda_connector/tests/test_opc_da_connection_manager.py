@@ -0,0 +1,198 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import random
+import threading
+import time
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from opc_da_connection_manager import (OpcDaConnectionManager, STATE_CONNECTED, STATE_DISCONNECTED,
+                                       STATE_HALF_OPEN, STATE_OPEN)
+
+
+class FakeOpcServer:
+    """
+    Opens OpenOPC clients, whose connection fails the first `failures` times
+    """
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.healthy = True
+        self.connects = 0
+        self.clients = []
+
+    def open_client(self, host: str):
+        client = MagicMock()
+        client.host = host
+        client.connect.side_effect = self.connect
+        client.ping.side_effect = lambda: self.healthy
+        self.clients.append(client)
+        return client
+
+    def connect(self, opc_server: str):
+        self.connects += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise Exception("Connection refused")
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+class TestOpcDaConnectionManager(TestCase):
+    def setUp(self):
+        self.server = FakeOpcServer()
+        self.on_circuit_open = MagicMock()
+        self.on_reconnect = MagicMock()
+        self.manager = None
+
+    def tearDown(self):
+        if self.manager is not None:
+            self.manager.stop()
+
+    def create_manager(self, **kwargs) -> OpcDaConnectionManager:
+        options = {
+            "base_delay": 0.01,
+            "max_delay": 0.02,
+            "failure_threshold": 3,
+            "open_seconds": 0.05,
+            "probe_interval": 10,
+            "on_circuit_open": self.on_circuit_open,
+            "on_reconnect": self.on_reconnect,
+            "rng": random.Random(1)
+        }
+        options.update(kwargs)
+        self.manager = OpcDaConnectionManager("localhost", "Matrikon.OPC.Simulation", self.server.open_client,
+                                              **options)
+        return self.manager
+
+    def test_start(self):
+        manager = self.create_manager()
+        self.assertTrue(manager.start())
+        self.assertEqual(manager.state, STATE_CONNECTED)
+        self.assertTrue(manager.is_connected())
+        self.server.clients[0].connect.assert_called_with(opc_server="Matrikon.OPC.Simulation")
+
+        with manager.client() as client:
+            self.assertEqual(client, self.server.clients[0])
+
+    def test_start_failure_reconnects_in_background(self):
+        self.server.failures = 2
+        manager = self.create_manager()
+        self.assertFalse(manager.start())
+        self.assertEqual(manager.state, STATE_DISCONNECTED)
+        with self.assertRaises(ConnectionError):
+            with manager.client():
+                pass
+
+        self.assertTrue(wait_until(manager.is_connected))
+        self.assertEqual(self.server.connects, 3)
+        self.assertEqual(manager.failed_attempts, 0)
+        self.assertGreater(manager.last_reconnect_seconds, 0)
+        # Failed clients are closed
+        self.server.clients[0].close.assert_called()
+        self.on_circuit_open.assert_not_called()
+        self.on_reconnect.assert_not_called()
+
+    def test_backoff_delay(self):
+        manager = self.create_manager(base_delay=1, max_delay=30, open_seconds=60)
+        for failed_attempts, limit in [(0, 1), (1, 2), (3, 8), (4, 16), (5, 30), (20, 30)]:
+            manager.failed_attempts = failed_attempts
+            delays = [manager.backoff_delay() for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= limit for delay in delays))
+            # Full jitter spreads the attempts of several connectors
+            self.assertGreater(max(delays) - min(delays), limit / 2)
+
+        manager.state = STATE_OPEN
+        self.assertEqual(manager.backoff_delay(), 60)
+
+    def test_circuit_breaker(self):
+        self.server.failures = 1000
+        manager = self.create_manager()
+        manager.start()
+
+        self.assertTrue(wait_until(lambda: self.on_circuit_open.called))
+        self.assertIn(manager.state, [STATE_OPEN, STATE_HALF_OPEN])
+        self.assertGreaterEqual(manager.failed_attempts, 3)
+
+        # While open, the server is tried once every `open_seconds`
+        connects = self.server.connects
+        time.sleep(0.2)
+        self.assertLessEqual(self.server.connects - connects, 5)
+        self.on_circuit_open.assert_called_once()
+
+        # The half-open attempt succeeds
+        self.server.failures = 0
+        # The callback runs once the state is connected
+        self.assertTrue(wait_until(lambda: self.on_reconnect.called))
+        self.assertTrue(manager.is_connected())
+        self.on_reconnect.assert_called_once()
+        reconnect_seconds = self.on_reconnect.call_args[0][0]
+        self.assertGreaterEqual(reconnect_seconds, 0.2)
+        self.assertEqual(manager.last_reconnect_seconds, reconnect_seconds)
+
+    def test_disconnect(self):
+        manager = self.create_manager()
+        manager.start()
+        client = self.server.clients[0]
+
+        self.server.failures = 1
+        manager.disconnect(Exception("Read failure"))
+        client.close.assert_called()
+
+        self.assertTrue(wait_until(manager.is_connected))
+        self.assertEqual(len(self.server.clients), 3)
+        self.assertLess(manager.last_reconnect_seconds, 1)
+
+    def test_health_probe(self):
+        manager = self.create_manager(probe_interval=0.02)
+        manager.start()
+        client = self.server.clients[0]
+
+        # A healthy server stays connected
+        self.assertTrue(wait_until(lambda: client.ping.call_count >= 2))
+        self.assertTrue(manager.is_connected())
+
+        # A server which does not answer is reconnected
+        self.server.healthy = False
+        self.assertTrue(wait_until(lambda: len(self.server.clients) > 1))
+        client.close.assert_called()
+
+    def test_report_success_defers_health_probe(self):
+        manager = self.create_manager(probe_interval=0.05)
+        manager.start()
+        client = self.server.clients[0]
+
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                manager.report_success()
+                time.sleep(0.005)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        time.sleep(0.2)
+        stop.set()
+        reader.join()
+        client.ping.assert_not_called()
+
+    def test_stop(self):
+        manager = self.create_manager()
+        manager.start()
+        client = self.server.clients[0]
+
+        manager.stop()
+        client.close.assert_called()
+        self.assertFalse(manager._thread.is_alive())
+        with self.assertRaises(ConnectionError):
+            with manager.client():
+                pass
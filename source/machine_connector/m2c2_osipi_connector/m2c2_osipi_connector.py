@@ -15,7 +15,6 @@ import traceback
 from datetime import timedelta
 
 from pi_connector_sdk.pi_connection_config import PiConnectionConfig
-from pi_connector_sdk.osi_pi_connector import OsiPiConnector
 from pi_connector_sdk.enhanced_json_encoder import EnhancedJSONEncoder
 
 from awsiot.greengrasscoreipc.model import (
@@ -24,14 +23,15 @@ from awsiot.greengrasscoreipc.model import (
     GetSecretValueRequest
 )
 
-from greengrasssdk.stream_manager import ExportDefinition
 from inspect import signature
 from pi_connector_sdk.pi_response import PiResponse
 from validations.message_validation import MessageValidation
-from utils import StreamManagerHelperClient, AWSEndpointClient, InitMessage
+from utils import AWSEndpointClient, InitMessage, get_ipc_client
 from utils.subscription_stream_handler import SubscriptionStreamHandler
 from utils.custom_exception import ConnectorException
 from utils.custom_exception import ValidationException
+from utils.lazy_import import LazyObject, lazy_import, resolve_concurrently
+from utils.startup_profiler import get_startup_profiler
 
 from boilerplate.messaging.message import Message
 from boilerplate.messaging.message_batch import MessageBatch
@@ -60,12 +60,16 @@ ERROR_RETRY = 5
 # Max size of message stream when creating (in bytes)
 max_stream_size = 5368706371  # 5G
 
+# The PI Web API SDK is imported, and the message sender connects to Stream Manager, when the connector starts
+OsiPiConnector = lazy_import("pi_connector_sdk.osi_pi_connector", "OsiPiConnector")
+
 # Clients and logging
-smh_client = StreamManagerHelperClient()
 connector_client = AWSEndpointClient()
-message_sender = MessageSender()
+message_sender = LazyObject(MessageSender)
 
 logger = ConnectorLogging.get_logger("m2c2-osipi-connector.py")
+startup_profiler = get_startup_profiler()
+startup_profiler.mark("imported")
 
 """Configures Connection from the Device to OSI PI server."""
 
@@ -441,6 +445,15 @@ def handle_get_data_error(error: Exception, error_count: int) -> int:
     return error_count
 
 
+def connect_clients() -> None:
+    """
+    Connects to Stream Manager and Greengrass IPC, and imports the PI Web API SDK, in parallel.
+    """
+    with startup_profiler.phase("connect_clients"):
+        resolve_concurrently(message_sender, OsiPiConnector,
+                             LazyObject(get_ipc_client))
+
+
 def main():
     """
     Runs infinitely unless there is an error.
@@ -456,9 +469,11 @@ def main():
         existing_configuration = connector_client.read_local_connection_configuration(
             connection_name=CONNECTION_NAME
         )
+        connect_clients()
 
         if existing_configuration or existing_configuration.get("control", None) == "start":
-            message_handler(existing_configuration)
+            with startup_profiler.phase("start_connection"):
+                message_handler(existing_configuration)
 
         request = SubscribeToIoTCoreRequest()
         request.topic_name = topic
@@ -467,7 +482,7 @@ def main():
         handler = SubscriptionStreamHandler(
             message_handler_callback=message_handler
         )
-        ipc_client = awsiot.greengrasscoreipc.connect()
+        ipc_client = get_ipc_client()
         operation = ipc_client.new_subscribe_to_iot_core(handler)
         future = operation.activate(request)
         future.result(10)  # 10 is timeout
@@ -21,5 +21,6 @@ ERR_MSG_SCHEMA_EMPTY_MESSAGES = "Message validation error. No data in messages:
 ERR_MSG_SCHEMA_MISSING_KEY = "Message validation error. Missing key in message '{}'"
 ERR_MSG_SCHEMA_DATE_CORRUPTED = "Message validation error. Datestamp is malformed in message '{}'"
 ERR_NAME_NOT_ALIAS = "Message validation error. The `name` value within each data point message must be the same string as `alias`: '{}'"
+ERR_MSG_SCHEMA_INVALID_MESSAGES = "Message validation error. {} of {} data point messages are invalid: '{}'"
 ERR_MISSING_KEYS = "Message validation error. The following keys are missing from the message: '{}'"
 ERR_MSG_VALIDATION = "An error occurred validating message data: '{}'"
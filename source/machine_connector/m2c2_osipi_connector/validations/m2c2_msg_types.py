@@ -8,7 +8,7 @@ class OsiPiMsgValidations:
          of types used by the OSI PI collector and
          expected format for the publisher.
         """
-        pass
+        self.qualities = frozenset(self.quality_validations())
 
     def payload_required_keys(self) -> list:
         return ["alias", "messages"]
@@ -37,5 +37,5 @@ class OsiPiMsgValidations:
             "name": lambda x: isinstance(x, str),
             "timestamp": lambda x: isinstance(x, str),
             "value": lambda x: x != None,
-            "quality": lambda x: isinstance(x, str) and x in self.quality_validations()
+            "quality": lambda x: isinstance(x, str) and x in self.qualities
         }
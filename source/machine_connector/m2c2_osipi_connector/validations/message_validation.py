@@ -4,11 +4,15 @@
 import logging
 import messages as msg
 
+from datetime import datetime
 from dateutil import parser
 from utils import AWSEndpointClient, InitMessage
 from utils.custom_exception import ValidationException
 from .m2c2_msg_types import OsiPiMsgValidations
 
+# Maximum number of invalid data point messages listed in the error of a batch
+MAX_REPORTED_ERRORS = 10
+
 
 class MessageValidation:
     """ensure that the data format is as should be"""
@@ -29,6 +33,13 @@ class MessageValidation:
         self.vals = OsiPiMsgValidations()
         self.topic = topic
 
+        # The required keys and the validations are compiled once, and used for every message
+        self.payload_required_keys = tuple(self.vals.payload_required_keys())
+        self.payload_validations = self.vals.payload_validations()
+        self.messages_required_keys = frozenset(
+            self.vals.messages_required_keys())
+        self.msgs_validations = self.vals.msgs_validations()
+
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
@@ -39,8 +50,16 @@ class MessageValidation:
         return True
 
     def parsable(self, msg: dict) -> bool:
+        timestamp = msg["timestamp"]
+        try:
+            # ISO timestamps, the usual case, are parsed without dateutil
+            datetime.fromisoformat(timestamp)
+            return True
+        except ValueError:
+            pass
+
         try:
-            parser.parse(msg["timestamp"])
+            parser.parse(timestamp)
         except parser._parser.ParserError:
             return False
         return True
@@ -67,14 +86,46 @@ class MessageValidation:
                 "An unknown error has occurred while sending message validation error: '{}'".format(err))
             raise
 
+    def validate_entry(self, entry: dict, alias: str) -> str:
+        """
+        Validates a data point message with the compiled validations.
+
+        :param entry: The data point message
+        :param alias: The alias of the message
+        :return: The validation error, `None` when the data point message is valid
+        """
+        if not isinstance(entry, dict):
+            return msg.ERR_MSG_SCHEMA_MESSAGE_NOT_DICT.format(entry)
+
+        if not self.messages_required_keys.issubset(entry.keys()):
+            return msg.ERR_MISSING_KEYS.format(
+                self.find_missing_keys(entry, self.vals.messages_required_keys()))
+
+        if not self.valid_val(entry, self.msgs_validations):
+            return msg.ERR_MSG_SCHEMA_MISSING_KEY.format(entry)
+
+        if not self.parsable(entry):
+            return msg.ERR_MSG_SCHEMA_DATE_CORRUPTED.format(entry)
+
+        if entry["name"] != alias:
+            return msg.ERR_NAME_NOT_ALIAS.format(entry)
+
+        return None
+
     def validate_schema(self, message: dict) -> None:
+        """
+        Validates a message and all of its data point messages in a single pass.
+        The errors of the data point messages are published together, in one error message.
+
+        :param message: The message
+        """
         try:
             if not isinstance(message, dict):
                 self.error_to_iot_and_raise(
                     msg.ERR_MSG_SCHEMA_MESSAGE_NOT_DICT.format(message))
 
             self.missing_keys = self.find_missing_keys(
-                message, self.vals.payload_required_keys())
+                message, self.payload_required_keys)
             if self.missing_keys:
                 self.error_to_iot_and_raise(
                     msg.ERR_MISSING_KEYS.format(self.missing_keys))
@@ -83,30 +134,20 @@ class MessageValidation:
                 self.error_to_iot_and_raise(
                     msg.ERR_MSG_SCHEMA_EMPTY_MESSAGES.format(message))
 
-            if not self.valid_val(message, self.vals.payload_validations()):
+            if not self.valid_val(message, self.payload_validations):
                 self.error_to_iot_and_raise(
                     msg.ERR_MSG_SCHEMA_MISSING_KEY.format(message))
 
+            alias = message["alias"]
+            errors = []
             for entry in message["messages"]:
-                self.entry_missing_keys = self.find_missing_keys(
-                    entry,
-                    self.vals.messages_required_keys()
-                )
-                if self.entry_missing_keys:
-                    self.error_to_iot_and_raise(
-                        msg.ERR_MISSING_KEYS.format(self.entry_missing_keys))
-
-                if not self.valid_val(entry, self.vals.msgs_validations()):
-                    self.error_to_iot_and_raise(
-                        msg.ERR_MSG_SCHEMA_MISSING_KEY.format(entry))
-
-                if not self.parsable(entry):
-                    self.error_to_iot_and_raise(
-                        msg.ERR_MSG_SCHEMA_DATE_CORRUPTED.format(entry))
-
-                if entry["name"] != message["alias"]:
-                    self.error_to_iot_and_raise(
-                        msg.ERR_NAME_NOT_ALIAS.format(message))
+                error = self.validate_entry(entry, alias)
+                if error is not None:
+                    errors.append(error)
+
+            if errors:
+                self.error_to_iot_and_raise(msg.ERR_MSG_SCHEMA_INVALID_MESSAGES.format(
+                    len(errors), len(message["messages"]), errors[:MAX_REPORTED_ERRORS]))
 
         except Exception as err:
             self.logger.error("Message validation failed. Error: %s", str(err))
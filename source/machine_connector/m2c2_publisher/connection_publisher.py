@@ -0,0 +1,527 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import time
+
+from collections import deque
+
+from greengrasssdk.stream_manager import ExportDefinition
+from stream_position import StreamPositionTracker
+from target_cursor import TargetCursor
+from utils.custom_exception import ConverterException, PublisherException
+from utils.metrics import get_registry
+from utils.startup_profiler import FIRST_SAMPLE, get_startup_profiler
+from utils.trace import now_ms
+
+# Minimum number of messages to read from a stream at a time
+READ_MSG_NUMBER = 1
+# Minimum time the publisher waits while no target takes messages (in milliseconds)
+MIN_CURSOR_WAIT_MS = 10
+
+
+class ConnectionPublisher:
+    """
+    Reads the messages of one connection stream, and sends them to the payload router.
+    The trailing checkpoint is the last sequence number written to the cloud,
+    and the primary checkpoint is the last sequence number read from the stream.
+
+    With the target cursors, every target has its own position in the stream, see `TargetCursor`.
+    The targets at the newest position share the reads of the stream, and a target which falls behind,
+    e.g. after it failed, reads the stream on its own until it catches up.
+    The primary checkpoint is the newest position, and the trailing checkpoint is the oldest one.
+    """
+
+    def __init__(self, connection_name: str, stream_name: str, router_client, smh_client, checkpoint_client,
+                 max_stream_size: int, read_max_messages: int = 100, read_timeout_ms: int = 1000,
+                 catch_up_lag_threshold: int = 1000, catch_up_read_messages: int = 100, catch_up_downsample: int = 1,
+                 position_check_interval: float = 1, max_consecutive_read_errors: int = 10,
+                 metrics_prefix: str = "publisher", conversion_pool=None, max_pending_batches: int = 2,
+                 target_cursors: bool = False, target_retry_base_delay: float = 1, target_retry_max_delay: float = 60,
+                 max_target_lag: int = 10000):
+        """
+        :param connection_name: The connection name
+        :param stream_name: The connection stream name
+        :param router_client: The payload router of the connection
+        :param smh_client: The Stream Manager helper client
+        :param checkpoint_client: The checkpoint manager of the connection
+        :param max_stream_size: The maximum size of the stream when it is created (in bytes)
+        :param read_max_messages: The maximum number of messages read from the stream at a time
+        :param read_timeout_ms: The maximum time a read waits for new messages (in milliseconds)
+        :param catch_up_lag_threshold: The lag, in messages, from which the publisher catches up
+        :param catch_up_read_messages: The maximum number of messages read at a time while catching up
+        :param catch_up_downsample: While catching up, only every n-th message of a low-priority tag is published
+        :param position_check_interval: The time between stream position checks (in seconds)
+        :param max_consecutive_read_errors: The consecutive read errors after which the read error is raised
+        :param metrics_prefix: The prefix of the publisher metric names
+        :param conversion_pool: Converts the messages in worker processes, see `ConversionPool`.
+            Without it, the messages are converted and written in the publisher process.
+        :param max_pending_batches: The maximum number of batches the conversion pool converts at a time
+        :param target_cursors: Whether every target reads the stream with its own cursor.
+            The messages are then converted in the publisher process.
+        :param target_retry_base_delay: The time before a failed target is retried,
+            doubled on every failure in a row (in seconds)
+        :param target_retry_max_delay: The maximum time before a failed target is retried (in seconds)
+        :param max_target_lag: The messages a target may fall behind the newest cursor before it is flagged
+        """
+        self.connection_name = connection_name
+        self.stream_name = stream_name
+        self.router_client = router_client
+        self.smh_client = smh_client
+        self.checkpoint_client = checkpoint_client
+        self.max_stream_size = max_stream_size
+        self.read_max_messages = read_max_messages
+        self.read_timeout_ms = read_timeout_ms
+        self.catch_up_read_messages = catch_up_read_messages
+        self.catch_up_downsample = catch_up_downsample
+        self.position_check_interval = position_check_interval
+        self.max_consecutive_read_errors = max_consecutive_read_errors
+        self.conversion_pool = None if target_cursors else conversion_pool
+        self.max_pending_batches = max_pending_batches
+        self.target_cursors = target_cursors
+        self.target_retry_base_delay = target_retry_base_delay
+        self.target_retry_max_delay = target_retry_max_delay
+        self.max_target_lag = max_target_lag
+        self.metrics_prefix = metrics_prefix
+
+        self.position_tracker = StreamPositionTracker(
+            smh_client, stream_name, catch_up_lag_threshold, position_check_interval, metrics_prefix)
+        # The sequence number of the next message to read
+        self.sequence_number = None
+        # The last routed sequence number whose data may still be buffered by the targets
+        self.unflushed_sequence_number = None
+        self.consecutive_read_errors = 0
+        # The sequence numbers, the conversion futures and the read times of the batches in the conversion pool,
+        # in read order
+        self._pending_batches = deque()
+        self._downsample_every = 1
+        # The cursors of the targets, when every target reads the stream with its own cursor
+        self.cursors = []
+        self._trailing_sequence_number = None
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        metrics = get_registry()
+        self._published_messages = metrics.counter(f"{metrics_prefix}.messages")
+        self._read_errors = metrics.counter(f"{metrics_prefix}.read_errors")
+        self._oldest_cursor_gauge = metrics.gauge(f"{metrics_prefix}.oldest_cursor_behind")
+        self._startup_profiler = get_startup_profiler()
+
+    def start(self) -> None:
+        """
+        Creates the stream when it does not exist, and sets the read position from the checkpoints
+        """
+        if self.stream_name not in self.smh_client.list_streams():
+            self.logger.info(
+                f"Stream {self.stream_name} not found, attempting to create it.")
+            self.smh_client.create_stream(
+                self.stream_name, self.max_stream_size, ExportDefinition())
+
+        trailing, primary = self.checkpoint_client.retrieve_checkpoints(
+            self.stream_name)
+
+        # If the trailing checkpoint exists,
+        # set the primary to the next in the sequence after the trailing
+        if trailing:
+            primary = trailing + 1
+            self.write_checkpoint('primary', trailing)
+
+        # If primary isn't set in the checkpoint manager,
+        # retrieve the oldest sequence number from the stream
+        if not primary:
+            primary = self.smh_client.get_oldest_sequence_number(
+                self.stream_name)
+            self.write_checkpoint('primary', primary)
+
+        self.sequence_number = primary
+        if self.target_cursors:
+            self.start_cursors()
+        self.logger.info(
+            f"Reading from stream {self.stream_name} of connection {self.connection_name}")
+
+    def start_cursors(self) -> None:
+        """
+        Sets the position of every target from its cursor checkpoint, and reads on from the newest position
+        """
+        # A target is checkpointed once its publishes are confirmed
+        self.router_client.confirm_publishes()
+        self.cursors = [
+            TargetCursor(target_name, self.stream_name, self.checkpoint_client, self.target_retry_base_delay,
+                         self.target_retry_max_delay, self.max_target_lag, self.metrics_prefix)
+            for target_name in self.router_client.enabled_targets()
+        ]
+        for cursor in self.cursors:
+            cursor.start(self.sequence_number or 0)
+
+        if self.cursors:
+            # The targets which are behind the newest cursor catch up on their own
+            newest_sequence_number = max(cursor.sequence_number for cursor in self.cursors)
+            if newest_sequence_number != self.sequence_number:
+                self.sequence_number = newest_sequence_number
+                self.write_checkpoint('primary', newest_sequence_number)
+            self._trailing_sequence_number = min(cursor.committed_sequence_number for cursor in self.cursors)
+
+    def poll(self, max_messages: int = None) -> int:
+        """
+        Reads the next messages in the stream, and routes them.
+        If there are no messages yet, the read waits in Stream Manager until there are new messages.
+
+        :param max_messages: The maximum number of messages to read, `None` for the configured read size
+        :return: The number of messages read
+        """
+        if self.target_cursors:
+            return self.poll_cursors(max_messages)
+
+        self.update_position()
+
+        message_data = self.read_next(max_messages)
+        if message_data is None:
+            return 0
+
+        if message_data:
+            # The read time of the traced messages
+            read_time_ms = now_ms()
+            self.position_tracker.check_read(self.sequence_number, message_data)
+            if self.conversion_pool:
+                self.submit_batch(message_data, read_time_ms)
+            else:
+                for message in message_data:
+                    message_sequence_number = self.route(message, read_time_ms)
+                    self.unflushed_sequence_number = message_sequence_number
+                    message_sequence_number += 1
+                    self.write_checkpoint('primary', message_sequence_number)
+                    self.sequence_number = message_sequence_number
+            self._published_messages.inc(len(message_data))
+            self._startup_profiler.mark(FIRST_SAMPLE)
+        elif self.position_tracker.should_check(self.sequence_number):
+            # The stream holds newer messages than the ones which could not be read
+            self.update_position(force=True)
+
+        # Commit the converted batches in read order. When there is nothing new to read,
+        # or the pool is busy, wait for the oldest batch.
+        if self._pending_batches:
+            self.commit_batches(
+                wait=not message_data or len(self._pending_batches) >= self.max_pending_batches)
+
+        # Publish the batched data which has lingered long enough
+        self.router_client.flush()
+
+        # The trailing checkpoint only advances once the targets hold no buffered data,
+        # so buffered messages are read again after a restart
+        if self.unflushed_sequence_number is not None and not self.router_client.has_pending():
+            self.write_checkpoint('trailing', self.unflushed_sequence_number)
+            self.unflushed_sequence_number = None
+
+        return len(message_data)
+
+    def poll_cursors(self, max_messages: int = None) -> int:
+        """
+        Reads the next messages in the stream for the targets at the newest position,
+        and the messages a target which fell behind has not taken yet.
+        A target which fails stays at the message it failed, while the other targets read on.
+
+        :param max_messages: The maximum number of messages to read, `None` for the configured read size
+        :return: The number of messages sent to the targets
+        """
+        self.update_position()
+        self.update_cursors()
+
+        now = time.monotonic()
+        head_cursors = [cursor for cursor in self.cursors
+                        if cursor.sequence_number >= self.sequence_number and cursor.ready(now)]
+        messages = 0
+        if head_cursors:
+            message_data = self.read_next(max_messages)
+            if message_data:
+                self.position_tracker.check_read(self.sequence_number, message_data)
+                messages += self.route_to_cursors(head_cursors, message_data)
+                self._published_messages.inc(len(message_data))
+                self._startup_profiler.mark(FIRST_SAMPLE)
+            elif message_data is not None and self.position_tracker.should_check(self.sequence_number):
+                self.update_position(force=True)
+
+        for cursor in self.cursors:
+            if cursor.sequence_number < self.sequence_number and cursor.ready():
+                messages += self.catch_up_cursor(cursor, max_messages)
+
+        # Publish the batched data which has lingered long enough. A target which fails to publish it retries later.
+        errors = {}
+        self.router_client.flush(errors=errors)
+        for cursor in self.cursors:
+            if cursor.target_name in errors:
+                cursor.failed(errors[cursor.target_name])
+
+        self.commit_cursors()
+
+        # Without a target to read for, wait for the next retry instead of the next message
+        if not head_cursors and not messages:
+            wait_ms = self.cursor_wait_ms()
+            wait_ms = self.read_timeout_ms if wait_ms is None else min(self.read_timeout_ms, wait_ms)
+            time.sleep(max(MIN_CURSOR_WAIT_MS, wait_ms) / 1000)
+
+        return messages
+
+    def route_to_cursors(self, cursors: list, messages: list) -> int:
+        """
+        Sends the messages read at the newest position to the targets of the cursors,
+        until every target failed
+
+        :param cursors: The cursors at the newest position
+        :param messages: The messages
+        :return: The number of messages sent
+        """
+        read_time_ms = now_ms()
+        cursors = list(cursors)
+        sent = 0
+        for message in messages:
+            errors = self.router_client.route_to_targets(
+                message, [cursor.target_name for cursor in cursors], read_time_ms)
+            for cursor in list(cursors):
+                if cursor.target_name not in errors:
+                    cursor.sent(message.sequence_number)
+                elif not self.cursor_failed(cursor, message.sequence_number, errors[cursor.target_name]):
+                    cursors.remove(cursor)
+
+            if not cursors:
+                break
+            sent += 1
+            self.sequence_number = message.sequence_number + 1
+
+        self.write_checkpoint('primary', self.sequence_number)
+        return sent
+
+    def catch_up_cursor(self, cursor: TargetCursor, max_messages: int = None) -> int:
+        """
+        Sends the messages a target fell behind on, up to the newest position
+
+        :param cursor: The cursor of the target
+        :param max_messages: The maximum number of messages to read, `None` for the configured read size
+        :return: The number of messages sent
+        """
+        try:
+            message_data = self.smh_client.read_from_stream(
+                self.stream_name,
+                cursor.sequence_number,
+                READ_MSG_NUMBER,
+                max_message_count=min(_limit(self.read_max_messages, max_messages),
+                                      self.sequence_number - cursor.sequence_number)
+            )
+        except Exception as err:
+            # The position of the overwritten messages is checked before the cursor reads again
+            self._read_errors.inc()
+            self.logger.warning(
+                f"Failed to read sequence number {cursor.sequence_number} from stream {self.stream_name} "
+                f"for the {cursor.target_name} target: {err}")
+            return 0
+
+        if not message_data:
+            # The messages the target has not taken may have been overwritten
+            self.update_position(force=True)
+            return 0
+        if message_data[0].sequence_number > cursor.sequence_number:
+            cursor.move_to(message_data[0].sequence_number)
+
+        read_time_ms = now_ms()
+        sent = 0
+        for message in message_data:
+            if message.sequence_number >= self.sequence_number:
+                break
+            errors = self.router_client.route_to_targets(message, [cursor.target_name], read_time_ms)
+            if cursor.target_name not in errors:
+                cursor.sent(message.sequence_number)
+            elif not self.cursor_failed(cursor, message.sequence_number, errors[cursor.target_name]):
+                break
+            sent += 1
+        return sent
+
+    def cursor_failed(self, cursor: TargetCursor, sequence_number: int, error: Exception) -> bool:
+        """
+        A target skips a message it cannot convert, as it would fail again, and retries on any other error
+
+        :return: Whether the target moved on
+        """
+        if isinstance(error, ConverterException):
+            cursor.skip(sequence_number, error)
+            return True
+
+        cursor.failed(error)
+        return False
+
+    def update_cursors(self) -> None:
+        """
+        Moves the targets past the overwritten messages, and updates their lag
+        """
+        oldest_sequence_number = self.position_tracker.oldest_sequence_number
+        for cursor in self.cursors:
+            if oldest_sequence_number is not None and cursor.sequence_number < oldest_sequence_number:
+                cursor.move_to(oldest_sequence_number)
+            cursor.update_lag(self.position_tracker.newest_sequence_number, self.sequence_number)
+
+        if self.cursors:
+            self._oldest_cursor_gauge.set(
+                self.sequence_number - min(cursor.sequence_number for cursor in self.cursors))
+
+    def commit_cursors(self) -> None:
+        """
+        Checkpoints the targets which do not buffer data, once their publishes are confirmed,
+        and advances the trailing checkpoint to the oldest one
+        """
+        for cursor in self.cursors:
+            pending = self.router_client.target_has_pending(cursor.target_name)
+            if not pending and cursor.has_uncommitted():
+                try:
+                    self.router_client.wait_for_publishes(cursor.target_name)
+                except Exception as err:
+                    cursor.failed(err)
+                    continue
+
+            cursor.commit(pending)
+
+        if self.cursors:
+            trailing_sequence_number = min(cursor.committed_sequence_number for cursor in self.cursors)
+            if trailing_sequence_number != self._trailing_sequence_number:
+                self.write_checkpoint('trailing', trailing_sequence_number)
+                self._trailing_sequence_number = trailing_sequence_number
+
+    def cursor_wait_ms(self):
+        """
+        :return: The time until a target which is behind or failed reads again (in milliseconds),
+            `None` when every target is at the newest position
+        """
+        wait_times = [cursor.wait_ms() for cursor in self.cursors
+                      if cursor.sequence_number < self.sequence_number or not cursor.ready()]
+        return min(wait_times) if wait_times else None
+
+    def read_next(self, max_messages: int = None):
+        """
+        Reads the next messages at the read position
+
+        :param max_messages: The maximum number of messages to read, `None` for the configured read size
+        :return: The messages, `None` when the read failed
+        """
+        try:
+            message_data = self.read_messages(max_messages)
+            self.consecutive_read_errors = 0
+            return message_data
+        except Exception as err:
+            # A read can fail when its messages were overwritten in the meantime,
+            # so the position is checked before the read is tried again
+            self.consecutive_read_errors += 1
+            self._read_errors.inc()
+            if self.consecutive_read_errors >= self.max_consecutive_read_errors:
+                raise
+            self.logger.warning(
+                f"Failed to read sequence number {self.sequence_number} from stream {self.stream_name}, "
+                f"checking the stream position: {err}")
+            time.sleep(min(0.1 * 2 ** self.consecutive_read_errors, 5))
+            self.update_position(force=True)
+            return None
+
+    def read_messages(self, max_messages: int = None) -> list:
+        # While catching up, read as many messages as are available up to the catch-up batch size
+        if self.position_tracker.catch_up:
+            return self.smh_client.read_from_stream(
+                self.stream_name,
+                self.sequence_number,
+                READ_MSG_NUMBER,
+                max_message_count=_limit(self.catch_up_read_messages, max_messages)
+            )
+
+        # Otherwise, wait in Stream Manager until a message arrives,
+        # but no longer than until the buffered data is due or the stream position is due to be checked.
+        # While the conversion pool holds batches, the read does not wait, so the batches are committed.
+        read_timeout_ms = min(self.read_timeout_ms,
+                              self.position_check_interval * 1000)
+        flush_wait_ms = self.router_client.flush_wait_ms()
+        if flush_wait_ms is not None:
+            read_timeout_ms = min(read_timeout_ms, flush_wait_ms)
+        # and no longer than until a target which is behind or failed reads again
+        cursor_wait_ms = self.cursor_wait_ms()
+        if cursor_wait_ms is not None:
+            read_timeout_ms = min(read_timeout_ms, cursor_wait_ms)
+        if self._pending_batches:
+            read_timeout_ms = 0
+
+        return self.smh_client.read_from_stream(
+            self.stream_name,
+            self.sequence_number,
+            READ_MSG_NUMBER,
+            max_message_count=_limit(self.read_max_messages, max_messages),
+            read_timeout_millis=int(read_timeout_ms)
+        )
+
+    def update_position(self, force: bool = False) -> None:
+        """
+        Checks the stream position, moves past overwritten messages,
+        and down-samples the low-priority tags while catching up
+        """
+        catch_up = self.position_tracker.catch_up
+        sequence_number = self.position_tracker.check(
+            self.sequence_number, force)
+
+        if sequence_number != self.sequence_number:
+            self.sequence_number = sequence_number
+            self.write_checkpoint('primary', sequence_number)
+
+        if self.position_tracker.catch_up != catch_up:
+            self._downsample_every = self.catch_up_downsample if self.position_tracker.catch_up else 1
+            self.router_client.set_downsampling(self._downsample_every)
+
+    def submit_batch(self, messages: list, read_time_ms: float = None) -> None:
+        """
+        Hands the messages to the conversion pool. The read position moves on, and the checkpoints advance on commit.
+
+        :param messages: The messages
+        :param read_time_ms: The time the messages were read from the stream (in epoch milliseconds)
+        """
+        sequence_numbers = [message.sequence_number for message in messages]
+        future = self.conversion_pool.submit(
+            [message.payload for message in messages], self._downsample_every)
+        self._pending_batches.append((sequence_numbers, future, read_time_ms))
+        self.sequence_number = sequence_numbers[-1] + 1
+
+    def commit_batches(self, wait: bool = False) -> None:
+        """
+        Writes the converted batches to the targets in read order, and advances the primary checkpoint.
+        A batch is only committed once every batch read before it is committed.
+
+        :param wait: Whether to wait for the oldest batch when it is not converted yet
+        """
+        while self._pending_batches:
+            sequence_numbers, future, read_time_ms = self._pending_batches[0]
+            if not wait and not future.done():
+                return
+
+            results = future.result()
+            self._pending_batches.popleft()
+            wait = False
+
+            for sequence_number, (success, converted_payloads) in zip(sequence_numbers, results):
+                if not success:
+                    raise PublisherException(
+                        f"There was an error when trying to send data to the payload router: '{converted_payloads}'")
+                self.router_client.write_converted(converted_payloads, read_time_ms)
+                self.unflushed_sequence_number = sequence_number
+                self.write_checkpoint('primary', sequence_number + 1)
+
+    def route(self, message, read_time_ms: float = None) -> int:
+        try:
+            return self.router_client.route_payload(message, read_time_ms)
+        except Exception as err:
+            raise PublisherException(
+                f"There was an error when trying to send data to the payload router: '{err}'")
+
+    def write_checkpoint(self, checkpoint: str, value: int) -> None:
+        try:
+            self.checkpoint_client.write_checkpoints(
+                self.stream_name, checkpoint, value)
+        except Exception as err:
+            self.logger.error(
+                f"There was an issue writing the checkpoint {checkpoint} of value {value} for stream {self.stream_name}: {err}"
+            )
+            raise
+
+
+def _limit(read_messages: int, max_messages: int = None) -> int:
+    return read_messages if max_messages is None else min(read_messages, max_messages)
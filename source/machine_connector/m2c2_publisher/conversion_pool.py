@@ -0,0 +1,67 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import multiprocessing
+
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from payload_router import PayloadRouter
+
+"""
+    Converts batches of stream messages in worker processes, so the JSON parsing and the conversions
+    of the payload router use several cores instead of one.
+    Every worker has its own payload router, which only converts. The publisher process writes the
+    converted payloads to the targets in sequence number order, and advances the checkpoints.
+    The batches are pickled to the workers as lists of message payloads.
+"""
+
+# The payload router of a worker process
+_router = None
+
+
+def _init_worker(router_parameters: dict) -> None:
+    global _router
+    _router = PayloadRouter(**router_parameters)
+
+
+def _convert_batch(message_payloads: list, downsample_every: int) -> list:
+    """
+    :return: `(True, converted payloads)` or `(False, error message)` for every message payload
+    """
+    _router.set_downsampling(downsample_every)
+
+    results = []
+    for message_payload in message_payloads:
+        try:
+            results.append((True, _router.convert_payload(message_payload)))
+        except Exception as err:
+            # Not every exception can be pickled, so the error goes back as a message
+            results.append((False, f"{type(err).__name__}: {err}"))
+    return results
+
+
+class ConversionPool:
+    def __init__(self, router_parameters: dict, workers: int):
+        """
+        :param router_parameters: The payload router parameters of the connection
+        :param workers: The number of worker processes
+        """
+        self.workers = workers
+        # Workers are spawned, so they do not inherit the threads and the connections of the publisher
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(router_parameters,)
+        )
+
+    def submit(self, message_payloads: list, downsample_every: int = 1) -> Future:
+        """
+        :param message_payloads: The payloads of the stream messages
+        :param downsample_every: The down-sampling of the low-priority tags, see `PayloadRouter.set_downsampling`
+        :return: The future of the conversion results, see `_convert_batch`
+        """
+        return self.executor.submit(_convert_batch, message_payloads, downsample_every)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -4,14 +4,20 @@
 import logging
 
 from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
 
 
 class CommonConverter:
-    def __init__(self, hierarchy):
-        self.site_name = hierarchy["site_name"]
-        self.area = hierarchy["area"]
-        self.process = hierarchy["process"]
-        self.machine_name = hierarchy["machine_name"]
+    def __init__(self, hierarchy, metadata_template: MetadataTemplate = None):
+        """
+        :param hierarchy: The site name, area, process and machine name of the connection
+        :param metadata_template: The metadata template of the connection, built from the hierarchy by default
+        """
+        self.metadata_template = metadata_template or MetadataTemplate.from_hierarchy(hierarchy)
+        self.site_name = self.metadata_template.site_name
+        self.area = self.metadata_template.area
+        self.process = self.metadata_template.process
+        self.machine_name = self.metadata_template.machine_name
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
@@ -21,24 +27,9 @@ class CommonConverter:
         This adds metadata to identify the source and tag of the payload
         """
         try:
-            self.key_list = [
-                "site_name",
-                "area",
-                "process",
-                "machine_name",
-                "tag"
-            ]
-            self.value_list = [
-                self.site_name,
-                self.area,
-                self.process,
-                self.machine_name,
-                tag
-            ]
-            self.metadata_dict = dict(zip(self.key_list, self.value_list))
-            payload.update(self.metadata_dict)
+            payload.update(self.metadata_template.tag_metadata(tag))
             return (payload)
         except Exception as err:
             self.logger.error(
-                "An error has occurred in the common converter: {}".format(err))
+                "An error has occurred in the common converter: %s", err)
             raise ConverterException(err)
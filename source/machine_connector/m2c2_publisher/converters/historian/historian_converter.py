@@ -4,21 +4,32 @@
 import time
 from converters.historian.historian_message import HistorianMessage
 from boilerplate.logging.logger import get_logger
+from utils.metadata_template import MetadataTemplate
 
 
 class HistorianConverter:
 
-    def __init__(self, source_id: str, collector_id: str):
+    def __init__(self, source_id: str, collector_id: str, metadata_template: MetadataTemplate = None):
+        """
+        :param source_id: The source ID, i.e. the connection name
+        :param collector_id: The collector ID
+        :param metadata_template: The metadata template of the connection, which caches the record headers of the tags
+        """
         self.source_id = source_id
         self.collector_id = collector_id
+        self.metadata_template = metadata_template
 
         self.logger = get_logger(self.__class__.__name__)
 
     def convert_payload(self, payload: dict) -> list:
-        self.logger.info(f"Converting payload for historian: {payload}")
+        self.logger.debug("Converting payload for historian: %s", payload)
 
         try:
             historian_messages = []
+            header = None
+            if self.metadata_template is not None:
+                header = self.metadata_template.historian_header(payload["tag"], self.collector_id)
+
             for message in payload['messages']:
 
                 measurement_id = payload["tag"]
@@ -27,21 +38,25 @@ class HistorianConverter:
                 quality = message['quality']
                 value = message['value']
 
-                historian_message = HistorianMessage(self.source_id, self.collector_id,
-                                                     measurement_id, timestamp, value, quality)
-
-                historian_message_dict = historian_message.__dict__
+                if header is not None:
+                    # Same fields, in the same order, as the historian message
+                    historian_message_dict = {**header, "timestamp": timestamp, "value": value,
+                                              "measureQuality": quality}
+                else:
+                    historian_message = HistorianMessage(self.source_id, self.collector_id,
+                                                         measurement_id, timestamp, value, quality)
+                    historian_message_dict = historian_message.__dict__
                 historian_message_dict['@type'] = 'data'
 
                 historian_messages.append(
                     historian_message_dict
                 )
 
-            self.logger.info(
-                f"Total length of messages converted for historian: {len(historian_messages)}")
+            self.logger.debug(
+                "Total length of messages converted for historian: %d", len(historian_messages))
 
             return historian_messages
 
         except Exception as e:
-            self.logger.error(f"Error converting payload: {e}")
+            self.logger.error("Error converting payload: %s", e)
             raise e
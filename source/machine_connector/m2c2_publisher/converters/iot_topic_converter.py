@@ -4,19 +4,30 @@
 import logging
 
 from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
 
 
 class IoTTopicConverter:
 
-    def __init__(self, connection_name: str, protocol: str):
+    def __init__(self, connection_name: str, protocol: str, metadata_template: MetadataTemplate = None):
+        """
+        :param connection_name: The connection name
+        :param protocol: The connection protocol
+        :param metadata_template: The metadata template of the connection. Without it, the topics are formatted
+            from the payload metadata.
+        """
         self.connection_name = connection_name
         self.protocol = protocol
+        self.metadata_template = metadata_template
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
     def topic_converter(self, payload):
         try:
+            if self.metadata_template is not None:
+                return self.metadata_template.topic(payload["tag"])
+
             iot_topic = "m2c2/data/{connection_name}/{machine_name}/{tag}".format(
                 connection_name=self.connection_name,
                 **payload
@@ -28,3 +39,13 @@ class IoTTopicConverter:
             )
             self.logger.error(error_msg)
             raise ConverterException(error_msg)
+
+    def batch_topic_converter(self, compression: str = None):
+        """
+        The connection-level topic of the batches of payloads.
+        Compressed batches are published to a sub-topic named after the compression.
+        """
+        iot_topic = f"m2c2/data/{self.connection_name}/batch"
+        if compression:
+            iot_topic = f"{iot_topic}/{compression}"
+        return iot_topic
@@ -3,13 +3,30 @@
 
 import logging
 
-from datetime import datetime
-from dateutil import parser
+from converters.solution_time import format_timestamp, parse_timestamp
 from utils.custom_exception import ConverterException
 
+# Python value type -> SiteWise variant key
+# The exact type is looked up, so `bool` values do not match `int`.
+SITEWISE_VALUE_KEYS = {
+    str: "stringValue",
+    int: "integerValue",
+    float: "doubleValue",
+    bool: "booleanValue"
+}
+# Maximum number of aliases whose value type is cached
+MAX_CACHED_ALIASES = 100000
+
 
 class SiteWiseConverter:
-    def __init__(self):
+    def __init__(self, expand_list_values: bool = True):
+        """
+        :param expand_list_values: Whether list values are expanded into indexed aliases by `sw_required_entries`
+        """
+        self.expand_list_values = expand_list_values
+        # alias -> (Python value type, SiteWise variant key)
+        self._alias_value_types = {}
+
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
@@ -39,18 +56,16 @@ class SiteWiseConverter:
                 "messages": []
             }
 
+            # The payload is shared with the SiteWise target, so it is read without being changed.
             for message in payload["propertyValues"]:
                 # Converts IoT SiteWise timestamp to the solution time
                 # from "timestamp": { "timeInSeconds": 1641862679, "offsetInNanos":176000000 }
                 # to "timestamp": "2022-01-10 16:57:59.176000+00:00"
                 timestamp = message["timestamp"]
-                time_in_seconds = timestamp["timeInSeconds"]
-                offset_in_nanos = timestamp["offsetInNanos"]
-                converted_timestamp = datetime.utcfromtimestamp(
-                    time_in_seconds + offset_in_nanos / 1000000000
-                ).strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
+                converted_timestamp = format_timestamp(
+                    timestamp["timeInSeconds"], timestamp["offsetInNanos"])
 
-                value = message["value"].popitem()[1]
+                value = next(iter(message["value"].values()))
                 solution_message["messages"].append({
                     "name": alias,
                     "value": value,
@@ -65,42 +80,123 @@ class SiteWiseConverter:
             raise ConverterException(err_msg)
 
     def sw_required_format(self, payload):
+        """
+        Converts the solution format to a single SiteWise `PutAssetPropertyValueEntry`.
+
+        :param payload: The payload in the solution format
+        :return: The SiteWise entry for the payload alias
+        :raises: :err:`ConverterException` when a value cannot be converted, including list values
+        """
         try:
-            sitewise_message = {
-                "propertyAlias": payload["alias"],
-                "propertyValues": []
+            alias = payload["alias"]
+            messages = payload["messages"]
+            timestamps = self.convert_timestamps(
+                [message["timestamp"] for message in messages])
+
+            return {
+                "propertyAlias": alias,
+                "propertyValues": [
+                    {
+                        "value": self._convert_value(alias, message["value"]),
+                        "timestamp": timestamp,
+                        "quality": message["quality"].upper()
+                    }
+                    for message, timestamp in zip(messages, timestamps)
+                ]
             }
+        except Exception as err:
+            err_msg = f"There was an issue converting the payload to SiteWise format: {err}"
+            self.logger.error(err_msg)
+            raise ConverterException(err_msg)
 
-            for message in payload["messages"]:
-                converted_time = parser.parse(message["timestamp"])
-                timestamp = {
-                    "timeInSeconds": int(converted_time.timestamp()),
-                    "offsetInNanos": converted_time.microsecond * 1000
-                }
-                value = {}
-                message_value = message["value"]
-                message_value_type = type(message_value)
-
-                if message_value_type == str:
-                    value["stringValue"] = message_value
-                elif message_value_type == int:
-                    value["integerValue"] = message_value
-                elif message_value_type == float:
-                    value["doubleValue"] = message_value
-                elif message_value_type == bool:
-                    value["booleanValue"] = message_value
-                else:
-                    raise ConverterException(
-                        f"Unsupported value type: {message_value_type}")
-
-                sitewise_message["propertyValues"].append({
-                    "value": value,
-                    "timestamp": timestamp,
-                    "quality": message["quality"].upper()
-                })
+    def sw_required_entries(self, payload):
+        """
+        Converts the solution format to SiteWise `PutAssetPropertyValueEntry` entries.
+        When list values are expanded, every list index is converted to its own alias `{alias}/{index}`,
+        so register arrays are sent as one property per register.
+
+        :param payload: The payload in the solution format
+        :return: The SiteWise entries, one per alias
+        :raises: :err:`ConverterException` when a value cannot be converted
+        """
+        if not self.expand_list_values or not any(
+                type(message.get("value")) is list for message in payload.get("messages", [])):
+            return [self.sw_required_format(payload)]
+
+        try:
+            alias = payload["alias"]
+            messages = payload["messages"]
+            timestamps = self.convert_timestamps(
+                [message["timestamp"] for message in messages])
+            # alias -> entry, in the order the aliases appear
+            entries = {}
+
+            for message, timestamp in zip(messages, timestamps):
+                quality = message["quality"].upper()
+                value = message["value"]
+                indexed_values = enumerate(value) if type(value) is list else [(None, value)]
+
+                for index, indexed_value in indexed_values:
+                    property_alias = alias if index is None else f"{alias}/{index}"
+                    entry = entries.get(property_alias)
+                    if entry is None:
+                        entry = entries[property_alias] = {
+                            "propertyAlias": property_alias,
+                            "propertyValues": []
+                        }
 
-            return sitewise_message
+                    entry["propertyValues"].append({
+                        "value": self._convert_value(property_alias, indexed_value),
+                        "timestamp": timestamp,
+                        "quality": quality
+                    })
+
+            return list(entries.values())
         except Exception as err:
             err_msg = f"There was an issue converting the payload to SiteWise format: {err}"
             self.logger.error(err_msg)
             raise ConverterException(err_msg)
+
+    def convert_timestamps(self, timestamps: list) -> list:
+        """
+        Converts the solution timestamps of a batch to SiteWise timestamps.
+        ISO formatted timestamps take the fast path, other formats are parsed by `dateutil`.
+        Repeated timestamps in the batch are converted once.
+
+        :param timestamps: The solution timestamps, e.g. "2021-06-03 15:14:21.247000+00:00"
+        :return: The SiteWise timestamps, e.g. { "timeInSeconds": 1622733261, "offsetInNanos": 247000000 }
+        """
+        converted = {}
+
+        for timestamp in timestamps:
+            if timestamp not in converted:
+                converted_time = parse_timestamp(timestamp)
+
+                converted[timestamp] = {
+                    "timeInSeconds": int(converted_time.timestamp()),
+                    "offsetInNanos": converted_time.microsecond * 1000
+                }
+
+        # Every value gets its own dictionary, as the entries might be changed later on.
+        return [dict(converted[timestamp]) for timestamp in timestamps]
+
+    def _convert_value(self, alias: str, value) -> dict:
+        """
+        Converts a value to a SiteWise variant.
+        The SiteWise type of the previous value of the alias is tried first, as it rarely changes.
+        """
+        value_type = type(value)
+        cached_type = self._alias_value_types.get(alias)
+
+        if cached_type is not None and cached_type[0] is value_type:
+            return {cached_type[1]: value}
+
+        value_key = SITEWISE_VALUE_KEYS.get(value_type)
+        if value_key is None:
+            raise ConverterException(f"Unsupported value type: {value_type}")
+
+        if len(self._alias_value_types) >= MAX_CACHED_ALIASES and alias not in self._alias_value_types:
+            self._alias_value_types.clear()
+        self._alias_value_types[alias] = (value_type, value_key)
+
+        return {value_key: value}
@@ -0,0 +1,60 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from dateutil import parser
+
+"""
+    Conversions between the solution timestamp, e.g. "2021-06-03 15:14:21.247000+00:00",
+    and the native epoch time used by IoT SiteWise and Timestream.
+    The converters share these, so a timestamp is formatted or parsed once, without `strftime` per value.
+"""
+
+NANOS_PER_MICRO = 1000
+MICROS_PER_SECOND = 1000000
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(time_in_seconds: int) -> str:
+    return datetime.fromtimestamp(time_in_seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_timestamp(time_in_seconds: int, offset_in_nanos: int) -> str:
+    """
+    Formats an epoch time to the solution timestamp in UTC.
+    The date and time part is formatted once per second, and the microseconds are appended to it.
+
+    :param time_in_seconds: The epoch time in seconds
+    :param offset_in_nanos: The nanosecond offset from the epoch time in seconds
+    :return: The solution timestamp, e.g. "2021-06-03 15:14:21.247000+00:00"
+    """
+    micros = (offset_in_nanos + NANOS_PER_MICRO // 2) // NANOS_PER_MICRO
+    if micros >= MICROS_PER_SECOND:
+        time_in_seconds += micros // MICROS_PER_SECOND
+        micros %= MICROS_PER_SECOND
+
+    return f"{_format_seconds(time_in_seconds)}.{micros:06d}+00:00"
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parses a solution timestamp.
+    ISO formatted timestamps take the fast path, other formats are parsed by `dateutil`.
+
+    :param timestamp: The solution timestamp
+    :return: The parsed datetime
+    """
+    try:
+        return datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return parser.parse(timestamp)
+
+
+def to_epoch_millis(timestamp: str) -> float:
+    """
+    :param timestamp: The solution timestamp
+    :return: The epoch time in milliseconds
+    """
+    return parse_timestamp(timestamp).timestamp() * 1000
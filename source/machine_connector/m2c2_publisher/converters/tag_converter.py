@@ -2,55 +2,87 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import logging
+import os
+
+from functools import lru_cache
+
+from utils.custom_exception import ConverterException
+
+# Maximum number of aliases with a cached tag per converter
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "4096"))
+
+# Replaces '/' with '_' and "." with "-" in one pass
+_ALIAS_TRANSLATION = str.maketrans({".": "-", "/": "_"})
+
+
+def _translate_alias(alias: str) -> str:
+    return alias.translate(_ALIAS_TRANSLATION)
+
+
+def _last_alias_part(alias: str) -> str:
+    return alias.rsplit('/', 1)[-1]
+
+
+# Protocol: the function which derives the tag from the alias
+_TAG_FUNCTIONS = {
+    "opcua": _translate_alias,
+    "opcda": _last_alias_part,
+    "osipi": _translate_alias,
+    "modbustcp": _last_alias_part
+}
 
 
 class TagConverter:
-    def __init__(self, protocol):
+    def __init__(self, protocol, cache_size: int = TAG_CACHE_SIZE):
+        """
+        :param protocol: The connection protocol, which sets how the tag is derived from the alias
+        :param cache_size: The maximum number of aliases with a cached tag
+        """
         self.protocol = protocol
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
+        # The converter holds no state per call, so the router workers can share it
+        tag_function = _TAG_FUNCTIONS.get(protocol, self._unsupported_protocol)
+        self._alias_to_tag = lru_cache(maxsize=cache_size)(tag_function)
+
     def convert_opcua_tag(self, payload):
         """
         Converting the OPC-UA alias, representing the telemetry tag
         Replacing '/' with '_' and "." with "-" in tag
         """
-        self.payload = payload
-        tag = self.payload["alias"].replace(".", "-").replace("/", "_")
-        return tag
+        return _translate_alias(payload["alias"])
 
     def convert_opcda_tag(self, payload):
         """
         Using the alias to pull out the tag for OPC-DA
         """
-        tag = payload["alias"].split('/')[-1]
-        return tag
+        return _last_alias_part(payload["alias"])
 
     def convert_osipi_tag(self, payload):
         """
         Converting the OSI PI name, representing the telemetry tag
         Replacing '/' with '_' and "." with "-" in tag
         """
-        self.payload = payload
-        tag = self.payload["alias"].replace(".", "-").replace("/", "_")
-        return tag
+        return _translate_alias(payload["alias"])
 
     def convert_modbustcp_tag(self, payload):
         """
-        Using the alias to pull out the tag for modbustcp, tag is 
+        Using the alias to pull out the tag for modbustcp, tag is
         last part of alias designated as "(user custom tag)_(modbus command)_(secondary address)"
         """
-        tag = payload["alias"].split('/')[-1]
-        return tag
+        return _last_alias_part(payload["alias"])
 
     def retrieve_tag(self, payload):
-        if self.protocol == "opcua":
-            self.tag = self.convert_opcua_tag(payload)
-        if self.protocol == "opcda":
-            self.tag = self.convert_opcda_tag(payload)
-        if self.protocol == "osipi":
-            self.tag = self.convert_osipi_tag(payload)
-        if self.protocol == "modbustcp":
-            self.tag = self.convert_modbustcp_tag(payload)
-        return self.tag
+        """
+        :param payload: The payload
+        :return: The tag of the payload alias, cached per alias
+        """
+        return self._alias_to_tag(payload["alias"])
+
+    def cache_info(self):
+        return self._alias_to_tag.cache_info()
+
+    def _unsupported_protocol(self, alias: str) -> str:
+        raise ConverterException(f"The tag of the alias {alias} cannot be derived for the protocol {self.protocol}")
@@ -3,12 +3,24 @@
 
 import logging
 
-from dateutil import parser
+from converters.solution_time import to_epoch_millis
 from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
+
+# Timestream Kinesis record formats
+# One record per sample, with the dimensions of the sample
+TIMESTREAM_RECORD_FORMAT_SINGLE = "single"
+# One record per machine, with the samples grouped by timestamp and quality, see `convert_multi_measure_format`
+TIMESTREAM_RECORD_FORMAT_MULTI = "multi"
 
 
 class TimestreamConverter:
-    def __init__(self) -> None:
+    def __init__(self, metadata_template: MetadataTemplate = None) -> None:
+        """
+        :param metadata_template: The metadata template of the connection. Without it, the dimensions are taken
+            from the payload metadata.
+        """
+        self.metadata_template = metadata_template
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
@@ -34,20 +46,23 @@ class TimestreamConverter:
 
         try:
             messages = payload.get("messages")
-            metadata = {
-                "site": payload.get("site_name"),
-                "area": payload.get("area"),
-                "process": payload.get("process"),
-                "machine": payload.get("machine_name"),
-                "tag": payload.get("tag")
-            }
+            if self.metadata_template is not None:
+                metadata = self.metadata_template.timestream_tag_dimensions(payload.get("tag"))
+            else:
+                metadata = {
+                    "site": payload.get("site_name"),
+                    "area": payload.get("area"),
+                    "process": payload.get("process"),
+                    "machine": payload.get("machine_name"),
+                    "tag": payload.get("tag")
+                }
             records = []
 
             for message in messages:
                 records.append({
                     **metadata,
                     "quality": message.get("quality"),
-                    "timestamp": parser.parse(message.get("timestamp")).timestamp() * 1000,
+                    "timestamp": to_epoch_millis(message.get("timestamp")),
                     "value": message.get("value"),
                 })
 
@@ -56,3 +71,62 @@ class TimestreamConverter:
             error_message = f"There was an issue converting the payload to solution format: {err}"
             self.logger.error(error_message)
             raise ConverterException(error_message)
+
+    def convert_multi_measure_format(self, records: list) -> list:
+        """
+        Groups the Timestream records of `convert_timestream_format` by machine, and their samples by timestamp
+        and quality, so the dimensions of a machine are sent once:
+        [
+            {
+                "site": str,
+                "area": str,
+                "process": str,
+                "machine": str,
+                "measures": [
+                    {
+                        "timestamp": Unix epoch time in ms,
+                        "quality": "Good" | "GOOD" | "Bad" | "BAD" | "Uncertain" | "UNCERTAIN",
+                        "values": { tag: various values }
+                    }
+                ]
+            }
+        ]
+        The timestream-writer Lambda function writes the measures with the dimensions as common attributes.
+
+        :param records: The Timestream records
+        :return: The Kinesis records for the Timestream, one per machine
+        """
+        try:
+            # Dimensions: (record, {(timestamp, quality): measure})
+            machines = {}
+
+            for record in records:
+                dimensions = (record["site"], record["area"], record["process"], record["machine"])
+                machine = machines.get(dimensions)
+                if machine is None:
+                    machine = machines[dimensions] = ({
+                        "site": record["site"],
+                        "area": record["area"],
+                        "process": record["process"],
+                        "machine": record["machine"],
+                        "measures": []
+                    }, {})
+                machine_record, measures = machine
+
+                key = (record["timestamp"], record["quality"])
+                measure = measures.get(key)
+                # A repeated sample of a tag starts a new measure, so no sample is overwritten
+                if measure is None or record["tag"] in measure["values"]:
+                    measure = measures[key] = {
+                        "timestamp": record["timestamp"],
+                        "quality": record["quality"],
+                        "values": {}
+                    }
+                    machine_record["measures"].append(measure)
+                measure["values"][record["tag"]] = record["value"]
+
+            return [machine_record for machine_record, _ in machines.values()]
+        except Exception as err:
+            error_message = f"There was an issue grouping the Timestream records: {err}"
+            self.logger.error(error_message)
+            raise ConverterException(error_message)
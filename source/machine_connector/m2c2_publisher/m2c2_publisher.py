@@ -1,14 +1,14 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-from boilerplate.logging.logger import get_logger
+from boilerplate.logging.logger import configure_logging
 from utils.constants import WORK_BASE_DIR
-from utils.custom_exception import PublisherException
-from utils import (PickleCheckpointManager, StreamManagerHelperClient)
+from utils import (AWSEndpointClient, PickleCheckpointManager, StreamManagerHelperClient)
+from utils.metrics import MetricsReporter, get_registry
+from utils.lazy_import import lazy_import
+from utils.startup_profiler import get_startup_profiler
 from payload_router import PayloadRouter
-from greengrasssdk.stream_manager import (
-    ExportDefinition
-)
-import time
+from connection_publisher import ConnectionPublisher
+from multi_connection_publisher import MultiConnectionPublisher, load_connections
 import os
 import logging
 
@@ -30,44 +30,103 @@ The publisher expects the payload of the messages on the stream to be the follow
     ]
 }
 It publishes data to any of the following: SiteWise, Kinesis Data Stream, an IoT topic
+
+By default, the publisher serves the connection of its environment variables.
+When PUBLISHER_CONNECTIONS_FILE is set, it serves every connection of the file from one process instead.
 """
 
 
 # Constant variables
-# Kinesis Data Stream name
-KINESIS_STREAM_NAME = os.getenv("KINESIS_STREAM_NAME")
-# Timestream Kinesis Data Stream name
-TIMESTREAM_KINESIS_STREAM = os.getenv("TIMESTREAM_KINESIS_STREAM")
-# Greengrass Stream name
-CONNECTION_GG_STREAM_NAME = os.getenv("CONNECTION_GG_STREAM_NAME")
-# Historian Kinesis Data Stream name
-HISTORIAN_KINESIS_STREAM = os.getenv("HISTORIAN_KINESIS_STREAM")
-# Connection name - used for IoT topic and alias (when needed)
-CONNECTION_NAME = os.getenv("CONNECTION_NAME")
-# Collecotr id - used as an attribute for historian messages
-COLLECTOR_ID = os.getenv("COLLECTOR_ID")
-
+# The connection settings are read per connection, from the environment variables of the process
+# or from the connections file of a multi-connection publisher:
+#   CONNECTION_NAME - used for IoT topic and alias (when needed)
+#   CONNECTION_GG_STREAM_NAME - Greengrass Stream name
+#   PROTOCOL - Messaging protocol
+#   KINESIS_STREAM_NAME - Kinesis Data Stream name
+#   TIMESTREAM_KINESIS_STREAM - Timestream Kinesis Data Stream name
+#   HISTORIAN_KINESIS_STREAM - Historian Kinesis Data Stream name
+#   COLLECTOR_ID - used as an attribute for historian messages
 # Connection defined destination values
 # Connection builder won't set these if they aren't defined as a destination in the connection
-SEND_TO_SITEWISE = os.getenv("SEND_TO_SITEWISE")
-SEND_TO_IOT_TOPIC = os.getenv("SEND_TO_IOT_TOPIC")
-SEND_TO_KINESIS_STREAM = os.getenv("SEND_TO_KINESIS_STREAM")
-SEND_TO_TIMESTREAM = os.getenv("SEND_TO_TIMESTREAM")
-SEND_TO_HISTORIAN = os.getenv("SEND_TO_HISTORIAN")
-
+#   SEND_TO_SITEWISE, SEND_TO_IOT_TOPIC, SEND_TO_KINESIS_STREAM, SEND_TO_TIMESTREAM, SEND_TO_HISTORIAN
 # The following variables may not be set
 # if using a protocol supported by an AWS-managed connector
-# Site name from Greengrass Lambda Environment variables
-SITE_NAME = os.getenv("SITE_NAME")
-# Area from Greengrass Lambda Environment variables
-AREA = os.getenv("AREA")
-# Process from Greengrass Lambda Environment variables
-PROCESS = os.getenv("PROCESS")
-# Machine name from Greengrass Lambda Environment variables
-MACHINE_NAME = os.getenv("MACHINE_NAME")
-
-# Messaging protocol
-PROTOCOL = os.getenv("PROTOCOL")
+#   SITE_NAME, AREA, PROCESS, MACHINE_NAME
+
+# Connection name of a single-connection publisher
+CONNECTION_NAME = os.getenv("CONNECTION_NAME")
+
+# Multi-connection publisher - a JSON file which lists the environment variables of every connection
+# the process publishes, see multi_connection_publisher.load_connections
+PUBLISHER_CONNECTIONS_FILE = os.getenv("PUBLISHER_CONNECTIONS_FILE")
+# Maximum number of messages a connection reads before the other connections get a turn
+PUBLISHER_MESSAGES_PER_TURN = int(os.getenv("PUBLISHER_MESSAGES_PER_TURN", "100"))
+
+# Conversion pool - number of worker processes which convert the messages of a single-connection publisher,
+# 0 converts the messages in the publisher process
+PUBLISHER_CONVERSION_WORKERS = int(os.getenv("PUBLISHER_CONVERSION_WORKERS", "0"))
+
+# IoT topic batching - when enabled, payloads are packed into batches on the connection batch topic
+# instead of being published to one topic per tag
+IOT_TOPIC_BATCHING = os.getenv("IOT_TOPIC_BATCHING", "false").lower() == "true"
+# Maximum time a payload waits in an IoT topic batch (in milliseconds)
+IOT_TOPIC_BATCH_LINGER_MS = int(os.getenv("IOT_TOPIC_BATCH_LINGER_MS", "100"))
+# IoT topic batch compression, "gzip" or empty for JSON batches
+IOT_TOPIC_BATCH_COMPRESSION = os.getenv("IOT_TOPIC_BATCH_COMPRESSION") or None
+
+# Number of SiteWise entries buffered before they are written, every entry is written as its own stream message.
+# 1, the default, writes every entry right away
+SITEWISE_MAX_BUFFERED_ENTRIES = int(
+    os.getenv("SITEWISE_MAX_BUFFERED_ENTRIES", "1"))
+# Maximum time a SiteWise entry waits in the buffer (in milliseconds)
+SITEWISE_LINGER_MS = int(os.getenv("SITEWISE_LINGER_MS", "100"))
+# Whether list values, e.g. Modbus register arrays, are sent to SiteWise as indexed aliases "{alias}/{index}"
+SITEWISE_EXPAND_LIST_VALUES = os.getenv(
+    "SITEWISE_EXPAND_LIST_VALUES", "true").lower() == "true"
+
+# Timestream record format, "single" for a record per sample, "multi" for a record per machine
+# with the samples grouped by timestamp and quality
+TIMESTREAM_RECORD_FORMAT = os.getenv("TIMESTREAM_RECORD_FORMAT", "single").lower()
+# Maximum time a sample waits to be grouped into a multi-measure Timestream record (in milliseconds)
+TIMESTREAM_LINGER_MS = int(os.getenv("TIMESTREAM_LINGER_MS", "100"))
+# Maximum number of samples grouped into one multi-measure Timestream record
+TIMESTREAM_MAX_SAMPLES_PER_RECORD = int(os.getenv("TIMESTREAM_MAX_SAMPLES_PER_RECORD", "500"))
+
+# Metrics - collected when METRICS_ENABLED is "true"
+# Time between metrics snapshots (in seconds)
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))
+# File which holds the latest metrics snapshot
+METRICS_FILE = os.getenv(
+    "METRICS_FILE", f"{WORK_BASE_DIR}/m2c2-{CONNECTION_NAME or 'multi-connection'}-publisher/metrics.json")
+# Local Greengrass IPC topic the metrics snapshots are published to, e.g. m2c2/metrics/{connection name}
+METRICS_TOPIC = os.getenv("METRICS_TOPIC")
+# The stage histograms of the traced messages, whose connectors set TRACE_SAMPLE_EVERY, are reported
+# with the metrics, see utils/trace.py
+
+# Catch-up - while the publisher is far behind the stream, it reads larger batches
+# Lag, in messages, from which the publisher catches up
+CATCH_UP_LAG_THRESHOLD = int(os.getenv("CATCH_UP_LAG_THRESHOLD", "1000"))
+# Maximum number of messages read from the stream at a time while catching up
+CATCH_UP_READ_MESSAGES = int(os.getenv("CATCH_UP_READ_MESSAGES", "100"))
+# Comma separated glob patterns of the low-priority tag aliases, e.g. "site/area/process/machine/debug-*"
+LOW_PRIORITY_TAGS = [tag.strip() for tag in os.getenv("LOW_PRIORITY_TAGS", "").split(",") if tag.strip()]
+# While catching up, only every n-th message of a low-priority tag is published, 1 publishes every message
+CATCH_UP_DOWNSAMPLE = int(os.getenv("CATCH_UP_DOWNSAMPLE", "1"))
+# Time between stream position checks (in seconds)
+position_check_interval = 1
+
+# Target cursors - when enabled, every target reads the connection stream with its own cursor and checkpoint,
+# so a failing target falls behind and catches up on its own instead of stopping the other targets.
+# The messages are then converted in the publisher process, without the conversion pool.
+PUBLISHER_TARGET_CURSORS = os.getenv("PUBLISHER_TARGET_CURSORS", "false").lower() == "true"
+# Time before a failed target is retried, doubled on every failure in a row (in seconds)
+TARGET_RETRY_BASE_DELAY = float(os.getenv("TARGET_RETRY_BASE_DELAY", "1"))
+# Maximum time before a failed target is retried (in seconds)
+TARGET_RETRY_MAX_DELAY = float(os.getenv("TARGET_RETRY_MAX_DELAY", "60"))
+# Messages a target may fall behind the newest cursor before it is flagged
+TARGET_MAX_LAG = int(os.getenv("TARGET_MAX_LAG", "10000"))
+# Consecutive read errors after which the publisher stops
+max_consecutive_read_errors = 10
 
 # Stream Manager SiteWise publisher stream
 sitewise_stream = 'SiteWise_Stream'
@@ -78,66 +137,42 @@ timestream_kinesis_stream = "m2c2_timestream_stream"
 
 # Max size of message stream when creating (in bytes)
 max_stream_size = 5368706371  # 5GB
-# Number of messages to read from a stream at a time
-read_msg_number = 1
+# Maximum number of messages read from the stream at a time
+READ_MAX_MESSAGES = int(os.getenv("READ_MAX_MESSAGES", "100"))
+# Maximum time a read waits in Stream Manager for new messages (in milliseconds)
+READ_TIMEOUT_MS = int(os.getenv("READ_TIMEOUT_MS", "1000"))
 
-# Checkpoint db - to track message sequence numbers
-checkpoint_db = f"{WORK_BASE_DIR}/m2c2-{CONNECTION_NAME}-publisher/stream_checkpoints"
-
-# Checkpoint client for tracking message sequence
-checkpoint_client = PickleCheckpointManager(checkpoint_db)
-# Base stream manager client
-smh_client = StreamManagerHelperClient()
+# Base stream manager client, connected in main
+# The conversion pool workers import this module, and must not connect to Stream Manager
+smh_client = None
 
 # Logging
 logger = logging.getLogger()  # get_logger('m2c2_publisher.py')
 
+# Metrics
+metrics = get_registry()
+startup_profiler = get_startup_profiler()
+
+# The worker processes are only started, and multiprocessing imported, when they are configured
+ConversionPool = lazy_import("conversion_pool", "ConversionPool")
 
-def retrieve_checkpoints():
-    # Gets the latest checkpoints from the on-disk data store
-    # If this is a new connection, there will be no checkpoints, return None
-    try:
-        trailing_cp, primary_cp = checkpoint_client.retrieve_checkpoints(
-            CONNECTION_GG_STREAM_NAME
-        )
-        return (trailing_cp, primary_cp)
-    except Exception as err:
-        logger.error(
-            "There was an issue retrieving checkpoints for stream {}: {}".format(
-                CONNECTION_GG_STREAM_NAME,
-                err
-            )
-        )
-        raise
-
-
-def write_checkpoint(checkpoint, value):
-    try:
-        checkpoint_client.write_checkpoints(
-            CONNECTION_GG_STREAM_NAME, checkpoint, value)
-    except Exception as err:
-        logger.error(
-            f"There was an issue writing the checkpoint {checkpoint} of value {value} for stream {CONNECTION_GG_STREAM_NAME}: {err}"
-        )
-        raise
-
-
-def create_hierarchy():
+
+def create_hierarchy(connection):
     return {
-        "site_name": SITE_NAME,
-        "area": AREA,
-        "process": PROCESS,
-        "machine_name": MACHINE_NAME
+        "site_name": connection.get("SITE_NAME"),
+        "area": connection.get("AREA"),
+        "process": connection.get("PROCESS"),
+        "machine_name": connection.get("MACHINE_NAME")
     }
 
 
-def create_destinations():
+def create_destinations(connection):
     return {
-        "send_to_sitewise": SEND_TO_SITEWISE,
-        "send_to_kinesis_stream": SEND_TO_KINESIS_STREAM,
-        "send_to_iot_topic": SEND_TO_IOT_TOPIC,
-        "send_to_timestream": SEND_TO_TIMESTREAM,
-        "send_to_historian": SEND_TO_HISTORIAN
+        "send_to_sitewise": connection.get("SEND_TO_SITEWISE"),
+        "send_to_kinesis_stream": connection.get("SEND_TO_KINESIS_STREAM"),
+        "send_to_iot_topic": connection.get("SEND_TO_IOT_TOPIC"),
+        "send_to_timestream": connection.get("SEND_TO_TIMESTREAM"),
+        "send_to_historian": connection.get("SEND_TO_HISTORIAN")
     }
 
 
@@ -149,108 +184,164 @@ def create_destination_streams():
     }
 
 
-def init_router_client():
-    hierarchy = create_hierarchy()
-    destinations = create_destinations()
+def create_iot_topic_batching():
+    return {
+        "batching": IOT_TOPIC_BATCHING,
+        "batch_linger_ms": IOT_TOPIC_BATCH_LINGER_MS,
+        "batch_compression": IOT_TOPIC_BATCH_COMPRESSION
+    }
+
+
+def create_sitewise_options():
+    return {
+        "max_entries": SITEWISE_MAX_BUFFERED_ENTRIES,
+        "linger_ms": SITEWISE_LINGER_MS,
+        "expand_list_values": SITEWISE_EXPAND_LIST_VALUES
+    }
+
+
+def create_timestream_options():
+    return {
+        "record_format": TIMESTREAM_RECORD_FORMAT,
+        "linger_ms": TIMESTREAM_LINGER_MS,
+        "max_samples_per_record": TIMESTREAM_MAX_SAMPLES_PER_RECORD
+    }
+
+
+def create_router_parameters(connection, metrics_prefix=None):
+    hierarchy = create_hierarchy(connection)
+    destinations = create_destinations(connection)
     destination_streams = create_destination_streams()
     payload_router_parameters = {
-        "protocol": PROTOCOL,
-        "connection_name": CONNECTION_NAME,
+        "protocol": connection.get("PROTOCOL"),
+        "connection_name": connection.get("CONNECTION_NAME"),
         "hierarchy": hierarchy,
         "destinations": destinations,
         "destination_streams": destination_streams,
         "max_stream_size": max_stream_size,
-        "kinesis_data_stream": KINESIS_STREAM_NAME,
-        "timestream_kinesis_data_stream": TIMESTREAM_KINESIS_STREAM,
-        "historian_data_stream": HISTORIAN_KINESIS_STREAM,
-        "collector_id": COLLECTOR_ID
+        "kinesis_data_stream": connection.get("KINESIS_STREAM_NAME"),
+        "timestream_kinesis_data_stream": connection.get("TIMESTREAM_KINESIS_STREAM"),
+        "historian_data_stream": connection.get("HISTORIAN_KINESIS_STREAM"),
+        "collector_id": connection.get("COLLECTOR_ID"),
+        "iot_topic_batching": create_iot_topic_batching(),
+        "sitewise_options": create_sitewise_options(),
+        "timestream_options": create_timestream_options(),
+        "low_priority_tags": LOW_PRIORITY_TAGS,
+        "metrics_prefix": metrics_prefix
     }
-    router_client = PayloadRouter(**payload_router_parameters)
-    return router_client
-
-
-def payload_router(router_client, message):
-    try:
-        message_sequence_number = router_client.route_payload(message)
-        return message_sequence_number
-    except Exception as err:
-        raise PublisherException(
-            f"There was an error when trying to send data to the payload router: '{err}'")
+    return payload_router_parameters
 
 
-def create_stream():
-    logger.info(
-        f"Stream {CONNECTION_GG_STREAM_NAME} not found, attempting to create it.")
-    gg_exports = ExportDefinition()
-    smh_client.create_stream(CONNECTION_GG_STREAM_NAME,
-                             max_stream_size, gg_exports)
+def init_router_client(connection, metrics_prefix=None):
+    router_client = PayloadRouter(
+        **create_router_parameters(connection, metrics_prefix))
+    return router_client
 
 
-def check_for_gg_stream():
-    # Ensure the message stream exists, if it doesn't, create
-    avail_streams = smh_client.list_streams()
-    if CONNECTION_GG_STREAM_NAME not in avail_streams:
-        return False
-    else:
-        return True
+def init_checkpoint_client(connection):
+    # Checkpoint db - to track message sequence numbers
+    checkpoint_dir = f"{WORK_BASE_DIR}/m2c2-{connection.get('CONNECTION_NAME')}-publisher"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return PickleCheckpointManager(f"{checkpoint_dir}/stream_checkpoints")
+
+
+def create_connection_publisher(connection, metrics_prefix=None, conversion_pool=None):
+    """
+    Creates the publisher of a connection.
+    The connection holds the environment variables of the connection, e.g. `os.environ` for a single connection.
+    The metric names of the connection start with the metrics prefix, when it is set.
+    """
+    return ConnectionPublisher(
+        connection_name=connection.get("CONNECTION_NAME"),
+        stream_name=connection.get("CONNECTION_GG_STREAM_NAME"),
+        router_client=init_router_client(connection, metrics_prefix),
+        smh_client=smh_client,
+        checkpoint_client=init_checkpoint_client(connection),
+        max_stream_size=max_stream_size,
+        read_max_messages=READ_MAX_MESSAGES,
+        read_timeout_ms=READ_TIMEOUT_MS,
+        catch_up_lag_threshold=CATCH_UP_LAG_THRESHOLD,
+        catch_up_read_messages=CATCH_UP_READ_MESSAGES,
+        catch_up_downsample=CATCH_UP_DOWNSAMPLE,
+        position_check_interval=position_check_interval,
+        max_consecutive_read_errors=max_consecutive_read_errors,
+        metrics_prefix=f"{metrics_prefix}.publisher" if metrics_prefix else "publisher",
+        conversion_pool=conversion_pool,
+        max_pending_batches=2 * PUBLISHER_CONVERSION_WORKERS,
+        target_cursors=PUBLISHER_TARGET_CURSORS,
+        target_retry_base_delay=TARGET_RETRY_BASE_DELAY,
+        target_retry_max_delay=TARGET_RETRY_MAX_DELAY,
+        max_target_lag=TARGET_MAX_LAG
+    )
+
+
+def create_multi_connection_publisher():
+    connections = load_connections(PUBLISHER_CONNECTIONS_FILE)
+
+    def publisher_factory(connection):
+        # Every connection has its own metric names
+        return create_connection_publisher(
+            connection, f"connection.{connection['CONNECTION_NAME']}")
+
+    return MultiConnectionPublisher(connections, publisher_factory, PUBLISHER_MESSAGES_PER_TURN)
+
+
+def start_metrics_reporter():
+    publish_callback = None
+    if METRICS_TOPIC:
+        connector_client = AWSEndpointClient()
+
+        def publish_callback(snapshot):
+            connector_client.publish_message_to_local_topic(
+                METRICS_TOPIC, snapshot)
+
+    reporter = MetricsReporter(
+        metrics, METRICS_INTERVAL, METRICS_FILE, publish_callback)
+    reporter.start()
+    return reporter
 
 
 def main():
-    logger.info(f"Starting up publisher for connection {CONNECTION_NAME}")
+    global smh_client
+    configure_logging()
+    startup_profiler.mark("imported")
+    with startup_profiler.phase("connect_clients"):
+        smh_client = StreamManagerHelperClient()
+
+    if metrics.enabled:
+        start_metrics_reporter()
+
+    if PUBLISHER_CONNECTIONS_FILE:
+        logger.info(
+            f"Starting up publisher for the connections in {PUBLISHER_CONNECTIONS_FILE}")
+        with startup_profiler.phase("create_publisher"):
+            multi_connection_publisher = create_multi_connection_publisher()
+        multi_connection_publisher.start()
+        multi_connection_publisher.join()
+        return
 
-    # In this case, if the stream does not exist, it is created
-    logger.info("Checking for GG stream")
-    stream_exists = check_for_gg_stream()
-    if not stream_exists:
-        create_stream()
-
-    # Get the checkpoints from the data store
-    # Trailing checkpoint will be the last sequence number written to the cloud
-    # Primary checkpoint will be the last sequence number read from the stream
-    trailing, primary = retrieve_checkpoints()
-
-    # If the trailing checkpoint exists,
-    # set the primary to the next in the sequence after the trailing
-    if trailing:
-        primary = trailing + 1
-        write_checkpoint('primary', trailing)
-
-    # If primary isn't set in the checkpoint manager,
-    # retrieve the oldest sequence number from the stream
-    if not primary:
-        primary = smh_client.get_oldest_sequence_number(
-            CONNECTION_GG_STREAM_NAME)
-        write_checkpoint('primary', primary)
-
-    # The sequence number tracks the sequence number of the message in progress
-    sequence_number = primary
-
-    # Retrive message from the stream
-    logger.info(f"Reading from stream {CONNECTION_GG_STREAM_NAME}")
-    router_client = init_router_client()
-    # In a infinite loop, read the next message in the stream
+    logger.info(f"Starting up publisher for connection {CONNECTION_NAME}")
+    with startup_profiler.phase("create_publisher"):
+        conversion_pool = None
+        if PUBLISHER_CONVERSION_WORKERS > 0 and PUBLISHER_TARGET_CURSORS:
+            logger.warning("The target cursors convert the messages in the publisher process, "
+                           "PUBLISHER_CONVERSION_WORKERS is ignored")
+        elif PUBLISHER_CONVERSION_WORKERS > 0:
+            logger.info(
+                f"Converting the messages in {PUBLISHER_CONVERSION_WORKERS} worker processes")
+            conversion_pool = ConversionPool(
+                create_router_parameters(dict(os.environ)), PUBLISHER_CONVERSION_WORKERS)
+        publisher = create_connection_publisher(
+            os.environ, conversion_pool=conversion_pool)
+        publisher.start()
+
+    # In a infinite loop, read the next messages in the stream
     # If there are no messages associate with the sequence number,
-    # check the stream again until there are new messages
+    # the read waits in Stream Manager until there are new messages
     # When there is a new message, send to the payload router
     while True:
         try:
-            message_data = smh_client.read_from_stream(
-                CONNECTION_GG_STREAM_NAME,
-                sequence_number,
-                read_msg_number
-            )
-
-            if message_data:
-                for message in message_data:
-                    message_sequence_number = payload_router(
-                        router_client, message)
-                    write_checkpoint('trailing', message_sequence_number)
-                    message_sequence_number += 1
-                    write_checkpoint('primary', message_sequence_number)
-                    sequence_number = message_sequence_number
-
-            # To reduce the load, sleep 0.01 second.
-            time.sleep(0.01)
+            publisher.poll()
         except Exception as err:
             logger.error(
                 f"There was an error when trying to read your data from a stream and send it to AWS: {err}")
@@ -0,0 +1,105 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import logging
+import threading
+import time
+
+from typing import Callable
+
+from utils.metrics import get_registry
+
+"""
+    Publishes many connection streams from one process.
+    Every connection has its own payload router, checkpoints and worker thread, and the workers share
+    the Stream Manager and Greengrass IPC clients of the process.
+        - Fairness: a worker reads at most `messages_per_turn` messages before it yields to the other workers,
+          so a connection with a large backlog cannot starve the others.
+        - Isolation: an error only stops its own connection. The connection is set up again after a backoff,
+          while the other connections keep publishing.
+"""
+
+# Maximum time between the restarts of a failing connection (in seconds)
+MAX_RESTART_BACKOFF = 60
+
+
+def load_connections(file_path: str) -> list:
+    """
+    Loads the connections of a multi-connection publisher.
+    The file holds a JSON list, and every connection has the environment variables of a single-connection publisher,
+    e.g. [{"CONNECTION_NAME": "...", "CONNECTION_GG_STREAM_NAME": "...", "PROTOCOL": "opcda", "SEND_TO_IOT_TOPIC": "Yes"}]
+
+    :param file_path: The connections file
+    :return: The connections
+    """
+    with open(file_path) as file:
+        connections = json.load(file)
+
+    if not isinstance(connections, list):
+        raise ValueError(f"The connections file {file_path} does not hold a list of connections")
+
+    for connection in connections:
+        for key in ("CONNECTION_NAME", "CONNECTION_GG_STREAM_NAME"):
+            if not connection.get(key):
+                raise ValueError(f"A connection in {file_path} is missing {key}")
+
+    return connections
+
+
+class MultiConnectionPublisher:
+    def __init__(self, connections: list, publisher_factory: Callable, messages_per_turn: int = 100):
+        """
+        :param connections: The connections, see `load_connections`
+        :param publisher_factory: Creates the `ConnectionPublisher` of a connection
+        :param messages_per_turn: The maximum number of messages a connection reads before the others get a turn
+        """
+        self.connections = connections
+        self.publisher_factory = publisher_factory
+        self.messages_per_turn = messages_per_turn
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._connection_failures = get_registry().counter("publisher.connection_failures")
+
+    def start(self) -> None:
+        for connection in self.connections:
+            connection_name = connection["CONNECTION_NAME"]
+            thread = threading.Thread(
+                target=self._run_connection, args=(connection,), name=f"publisher-{connection_name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info(f"Publishing {len(self.connections)} connections")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def join(self, timeout: float = None) -> None:
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run_connection(self, connection: dict) -> None:
+        connection_name = connection["CONNECTION_NAME"]
+        failures = 0
+
+        while not self._stop_event.is_set():
+            try:
+                publisher = self.publisher_factory(connection)
+                publisher.start()
+
+                while not self._stop_event.is_set():
+                    if publisher.poll(self.messages_per_turn):
+                        # Gives the other connections a turn
+                        time.sleep(0)
+                    failures = 0
+            except Exception as err:
+                failures += 1
+                self._connection_failures.inc()
+                backoff = min(2 ** failures, MAX_RESTART_BACKOFF)
+                self.logger.error(
+                    f"Publishing connection {connection_name} failed, restarting it in {backoff} seconds: {err}")
+                self._stop_event.wait(backoff)
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import copy
+import fnmatch
 import logging
 import json
 
@@ -9,24 +10,59 @@ from targets.iot_topic_target import IoTTopicTarget
 from targets.kinesis_target import KinesisTarget
 from targets.historian_target import HistorianTarget
 from targets.sitewise_target import SiteWiseTarget
+from converters.sitewise_converter import SiteWiseConverter
+from converters.timestream_converter import TIMESTREAM_RECORD_FORMAT_MULTI
 from boilerplate.logging.logger import get_logger
+from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
+from utils.metrics import get_registry
+from utils.trace import ACK_PREFIX, READ, ROUTE_END, ROUTE_START, TRACE_KEY, TraceRecorder, stamp
+
+# Destinations which take OPC UA payloads in the solution format
+CONVERTED_DESTINATIONS = [
+    "send_to_kinesis_stream",
+    "send_to_iot_topic",
+    "send_to_timestream",
+    "send_to_historian"
+]
+
+# Target names used in the metric names
+TARGET_NAMES = ["sitewise", "kinesis", "iot_topic", "timestream", "historian"]
+
+# The destination setting of every target
+TARGET_DESTINATIONS = {
+    "sitewise": "send_to_sitewise",
+    "kinesis": "send_to_kinesis_stream",
+    "iot_topic": "send_to_iot_topic",
+    "timestream": "send_to_timestream",
+    "historian": "send_to_historian"
+}
 
 
 class PayloadRouter:
     def __init__(self, protocol: str, connection_name: str, hierarchy: dict, destinations: dict,
                  destination_streams: dict, max_stream_size: int, kinesis_data_stream: str,
-                 timestream_kinesis_data_stream: str, historian_data_stream: str, collector_id: str):
+                 timestream_kinesis_data_stream: str, historian_data_stream: str, collector_id: str,
+                 iot_topic_batching: dict = None, sitewise_options: dict = None, low_priority_tags: list = None,
+                 metrics_prefix: str = None, timestream_options: dict = None):
         self.logger = get_logger(self.__class__.__name__)
 
+        self.protocol = protocol
         self.destinations = destinations
+        self.sitewise_converter = SiteWiseConverter()
+        # The targets share the metadata of the connection, and its cached per-tag metadata
+        metadata_template = MetadataTemplate.from_hierarchy(hierarchy, connection_name)
         self.iot_client = IoTTopicTarget(
             connection_name=connection_name,
             protocol=protocol,
-            hierarchy=hierarchy
+            hierarchy=hierarchy,
+            metadata_template=metadata_template,
+            **(iot_topic_batching or {})
         )
         self.sitewise_client = SiteWiseTarget(
             protocol=protocol,
-            sitewise_stream=destination_streams["sitewise_stream"]
+            sitewise_stream=destination_streams["sitewise_stream"],
+            **(sitewise_options or {})
         )
         self.kinesis_client = KinesisTarget(
             connection_name=connection_name,
@@ -34,7 +70,8 @@ class PayloadRouter:
             hierarchy=hierarchy,
             kinesis_sm_stream=destination_streams["kinesis_sm_stream"],
             max_stream_size=max_stream_size,
-            kinesis_data_stream=kinesis_data_stream
+            kinesis_data_stream=kinesis_data_stream,
+            metadata_template=metadata_template
         )
         self.timestream_kinesis_client = KinesisTarget(
             connection_name=connection_name,
@@ -43,8 +80,12 @@ class PayloadRouter:
             kinesis_sm_stream=destination_streams["timestream_kinesis_stream"],
             max_stream_size=max_stream_size,
             kinesis_data_stream=timestream_kinesis_data_stream,
-            is_timestream_kinesis=True
+            is_timestream_kinesis=True,
+            metadata_template=metadata_template,
+            **(timestream_options or {})
         )
+        # The multi-measure Timestream records are buffered until they are grouped
+        self._timestream_buffering = (timestream_options or {}).get("record_format") == TIMESTREAM_RECORD_FORMAT_MULTI
         self.historian_client = HistorianTarget(
             connection_name=connection_name,
             protocol=protocol,
@@ -54,48 +95,398 @@ class PayloadRouter:
             historian_sm_stream=f"historian_{connection_name}",
             max_stream_size=max_stream_size,
             historian_data_stream=historian_data_stream,
-            collector_id=collector_id
+            collector_id=collector_id,
+            metadata_template=metadata_template
         )
 
-    def route_payload(self, message):
+        # Glob patterns of the low-priority tag aliases, which are down-sampled while the publisher catches up
+        self.low_priority_tags = low_priority_tags or []
+        self._downsample_every = 1
+        self._low_priority_aliases = {}
+        self._downsample_counts = {}
+
+        # A process which publishes several connections prefixes the metric names with the connection
+        prefix = f"{metrics_prefix}." if metrics_prefix else ""
+        metrics = get_registry()
+        self._downsampled_messages = metrics.counter(f"{prefix}router.downsampled")
+        self._route_ms = metrics.histogram(f"{prefix}router.route_ms")
+        self._routed_messages = metrics.counter(f"{prefix}router.messages")
+        self._route_errors = metrics.counter(f"{prefix}router.errors")
+        self._target_send_ms = {
+            name: metrics.histogram(f"{prefix}target.{name}.send_ms") for name in TARGET_NAMES}
+        self._target_errors = {
+            name: metrics.counter(f"{prefix}target.{name}.errors") for name in TARGET_NAMES}
+        self._target_conversion_errors = {
+            name: metrics.counter(f"{prefix}target.{name}.conversion_errors") for name in TARGET_NAMES}
+        # The traced payloads record the time between their stages, see `utils.trace`
+        self._trace_recorder = TraceRecorder(metrics_prefix)
+
+    def route_payload(self, message, read_time_ms: float = None):
         """
         The payload router routes telemetry data based on set destinations in the destinations dictionary
+
+        :param message: The stream message
+        :param read_time_ms: The time the message was read from the stream (in epoch milliseconds)
         """
         if message.payload is None:
             raise ValueError("Message is missing payload attribute")
         try:
-            payload = json.loads(message.payload)
-            message_sequence_number = message.sequence_number
-
-            if self.destinations["send_to_sitewise"]:
-                sitewise_payload = copy.deepcopy(payload)
-                self.sitewise_client.send_to_sitewise(sitewise_payload)
-
-            if self.destinations["send_to_kinesis_stream"]:
-                kinesis_payload = copy.deepcopy(payload)
-                self.kinesis_client.send_to_kinesis(kinesis_payload)
-
-            if self.destinations["send_to_iot_topic"]:
-                iot_payload = copy.deepcopy(payload)
-                self.iot_client.send_to_iot(iot_payload)
-
-            if self.destinations["send_to_timestream"]:
-                timestream_payload = copy.deepcopy(payload)
-                self.timestream_kinesis_client.send_to_kinesis(
-                    timestream_payload
-                )
-
-            if self.destinations["send_to_historian"]:
-                historian_payload = copy.deepcopy(payload)
-                self.historian_client.send_to_kinesis(
-                    historian_payload
-                )
-
-            return message_sequence_number
+            with self._route_ms.time():
+                self._route(message, read_time_ms)
+            self._routed_messages.inc()
+
+            return message.sequence_number
         except TypeError as err:
+            self._route_errors.inc()
             self.logger.error(
-                f"There was an error raised when trying to route the data payload: {err}")
+                "There was an error raised when trying to route the data payload: %s", err)
+            raise
+        except Exception as err:
+            self._route_errors.inc()
+            self.logger.error("An error was raised: %s", err)
+            raise
+
+    def route_to_targets(self, message, targets: list, read_time_ms: float = None) -> dict:
+        """
+        Routes a message to some of the targets, e.g. to the targets whose cursor is at the message.
+        A target which fails does not keep the message from the other targets.
+        A payload which cannot be parsed or converted fails the targets with a `ConverterException`.
+
+        :param message: The stream message
+        :param targets: The names of the targets, see `TARGET_NAMES`
+        :param read_time_ms: The time the message was read from the stream (in epoch milliseconds)
+        :return: The error of every target which failed
+        """
+        if message.payload is None:
+            raise ValueError("Message is missing payload attribute")
+
+        errors = {}
+        with self._route_ms.time():
+            try:
+                self._route(message, read_time_ms, targets, errors)
+            except Exception as err:
+                self.logger.error("Failed to parse the payload: %s", err)
+                self._fail_targets(errors, [name for name in targets if self._routes_to(name)],
+                                   ConverterException(f"Failed to parse the payload: {err}"))
+        if errors:
+            self._route_errors.inc()
+        self._routed_messages.inc()
+        return errors
+
+    def enabled_targets(self) -> list:
+        """
+        :return: The names of the targets of the destinations of the connection
+        """
+        return [name for name in TARGET_NAMES if self.destinations[TARGET_DESTINATIONS[name]]]
+
+    def set_downsampling(self, keep_every: int):
+        """
+        Down-samples the low-priority tags, e.g. while the publisher catches up with the stream.
+
+        :param keep_every: Every `keep_every`-th message of a low-priority tag is routed, 1 routes every message
+        """
+        keep_every = max(1, keep_every)
+        if keep_every != self._downsample_every:
+            self._downsample_every = keep_every
+            self._downsample_counts = {}
+
+    def _route(self, message, read_time_ms: float = None, targets: list = None, errors: dict = None):
+        """
+        :param targets: The names of the targets the message is routed to, `None` for every target
+        :param errors: Collects the error of every target which failed, `None` raises the first error
+        """
+        payload = json.loads(message.payload)
+        trace = payload.pop(TRACE_KEY, None)
+
+        if self._downsample_every > 1 and self._is_downsampled(payload):
+            self._downsampled_messages.inc()
+            return
+
+        self._start_trace(trace, read_time_ms)
+        stamp(trace, ROUTE_START)
+
+        # The SiteWise target passes OPC UA payloads through as they are
+        if self._routes_to("sitewise", targets):
+            sitewise_payload = payload if self.protocol == "opcua" else copy.deepcopy(payload)
+            self._send_to(errors, trace, "sitewise", self.sitewise_client.send_to_sitewise, sitewise_payload)
+
+        # The other targets share one conversion of an OPC UA payload to the solution format
+        converted = self.protocol == "opcua" and any(
+            self._routes_to(name, targets) for name in TARGET_NAMES
+            if TARGET_DESTINATIONS[name] in CONVERTED_DESTINATIONS)
+        if converted:
+            try:
+                payload = self.sitewise_converter.convert_sitewise_format(payload)
+            except ConverterException as err:
+                if errors is None:
+                    raise
+                self._fail_targets(errors, [name for name in TARGET_NAMES if self._routes_to(name, targets)
+                                            and TARGET_DESTINATIONS[name] in CONVERTED_DESTINATIONS], err)
+                self._end_trace(trace)
+                return
+
+        if self._routes_to("kinesis", targets):
+            kinesis_payload = copy.deepcopy(payload)
+            self._send_to(errors, trace, "kinesis", self.kinesis_client.send_to_kinesis, kinesis_payload, converted)
+
+        if self._routes_to("iot_topic", targets):
+            iot_payload = copy.deepcopy(payload)
+            self._send_to(errors, trace, "iot_topic", self.iot_client.send_to_iot, iot_payload, converted)
+
+        if self._routes_to("timestream", targets):
+            timestream_payload = copy.deepcopy(payload)
+            self._send_to(errors, trace, "timestream", self.timestream_kinesis_client.send_to_kinesis,
+                          timestream_payload, converted)
+
+        if self._routes_to("historian", targets):
+            historian_payload = copy.deepcopy(payload)
+            self._send_to(errors, trace, "historian", self.historian_client.send_to_kinesis,
+                          historian_payload, converted)
+
+        self._end_trace(trace)
+
+    def _routes_to(self, target_name: str, targets: list = None) -> bool:
+        return self.destinations[TARGET_DESTINATIONS[target_name]] and (targets is None or target_name in targets)
+
+    def convert_payload(self, message_payload):
+        """
+        Parses a message payload, and converts it for every destination without sending it.
+        This is the CPU bound part of the routing, so a conversion pool can run it in worker processes.
+
+        :param message_payload: The payload of a stream message
+        :return: The converted payload of every target, or `None` when the payload is down-sampled.
+            The trace of a traced payload is returned under the `trace` key.
+        """
+        payload = json.loads(message_payload)
+        trace = payload.pop(TRACE_KEY, None)
+
+        if self._downsample_every > 1 and self._is_downsampled(payload):
+            return None
+
+        stamp(trace, ROUTE_START)
+        converted_payloads = {}
+        if trace is not None:
+            converted_payloads[TRACE_KEY] = trace
+        if self.destinations["send_to_sitewise"]:
+            sitewise_payload = payload if self.protocol == "opcua" else copy.deepcopy(payload)
+            converted_payloads["sitewise"] = self._convert(
+                "sitewise", self.sitewise_client.convert, sitewise_payload)
+
+        converted = self.protocol == "opcua" and any(
+            self.destinations[destination] for destination in CONVERTED_DESTINATIONS)
+        if converted:
+            payload = self.sitewise_converter.convert_sitewise_format(payload)
+
+        if self.destinations["send_to_kinesis_stream"]:
+            converted_payloads["kinesis"] = self._convert(
+                "kinesis", self.kinesis_client.convert, copy.deepcopy(payload), converted)
+
+        if self.destinations["send_to_iot_topic"]:
+            converted_payloads["iot_topic"] = self._convert(
+                "iot_topic", self.iot_client.convert, copy.deepcopy(payload), converted)
+
+        if self.destinations["send_to_timestream"]:
+            converted_payloads["timestream"] = self._convert(
+                "timestream", self.timestream_kinesis_client.convert, copy.deepcopy(payload), converted)
+
+        if self.destinations["send_to_historian"]:
+            converted_payloads["historian"] = self._convert(
+                "historian", self.historian_client.convert, copy.deepcopy(payload), converted)
+
+        return converted_payloads
+
+    def write_converted(self, converted_payloads, read_time_ms: float = None, targets: list = None,
+                        errors: dict = None):
+        """
+        Sends the payloads converted by `convert_payload` to the targets.
+
+        :param converted_payloads: The converted payload of every target, `None` for a down-sampled payload
+        :param read_time_ms: The time the message was read from the stream (in epoch milliseconds)
+        :param targets: The names of the targets the payloads are sent to, `None` for every target
+        :param errors: Collects the error of every target which failed, `None` raises the first error
+        """
+        if converted_payloads is None:
+            self._downsampled_messages.inc()
+            return
+
+        trace = None
+        if TRACE_KEY in converted_payloads:
+            converted_payloads = dict(converted_payloads)
+            trace = converted_payloads.pop(TRACE_KEY)
+            self._start_trace(trace, read_time_ms)
+
+        write_functions = {
+            "sitewise": self.sitewise_client.add_entries,
+            "kinesis": self.kinesis_client.write_records,
+            "iot_topic": lambda message: self.iot_client.publish(*message),
+            "timestream": self.timestream_kinesis_client.write_records,
+            "historian": self.historian_client.write_to_stream
+        }
+        try:
+            with self._route_ms.time():
+                for target_name, converted_payload in converted_payloads.items():
+                    if targets is None or target_name in targets:
+                        self._send_to(errors, trace, target_name, write_functions[target_name], converted_payload)
+            self._end_trace(trace)
+            self._routed_messages.inc()
+        except Exception as err:
+            self._route_errors.inc()
+            self.logger.error("An error was raised: %s", err)
             raise
+
+    def _is_downsampled(self, payload: dict) -> bool:
+        """
+        Whether the payload of a low-priority tag is dropped by the down-sampling
+        """
+        alias = payload.get("alias") or payload.get("propertyAlias")
+
+        low_priority = self._low_priority_aliases.get(alias)
+        if low_priority is None:
+            low_priority = any(fnmatch.fnmatchcase(str(alias), pattern) for pattern in self.low_priority_tags)
+            self._low_priority_aliases[alias] = low_priority
+
+        if not low_priority:
+            return False
+
+        count = self._downsample_counts.get(alias, 0)
+        self._downsample_counts[alias] = count + 1
+        return count % self._downsample_every != 0
+
+    def _send(self, trace, target_name: str, send_function, *args):
+        """
+        Sends a payload to a target, and records the time it took and the errors it raised
+
+        :param trace: The trace of a traced payload, stamped when the target takes the payload, or `None`
+        """
+        with self._target_send_ms[target_name].time():
+            try:
+                send_function(*args)
+            except ConverterException:
+                self._target_conversion_errors[target_name].inc()
+                raise
+            except Exception:
+                self._target_errors[target_name].inc()
+                raise
+        stamp(trace, f"{ACK_PREFIX}{target_name}")
+
+    def _send_to(self, errors: dict, trace, target_name: str, send_function, *args):
+        """
+        Sends a payload to a target. When the errors are collected, the error of the target is added to them.
+        """
+        if errors is None:
+            self._send(trace, target_name, send_function, *args)
+            return
+
+        try:
+            self._send(trace, target_name, send_function, *args)
         except Exception as err:
-            self.logger.error(f"An error was raised: {err}")
+            self.logger.error("Failed to send the payload to the %s target: %s", target_name, err)
+            errors[target_name] = err
+
+    def _fail_targets(self, errors: dict, target_names: list, error: ConverterException):
+        """
+        Fails the targets with the conversion error of a payload none of them can take
+        """
+        for target_name in target_names:
+            self._target_conversion_errors[target_name].inc()
+            errors[target_name] = error
+
+    def _start_trace(self, trace, read_time_ms: float = None):
+        """
+        Stamps the time a traced payload was read from the stream
+        """
+        if trace is not None and read_time_ms is not None:
+            stamp(trace, READ, read_time_ms)
+
+    def _end_trace(self, trace):
+        """
+        Stamps the end of the routing of a traced payload, and records its trace
+        """
+        if trace is not None:
+            stamp(trace, ROUTE_END)
+            self._trace_recorder.record(trace)
+
+    def _convert(self, target_name: str, convert_function, *args):
+        try:
+            return convert_function(*args)
+        except ConverterException:
+            self._target_conversion_errors[target_name].inc()
             raise
+
+    def flush(self, force: bool = False, errors: dict = None):
+        """
+        Publishes the data buffered by the targets once it has lingered long enough, or right away when forced.
+        When one target publishes its buffer, the other targets publish theirs as well,
+        so all targets are empty at the same time and the trailing checkpoint can advance.
+
+        :param force: Whether the buffered data is published regardless of the linger time
+        :param errors: Collects the error of every target which failed to publish, `None` raises the first error
+        """
+        for name, target in self._buffering_targets(named=True):
+            if target.has_pending():
+                self._flush_target(errors, name, target, force)
+                force = force or not target.has_pending()
+
+        if force:
+            for name, target in self._buffering_targets(named=True):
+                self._flush_target(errors, name, target, force)
+
+    def _flush_target(self, errors: dict, target_name: str, target, force: bool):
+        if errors is None:
+            target.flush(force)
+            return
+
+        try:
+            target.flush(force)
+        except Exception as err:
+            errors[target_name] = err
+
+    def has_pending(self):
+        """
+        Whether any target still buffers data of the routed messages
+        """
+        return any(target.has_pending() for target in self._buffering_targets())
+
+    def target_has_pending(self, target_name: str):
+        """
+        Whether a target still buffers data of the routed messages
+        """
+        return any(target.has_pending() for name, target in self._buffering_targets(named=True) if name == target_name)
+
+    def confirm_publishes(self) -> None:
+        """
+        Keeps the publishes of the targets until they are confirmed, so `wait_for_publishes` can wait for them.
+        A publish which fails then fails the message, instead of being only logged.
+        """
+        self.iot_client.confirm_publishes = True
+
+    def wait_for_publishes(self, target_name: str) -> None:
+        """
+        Waits until the publishes of a target are confirmed, so the messages they hold can be checkpointed
+
+        :param target_name: The target name
+        :raises: The error of a publish which failed or was not confirmed in time
+        """
+        if target_name == "iot_topic" and self.destinations["send_to_iot_topic"]:
+            self.iot_client.wait_for_publishes()
+
+    def flush_wait_ms(self):
+        """
+        The time until the next flush publishes buffered data, so the publisher knows how long it can wait for messages
+        """
+        wait_times = [wait_ms for wait_ms in (target.flush_wait_ms() for target in self._buffering_targets())
+                      if wait_ms is not None]
+        return min(wait_times) if wait_times else None
+
+    def _buffering_targets(self, named: bool = False):
+        """
+        :param named: Whether the targets are returned with their names, as `(name, target)` pairs
+        """
+        targets = []
+        if self.destinations["send_to_sitewise"]:
+            targets.append(("sitewise", self.sitewise_client))
+        if self.destinations["send_to_iot_topic"]:
+            targets.append(("iot_topic", self.iot_client))
+        if self.destinations["send_to_timestream"] and self._timestream_buffering:
+            targets.append(("timestream", self.timestream_kinesis_client))
+        return targets if named else [target for _, target in targets]
@@ -0,0 +1,127 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import time
+
+from utils.metrics import get_registry
+
+"""
+    Tracks the position of the publisher in the connection stream.
+    The stream overwrites its oldest data when it is full, so a publisher which falls behind can lose messages.
+    The tracker compares the read position with the oldest and the newest sequence numbers of the stream to
+        - measure the lag,
+        - switch the publisher to the catch-up mode while the lag is large, and back once it has caught up,
+        - detect the messages which were overwritten before they were read, and move past them.
+"""
+
+# Forced checks, e.g. after an empty read, happen at most this often (in seconds)
+MIN_FORCED_CHECK_INTERVAL = 0.1
+
+
+class StreamPositionTracker:
+    def __init__(self, smh_client, stream_name: str, catch_up_lag_threshold: int, check_interval: float = 1,
+                 metrics_prefix: str = "publisher"):
+        """
+        :param smh_client: The Stream Manager helper client
+        :param stream_name: The connection stream name
+        :param catch_up_lag_threshold: The lag, in messages, from which the publisher catches up.
+            It leaves the catch-up mode once the lag drops below half of the threshold.
+        :param check_interval: The time between stream position checks (in seconds)
+        :param metrics_prefix: The prefix of the metric names
+        """
+        self.smh_client = smh_client
+        self.stream_name = stream_name
+        self.catch_up_lag_threshold = catch_up_lag_threshold
+        self.check_interval = check_interval
+
+        self.catch_up = False
+        self.oldest_sequence_number = None
+        self.newest_sequence_number = None
+        self._last_check = None
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        metrics = get_registry()
+        self._sequence_number_gauge = metrics.gauge(f"{metrics_prefix}.sequence_number")
+        self._latest_sequence_number_gauge = metrics.gauge(f"{metrics_prefix}.latest_sequence_number")
+        self._lag_gauge = metrics.gauge(f"{metrics_prefix}.lag")
+        self._catch_up_gauge = metrics.gauge(f"{metrics_prefix}.catch_up")
+        self._gaps = metrics.counter(f"{metrics_prefix}.gaps")
+        self._gap_messages = metrics.counter(f"{metrics_prefix}.gap_messages")
+
+    def check(self, sequence_number: int, force: bool = False) -> int:
+        """
+        Checks the position once the check interval has passed, or right away when forced.
+        When the messages from the sequence number on were overwritten, the position moves to the oldest message.
+
+        :param sequence_number: The sequence number of the next message to read
+        :param force: Whether the position is checked before the check interval has passed
+        :return: The sequence number of the next message to read
+        """
+        now = time.monotonic()
+        if self._last_check is not None:
+            elapsed = now - self._last_check
+            if elapsed < (MIN_FORCED_CHECK_INTERVAL if force else self.check_interval):
+                return sequence_number
+        self._last_check = now
+
+        oldest_sequence_number, newest_sequence_number = self.smh_client.get_stream_position(
+            self.stream_name)
+        self.oldest_sequence_number = oldest_sequence_number
+        self.newest_sequence_number = newest_sequence_number
+
+        if oldest_sequence_number is not None and sequence_number < oldest_sequence_number:
+            self.report_gap(sequence_number, oldest_sequence_number)
+            sequence_number = oldest_sequence_number
+
+        lag = 0 if newest_sequence_number is None else max(
+            0, newest_sequence_number - sequence_number + 1)
+        self._update_mode(lag)
+
+        self._sequence_number_gauge.set(sequence_number)
+        self._latest_sequence_number_gauge.set(newest_sequence_number)
+        self._lag_gauge.set(lag)
+
+        return sequence_number
+
+    def check_read(self, sequence_number: int, messages: list) -> None:
+        """
+        Reports the messages which were skipped when a read starts after the requested sequence number.
+
+        :param sequence_number: The requested sequence number
+        :param messages: The messages which were read
+        """
+        if messages and messages[0].sequence_number > sequence_number:
+            self.report_gap(sequence_number, messages[0].sequence_number)
+
+    def should_check(self, sequence_number: int) -> bool:
+        """
+        An empty read while the stream holds newer messages means the messages may have been overwritten.
+
+        :param sequence_number: The sequence number of the empty read
+        :return: Whether the position needs to be checked
+        """
+        return self.newest_sequence_number is not None and sequence_number <= self.newest_sequence_number
+
+    def report_gap(self, sequence_number: int, next_sequence_number: int) -> None:
+        missing_messages = next_sequence_number - sequence_number
+        self._gaps.inc()
+        self._gap_messages.inc(missing_messages)
+        self.logger.error(
+            f"{missing_messages} messages of stream {self.stream_name} were overwritten before they were published, "
+            f"sequence numbers {sequence_number} to {next_sequence_number - 1}. "
+            f"Continuing from sequence number {next_sequence_number}.")
+
+    def _update_mode(self, lag: int) -> None:
+        if not self.catch_up and lag >= self.catch_up_lag_threshold:
+            self.catch_up = True
+            self.logger.warning(
+                f"The publisher is {lag} messages behind stream {self.stream_name}, switching to the catch-up mode")
+        elif self.catch_up and lag < self.catch_up_lag_threshold // 2:
+            self.catch_up = False
+            self.logger.info(
+                f"The publisher caught up with stream {self.stream_name}, switching to the normal mode")
+
+        self._catch_up_gauge.set(int(self.catch_up))
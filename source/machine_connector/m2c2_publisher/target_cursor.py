@@ -0,0 +1,198 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import time
+
+from utils.metrics import get_registry
+
+"""
+    The position of one target in the connection stream, when every target reads the stream with its own cursor.
+    A target which fails goes back to the message after its last checkpoint, and is retried after a backoff,
+    while the other targets keep publishing. Once it works again, it catches up on its own.
+        - A target checkpoints the messages it took once it neither buffers nor waits for their data,
+          so the data it lost with a failed publish is sent again.
+        - The cursor checkpoint `cursor.{target}` is the last sequence number the target holds,
+          so a restarted publisher resumes every target where it stopped.
+        - The lag is the number of messages of the stream the target has not taken yet.
+        - A target which falls more than `max_lag` messages behind the newest cursor is flagged,
+          as the stream may overwrite its messages before it catches up.
+"""
+
+# The prefix of the cursor checkpoint names
+CHECKPOINT_PREFIX = "cursor."
+
+
+class TargetCursor:
+    def __init__(self, target_name: str, stream_name: str, checkpoint_client, retry_base_delay: float = 1,
+                 retry_max_delay: float = 60, max_lag: int = 10000, metrics_prefix: str = "publisher"):
+        """
+        :param target_name: The target name, see `payload_router.TARGET_NAMES`
+        :param stream_name: The connection stream name
+        :param checkpoint_client: The checkpoint manager of the connection
+        :param retry_base_delay: The time before a failed target is retried, doubled on every failure in a row
+            (in seconds)
+        :param retry_max_delay: The maximum time before a failed target is retried (in seconds)
+        :param max_lag: The messages the target may fall behind the newest cursor before it is flagged
+        :param metrics_prefix: The prefix of the metric names
+        """
+        self.target_name = target_name
+        self.stream_name = stream_name
+        self.checkpoint_client = checkpoint_client
+        self.checkpoint = f"{CHECKPOINT_PREFIX}{target_name}"
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_lag = max_lag
+
+        # The sequence number of the next message to send to the target
+        self.sequence_number = None
+        # The last checkpointed sequence number
+        self.committed_sequence_number = None
+        # Failures in a row
+        self.failures = 0
+        # The monotonic time from which a failed target is retried
+        self.retry_time = None
+        self.flagged = False
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        metrics = get_registry()
+        prefix = f"{metrics_prefix}.cursor.{target_name}"
+        self._sequence_number_gauge = metrics.gauge(f"{prefix}.sequence_number")
+        self._lag_gauge = metrics.gauge(f"{prefix}.lag")
+        self._flagged_gauge = metrics.gauge(f"{prefix}.flagged")
+        self._messages = metrics.counter(f"{prefix}.messages")
+        self._failures = metrics.counter(f"{prefix}.failures")
+        self._skipped_messages = metrics.counter(f"{prefix}.skipped")
+        self._gap_messages = metrics.counter(f"{prefix}.gap_messages")
+
+    def start(self, sequence_number: int) -> None:
+        """
+        Sets the position from the cursor checkpoint
+
+        :param sequence_number: The position of a target without a cursor checkpoint
+        """
+        checkpoint = self.checkpoint_client.retrieve_checkpoint(self.stream_name, self.checkpoint)
+        if checkpoint is not None:
+            sequence_number = checkpoint + 1
+        self.sequence_number = sequence_number
+        self.committed_sequence_number = sequence_number - 1
+        self._sequence_number_gauge.set(sequence_number)
+
+    def ready(self, now: float = None) -> bool:
+        """
+        :return: Whether the target takes messages, i.e. it did not fail or its backoff has passed
+        """
+        return self.retry_time is None or (time.monotonic() if now is None else now) >= self.retry_time
+
+    def wait_ms(self):
+        """
+        :return: The time until a failed target is retried (in milliseconds), 0 when it takes messages
+        """
+        if self.retry_time is None:
+            return 0
+        return max(0, (self.retry_time - time.monotonic()) * 1000)
+
+    def sent(self, sequence_number: int) -> None:
+        """
+        :param sequence_number: The sequence number of the message the target took
+        """
+        self.sequence_number = sequence_number + 1
+        self.failures = 0
+        self.retry_time = None
+        self._messages.inc()
+        self._sequence_number_gauge.set(self.sequence_number)
+
+    def skip(self, sequence_number: int, error: Exception) -> None:
+        """
+        Moves past a message the target can never take, e.g. a message it cannot convert
+
+        :param sequence_number: The sequence number of the message
+        :param error: The error of the target
+        """
+        self.logger.error(
+            f"The {self.target_name} target cannot take sequence number {sequence_number} of stream "
+            f"{self.stream_name}, skipping it: {error}")
+        self._skipped_messages.inc()
+        self.sequence_number = sequence_number + 1
+        self._sequence_number_gauge.set(self.sequence_number)
+
+    def failed(self, error: Exception) -> None:
+        """
+        Moves the target back to the message after its last checkpoint, and keeps it there until the backoff has passed.
+        The messages the target took since then may be lost with the failed publish, so they are sent again.
+
+        :param error: The error of the target
+        """
+        self.failures += 1
+        self._failures.inc()
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (self.failures - 1))
+        self.retry_time = time.monotonic() + delay
+        self.logger.warning(
+            f"The {self.target_name} target failed at sequence number {self.sequence_number} of stream "
+            f"{self.stream_name}, retrying it in {delay:.1f} seconds: {error}")
+
+        if self.sequence_number > self.committed_sequence_number + 1:
+            self.sequence_number = self.committed_sequence_number + 1
+            self._sequence_number_gauge.set(self.sequence_number)
+            self.logger.warning(
+                f"The {self.target_name} target sends stream {self.stream_name} again "
+                f"from sequence number {self.sequence_number}")
+
+    def has_uncommitted(self) -> bool:
+        """
+        :return: Whether the target took messages since its last checkpoint
+        """
+        return self.sequence_number - 1 != self.committed_sequence_number
+
+    def move_to(self, sequence_number: int) -> None:
+        """
+        Moves past the messages which were overwritten before the target took them
+
+        :param sequence_number: The oldest sequence number of the stream
+        """
+        missing_messages = sequence_number - self.sequence_number
+        self._gap_messages.inc(missing_messages)
+        self.logger.error(
+            f"{missing_messages} messages of stream {self.stream_name} were overwritten before the "
+            f"{self.target_name} target took them, sequence numbers {self.sequence_number} to {sequence_number - 1}. "
+            f"Continuing from sequence number {sequence_number}.")
+        self.sequence_number = sequence_number
+        self._sequence_number_gauge.set(sequence_number)
+
+    def commit(self, pending: bool) -> None:
+        """
+        Checkpoints the messages the target took, once it does not buffer any of them
+
+        :param pending: Whether the target still buffers data of the messages it took
+        """
+        if pending or not self.has_uncommitted():
+            return
+
+        sequence_number = self.sequence_number - 1
+
+        self.checkpoint_client.write_checkpoints(self.stream_name, self.checkpoint, sequence_number)
+        self.committed_sequence_number = sequence_number
+
+    def update_lag(self, newest_sequence_number: int, head_sequence_number: int) -> None:
+        """
+        Updates the lag, and flags the target when it is too far behind the newest cursor
+
+        :param newest_sequence_number: The newest sequence number of the stream, `None` while the stream is empty
+        :param head_sequence_number: The position of the newest cursor
+        """
+        lag = 0 if newest_sequence_number is None else max(0, newest_sequence_number - self.sequence_number + 1)
+        self._lag_gauge.set(lag)
+
+        behind = head_sequence_number - self.sequence_number
+        if not self.flagged and behind > self.max_lag:
+            self.flagged = True
+            self.logger.error(
+                f"The {self.target_name} target is {behind} messages behind the other targets of stream "
+                f"{self.stream_name}, its messages may be overwritten before it catches up")
+        elif self.flagged and behind <= self.max_lag // 2:
+            self.flagged = False
+            self.logger.info(f"The {self.target_name} target caught up with stream {self.stream_name}")
+
+        self._flagged_gauge.set(int(self.flagged))
@@ -12,48 +12,47 @@ from converters import common_converter, sitewise_converter, tag_converter
 from converters.historian.historian_converter import HistorianConverter
 from utils.stream_manager_helper import StreamManagerHelperClient
 from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
 
 
 class HistorianTarget:
     def __init__(self, connection_name: str, protocol: str, hierarchy: dict,
                  historian_sm_stream: str, max_stream_size: int, historian_data_stream: str,
-                 collector_id: str):
+                 collector_id: str, metadata_template: MetadataTemplate = None):
         self.connection_name = connection_name
         self.protocol = protocol
         self.hierarchy = hierarchy
         self.historian_sm_stream = historian_sm_stream
         self.max_stream_size = max_stream_size
         self.historian_data_stream = historian_data_stream
+        self.metadata_template = metadata_template or MetadataTemplate.from_hierarchy(hierarchy, connection_name)
         self.tag_client = tag_converter.TagConverter(self.protocol)
         self.converter_client = common_converter.CommonConverter(
-            self.hierarchy)
-        self.sm_client = StreamManagerHelperClient()
+            self.hierarchy, self.metadata_template)
+        # Stream Manager client, connected on first use
+        self._sm_client = None
         self.sitewise_converter = sitewise_converter.SiteWiseConverter()
         self.historian_converter = HistorianConverter(
-            source_id=connection_name, collector_id=collector_id)
+            source_id=connection_name, collector_id=collector_id, metadata_template=self.metadata_template)
 
         self.logger = get_logger(self.__class__.__name__)
 
-    def send_to_kinesis(self, payload):
-        try:
+    @property
+    def sm_client(self):
+        """
+        Connects to Stream Manager on first use, as only the stream writes need it
+        """
+        if self._sm_client is None:
+            self._sm_client = StreamManagerHelperClient()
+        return self._sm_client
 
-            if self.protocol == "opcua":
-                payload = self.sitewise_converter.convert_sitewise_format(
-                    payload
-                )
+    @sm_client.setter
+    def sm_client(self, sm_client) -> None:
+        self._sm_client = sm_client
 
-            tag = self.tag_client.retrieve_tag(
-                payload
-            )
-            updated_payload = self.converter_client.add_metadata(
-                payload,
-                tag
-            )
-
-            converted_historian_payload = self.historian_converter.convert_payload(
-                updated_payload)
-
-            self.write_to_stream(converted_historian_payload)
+    def send_to_kinesis(self, payload, converted: bool = False):
+        try:
+            self.write_to_stream(self.convert(payload, converted))
         except ConverterException as err:
             raise err
         except Exception as err:
@@ -61,6 +60,30 @@ class HistorianTarget:
                 "Connection failed during historian message writing. Error: %s", str(err))
             raise ConnectionError(err)
 
+    def convert(self, payload, converted: bool = False) -> list:
+        """
+        Converts a payload to the historian records, without writing them.
+
+        :param payload: The payload
+        :param converted: Whether an OPC UA payload is already in the solution format
+        :return: The historian records
+        """
+        # The payload router converts OPC UA payloads once for all targets.
+        if self.protocol == "opcua" and not converted:
+            payload = self.sitewise_converter.convert_sitewise_format(
+                payload
+            )
+
+        tag = self.tag_client.retrieve_tag(
+            payload
+        )
+        updated_payload = self.converter_client.add_metadata(
+            payload,
+            tag
+        )
+
+        return self.historian_converter.convert_payload(updated_payload)
+
     def write_to_stream(self, payload: list, batch_size=1):
         avail_streams = self.sm_client.list_streams()
 
@@ -84,7 +107,7 @@ class HistorianTarget:
 
         # Historian doesn't support writing lists yet
         for item in payload:
-            self.logger.debug(f"Writing to stream")
+            self.logger.debug("Writing to stream %s", self.historian_sm_stream)
             self.sm_client.write_to_stream(
                 self.historian_sm_stream, item
             )
@@ -1,53 +1,213 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import concurrent.futures
+import gzip
+import json
 import logging
+import threading
 
 from converters import common_converter, sitewise_converter, tag_converter, iot_topic_converter
+from targets.linger_buffer import LingerBuffer
 from utils.custom_exception import ConverterException
 from utils import AWSEndpointClient
+from utils.client import IOT_PUBLISH_TIMEOUT
+from utils.metadata_template import MetadataTemplate
+
+# Maximum MQTT payload size accepted by AWS IoT Core (in bytes)
+MAX_IOT_PAYLOAD_SIZE = 131072  # 128KB
+# Compressed batches start from this many uncompressed bytes, and are split when they still exceed the payload limit
+MAX_UNCOMPRESSED_BATCH_SIZE = 1048576  # 1MB
+BATCH_COMPRESSION_GZIP = "gzip"
+BATCH_PREFIX = b'{"payloads":['
+BATCH_SUFFIX = b']}'
 
 
 class IoTTopicTarget:
-    def __init__(self, connection_name: str, protocol: str, hierarchy: dict):
+    def __init__(self, connection_name: str, protocol: str, hierarchy: dict, batching: bool = False,
+                 batch_linger_ms: int = 100, batch_compression: str = None,
+                 metadata_template: MetadataTemplate = None, confirm_publishes: bool = False):
+        """
+        :param connection_name: The connection name
+        :param protocol: The connection protocol
+        :param hierarchy: The site name, area, process and machine name of the connection
+        :param batching: When it is `True`, payloads are packed into batches published to the connection batch topic.
+            Otherwise, every payload is published to its own tag topic.
+        :param batch_linger_ms: The maximum time a payload waits in a batch before the batch is published
+        :param batch_compression: `gzip` to publish gzip compressed batches, `None` to publish JSON batches
+        :param metadata_template: The metadata template of the connection, built from the hierarchy by default
+        :param confirm_publishes: Whether the publishes are confirmed before their messages are checkpointed,
+            see `wait_for_publishes`. Otherwise, a publish which fails is only logged.
+        """
         self.connection_name = connection_name
         self.protocol = protocol
         self.hierarchy = hierarchy
+        self.batching = batching
+        self.batch_linger_ms = batch_linger_ms
+        self.batch_compression = batch_compression
+        self.confirm_publishes = confirm_publishes
+        self.metadata_template = metadata_template or MetadataTemplate.from_hierarchy(hierarchy, connection_name)
         self.tag_client = tag_converter.TagConverter(self.protocol)
         self.converter_client = common_converter.CommonConverter(
-            self.hierarchy)
+            self.hierarchy, self.metadata_template)
         self.sitewise_converter = sitewise_converter.SiteWiseConverter()
         self.topic_client = iot_topic_converter.IoTTopicConverter(
-            self.connection_name, self.protocol)
+            self.connection_name, self.protocol, self.metadata_template)
         self.connector_client = AWSEndpointClient()
 
+        self.batch_topic = self.topic_client.batch_topic_converter(
+            batch_compression)
+        self.max_batch_size = MAX_UNCOMPRESSED_BATCH_SIZE if batch_compression == BATCH_COMPRESSION_GZIP \
+            else MAX_IOT_PAYLOAD_SIZE
+        # Serialized payloads of the pending batch, shared by the threads which publish payloads
+        self._batch = LingerBuffer(batch_linger_ms, self.max_batch_size,
+                                   base_size=len(BATCH_PREFIX) + len(BATCH_SUFFIX), separator_size=len(b","))
+        # Responses of the publishes in flight, and the first error of a publish not confirmed yet
+        self._publishes = set()
+        self._publish_error = None
+        self._publishes_lock = threading.Lock()
+
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
-    def send_to_iot(self, payload: dict):
+    def send_to_iot(self, payload: dict, converted: bool = False):
         try:
-            self.payload = payload
-
-            if self.protocol == "opcua":
-                self.payload = self.sitewise_converter.convert_sitewise_format(
-                    payload
-                )
-
-            self.tag = self.tag_client.retrieve_tag(
-                self.payload
-            )
-            self.payload = self.converter_client.add_metadata(
-                self.payload,
-                self.tag
-            )
-            self.topic = self.topic_client.topic_converter(self.payload)
-            self.connector_client.publish_message_to_iot_topic(
-                self.topic,
-                self.payload
-            )
+            self.publish(*self.convert(payload, converted))
         except ConverterException as err:
             raise err
         except Exception as err:
             self.logger.error(
-                f"Failed to publish telemetry data to the IoT topic. Error: {err}")
+                "Failed to publish telemetry data to the IoT topic. Error: %s", err)
             raise err
+
+    def convert(self, payload: dict, converted: bool = False) -> tuple:
+        """
+        Converts a payload to the IoT topic and the message, without publishing them.
+
+        :param payload: The payload
+        :param converted: Whether an OPC UA payload is already in the solution format
+        :return: The topic and the message
+        """
+        # The payload router converts OPC UA payloads once for all targets.
+        if self.protocol == "opcua" and not converted:
+            payload = self.sitewise_converter.convert_sitewise_format(
+                payload
+            )
+
+        tag = self.tag_client.retrieve_tag(
+            payload
+        )
+        payload = self.converter_client.add_metadata(
+            payload,
+            tag
+        )
+        topic = self.topic_client.topic_converter(payload)
+
+        return topic, payload
+
+    def publish(self, topic: str, payload: dict):
+        """
+        Publishes a converted message, or adds it to the pending batch when batching is on.
+        """
+        if self.batching:
+            self._add_to_batch(payload)
+        else:
+            self._publish_to_iot_topic(topic, payload)
+
+    def has_pending(self) -> bool:
+        return self._batch.has_pending()
+
+    def wait_for_publishes(self, timeout: float = IOT_PUBLISH_TIMEOUT) -> None:
+        """
+        Waits for the responses of the publishes in flight, so the messages they hold can be checkpointed.
+
+        :param timeout: The maximum time to wait (in seconds)
+        :raises: The error of a publish which failed since the last call,
+            or `TimeoutError` when a publish did not complete in time
+        """
+        with self._publishes_lock:
+            publishes = list(self._publishes)
+
+        done, not_done = concurrent.futures.wait(publishes, timeout)
+
+        with self._publishes_lock:
+            error = self._publish_error
+            self._publish_error = None
+
+        # The done callback may run after the wait returns
+        error = error or next((response.exception() for response in done if response.exception()), None)
+        if error is not None:
+            raise error
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} publishes to the IoT topic were not confirmed in {timeout} seconds")
+
+    def flush_wait_ms(self):
+        """
+        :return: The time until the pending batch has lingered for `batch_linger_ms`, `None` when nothing is pending
+        """
+        return self._batch.wait_ms()
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Publishes the pending batch when it has lingered for `batch_linger_ms`, or when `force` is `True`.
+
+        :param force: Whether the pending batch is published regardless of the linger time
+        """
+        serialized_payloads = self._batch.take(force)
+        if serialized_payloads:
+            self._publish_serialized_payloads(serialized_payloads)
+
+    def _add_to_batch(self, payload: dict) -> None:
+        serialized_payload = json.dumps(payload).encode("utf-8")
+
+        # The full batches are published outside of the buffer lock, so the other threads keep adding payloads
+        for serialized_payloads in self._batch.add(serialized_payload, len(serialized_payload)):
+            self._publish_serialized_payloads(serialized_payloads)
+
+    def _publish_serialized_payloads(self, serialized_payloads: list) -> None:
+        """
+        Publishes the serialized payloads as one batch.
+        A compressed batch which still exceeds the IoT payload limit is split in halves.
+        """
+        batch = BATCH_PREFIX + b",".join(serialized_payloads) + BATCH_SUFFIX
+
+        if self.batch_compression == BATCH_COMPRESSION_GZIP:
+            batch = gzip.compress(batch)
+
+            if len(batch) > MAX_IOT_PAYLOAD_SIZE and len(serialized_payloads) > 1:
+                middle = len(serialized_payloads) // 2
+                self._publish_serialized_payloads(serialized_payloads[:middle])
+                self._publish_serialized_payloads(serialized_payloads[middle:])
+                return
+
+        if len(batch) > MAX_IOT_PAYLOAD_SIZE:
+            self.logger.warning(
+                f"The batch of {len(serialized_payloads)} payloads is {len(batch)} bytes, "
+                f"which exceeds the IoT payload limit of {MAX_IOT_PAYLOAD_SIZE} bytes")
+
+        self._publish_to_iot_topic(self.batch_topic, batch)
+
+    def _publish_to_iot_topic(self, topic: str, payload) -> None:
+        """
+        Publishes a message. When the publishes are confirmed, its response is kept until the publish completes.
+
+        :raises: The error of a publish which was rejected, or could not be handed to the IPC connection,
+            when the publishes are confirmed
+        """
+        # The endpoint client logs the publishes which fail
+        response = self.connector_client.publish_message_to_iot_topic(topic, payload)
+        if not self.confirm_publishes:
+            return
+
+        if response.done() and response.exception() is not None:
+            raise response.exception()
+
+        with self._publishes_lock:
+            self._publishes.add(response)
+        response.add_done_callback(self._on_publish_complete)
+
+    def _on_publish_complete(self, response) -> None:
+        with self._publishes_lock:
+            self._publishes.discard(response)
+            if self._publish_error is None and response.exception() is not None:
+                self._publish_error = response.exception()
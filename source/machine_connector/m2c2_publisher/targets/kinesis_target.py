@@ -11,59 +11,176 @@ from greengrasssdk.stream_manager import (
 from converters import common_converter, sitewise_converter, tag_converter, timestream_converter
 from utils.stream_manager_helper import StreamManagerHelperClient
 from utils.custom_exception import ConverterException
+from converters.timestream_converter import TIMESTREAM_RECORD_FORMAT_MULTI, TIMESTREAM_RECORD_FORMAT_SINGLE
+from utils.metadata_template import MetadataTemplate
+from targets.linger_buffer import LingerBuffer
 
 
 class KinesisTarget:
-    def __init__(self, connection_name: str, protocol: str, hierarchy: dict, kinesis_sm_stream: str, max_stream_size: int, kinesis_data_stream: str, is_timestream_kinesis: bool = False):
+    def __init__(self, connection_name: str, protocol: str, hierarchy: dict, kinesis_sm_stream: str, max_stream_size: int, kinesis_data_stream: str, is_timestream_kinesis: bool = False,
+                 metadata_template: MetadataTemplate = None, record_format: str = TIMESTREAM_RECORD_FORMAT_SINGLE,
+                 linger_ms: int = 100, max_samples_per_record: int = 500):
+        """
+        :param connection_name: The connection name
+        :param protocol: The connection protocol
+        :param hierarchy: The site name, area, process and machine name of the connection
+        :param kinesis_sm_stream: The Stream Manager stream exported to the Kinesis data stream
+        :param max_stream_size: The maximum size of the Stream Manager stream (in bytes)
+        :param kinesis_data_stream: The Kinesis data stream
+        :param is_timestream_kinesis: Whether the records are written for the Timestream
+        :param metadata_template: The metadata template of the connection, built from the hierarchy by default
+        :param record_format: The Timestream record format. `single` writes a record per sample.
+            `multi` groups the samples which lingered for `linger_ms` into a record per machine.
+        :param linger_ms: The maximum time a Timestream sample waits to be grouped before it is written
+        :param max_samples_per_record: The maximum number of samples grouped into one record
+        """
         self.connection_name = connection_name
         self.protocol = protocol
         self.hierarchy = hierarchy
         self.kinesis_sm_stream = kinesis_sm_stream
         self.max_stream_size = max_stream_size
         self.kinesis_data_stream = kinesis_data_stream
+        self.metadata_template = metadata_template or MetadataTemplate.from_hierarchy(hierarchy, connection_name)
         self.tag_client = tag_converter.TagConverter(self.protocol)
         self.converter_client = common_converter.CommonConverter(
-            self.hierarchy)
-        self.sm_client = StreamManagerHelperClient()
+            self.hierarchy, self.metadata_template)
+        # Stream Manager client, connected on first use
+        self._sm_client = None
         self.sitewise_converter = sitewise_converter.SiteWiseConverter()
-        self.timestream_converter = timestream_converter.TimestreamConverter()
+        self.timestream_converter = timestream_converter.TimestreamConverter(self.metadata_template)
         self.is_timestream_kinesis = is_timestream_kinesis
+        self.multi_measure = is_timestream_kinesis and record_format == TIMESTREAM_RECORD_FORMAT_MULTI
+        self.linger_ms = linger_ms
+        self.max_samples_per_record = max(1, max_samples_per_record)
+
+        # Timestream records waiting to be grouped, shared by the threads which write records
+        self._pending_records = LingerBuffer(linger_ms, self.max_samples_per_record)
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
-    def send_to_kinesis(self, payload):
+    @property
+    def sm_client(self):
+        """
+        Connects to Stream Manager on first use, so converting a payload does not connect
+        """
+        if self._sm_client is None:
+            self._sm_client = StreamManagerHelperClient()
+        return self._sm_client
+
+    @sm_client.setter
+    def sm_client(self, sm_client) -> None:
+        self._sm_client = sm_client
+
+    def send_to_kinesis(self, payload, converted: bool = False):
         try:
-            self.payload = payload
+            self.write_records(self.convert(payload, converted))
+        except ConverterException as err:
+            raise err
+        except Exception as err:
+            self.logger.error("Connection failed. Error: %s", str(err))
+            raise ConnectionError(err)
 
-            if self.protocol == "opcua":
-                self.payload = self.sitewise_converter.convert_sitewise_format(
-                    payload
-                )
+    def convert(self, payload, converted: bool = False) -> list:
+        """
+        Converts a payload to the Kinesis records, without writing them.
 
-            self.tag = self.tag_client.retrieve_tag(
-                self.payload
+        :param payload: The payload
+        :param converted: Whether an OPC UA payload is already in the solution format
+        :return: The Kinesis records
+        """
+        # The payload router converts OPC UA payloads once for all targets.
+        if self.protocol == "opcua" and not converted:
+            payload = self.sitewise_converter.convert_sitewise_format(
+                payload
             )
-            self.updated_payload = self.converter_client.add_metadata(
-                self.payload,
-                self.tag
+
+        tag = self.tag_client.retrieve_tag(
+            payload
+        )
+        updated_payload = self.converter_client.add_metadata(
+            payload,
+            tag
+        )
+
+        if self.is_timestream_kinesis:
+            return self.timestream_converter.convert_timestream_format(
+                updated_payload
             )
+        return [updated_payload]
+
+    def write_records(self, records: list):
+        if self.multi_measure:
+            self._add_records(records)
+            return
+
+        batch_size = 10 if self.is_timestream_kinesis else 1
+        for record in records:
+            self.write_to_stream(record, batch_size)
+
+    def has_pending(self) -> bool:
+        return self._pending_records.has_pending()
+
+    def flush_wait_ms(self):
+        """
+        :return: The time until the pending records have lingered for `linger_ms`, `None` when nothing is pending
+        """
+        return self._pending_records.wait_ms()
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Writes the pending records when they have lingered for `linger_ms`, or when `force` is `True`.
 
-            if self.is_timestream_kinesis:
-                kinesis_records = self.timestream_converter.convert_timestream_format(
-                    self.updated_payload
-                )
+        :param force: Whether the pending records are written regardless of the linger time
+        """
+        records = self._pending_records.take(force)
+        if not records:
+            return
 
-                for record in kinesis_records:
-                    self.write_to_stream(record, 10)
-            else:
-                self.write_to_stream(self.updated_payload)
+        try:
+            self._write_groups([records])
         except ConverterException as err:
             raise err
         except Exception as err:
             self.logger.error("Connection failed. Error: %s", str(err))
             raise ConnectionError(err)
 
+    def _add_records(self, records: list) -> None:
+        """
+        Adds Timestream records to the pending records, and writes every full group.
+        """
+        # The groups are written outside of the buffer lock, so the other threads keep adding records
+        self._write_groups(self._pending_records.extend(records))
+
+    def _write_groups(self, groups: list) -> None:
+        """
+        Writes the groups of Timestream records in order, a grouped record per machine.
+        When a write fails, the records which were not written are put back, so the next flush writes them.
+        Records which cannot be grouped would fail again, so they are dropped.
+        """
+        for index, records in enumerate(groups):
+            later_records = [record for group in groups[index + 1:] for record in group]
+            try:
+                grouped_records = self.timestream_converter.convert_multi_measure_format(records)
+            except ConverterException:
+                self._pending_records.put_back(later_records)
+                raise
+
+            written_machines = set()
+            for grouped_record in grouped_records:
+                try:
+                    self.write_to_stream(grouped_record, 10)
+                except Exception:
+                    self._pending_records.put_back(
+                        [record for record in records if self._machine(record) not in written_machines]
+                        + later_records)
+                    raise
+                written_machines.add(self._machine(grouped_record))
+
+    @staticmethod
+    def _machine(record: dict) -> tuple:
+        return record["site"], record["area"], record["process"], record["machine"]
+
     def write_to_stream(self, payload: dict, batch_size=1):
         avail_streams = self.sm_client.list_streams()
 
@@ -0,0 +1,124 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+
+
+class LingerBuffer:
+    """
+    Buffer of the items a target writes together, shared by the threads which add items.
+    The pending items are taken once they reach `max_size`, or once the oldest one has lingered for `linger_ms`.
+    """
+
+    def __init__(self, linger_ms: int, max_size: int, base_size: int = 0, separator_size: int = 0):
+        """
+        :param linger_ms: The maximum time an item waits in the buffer
+        :param max_size: The size at which the pending items are taken
+        :param base_size: The size of the pending items when there are none, e.g. the envelope of a batch
+        :param separator_size: The size added between two items
+        """
+        self.linger_ms = linger_ms
+        self.max_size = max_size
+        self.base_size = base_size
+        self.separator_size = separator_size
+
+        self._items = []
+        self._size = base_size
+        self._start_time = None
+        self._lock = threading.Lock()
+
+    def has_pending(self) -> bool:
+        return len(self._items) > 0
+
+    def wait_ms(self):
+        """
+        :return: The time until the pending items have lingered for `linger_ms`, `None` when nothing is pending
+        """
+        with self._lock:
+            if not self._items:
+                return None
+
+            return max(0, self.linger_ms - (time.monotonic() - self._start_time) * 1000)
+
+    def add(self, item, size: int = 1) -> list:
+        """
+        Adds an item. When it does not fit, the pending items are taken before it is added.
+
+        :param item: The item
+        :param size: The size of the item
+        :return: The lists of pending items which were taken, oldest first
+        """
+        with self._lock:
+            return self._add(item, size)
+
+    def extend(self, items: list) -> list:
+        """
+        Adds items of size 1.
+
+        :param items: The items
+        :return: The lists of pending items which were taken, oldest first
+        """
+        taken = []
+        with self._lock:
+            for item in items:
+                taken.extend(self._add(item, 1))
+        return taken
+
+    def take(self, force: bool = False) -> list:
+        """
+        Takes the pending items when they have lingered for `linger_ms`, or when `force` is `True`.
+
+        :param force: Whether the pending items are taken regardless of the linger time
+        :return: The pending items, an empty list when there are none or they did not linger long enough
+        """
+        with self._lock:
+            if not self._items:
+                return []
+
+            lingered_ms = (time.monotonic() - self._start_time) * 1000
+            if not force and lingered_ms < self.linger_ms:
+                return []
+
+            return self._take()
+
+    def put_back(self, items: list, size: int = None) -> None:
+        """
+        Puts items which could not be written back in front of the pending items, so they are taken next.
+
+        :param items: The items, oldest first
+        :param size: The size of the items, their number by default
+        """
+        if not items:
+            return
+
+        with self._lock:
+            if not self._items:
+                self._start_time = time.monotonic()
+            self._items[:0] = items
+            self._size += len(items) if size is None else size
+
+    def _add(self, item, size: int) -> list:
+        taken = []
+        # Every item after the first one needs a separator
+        if self._items and self._size + self.separator_size + size > self.max_size:
+            taken.append(self._take())
+
+        if self._items:
+            size += self.separator_size
+        else:
+            self._start_time = time.monotonic()
+
+        self._items.append(item)
+        self._size += size
+
+        if self._size >= self.max_size:
+            taken.append(self._take())
+        return taken
+
+    def _take(self) -> list:
+        items = self._items
+        self._items = []
+        self._size = self.base_size
+        self._start_time = None
+        return items
@@ -4,27 +4,124 @@
 import logging
 
 from converters.sitewise_converter import SiteWiseConverter
+from targets.linger_buffer import LingerBuffer
 from utils.stream_manager_helper import StreamManagerHelperClient
 
+# IoT SiteWise BatchPutAssetPropertyValue limit
+MAX_VALUES_PER_ENTRY = 10
+
 
 class SiteWiseTarget:
-    def __init__(self, protocol: str, sitewise_stream: str):
+    def __init__(self, protocol: str, sitewise_stream: str, max_entries: int = 1,
+                 linger_ms: int = 100, expand_list_values: bool = True):
+        """
+        :param protocol: The connection protocol
+        :param sitewise_stream: The Stream Manager stream exported to IoT SiteWise
+        :param max_entries: The number of entries buffered before they are written, 1 writes every entry right away.
+            Every entry is written as its own `PutAssetPropertyValueEntry` message,
+            and the SiteWise exporter batches them into `BatchPutAssetPropertyValue` calls.
+        :param linger_ms: The maximum time an entry waits in the buffer before it is written
+        :param expand_list_values: Whether list values are sent as indexed aliases `{alias}/{index}`
+        """
         self.protocol = protocol
         self.sitewise_stream = sitewise_stream
-        self.sitewise_converter = SiteWiseConverter()
-        self.sm_helper_client = StreamManagerHelperClient()
+        self.max_entries = max(1, max_entries)
+        self.linger_ms = linger_ms
+        self.sitewise_converter = SiteWiseConverter(expand_list_values)
+        # Stream Manager client, connected on first use
+        self._sm_helper_client = None
+
+        # Entries waiting to be written, shared by the threads which add entries
+        self._pending_entries = LingerBuffer(linger_ms, self.max_entries)
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
+    @property
+    def sm_helper_client(self):
+        """
+        The Stream Manager client connects on first use, so a target which only converts,
+        e.g. in a publisher conversion worker, does not connect.
+        """
+        if self._sm_helper_client is None:
+            self._sm_helper_client = StreamManagerHelperClient()
+        return self._sm_helper_client
+
+    @sm_helper_client.setter
+    def sm_helper_client(self, sm_helper_client) -> None:
+        self._sm_helper_client = sm_helper_client
+
     def send_to_sitewise(self, payload: dict):
         try:
-            self.payload = payload
-            if self.protocol != "opcua":
-                self.payload = self.sitewise_converter.sw_required_format(
-                    self.payload)
-            self.sm_helper_client.write_to_stream(
-                self.sitewise_stream, self.payload)
+            self.add_entries(self.convert(payload))
         except Exception as err:
-            self.logger.error(f"Error raised when writing to SiteWise: {err}")
+            self.logger.error("Error raised when writing to SiteWise: %s", err)
             raise err
+
+    def convert(self, payload: dict) -> list:
+        """
+        Converts a payload to SiteWise entries, without writing them.
+        SiteWise accepts up to 10 values per entry, so large tag batches are split into several entries.
+        An OPC UA payload is already an entry.
+
+        :param payload: The payload
+        :return: The SiteWise entries
+        """
+        entries = [payload] if self.protocol == "opcua" else self.sitewise_converter.sw_required_entries(payload)
+
+        split_entries = []
+        for entry in entries:
+            property_values = entry["propertyValues"]
+            for i in range(0, len(property_values), MAX_VALUES_PER_ENTRY):
+                split_entries.append({
+                    "propertyAlias": entry["propertyAlias"],
+                    "propertyValues": property_values[i:i + MAX_VALUES_PER_ENTRY]
+                })
+        return split_entries
+
+    def add_entries(self, entries: list):
+        """
+        Adds converted entries to the pending entries, and writes them once `max_entries` are pending.
+        """
+        # The entries are written outside of the buffer lock, so the other threads keep adding entries
+        full_entries = [entry for taken in self._pending_entries.extend(entries) for entry in taken]
+        self._write_entries(full_entries)
+
+    def has_pending(self) -> bool:
+        return self._pending_entries.has_pending()
+
+    def flush_wait_ms(self):
+        """
+        :return: The time until the pending entries have lingered for `linger_ms`, `None` when nothing is pending
+        """
+        return self._pending_entries.wait_ms()
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Writes the pending entries when they have lingered for `linger_ms`, or when `force` is `True`.
+
+        :param force: Whether the pending entries are written regardless of the linger time
+        """
+        entries = self._pending_entries.take(force)
+        if not entries:
+            return
+
+        try:
+            self._write_entries(entries)
+        except Exception as err:
+            self.logger.error(
+                "Error raised when writing to SiteWise: %s", err)
+            raise err
+
+    def _write_entries(self, entries: list) -> None:
+        """
+        Writes the entries in order. When a write fails, the entries which were not written are put back,
+        so the next flush writes them.
+        """
+        for index, entry in enumerate(entries):
+            try:
+                self.sm_helper_client.write_to_stream(
+                    self.sitewise_stream, entry)
+            except Exception:
+                self._pending_entries.put_back(entries[index:])
+                raise
@@ -0,0 +1,206 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from concurrent.futures import Future
+from unittest import mock, TestCase
+from connection_publisher import ConnectionPublisher
+from utils.custom_exception import ConverterException, PublisherException
+
+
+class MockMessage:
+    def __init__(self, sequence_number):
+        self.sequence_number = sequence_number
+        self.payload = b'{"alias": "test_alias", "messages": []}'
+
+
+class TestConnectionPublisher(TestCase):
+    def setUp(self):
+        self.router_client = mock.MagicMock()
+        self.router_client.route_payload.side_effect = lambda message, read_time_ms=None: message.sequence_number
+        self.router_client.has_pending.return_value = False
+        self.router_client.flush_wait_ms.return_value = None
+        self.smh_client = mock.MagicMock()
+        self.smh_client.list_streams.return_value = ["test_stream"]
+        self.smh_client.get_stream_position.return_value = (0, 20)
+        self.checkpoint_client = mock.MagicMock()
+        self.checkpoint_client.retrieve_checkpoints.return_value = (9, 10)
+        self.publisher = ConnectionPublisher(
+            "test_connection", "test_stream", self.router_client, self.smh_client, self.checkpoint_client,
+            max_stream_size=50, read_max_messages=100, read_timeout_ms=1000)
+
+    def test_start_from_trailing_checkpoint(self):
+        self.publisher.start()
+        self.assertEqual(self.publisher.sequence_number, 10)
+        self.assertFalse(self.smh_client.create_stream.called)
+
+    def test_poll(self):
+        self.publisher.start()
+        self.smh_client.read_from_stream.return_value = [MockMessage(10), MockMessage(11)]
+
+        self.assertEqual(self.publisher.poll(max_messages=50), 2)
+        self.assertEqual(self.publisher.sequence_number, 12)
+        self.smh_client.read_from_stream.assert_called_with(
+            "test_stream", 10, 1, max_message_count=50, read_timeout_millis=1000)
+        self.checkpoint_client.write_checkpoints.assert_any_call("test_stream", "primary", 12)
+        self.checkpoint_client.write_checkpoints.assert_called_with("test_stream", "trailing", 11)
+
+    def test_poll_read_error(self):
+        self.publisher.start()
+        self.smh_client.read_from_stream.side_effect = Exception("read error")
+
+        with mock.patch("connection_publisher.time.sleep"):
+            self.assertEqual(self.publisher.poll(), 0)
+            self.publisher.max_consecutive_read_errors = 2
+            with self.assertRaises(Exception):
+                self.publisher.poll()
+
+    def test_route_error(self):
+        self.publisher.start()
+        self.smh_client.read_from_stream.return_value = [MockMessage(10)]
+        self.router_client.route_payload.side_effect = ValueError("bad payload")
+
+        with self.assertRaises(PublisherException):
+            self.publisher.poll()
+
+    def test_poll_with_conversion_pool(self):
+        conversion_pool = mock.MagicMock()
+        first_batch, second_batch = Future(), Future()
+        conversion_pool.submit.side_effect = [first_batch, second_batch]
+        self.publisher.conversion_pool = conversion_pool
+        self.publisher.max_pending_batches = 4
+        self.publisher.start()
+
+        self.smh_client.read_from_stream.return_value = [MockMessage(10), MockMessage(11)]
+        self.publisher.poll()
+        self.smh_client.read_from_stream.return_value = [MockMessage(12)]
+        self.publisher.poll()
+        self.assertEqual(self.publisher.sequence_number, 13)
+        # The second read does not wait, because a batch is pending
+        self.assertEqual(self.smh_client.read_from_stream.call_args.kwargs["read_timeout_millis"], 0)
+
+        # The second batch is converted first, but it is committed after the first one
+        second_batch.set_result([(True, {"kinesis": ["converted-12"]})])
+        self.publisher.commit_batches()
+        self.assertFalse(self.router_client.write_converted.called)
+
+        first_batch.set_result([(True, {"kinesis": ["converted-10"]}), (True, None)])
+        self.publisher.commit_batches()
+        self.assertEqual(
+            [call.args[0] for call in self.router_client.write_converted.call_args_list],
+            [{"kinesis": ["converted-10"]}, None, {"kinesis": ["converted-12"]}])
+        self.checkpoint_client.write_checkpoints.assert_called_with("test_stream", "primary", 13)
+        self.assertEqual(self.publisher.unflushed_sequence_number, 12)
+
+    def test_conversion_error(self):
+        conversion_pool = mock.MagicMock()
+        batch = Future()
+        batch.set_result([(False, "ConverterException: bad payload")])
+        conversion_pool.submit.return_value = batch
+        self.publisher.conversion_pool = conversion_pool
+        self.publisher.start()
+        self.smh_client.read_from_stream.return_value = [MockMessage(10)]
+
+        with self.assertRaises(PublisherException):
+            self.publisher.poll()
+
+    def create_cursor_publisher(self, failing_targets: dict) -> ConnectionPublisher:
+        """
+        :param failing_targets: The error of every target which fails
+        """
+        self.router_client.enabled_targets.return_value = ["kinesis", "iot_topic"]
+        self.router_client.target_has_pending.return_value = False
+        self.router_client.route_to_targets.side_effect = lambda message, targets, read_time_ms=None: {
+            target: failing_targets[target] for target in targets if target in failing_targets}
+        self.checkpoint_client.retrieve_checkpoint.return_value = None
+        return ConnectionPublisher(
+            "test_connection", "test_stream", self.router_client, self.smh_client, self.checkpoint_client,
+            max_stream_size=50, read_max_messages=100, read_timeout_ms=1000, target_cursors=True)
+
+    def test_start_cursors(self):
+        publisher = self.create_cursor_publisher({})
+        self.checkpoint_client.retrieve_checkpoint.side_effect = lambda stream_name, checkpoint: {
+            "cursor.kinesis": 14}.get(checkpoint)
+        publisher.start()
+
+        cursors = {cursor.target_name: cursor for cursor in publisher.cursors}
+        self.router_client.confirm_publishes.assert_called_once_with()
+        self.assertEqual(cursors["kinesis"].sequence_number, 15)
+        self.assertEqual(cursors["iot_topic"].sequence_number, 10)
+        # The targets behind the newest cursor catch up on their own
+        self.assertEqual(publisher.sequence_number, 15)
+        self.checkpoint_client.write_checkpoints.assert_called_with("test_stream", "primary", 15)
+
+    def test_poll_cursors_with_failing_target(self):
+        failing_targets = {"kinesis": Exception("throttled")}
+        publisher = self.create_cursor_publisher(failing_targets)
+        publisher.start()
+        cursors = {cursor.target_name: cursor for cursor in publisher.cursors}
+
+        # The IoT topic target reads on while the Kinesis target fails
+        self.smh_client.read_from_stream.return_value = [MockMessage(10), MockMessage(11)]
+        self.assertEqual(publisher.poll(), 2)
+        self.assertEqual(publisher.sequence_number, 12)
+        self.assertEqual(cursors["iot_topic"].sequence_number, 12)
+        self.assertEqual(cursors["kinesis"].sequence_number, 10)
+        self.assertFalse(cursors["kinesis"].ready())
+        self.router_client.route_to_targets.assert_called_with(mock.ANY, ["iot_topic"], mock.ANY)
+        self.checkpoint_client.write_checkpoints.assert_any_call("test_stream", "cursor.iot_topic", 11)
+        self.assertNotIn(mock.call("test_stream", "trailing", mock.ANY),
+                         self.checkpoint_client.write_checkpoints.call_args_list)
+
+        # Once its backoff has passed, the Kinesis target catches up on its own
+        failing_targets.clear()
+        cursors["kinesis"].retry_time = 0
+        self.smh_client.read_from_stream.side_effect = [[], [MockMessage(10), MockMessage(11)]]
+        self.assertEqual(publisher.poll(), 2)
+        self.assertEqual(cursors["kinesis"].sequence_number, 12)
+        self.smh_client.read_from_stream.assert_called_with("test_stream", 10, 1, max_message_count=2)
+        self.checkpoint_client.write_checkpoints.assert_any_call("test_stream", "cursor.kinesis", 11)
+        self.checkpoint_client.write_checkpoints.assert_called_with("test_stream", "trailing", 11)
+
+    def test_poll_cursors_with_failed_publish(self):
+        publisher = self.create_cursor_publisher({})
+        publisher.start()
+        cursors = {cursor.target_name: cursor for cursor in publisher.cursors}
+
+        def wait_for_publishes(target_name):
+            if target_name == "iot_topic":
+                raise TimeoutError("not confirmed")
+
+        self.router_client.wait_for_publishes.side_effect = wait_for_publishes
+
+        # The IoT topic publishes are not confirmed, so the target is not checkpointed and sends them again
+        self.smh_client.read_from_stream.return_value = [MockMessage(10), MockMessage(11)]
+        self.assertEqual(publisher.poll(), 2)
+        self.router_client.wait_for_publishes.assert_any_call("iot_topic")
+        self.checkpoint_client.write_checkpoints.assert_any_call("test_stream", "cursor.kinesis", 11)
+        self.assertNotIn(mock.call("test_stream", "cursor.iot_topic", mock.ANY),
+                         self.checkpoint_client.write_checkpoints.call_args_list)
+        self.assertEqual(cursors["iot_topic"].sequence_number, 10)
+        self.assertFalse(cursors["iot_topic"].ready())
+
+    def test_poll_cursors_without_ready_target(self):
+        publisher = self.create_cursor_publisher({"kinesis": Exception("throttled"), "iot_topic": Exception("down")})
+        publisher.start()
+        self.smh_client.read_from_stream.return_value = [MockMessage(10), MockMessage(11)]
+
+        # Every target failed on the first message, so the read position does not move
+        self.assertEqual(publisher.poll(), 0)
+        self.assertEqual(publisher.sequence_number, 10)
+        self.assertEqual([cursor.sequence_number for cursor in publisher.cursors], [10, 10])
+
+        # The publisher waits for the retry instead of reading
+        self.smh_client.read_from_stream.reset_mock()
+        with mock.patch("connection_publisher.time.sleep") as mock_sleep:
+            self.assertEqual(publisher.poll(), 0)
+        self.smh_client.read_from_stream.assert_not_called()
+        self.assertLessEqual(mock_sleep.call_args[0][0], 1)
+
+    def test_poll_cursors_skips_unconvertible_message(self):
+        publisher = self.create_cursor_publisher({"kinesis": ConverterException("bad payload")})
+        publisher.start()
+        self.smh_client.read_from_stream.return_value = [MockMessage(10)]
+
+        self.assertEqual(publisher.poll(), 1)
+        self.assertEqual([cursor.sequence_number for cursor in publisher.cursors], [11, 11])
+        self.assertTrue(all(cursor.ready() for cursor in publisher.cursors))
@@ -0,0 +1,58 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest import mock, TestCase
+
+import conversion_pool
+
+
+class TestConversionPool(TestCase):
+    def test_convert_batch(self):
+        router = mock.MagicMock()
+        router.convert_payload.side_effect = [{"kinesis": ["converted"]}, ValueError("bad payload")]
+
+        with mock.patch.object(conversion_pool, "_router", router):
+            results = conversion_pool._convert_batch([b"first", b"second"], 3)
+
+        router.set_downsampling.assert_called_once_with(3)
+        self.assertEqual(results, [(True, {"kinesis": ["converted"]}), (False, "ValueError: bad payload")])
+
+    def test_worker_does_not_connect_to_stream_manager(self):
+        router_parameters = {
+            "protocol": "opcda",
+            "connection_name": "test_connection",
+            "hierarchy": {"site_name": "site", "area": "area", "process": "process", "machine_name": "machine"},
+            "destinations": {
+                "send_to_sitewise": True,
+                "send_to_kinesis_stream": True,
+                "send_to_iot_topic": True,
+                "send_to_timestream": True,
+                "send_to_historian": True
+            },
+            "destination_streams": {
+                "sitewise_stream": "SiteWise_Stream",
+                "kinesis_sm_stream": "test_kinesis_stream",
+                "timestream_kinesis_stream": "test_timestream_stream"
+            },
+            "max_stream_size": 50,
+            "kinesis_data_stream": "test_kinesis_data_stream",
+            "timestream_kinesis_data_stream": "test_timestream_kinesis_data_stream",
+            "historian_data_stream": "test_historian_data_stream",
+            "collector_id": "test_collector_id"
+        }
+        payload = b'{"alias": "site/area/process/machine/tag", "messages": ' \
+                  b'[{"name": "site/area/process/machine/tag", "timestamp": "2022-01-25 00:00:00+00:00", ' \
+                  b'"value": 1, "quality": "Good"}]}'
+
+        with mock.patch("utils.stream_manager_helper.StreamManagerHelperClient") as mock_sm_client_class, \
+                mock.patch("targets.sitewise_target.StreamManagerHelperClient", mock_sm_client_class), \
+                mock.patch("targets.kinesis_target.StreamManagerHelperClient", mock_sm_client_class), \
+                mock.patch("targets.historian_target.StreamManagerHelperClient", mock_sm_client_class), \
+                mock.patch("utils.client.get_ipc_client") as mock_get_ipc_client, \
+                mock.patch.object(conversion_pool, "_router", None):
+            conversion_pool._init_worker(router_parameters)
+            results = conversion_pool._convert_batch([payload], 1)
+
+        self.assertTrue(results[0][0], results)
+        mock_sm_client_class.assert_not_called()
+        mock_get_ipc_client.assert_not_called()
@@ -4,6 +4,7 @@
 import unittest
 
 from converters.historian.historian_converter import HistorianConverter
+from utils.metadata_template import MetadataTemplate
 
 
 class TestHistorianConverter(unittest.TestCase):
@@ -36,3 +37,29 @@ class TestHistorianConverter(unittest.TestCase):
         self.assertEqual(converted_payload[0]['value'], 100)
         self.assertEqual(converted_payload[0]['measureQuality'], "GOOD")
         self.assertEqual(converted_payload[0]['measureName'], "test-tag")
+
+    def test_convert_payload_metadata_template(self):
+        # Arrange
+        template = MetadataTemplate("site", "area", "process", "machine", "test-source-id")
+        historian_converter = HistorianConverter(
+            "test-source-id", "test-collector-id", template)
+        payload = {
+            "tag": "test-tag",
+            "messages": [
+                {"quality": "GOOD", "value": 100},
+                {"quality": "BAD", "value": 101}
+            ]
+        }
+
+        # Act
+        converted_payload = historian_converter.convert_payload(payload)
+
+        # Assert, the records have the fields of the historian messages
+        expected_payload = HistorianConverter(
+            "test-source-id", "test-collector-id").convert_payload(payload)
+        for record, expected_record in zip(converted_payload, expected_payload):
+            record.pop("timestamp")
+            expected_record.pop("timestamp")
+        self.assertEqual(converted_payload, expected_payload)
+        self.assertEqual(list(converted_payload[1].keys()), list(expected_payload[1].keys()))
+        self.assertEqual(converted_payload[1]["measureQuality"], "BAD")
@@ -4,6 +4,7 @@
 import unittest
 
 from converters.iot_topic_converter import IoTTopicConverter
+from utils.metadata_template import MetadataTemplate
 
 
 class TestTopicConverter(unittest.TestCase):
@@ -29,6 +30,20 @@ class TestTopicConverter(unittest.TestCase):
         self.assertEqual(
             self.topic, f"m2c2/data/{self.connection_name}/{self.machine_name}/{self.tag}")
 
+    def test_topic_converter_metadata_template(self):
+        template = MetadataTemplate(self.site_name, self.area, self.process, self.machine_name, self.connection_name)
+        client = IoTTopicConverter(self.connection_name, self.protocol, template)
+
+        self.assertEqual(client.topic_converter(self.payload),
+                         f"m2c2/data/{self.connection_name}/{self.machine_name}/{self.tag}")
+        self.assertEqual(template.topic.cache_info().currsize, 1)
+
+    def test_batch_topic_converter(self):
+        self.assertEqual(self.client.batch_topic_converter(),
+                         f"m2c2/data/{self.connection_name}/batch")
+        self.assertEqual(self.client.batch_topic_converter("gzip"),
+                         f"m2c2/data/{self.connection_name}/batch/gzip")
+
     def test_incomplete_payload(self):
         self.payload = {
             "site_name": self.site_name,
@@ -2,12 +2,16 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import copy
+import gzip
+import json
 import sys
 import unittest
 
+from concurrent.futures import Future
 from unittest import mock
 from utils.custom_exception import ConverterException
 from targets import IoTTopicTarget
+from targets.iot_topic_target import MAX_IOT_PAYLOAD_SIZE
 
 awsiot_mock = mock.MagicMock()
 sys.modules["awsiot"] = awsiot_mock
@@ -32,6 +36,19 @@ class TestIoTTopicTarget(unittest.TestCase):
         }
         self.timestamp = "2021-06-03 15:14:21.247000+00:00"
 
+    def mock_connector_client(self, responses: list = None):
+        """
+        :param responses: The publish responses, in order. By default, every publish is confirmed right away.
+        """
+        connector_client = mock.MagicMock()
+        if responses is None:
+            response = Future()
+            response.set_result(None)
+            connector_client.publish_message_to_iot_topic.return_value = response
+        else:
+            connector_client.publish_message_to_iot_topic.side_effect = responses
+        return connector_client
+
     def test_opc_da(self, mock_endpoint_client):
         tag = "Random.Int4"
         alias = f"{self.site_name}/{self.area}/{self.process}/{self.machine_name}/{tag}"
@@ -56,16 +73,52 @@ class TestIoTTopicTarget(unittest.TestCase):
 
         iot_target = IoTTopicTarget(
             self.connection_name, "opcda", self.hierarchy)
-        mock_connector_client = mock_endpoint_client.MagicMock()
-        iot_target.connector_client = mock_connector_client
-        iot_target.connector_client.publish_message_to_iot_topic = mock_endpoint_client.MagicMock()
+        iot_target.connector_client = self.mock_connector_client()
 
         iot_target.send_to_iot(opcda_payload)
-        self.assertDictEqual(expected_payload, iot_target.payload)
-        assert iot_target.connector_client.publish_message_to_iot_topic.called
-        assert iot_target.connector_client.publish_message_to_iot_topic.called_with(
+        iot_target.connector_client.publish_message_to_iot_topic.assert_called_once_with(
             iot_topic, expected_payload)
 
+    def test_wait_for_publishes(self, mock_endpoint_client):
+        iot_target = IoTTopicTarget(self.connection_name, "opcda", self.hierarchy, confirm_publishes=True)
+        responses = [Future(), Future(), Future()]
+        iot_target.connector_client = self.mock_connector_client(responses)
+
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Int4"))
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Real8"))
+        with self.assertRaises(TimeoutError):
+            iot_target.wait_for_publishes(timeout=0)
+
+        responses[0].set_result(None)
+        responses[1].set_exception(Exception("Throttled"))
+        with self.assertRaisesRegex(Exception, "Throttled"):
+            iot_target.wait_for_publishes(timeout=0)
+
+        # The error is raised once
+        iot_target.wait_for_publishes(timeout=0)
+
+        # A rejected publish raises right away
+        responses[2].set_exception(TimeoutError("too many publishes in flight"))
+        with self.assertRaises(TimeoutError):
+            iot_target.send_to_iot(self.build_opcda_payload("Random.Int4"))
+
+    def test_failed_publish_without_confirmation(self, mock_endpoint_client):
+        iot_target = IoTTopicTarget(
+            self.connection_name, "opcda", self.hierarchy, batching=True, batch_linger_ms=60000)
+        rejected = Future()
+        rejected.set_exception(TimeoutError("too many publishes in flight"))
+        iot_target.connector_client = self.mock_connector_client([rejected, rejected])
+
+        # A publish which fails is logged by the endpoint client, and the target carries on
+        iot_target.batching = False
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Int4"))
+        iot_target.batching = True
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Real8"))
+        iot_target.flush(force=True)
+
+        self.assertEqual(iot_target.connector_client.publish_message_to_iot_topic.call_count, 2)
+        iot_target.wait_for_publishes(timeout=0)
+
     def test_opc_da_missing_alias(self, mock_endpoint_client):
         tag = "Random.Int4"
         alias = f"{self.site_name}/{self.area}/{self.process}/{self.machine_name}/{tag}"
@@ -104,3 +157,70 @@ class TestIoTTopicTarget(unittest.TestCase):
 
         with self.assertRaises(ConverterException):
             iot_target.send_to_iot(opcua_payload)
+
+    def build_opcda_payload(self, tag: str, value=27652.13) -> dict:
+        alias = f"{self.site_name}/{self.area}/{self.process}/{self.machine_name}/{tag}"
+        return {
+            "alias": alias,
+            "messages": [
+                {
+                    "name": alias,
+                    "value": value,
+                    "quality": "Good",
+                    "timestamp": self.timestamp
+                }
+            ]
+        }
+
+    def test_batching_linger(self, mock_endpoint_client):
+        iot_target = IoTTopicTarget(
+            self.connection_name, "opcda", self.hierarchy, batching=True, batch_linger_ms=60000)
+        iot_target.connector_client = self.mock_connector_client()
+        self.assertIsNone(iot_target.flush_wait_ms())
+
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Int4"))
+        iot_target.send_to_iot(self.build_opcda_payload("Random.Real8"))
+        iot_target.flush()
+        self.assertFalse(
+            iot_target.connector_client.publish_message_to_iot_topic.called)
+        self.assertTrue(iot_target.has_pending())
+        self.assertTrue(0 < iot_target.flush_wait_ms() <= 60000)
+
+        iot_target.flush(force=True)
+        topic, batch = iot_target.connector_client.publish_message_to_iot_topic.call_args.args
+        self.assertEqual(topic, f"m2c2/data/{self.connection_name}/batch")
+        self.assertEqual([payload["tag"] for payload in json.loads(batch)["payloads"]],
+                         ["Random.Int4", "Random.Real8"])
+        self.assertFalse(iot_target.has_pending())
+
+    def test_batching_size_limit(self, mock_endpoint_client):
+        iot_target = IoTTopicTarget(
+            self.connection_name, "opcda", self.hierarchy, batching=True, batch_linger_ms=60000)
+        iot_target.connector_client = self.mock_connector_client()
+
+        for i in range(1000):
+            iot_target.send_to_iot(self.build_opcda_payload(f"Tag{i}", i))
+        iot_target.flush(force=True)
+
+        batches = [call.args[1] for call in
+                   iot_target.connector_client.publish_message_to_iot_topic.call_args_list]
+        self.assertGreater(len(batches), 1)
+        self.assertTrue(all(len(batch) <= MAX_IOT_PAYLOAD_SIZE for batch in batches))
+        values = [payload["messages"][0]["value"]
+                  for batch in batches for payload in json.loads(batch)["payloads"]]
+        self.assertEqual(values, list(range(1000)))
+
+    def test_batching_gzip(self, mock_endpoint_client):
+        iot_target = IoTTopicTarget(
+            self.connection_name, "opcda", self.hierarchy, batching=True, batch_compression="gzip")
+        iot_target.connector_client = self.mock_connector_client()
+
+        for i in range(1000):
+            iot_target.send_to_iot(self.build_opcda_payload(f"Tag{i}", i))
+        iot_target.flush(force=True)
+
+        calls = iot_target.connector_client.publish_message_to_iot_topic.call_args_list
+        self.assertEqual(len(calls), 1)
+        topic, batch = calls[0].args
+        self.assertEqual(topic, f"m2c2/data/{self.connection_name}/batch/gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(batch))["payloads"]), 1000)
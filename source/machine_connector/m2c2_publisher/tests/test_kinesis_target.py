@@ -70,10 +70,11 @@ class TestKinesisTarget(unittest.TestCase):
         kinesis_target.sm_client = mock_sm_client
         kinesis_target.sm_client.list_streams = mock_stream_manager_helper.MagicMock(
             return_value=avail_streams_exists)
-        kinesis_target.sm_client.write_to_stream = mock_stream_manager_helper.MagicMock()
+        kinesis_target.sm_client.write_to_stream = mock.MagicMock()
 
         kinesis_target.send_to_kinesis(opcda_payload)
-        self.assertDictEqual(expected_payload, kinesis_target.payload)
+        kinesis_target.sm_client.write_to_stream.assert_called_once_with(
+            self.greengrass_stream, expected_payload)
 
     @mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
     def test_opcua(self, mock_stream_manager_helper):
@@ -120,10 +121,11 @@ class TestKinesisTarget(unittest.TestCase):
         kinesis_target.sm_client = mock_sm_client
         kinesis_target.sm_client.list_streams = mock_stream_manager_helper.MagicMock(
             return_value=avail_streams_exists)
-        kinesis_target.sm_client.write_to_stream = mock_stream_manager_helper.MagicMock()
+        kinesis_target.sm_client.write_to_stream = mock.MagicMock()
 
         kinesis_target.send_to_kinesis(opcua_payload)
-        self.assertDictEqual(expected_payload, kinesis_target.payload)
+        kinesis_target.sm_client.write_to_stream.assert_called_once_with(
+            self.greengrass_stream, expected_payload)
 
     @mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
     def test_timestream(self, mock_stream_manager_helper):
@@ -234,3 +236,126 @@ class TestKinesisTarget(unittest.TestCase):
         with self.assertRaises(ConnectionError):
             kinesis_target.send_to_kinesis(opcua_payload)
             assert kinesis_target.sm_client.list_streams.called
+
+    @mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
+    def test_timestream_multi_measure(self, mock_stream_manager_helper):
+        # Arrange
+        kinesis_target = KinesisTarget(
+            self.connection_name,
+            "opcda",
+            self.hierarchy,
+            self.greengrass_stream,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            is_timestream_kinesis=True,
+            record_format="multi",
+            linger_ms=60000,
+            max_samples_per_record=4
+        )
+        kinesis_target.sm_client = mock.MagicMock()
+        kinesis_target.sm_client.list_streams.return_value = [self.greengrass_stream]
+
+        def create_payload(tag, values):
+            alias = f"{self.site_name}/{self.area}/{self.process}/{self.machine_name}/{tag}"
+            return {
+                "alias": alias,
+                "messages": [
+                    {"name": alias, "value": value, "quality": "Good", "timestamp": self.timestamp}
+                    for value in values
+                ]
+            }
+
+        # Act, the samples are grouped until the record is full or the samples lingered
+        kinesis_target.send_to_kinesis(create_payload("tag-1", [1]))
+        self.assertTrue(kinesis_target.has_pending())
+        self.assertGreater(kinesis_target.flush_wait_ms(), 0)
+        kinesis_target.flush()
+        kinesis_target.sm_client.write_to_stream.assert_not_called()
+
+        kinesis_target.send_to_kinesis(create_payload("tag-2", [2, 3, 4, 5]))
+        kinesis_target.flush(force=True)
+
+        # Assert
+        self.assertFalse(kinesis_target.has_pending())
+        self.assertIsNone(kinesis_target.flush_wait_ms())
+        records = [call.args[1] for call in kinesis_target.sm_client.write_to_stream.call_args_list]
+        timestamp = parser.parse(self.timestamp).timestamp() * 1000
+        dimensions = {
+            "site": self.site_name,
+            "area": self.area,
+            "process": self.process,
+            "machine": self.machine_name
+        }
+        self.assertEqual(records, [
+            {
+                **dimensions,
+                "measures": [
+                    {"timestamp": timestamp, "quality": "Good", "values": {"tag-1": 1, "tag-2": 2}},
+                    {"timestamp": timestamp, "quality": "Good", "values": {"tag-2": 3}},
+                    {"timestamp": timestamp, "quality": "Good", "values": {"tag-2": 4}}
+                ]
+            },
+            {
+                **dimensions,
+                "measures": [
+                    {"timestamp": timestamp, "quality": "Good", "values": {"tag-2": 5}}
+                ]
+            }
+        ])
+
+    @mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
+    def test_timestream_multi_measure_partial_failure(self, mock_stream_manager_helper):
+        # Arrange
+        kinesis_target = KinesisTarget(
+            self.connection_name,
+            "opcda",
+            self.hierarchy,
+            self.greengrass_stream,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            is_timestream_kinesis=True,
+            record_format="multi",
+            linger_ms=60000
+        )
+        kinesis_target.sm_client = mock.MagicMock()
+        kinesis_target.sm_client.list_streams.return_value = [self.greengrass_stream]
+        kinesis_target.sm_client.write_to_stream.side_effect = [None, Exception("throttled"), None]
+        records = [
+            {"site": self.site_name, "area": self.area, "process": self.process, "machine": machine,
+             "tag": "tag-1", "value": 1, "quality": "Good", "timestamp": 1622733261247}
+            for machine in ["machine-1", "machine-2"]
+        ]
+
+        # Act
+        kinesis_target.write_records(records)
+        with self.assertRaises(ConnectionError):
+            kinesis_target.flush(force=True)
+        kinesis_target.flush(force=True)
+
+        # Assert, the record of the machine which was written is not written again
+        self.assertEqual([call.args[1]["machine"] for call in kinesis_target.sm_client.write_to_stream.call_args_list],
+                         ["machine-1", "machine-2", "machine-2"])
+        self.assertFalse(kinesis_target.has_pending())
+
+    @mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
+    def test_timestream_multi_measure_converter_error(self, mock_stream_manager_helper):
+        # Arrange
+        kinesis_target = KinesisTarget(
+            self.connection_name,
+            "opcda",
+            self.hierarchy,
+            self.greengrass_stream,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            is_timestream_kinesis=True,
+            record_format="multi",
+            linger_ms=60000
+        )
+        kinesis_target.sm_client = mock.MagicMock()
+        kinesis_target.write_records([{"tag": "tag-1"}])
+
+        # Act and Assert, records which cannot be grouped are dropped
+        with self.assertRaises(ConverterException):
+            kinesis_target.flush(force=True)
+        self.assertFalse(kinesis_target.has_pending())
+        kinesis_target.sm_client.write_to_stream.assert_not_called()
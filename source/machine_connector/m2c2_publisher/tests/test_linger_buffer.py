@@ -0,0 +1,48 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import unittest
+
+from targets.linger_buffer import LingerBuffer
+
+
+class TestLingerBuffer(unittest.TestCase):
+    def test_take_full_items(self):
+        buffer = LingerBuffer(60000, 3)
+
+        taken = buffer.extend([1, 2, 3, 4])
+
+        self.assertEqual(taken, [[1, 2, 3]])
+        self.assertTrue(buffer.has_pending())
+        self.assertEqual(buffer.take(), [])
+        self.assertEqual(buffer.take(force=True), [4])
+        self.assertFalse(buffer.has_pending())
+
+    def test_linger(self):
+        buffer = LingerBuffer(0, 10)
+        self.assertIsNone(buffer.wait_ms())
+
+        buffer.add("item")
+
+        self.assertEqual(buffer.wait_ms(), 0)
+        self.assertEqual(buffer.take(), ["item"])
+
+    def test_size_with_separators(self):
+        # A batch of "[a,b]" fits 5 bytes
+        buffer = LingerBuffer(60000, 5, base_size=2, separator_size=1)
+
+        self.assertEqual(buffer.add("a", 1), [])
+        self.assertEqual(buffer.add("b", 1), [["a", "b"]])
+        self.assertEqual(buffer.add("cc", 2), [])
+        # The item does not fit, so the pending items are taken first
+        self.assertEqual(buffer.add("dd", 2), [["cc"]])
+        self.assertEqual(buffer.take(force=True), ["dd"])
+
+    def test_put_back(self):
+        buffer = LingerBuffer(60000, 3)
+        buffer.extend([3])
+
+        buffer.put_back([1, 2])
+
+        self.assertEqual(buffer.extend([4]), [[1, 2, 3]])
+        self.assertEqual(buffer.take(force=True), [4])
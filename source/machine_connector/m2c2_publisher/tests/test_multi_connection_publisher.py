@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import tempfile
+import threading
+
+from unittest import mock, TestCase
+from multi_connection_publisher import MultiConnectionPublisher, load_connections
+
+
+class TestMultiConnectionPublisher(TestCase):
+    def test_load_connections(self):
+        connections = [{"CONNECTION_NAME": "test_connection", "CONNECTION_GG_STREAM_NAME": "test_stream"}]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "connections.json")
+            with open(file_path, "w") as file:
+                json.dump(connections, file)
+            self.assertEqual(load_connections(file_path), connections)
+
+            with open(file_path, "w") as file:
+                json.dump([{"CONNECTION_NAME": "test_connection"}], file)
+            with self.assertRaises(ValueError):
+                load_connections(file_path)
+
+    def test_failing_connection_is_isolated(self):
+        polled = threading.Event()
+        healthy_publisher = mock.MagicMock()
+
+        def poll(max_messages):
+            polled.set()
+            return 1
+        healthy_publisher.poll.side_effect = poll
+
+        def publisher_factory(connection):
+            if connection["CONNECTION_NAME"] == "bad_connection":
+                raise Exception("bad connection")
+            return healthy_publisher
+
+        connections = [
+            {"CONNECTION_NAME": "bad_connection", "CONNECTION_GG_STREAM_NAME": "bad_stream"},
+            {"CONNECTION_NAME": "good_connection", "CONNECTION_GG_STREAM_NAME": "good_stream"}
+        ]
+        multi_connection_publisher = MultiConnectionPublisher(
+            connections, publisher_factory, messages_per_turn=10)
+
+        multi_connection_publisher.start()
+        self.assertTrue(polled.wait(5))
+        multi_connection_publisher.stop()
+        multi_connection_publisher.join(5)
+
+        healthy_publisher.start.assert_called_once()
+        healthy_publisher.poll.assert_called_with(10)
@@ -5,6 +5,8 @@ import json
 
 from unittest import mock, TestCase
 from payload_router import PayloadRouter
+from utils.custom_exception import ConverterException
+from utils.metrics import MetricsRegistry
 
 
 class MockMessage:
@@ -171,3 +173,416 @@ class TestPayloadRouter(TestCase):
 
         with self.assertRaises(ValueError):
             payload_router.route_payload(MockMessage(payload=None))
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_flush(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        iot_topic_batching = {
+            "batching": True,
+            "batch_linger_ms": 10,
+            "batch_compression": None
+        }
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id,
+            iot_topic_batching
+        )
+
+        with mock.patch("targets.iot_topic_target.IoTTopicTarget.flush") as mock_iot_flush, \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.has_pending", return_value=False), \
+                mock.patch("targets.sitewise_target.SiteWiseTarget.flush") as mock_sitewise_flush, \
+                mock.patch("targets.sitewise_target.SiteWiseTarget.has_pending", side_effect=[True, False, False]):
+            payload_router.flush()
+            mock_sitewise_flush.assert_any_call(False)
+            mock_iot_flush.assert_called_with(True)
+            self.assertFalse(payload_router.has_pending())
+            mock_iot_topic_target.assert_called_with(
+                connection_name=self.connection_name,
+                protocol=self.protocol,
+                hierarchy=self.hierarchy,
+                metadata_template=mock.ANY,
+                **iot_topic_batching
+            )
+            # The targets share the metadata template of the connection
+            metadata_template = mock_iot_topic_target.call_args.kwargs["metadata_template"]
+            self.assertIs(mock_kinesis_target.call_args.kwargs["metadata_template"], metadata_template)
+            self.assertIs(mock_historian_target.call_args.kwargs["metadata_template"], metadata_template)
+            self.assertEqual(metadata_template.topic_prefix,
+                             f"m2c2/data/{self.connection_name}/{self.hierarchy['machine_name']}/")
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_route_opcua_payload(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        opcua_payload = {
+            "propertyAlias": "/AnyCompany/1/Pressure",
+            "propertyValues": [
+                {
+                    "value": {"doubleValue": 123.12},
+                    "quality": "GOOD",
+                    "timestamp": {
+                        "timeInSeconds": 1622733261,
+                        "offsetInNanos": 247000000
+                    }
+                }
+            ]
+        }
+        payload_router = PayloadRouter(
+            "opcua",
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.send_to_sitewise") as mock_send_to_sitewise, \
+                mock.patch("targets.kinesis_target.KinesisTarget.send_to_kinesis") as mock_send_to_kinesis, \
+                mock.patch("targets.historian_target.HistorianTarget.send_to_kinesis"), \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.send_to_iot") as mock_send_to_iot, \
+                mock.patch.object(payload_router.sitewise_converter, "convert_sitewise_format",
+                                  wraps=payload_router.sitewise_converter.convert_sitewise_format) as mock_convert:
+            payload_router.route_payload(MockMessage(json.dumps(opcua_payload)))
+
+            mock_send_to_sitewise.assert_called_once_with(opcua_payload)
+            self.assertEqual(mock_convert.call_count, 1)
+            iot_payload, converted = mock_send_to_iot.call_args.args
+            self.assertTrue(converted)
+            self.assertEqual(iot_payload["messages"][0]["timestamp"], "2021-06-03 15:14:21.247000+00:00")
+            self.assertEqual(mock_send_to_kinesis.call_count, 2)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_route_payload_metrics(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        registry = MetricsRegistry(enabled=True)
+        with mock.patch("payload_router.get_registry", return_value=registry):
+            payload_router = PayloadRouter(
+                self.protocol,
+                self.connection_name,
+                self.hierarchy,
+                self.destinations,
+                self.destination_streams,
+                self.max_stream_size,
+                self.kinesis_data_stream,
+                self.timestream_kinesis_data_stream,
+                self.historian_kinesis_data_stream,
+                self.collector_id
+            )
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.send_to_sitewise",
+                        side_effect=ConverterException("invalid value")):
+            with self.assertRaises(ConverterException):
+                payload_router.route_payload(self.message)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["counters"]["target.sitewise.conversion_errors"], 1)
+        self.assertEqual(snapshot["counters"]["router.errors"], 1)
+        self.assertEqual(snapshot["histograms"]["target.sitewise.send_ms"]["count"], 1)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_downsample_low_priority_tags(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        self.destinations = {
+            "send_to_sitewise": False,
+            "send_to_kinesis_stream": True,
+            "send_to_iot_topic": False,
+            "send_to_timestream": False,
+            "send_to_historian": False
+        }
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id,
+            low_priority_tags=["site/*/debug-*"]
+        )
+        low_priority_message = MockMessage(json.dumps({"alias": "site/area/debug-1", "messages": []}))
+        high_priority_message = MockMessage(json.dumps({"alias": "site/area/tag-1", "messages": []}))
+
+        with mock.patch("targets.kinesis_target.KinesisTarget.send_to_kinesis") as mock_send_to_kinesis:
+            payload_router.set_downsampling(3)
+            for _ in range(6):
+                payload_router.route_payload(low_priority_message)
+                payload_router.route_payload(high_priority_message)
+            self.assertEqual(mock_send_to_kinesis.call_count, 8)
+
+            mock_send_to_kinesis.reset_mock()
+            payload_router.set_downsampling(1)
+            payload_router.route_payload(low_priority_message)
+            self.assertEqual(mock_send_to_kinesis.call_count, 1)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_flush_wait_ms(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+
+        with mock.patch("targets.iot_topic_target.IoTTopicTarget.flush_wait_ms", return_value=None), \
+                mock.patch("targets.sitewise_target.SiteWiseTarget.flush_wait_ms", side_effect=[None, 40]):
+            self.assertIsNone(payload_router.flush_wait_ms())
+            self.assertEqual(payload_router.flush_wait_ms(), 40)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_route_traced_payload(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        registry = MetricsRegistry(enabled=True)
+        self.destinations = {destination: False for destination in self.destinations}
+        self.destinations["send_to_kinesis_stream"] = True
+        with mock.patch("payload_router.get_registry", return_value=registry), \
+                mock.patch("utils.trace.get_registry", return_value=registry):
+            payload_router = PayloadRouter(
+                self.protocol,
+                self.connection_name,
+                self.hierarchy,
+                self.destinations,
+                self.destination_streams,
+                self.max_stream_size,
+                self.kinesis_data_stream,
+                self.timestream_kinesis_data_stream,
+                self.historian_kinesis_data_stream,
+                self.collector_id
+            )
+        message = MockMessage(json.dumps({"mock": "payload", "trace": {"capture": 1000.0, "append": 1001.0}}))
+
+        with mock.patch("targets.kinesis_target.KinesisTarget.send_to_kinesis") as mock_send_to_kinesis:
+            payload_router.route_payload(message, read_time_ms=1002.0)
+
+        # The targets get the payload without its trace
+        mock_send_to_kinesis.assert_called_once_with({"mock": "payload"}, False)
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["counters"]["trace.samples"], 1)
+        self.assertEqual(snapshot["histograms"]["trace.append_to_read_ms"]["max"], 1)
+        self.assertEqual(snapshot["histograms"]["trace.ack.kinesis_ms"]["count"], 1)
+        self.assertEqual(snapshot["histograms"]["trace.end_to_end_ms"]["count"], 1)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_convert_and_write_traced_payload(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        registry = MetricsRegistry(enabled=True)
+        self.destinations = {destination: False for destination in self.destinations}
+        self.destinations["send_to_kinesis_stream"] = True
+        with mock.patch("payload_router.get_registry", return_value=registry), \
+                mock.patch("utils.trace.get_registry", return_value=registry):
+            payload_router = PayloadRouter(
+                self.protocol,
+                self.connection_name,
+                self.hierarchy,
+                self.destinations,
+                self.destination_streams,
+                self.max_stream_size,
+                self.kinesis_data_stream,
+                self.timestream_kinesis_data_stream,
+                self.historian_kinesis_data_stream,
+                self.collector_id
+            )
+        payload = json.dumps({"mock": "payload", "trace": {"capture": 1000.0}})
+
+        with mock.patch("targets.kinesis_target.KinesisTarget.convert", return_value=["record"]) as mock_convert:
+            converted_payloads = payload_router.convert_payload(payload)
+        with mock.patch("targets.kinesis_target.KinesisTarget.write_records") as mock_write_records:
+            payload_router.write_converted(converted_payloads, read_time_ms=1001.0)
+
+        mock_convert.assert_called_once_with({"mock": "payload"}, False)
+        mock_write_records.assert_called_once_with(["record"])
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["histograms"]["trace.capture_to_read_ms"]["max"], 1)
+        self.assertEqual(snapshot["histograms"]["trace.ack.kinesis_ms"]["count"], 1)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_convert_and_write(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.convert", return_value=["entry"]), \
+                mock.patch("targets.kinesis_target.KinesisTarget.convert", return_value=["record"]), \
+                mock.patch("targets.historian_target.HistorianTarget.convert", return_value=["historian"]), \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.convert", return_value=("topic", {})):
+            converted_payloads = payload_router.convert_payload(self.message.payload)
+
+        self.assertEqual(converted_payloads, {
+            "sitewise": ["entry"],
+            "kinesis": ["record"],
+            "iot_topic": ("topic", {}),
+            "timestream": ["record"],
+            "historian": ["historian"]
+        })
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.add_entries") as mock_add_entries, \
+                mock.patch("targets.kinesis_target.KinesisTarget.write_records") as mock_write_records, \
+                mock.patch("targets.historian_target.HistorianTarget.write_to_stream") as mock_write_historian, \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.publish") as mock_publish:
+            payload_router.write_converted(converted_payloads)
+            payload_router.write_converted(None)
+
+        mock_add_entries.assert_called_once_with(["entry"])
+        self.assertEqual(mock_write_records.call_count, 2)
+        mock_write_historian.assert_called_once_with(["historian"])
+        mock_publish.assert_called_once_with("topic", {})
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_route_to_targets(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        self.destinations["send_to_timestream"] = False
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+        self.assertEqual(payload_router.enabled_targets(), ["sitewise", "kinesis", "iot_topic", "historian"])
+        payload_router.confirm_publishes()
+        self.assertTrue(payload_router.iot_client.confirm_publishes)
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.send_to_sitewise") as mock_send_to_sitewise, \
+                mock.patch("targets.kinesis_target.KinesisTarget.send_to_kinesis") as mock_send_to_kinesis, \
+                mock.patch("targets.historian_target.HistorianTarget.send_to_kinesis") as mock_send_to_historian, \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.send_to_iot") as mock_send_to_iot:
+            # A failing target does not keep the message from the other targets
+            error = Exception("throttled")
+            mock_send_to_kinesis.side_effect = error
+            errors = payload_router.route_to_targets(self.message, ["kinesis", "iot_topic", "historian"])
+            self.assertEqual(errors, {"kinesis": error})
+            mock_send_to_sitewise.assert_not_called()
+            mock_send_to_iot.assert_called_once()
+            mock_send_to_historian.assert_called_once()
+
+            # Only the given targets get the message
+            errors = payload_router.route_to_targets(self.message, ["sitewise"])
+            self.assertEqual(errors, {})
+            mock_send_to_sitewise.assert_called_once()
+            self.assertEqual(mock_send_to_kinesis.call_count, 1)
+            self.assertEqual(mock_send_to_iot.call_count, 1)
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_route_to_targets_malformed_payload(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        self.destinations["send_to_timestream"] = False
+        payload_router = PayloadRouter(
+            "opcua",
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+        targets = ["sitewise", "kinesis", "iot_topic", "historian"]
+
+        with mock.patch("targets.sitewise_target.SiteWiseTarget.send_to_sitewise") as mock_send_to_sitewise, \
+                mock.patch("targets.kinesis_target.KinesisTarget.send_to_kinesis") as mock_send_to_kinesis, \
+                mock.patch("targets.historian_target.HistorianTarget.send_to_kinesis"), \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.send_to_iot") as mock_send_to_iot:
+            # A payload which cannot be parsed fails every target, so their cursors skip it
+            errors = payload_router.route_to_targets(MockMessage("{not json"), targets)
+            self.assertEqual(list(errors.keys()), targets)
+            self.assertTrue(all(isinstance(error, ConverterException) for error in errors.values()))
+            mock_send_to_sitewise.assert_not_called()
+
+            # A payload which cannot be converted fails the targets of the converted payload
+            errors = payload_router.route_to_targets(MockMessage(json.dumps({"propertyAlias": "alias"})), targets)
+            self.assertEqual(list(errors.keys()), ["kinesis", "iot_topic", "historian"])
+            self.assertTrue(all(isinstance(error, ConverterException) for error in errors.values()))
+            mock_send_to_sitewise.assert_called_once()
+            mock_send_to_kinesis.assert_not_called()
+            mock_send_to_iot.assert_not_called()
+
+    @mock.patch("targets.iot_topic_target.IoTTopicTarget.__init__", return_value=None)
+    @mock.patch("targets.kinesis_target.KinesisTarget.__init__", return_value=None)
+    @mock.patch("targets.sitewise_target.SiteWiseTarget.__init__", return_value=None)
+    @mock.patch("targets.historian_target.HistorianTarget.__init__", return_value=None)
+    def test_flush_errors(self, mock_historian_target, mock_sitewise_target, mock_kinesis_target, mock_iot_topic_target):
+        payload_router = PayloadRouter(
+            self.protocol,
+            self.connection_name,
+            self.hierarchy,
+            self.destinations,
+            self.destination_streams,
+            self.max_stream_size,
+            self.kinesis_data_stream,
+            self.timestream_kinesis_data_stream,
+            self.historian_kinesis_data_stream,
+            self.collector_id
+        )
+
+        error = Exception("throttled")
+        with mock.patch("targets.iot_topic_target.IoTTopicTarget.flush") as mock_iot_flush, \
+                mock.patch("targets.iot_topic_target.IoTTopicTarget.has_pending", return_value=False), \
+                mock.patch("targets.sitewise_target.SiteWiseTarget.flush", side_effect=error), \
+                mock.patch("targets.sitewise_target.SiteWiseTarget.has_pending", return_value=True):
+            errors = {}
+            payload_router.flush(force=True, errors=errors)
+            self.assertEqual(errors, {"sitewise": error})
+            mock_iot_flush.assert_called_with(True)
+            self.assertTrue(payload_router.target_has_pending("sitewise"))
+            self.assertFalse(payload_router.target_has_pending("iot_topic"))
+            self.assertFalse(payload_router.target_has_pending("kinesis"))
+
+            with self.assertRaises(Exception):
+                payload_router.flush(force=True)
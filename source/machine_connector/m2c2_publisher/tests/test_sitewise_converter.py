@@ -45,6 +45,24 @@ class TestSiteWiseConverter(unittest.TestCase):
         converted_payload = self.client.convert_sitewise_format(payload)
         self.assertDictEqual(converted_payload, self.build_payload("test"))
 
+    def test_convert_sitewise_format_no_mutation(self):
+        payload = {
+            "propertyAlias": self.name,
+            "propertyValues": [
+                {
+                    "timestamp": self.sitewise_timestamp,
+                    "value": {"doubleValue": 1.5},
+                    "quality": "GOOD"
+                }
+            ]
+        }
+
+        self.client.convert_sitewise_format(payload)
+        converted_payload = self.client.convert_sitewise_format(payload)
+
+        self.assertDictEqual(payload["propertyValues"][0]["value"], {"doubleValue": 1.5})
+        self.assertEqual(converted_payload["messages"][0]["value"], 1.5)
+
     def test_convert_sitewise_format_error(self):
         with self.assertRaises(ConverterException):
             self.client.convert_sitewise_format({})
@@ -143,3 +161,45 @@ class TestSiteWiseConverter(unittest.TestCase):
 
         with self.assertRaises(ConverterException):
             self.client.sw_required_format(payload)
+
+    def test_sw_required_format_list_value(self):
+        payload = self.build_payload([1, 2])
+
+        with self.assertRaises(ConverterException):
+            self.client.sw_required_format(payload)
+
+    def test_sw_required_entries_expand_list_value(self):
+        payload = self.build_payload([1, 2.5])
+        payload["messages"].append(dict(payload["messages"][0], value=[3, 4.5]))
+
+        entries = self.client.sw_required_entries(payload)
+
+        self.assertEqual([entry["propertyAlias"] for entry in entries], [
+                         f"{self.name}/0", f"{self.name}/1"])
+        self.assertEqual(entries[0]["propertyValues"][1]["value"], {"integerValue": 3})
+        self.assertEqual(entries[1]["propertyValues"][0]["value"], {"doubleValue": 2.5})
+        self.assertDictEqual(
+            entries[1]["propertyValues"][1]["timestamp"], self.sitewise_timestamp)
+
+    def test_sw_required_entries_no_expansion(self):
+        client = SiteWiseConverter(expand_list_values=False)
+
+        with self.assertRaises(ConverterException):
+            client.sw_required_entries(self.build_payload([1, 2]))
+        self.assertEqual(len(client.sw_required_entries(self.build_payload(1))), 1)
+
+    def test_sw_required_format_value_type_change(self):
+        self.client.sw_required_format(self.build_payload(1))
+        converted_payload = self.client.sw_required_format(self.build_payload(False))
+
+        self.assertDictEqual(
+            converted_payload["propertyValues"][0]["value"],
+            {"booleanValue": False}
+        )
+
+    def test_convert_timestamps(self):
+        timestamps = self.client.convert_timestamps(
+            [self.timestamp, "Thu, 03 Jun 2021 15:14:21.247 +0000", self.timestamp])
+
+        self.assertEqual(timestamps, [self.sitewise_timestamp] * 3)
+        self.assertIsNot(timestamps[0], timestamps[2])
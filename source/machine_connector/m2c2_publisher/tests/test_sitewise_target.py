@@ -39,25 +39,133 @@ class TestSiteWiseTarget(unittest.TestCase):
         }
 
     def test_send_opcda_data(self, mock_stream_manager_helper):
-        sitewise_target = SiteWiseTarget("opcda", self.sitewise_stream)
+        sitewise_target = SiteWiseTarget("opcda", self.sitewise_stream, max_entries=1)
         mock_sm_helper_client = mock_stream_manager_helper.MagicMock()
         sitewise_target.sm_helper_client = mock_sm_helper_client
         sitewise_target.sm_helper_client.write_to_stream = mock_stream_manager_helper.MagicMock()
 
         sitewise_target.send_to_sitewise(self.opcda_payload)
-        self.assertDictEqual(sitewise_target.payload, self.sitewise_payload)
+        sitewise_target.sm_helper_client.write_to_stream.assert_called_once_with(
+            self.sitewise_stream, self.sitewise_payload)
 
     def test_send_opcua_data(self, mock_stream_manager_helper):
-        sitewise_target = SiteWiseTarget("opcua", self.sitewise_stream)
+        sitewise_target = SiteWiseTarget("opcua", self.sitewise_stream, max_entries=1)
         mock_sm_helper_client = mock_stream_manager_helper.MagicMock()
         sitewise_target.sm_helper_client = mock_sm_helper_client
         sitewise_target.sm_helper_client.write_to_stream = mock_stream_manager_helper.MagicMock()
 
         sitewise_target.send_to_sitewise(self.sitewise_payload)
-        self.assertDictEqual(sitewise_target.payload, self.sitewise_payload)
+        sitewise_target.sm_helper_client.write_to_stream.assert_called_once_with(
+            self.sitewise_stream, self.sitewise_payload)
+
+    def test_opcua_split_without_buffering(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget("opcua", self.sitewise_stream)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+
+        sitewise_target.send_to_sitewise(self.build_sitewise_payload(self.alias, 25))
+
+        # The entries are written right away, and nothing is buffered
+        entries = [call.args[1] for call in sitewise_target.sm_helper_client.write_to_stream.call_args_list]
+        self.assertEqual([len(entry["propertyValues"]) for entry in entries], [10, 10, 5])
+        self.assertFalse(sitewise_target.has_pending())
 
     def test_wrong_opcda_payload(self, mock_stream_manager_helper):
         sitewise_target = SiteWiseTarget("opcda", self.sitewise_stream)
 
         with self.assertRaises(Exception):
             sitewise_target.send_to_sitewise({})
+
+    def build_sitewise_payload(self, alias: str, value_count: int = 1) -> dict:
+        return {
+            "propertyAlias": alias,
+            "propertyValues": [
+                {
+                    "value": {"integerValue": i},
+                    "timestamp": {
+                        "timeInSeconds": 1622733261 + i,
+                        "offsetInNanos": 0
+                    },
+                    "quality": "GOOD"
+                }
+                for i in range(value_count)
+            ]
+        }
+
+    def test_buffer_entries(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget(
+            "opcua", self.sitewise_stream, max_entries=10, linger_ms=60000)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+
+        for i in range(12):
+            sitewise_target.send_to_sitewise(
+                self.build_sitewise_payload(f"{self.alias}-{i}"))
+
+        # Every entry is written as its own message
+        write_mock = sitewise_target.sm_helper_client.write_to_stream
+        self.assertEqual(write_mock.call_count, 10)
+        stream_name, entry = write_mock.call_args.args
+        self.assertEqual(stream_name, self.sitewise_stream)
+        self.assertEqual(entry["propertyAlias"], f"{self.alias}-9")
+        self.assertTrue(sitewise_target.has_pending())
+
+        sitewise_target.flush()
+        self.assertEqual(write_mock.call_count, 10)
+
+        sitewise_target.flush(force=True)
+        self.assertEqual(write_mock.call_count, 12)
+        self.assertFalse(sitewise_target.has_pending())
+
+    def test_partial_write_failure(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget(
+            "opcua", self.sitewise_stream, max_entries=3, linger_ms=60000)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+        write_mock = sitewise_target.sm_helper_client.write_to_stream
+        write_mock.side_effect = [None, Exception("throttled"), None, None]
+
+        for i in range(2):
+            sitewise_target.send_to_sitewise(self.build_sitewise_payload(f"{self.alias}-{i}"))
+        with self.assertRaises(Exception):
+            sitewise_target.send_to_sitewise(self.build_sitewise_payload(f"{self.alias}-2"))
+        sitewise_target.flush(force=True)
+
+        # Only the entries which were not written are written again
+        self.assertEqual([call.args[1]["propertyAlias"] for call in write_mock.call_args_list],
+                         [f"{self.alias}-0", f"{self.alias}-1", f"{self.alias}-1", f"{self.alias}-2"])
+        self.assertFalse(sitewise_target.has_pending())
+
+    def test_split_values(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget("opcua", self.sitewise_stream, max_entries=10)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+
+        sitewise_target.send_to_sitewise(
+            self.build_sitewise_payload(self.alias, 25))
+        sitewise_target.flush(force=True)
+
+        entries = [call.args[1] for call in sitewise_target.sm_helper_client.write_to_stream.call_args_list]
+        self.assertEqual([len(entry["propertyValues"])
+                         for entry in entries], [10, 10, 5])
+        self.assertTrue(
+            all(entry["propertyAlias"] == self.alias for entry in entries))
+
+    def test_linger(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget(
+            "opcua", self.sitewise_stream, max_entries=10, linger_ms=0)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+
+        sitewise_target.send_to_sitewise(self.sitewise_payload)
+        sitewise_target.flush()
+
+        self.assertTrue(sitewise_target.sm_helper_client.write_to_stream.called)
+        self.assertFalse(sitewise_target.has_pending())
+
+    def test_expand_list_values(self, mock_stream_manager_helper):
+        sitewise_target = SiteWiseTarget("opcda", self.sitewise_stream, max_entries=10)
+        sitewise_target.sm_helper_client = mock.MagicMock()
+        self.opcda_payload["messages"][0]["value"] = [1, 2]
+
+        sitewise_target.send_to_sitewise(self.opcda_payload)
+        sitewise_target.flush(force=True)
+
+        entries = [call.args[1] for call in sitewise_target.sm_helper_client.write_to_stream.call_args_list]
+        self.assertEqual([entry["propertyAlias"] for entry in entries], [
+                         f"{self.alias}/0", f"{self.alias}/1"])
@@ -0,0 +1,28 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import unittest
+
+from converters.solution_time import format_timestamp, parse_timestamp, to_epoch_millis
+
+
+class TestSolutionTime(unittest.TestCase):
+    def test_format_timestamp(self):
+        self.assertEqual(format_timestamp(1622733261, 247000000),
+                         "2021-06-03 15:14:21.247000+00:00")
+        self.assertEqual(format_timestamp(1622733261, 0),
+                         "2021-06-03 15:14:21.000000+00:00")
+
+    def test_format_timestamp_rounding(self):
+        self.assertEqual(format_timestamp(1622733261, 123456789),
+                         "2021-06-03 15:14:21.123457+00:00")
+        self.assertEqual(format_timestamp(1622733261, 999999999),
+                         "2021-06-03 15:14:22.000000+00:00")
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("2021-06-03 15:14:21.247000+00:00"),
+                         parse_timestamp("Thu, 03 Jun 2021 15:14:21.247 +0000"))
+
+    def test_to_epoch_millis(self):
+        self.assertEqual(to_epoch_millis(
+            "2021-06-03 15:14:21.247000+00:00"), 1622733261247)
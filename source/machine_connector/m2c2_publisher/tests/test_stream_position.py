@@ -0,0 +1,59 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest import mock, TestCase
+from stream_position import StreamPositionTracker
+
+
+class MockMessage:
+    def __init__(self, sequence_number):
+        self.sequence_number = sequence_number
+
+
+class TestStreamPositionTracker(TestCase):
+    def setUp(self):
+        self.smh_client = mock.MagicMock()
+        self.tracker = StreamPositionTracker(
+            self.smh_client, "test_stream", catch_up_lag_threshold=100, check_interval=0)
+
+    def test_catch_up_mode(self):
+        self.smh_client.get_stream_position.return_value = (0, 199)
+        self.assertEqual(self.tracker.check(50), 50)
+        self.assertTrue(self.tracker.catch_up)
+
+        # The publisher stays in the catch-up mode until the lag drops below half of the threshold
+        self.assertEqual(self.tracker.check(150), 150)
+        self.assertTrue(self.tracker.catch_up)
+
+        self.tracker.check(160)
+        self.assertFalse(self.tracker.catch_up)
+
+    def test_overwritten_messages(self):
+        self.smh_client.get_stream_position.return_value = (500, 510)
+        with mock.patch.object(self.tracker, "report_gap") as mock_report_gap:
+            self.assertEqual(self.tracker.check(100), 500)
+            mock_report_gap.assert_called_once_with(100, 500)
+        self.assertFalse(self.tracker.catch_up)
+
+    def test_check_read(self):
+        with mock.patch.object(self.tracker, "report_gap") as mock_report_gap:
+            self.tracker.check_read(10, [MockMessage(10), MockMessage(11)])
+            self.assertFalse(mock_report_gap.called)
+
+            self.tracker.check_read(10, [MockMessage(15)])
+            mock_report_gap.assert_called_once_with(10, 15)
+
+    def test_check_interval(self):
+        tracker = StreamPositionTracker(
+            self.smh_client, "test_stream", catch_up_lag_threshold=100, check_interval=60)
+        self.smh_client.get_stream_position.return_value = (0, 10)
+        tracker.check(5)
+        tracker.check(5)
+        self.assertEqual(self.smh_client.get_stream_position.call_count, 1)
+
+    def test_should_check(self):
+        self.assertFalse(self.tracker.should_check(10))
+        self.smh_client.get_stream_position.return_value = (0, 20)
+        self.tracker.check(5)
+        self.assertTrue(self.tracker.should_check(10))
+        self.assertFalse(self.tracker.should_check(21))
@@ -1,9 +1,11 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import threading
 import unittest
 
 from converters.tag_converter import TagConverter
+from utils.custom_exception import ConverterException
 
 
 class TestTagConverter(unittest.TestCase):
@@ -24,3 +26,53 @@ class TestTagConverter(unittest.TestCase):
         self.payload = {"alias": self.opcda_alias}
         self.tag = self.opcda_client.retrieve_tag(self.payload)
         self.assertEqual(self.tag, "TestMetric")
+
+    def test_tag_converter_osipi(self):
+        client = TagConverter("osipi")
+        self.assertEqual(client.retrieve_tag({"alias": "/Site/Area.1/Tag.Value"}), "_Site_Area-1_Tag-Value")
+
+    def test_tag_converter_modbustcp(self):
+        client = TagConverter("modbustcp")
+        self.assertEqual(client.retrieve_tag({"alias": "site/area/process/machine/tag_fc3_1"}), "tag_fc3_1")
+
+    def test_tag_converter_unsupported_protocol(self):
+        client = TagConverter("unknown")
+        with self.assertRaises(ConverterException):
+            client.retrieve_tag({"alias": self.opcda_alias})
+
+    def test_tag_converter_cache(self):
+        # Arrange
+        client = TagConverter(self.protocol_opcua, cache_size=2)
+
+        # Act
+        tags = [client.retrieve_tag({"alias": alias})
+                for alias in [self.opcua_alias, self.opcua_alias, "/RealTime/Other", "/RealTime/Third"]]
+
+        # Assert, the aliases repeat, so their tags are cached up to the cache size
+        self.assertEqual(tags, ["_RealTime_TestMetric", "_RealTime_TestMetric", "_RealTime_Other",
+                                "_RealTime_Third"])
+        self.assertEqual(client.cache_info().hits, 1)
+        self.assertEqual(client.cache_info().currsize, 2)
+        self.assertEqual(client.convert_opcua_tag({"alias": self.opcua_alias}), "_RealTime_TestMetric")
+
+    def test_tag_converter_threads(self):
+        # Arrange
+        client = TagConverter(self.protocol_opcda, cache_size=8)
+        aliases = [f"/Site/Area/Process/Machine/Tag{i}" for i in range(32)]
+        mismatches = []
+
+        def retrieve_tags():
+            for _ in range(100):
+                for i, alias in enumerate(aliases):
+                    if client.retrieve_tag({"alias": alias}) != f"Tag{i}":
+                        mismatches.append(alias)
+
+        # Act
+        threads = [threading.Thread(target=retrieve_tags) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(mismatches, [])
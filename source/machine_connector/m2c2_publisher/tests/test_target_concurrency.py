@@ -0,0 +1,200 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import sys
+import threading
+import unittest
+
+from concurrent.futures import Future
+from unittest import mock
+
+gg_mock = mock.MagicMock()
+sys.modules["greengrasssdk"] = gg_mock
+sys.modules["greengrasssdk.stream_manager"] = gg_mock
+sys.modules["awsiot"] = mock.MagicMock()
+sys.modules["awsiot.greengrasscoreipc"] = mock.MagicMock()
+sys.modules["awsiot.greengrasscoreipc.model"] = mock.MagicMock()
+sys.modules["dbm"] = mock.MagicMock()
+
+from targets import HistorianTarget, IoTTopicTarget, KinesisTarget, SiteWiseTarget  # noqa: E402
+
+THREADS = 8
+TAGS_PER_THREAD = 25
+MESSAGES_PER_PAYLOAD = 4
+
+
+class FakeStreamManager:
+    """
+    Stores the messages written to the streams and published to the IoT topics, for the threads which share it
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self._lock = threading.Lock()
+
+    def list_streams(self):
+        with self._lock:
+            return list(self.streams.keys())
+
+    def create_stream(self, stream_name, max_stream_size, exports):
+        with self._lock:
+            self.streams.setdefault(stream_name, [])
+
+    def write_to_stream(self, stream_name, data):
+        serialized_data = json.dumps(data)
+        with self._lock:
+            self.streams.setdefault(stream_name, []).append(json.loads(serialized_data))
+
+    def publish_message_to_iot_topic(self, topic, payload):
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        self.write_to_stream(topic, payload if isinstance(payload, str) else json.dumps(payload))
+
+        response = Future()
+        response.set_result(None)
+        return response
+
+
+@mock.patch("utils.AWSEndpointClient.__init__", return_value=None)
+@mock.patch("utils.stream_manager_helper.StreamManagerHelperClient.__init__", return_value=None)
+class TestTargetConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.hierarchy = {
+            "site_name": "site",
+            "area": "area",
+            "process": "process",
+            "machine_name": "machine"
+        }
+        self.fake_stream_manager = FakeStreamManager()
+        # Switches threads as often as possible, so the threads interleave within the calls
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def create_payload(self, thread_index: int, tag_index: int) -> dict:
+        tag = f"Tag-{thread_index}-{tag_index}"
+        alias = f"site/area/process/machine/{tag}"
+        return {
+            "alias": alias,
+            "messages": [
+                {
+                    "name": alias,
+                    # The value tells the tag, so a sample of another tag is detected
+                    "value": thread_index * 1000 + tag_index,
+                    "quality": "Good",
+                    "timestamp": f"2022-03-14 12:34:56.{message:06d}+00:00"
+                }
+                for message in range(MESSAGES_PER_PAYLOAD)
+            ]
+        }
+
+    def run_threads(self, send_function) -> None:
+        errors = []
+        barrier = threading.Barrier(THREADS)
+
+        def send_payloads(thread_index: int):
+            barrier.wait()
+            try:
+                for tag_index in range(TAGS_PER_THREAD):
+                    send_function(self.create_payload(thread_index, tag_index))
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=send_payloads, args=(index,)) for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def assert_tags(self, tag_values: list) -> None:
+        """
+        Every sample is written once, with the tag of its payload
+        """
+        expected = sorted(
+            (f"Tag-{thread_index}-{tag_index}", thread_index * 1000 + tag_index)
+            for thread_index in range(THREADS) for tag_index in range(TAGS_PER_THREAD)
+            for _ in range(MESSAGES_PER_PAYLOAD))
+        self.assertEqual(sorted(tag_values), expected)
+
+    def test_kinesis_target(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = KinesisTarget("connection", "opcda", self.hierarchy, "kinesis_stream", 1024, "kinesis")
+        target.sm_client = self.fake_stream_manager
+
+        self.run_threads(target.send_to_kinesis)
+
+        payloads = self.fake_stream_manager.streams["kinesis_stream"]
+        self.assertEqual(len(payloads), THREADS * TAGS_PER_THREAD)
+        self.assert_tags([(payload["tag"], message["value"])
+                          for payload in payloads for message in payload["messages"]])
+
+    def test_timestream_target(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = KinesisTarget("connection", "opcda", self.hierarchy, "timestream_stream", 1024, "timestream",
+                               is_timestream_kinesis=True, record_format="multi", linger_ms=60000,
+                               max_samples_per_record=7)
+        target.sm_client = self.fake_stream_manager
+
+        self.run_threads(target.send_to_kinesis)
+        target.flush(force=True)
+
+        self.assertFalse(target.has_pending())
+        records = self.fake_stream_manager.streams["timestream_stream"]
+        self.assert_tags([(tag, value) for record in records for measure in record["measures"]
+                          for tag, value in measure["values"].items()])
+
+    def test_iot_topic_target(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = IoTTopicTarget("connection", "opcda", self.hierarchy)
+        target.connector_client = self.fake_stream_manager
+
+        self.run_threads(target.send_to_iot)
+
+        tag_values = []
+        for topic, messages in self.fake_stream_manager.streams.items():
+            for message in messages:
+                payload = json.loads(message)
+                self.assertEqual(topic, f"m2c2/data/connection/machine/{payload['tag']}")
+                tag_values.extend((payload["tag"], sample["value"]) for sample in payload["messages"])
+        self.assert_tags(tag_values)
+
+    def test_iot_topic_target_batching(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = IoTTopicTarget("connection", "opcda", self.hierarchy, batching=True, batch_linger_ms=60000)
+        target.connector_client = self.fake_stream_manager
+        # Small batches, so the threads publish full batches while the others add payloads
+        target.max_batch_size = 4096
+
+        self.run_threads(target.send_to_iot)
+        target.flush(force=True)
+
+        self.assertFalse(target.has_pending())
+        batches = [json.loads(batch) for batch in self.fake_stream_manager.streams["m2c2/data/connection/batch"]]
+        self.assertGreater(len(batches), 1)
+        self.assert_tags([(payload["tag"], sample["value"]) for batch in batches
+                          for payload in batch["payloads"] for sample in payload["messages"]])
+
+    def test_sitewise_target(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = SiteWiseTarget("opcda", "sitewise_stream", max_entries=3, linger_ms=60000)
+        target.sm_helper_client = self.fake_stream_manager
+
+        self.run_threads(target.send_to_sitewise)
+        target.flush(force=True)
+
+        self.assertFalse(target.has_pending())
+        tag_values = []
+        for entry in self.fake_stream_manager.streams["sitewise_stream"]:
+            tag = entry["propertyAlias"].rsplit("/", 1)[-1]
+            tag_values.extend((tag, value["value"]["integerValue"]) for value in entry["propertyValues"])
+        self.assert_tags(tag_values)
+
+    def test_historian_target(self, mock_stream_manager_helper, mock_endpoint_client):
+        target = HistorianTarget("connection", "opcda", self.hierarchy, "historian_stream", 1024, "historian",
+                                 "collector")
+        target.sm_client = self.fake_stream_manager
+
+        self.run_threads(target.send_to_kinesis)
+
+        self.assert_tags([(record["measurementId"], record["value"])
+                          for record in self.fake_stream_manager.streams["historian_stream"]])
@@ -0,0 +1,96 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest import mock, TestCase
+from target_cursor import TargetCursor
+
+
+class TestTargetCursor(TestCase):
+    def setUp(self):
+        self.checkpoint_client = mock.MagicMock()
+        self.checkpoint_client.retrieve_checkpoint.return_value = None
+        self.cursor = TargetCursor("kinesis", "test_stream", self.checkpoint_client, retry_base_delay=1,
+                                   retry_max_delay=8, max_lag=100, metrics_prefix="test_publisher")
+
+    def test_start(self):
+        self.cursor.start(10)
+        self.assertEqual(self.cursor.sequence_number, 10)
+        self.assertEqual(self.cursor.committed_sequence_number, 9)
+
+        self.checkpoint_client.retrieve_checkpoint.return_value = 20
+        self.cursor.start(10)
+        self.checkpoint_client.retrieve_checkpoint.assert_called_with("test_stream", "cursor.kinesis")
+        self.assertEqual(self.cursor.sequence_number, 21)
+
+    def test_retry_backoff(self):
+        self.cursor.start(10)
+        with mock.patch("target_cursor.time.monotonic", return_value=100):
+            delays = []
+            for _ in range(5):
+                self.cursor.failed(Exception("throttled"))
+                delays.append(self.cursor.retry_time - 100)
+            self.assertEqual(delays, [1, 2, 4, 8, 8])
+            self.assertFalse(self.cursor.ready())
+            self.assertEqual(self.cursor.wait_ms(), 8000)
+            self.assertTrue(self.cursor.ready(now=108))
+
+        self.cursor.sent(10)
+        self.assertEqual(self.cursor.sequence_number, 11)
+        self.assertEqual(self.cursor.failures, 0)
+        self.assertTrue(self.cursor.ready())
+        self.assertEqual(self.cursor.wait_ms(), 0)
+
+    def test_failed_goes_back_to_checkpoint(self):
+        self.cursor.start(10)
+        self.cursor.sent(10)
+        self.cursor.commit(pending=False)
+        self.cursor.sent(11)
+        self.cursor.sent(12)
+        self.assertTrue(self.cursor.has_uncommitted())
+
+        # The messages taken since the last checkpoint are sent again
+        self.cursor.failed(Exception("publish not confirmed"))
+        self.assertEqual(self.cursor.sequence_number, 11)
+        self.assertFalse(self.cursor.has_uncommitted())
+
+    def test_commit(self):
+        self.cursor.start(10)
+        self.cursor.sent(10)
+        self.cursor.sent(11)
+
+        # Buffered messages are not checkpointed
+        self.cursor.commit(pending=True)
+        self.checkpoint_client.write_checkpoints.assert_not_called()
+
+        self.cursor.commit(pending=False)
+        self.checkpoint_client.write_checkpoints.assert_called_once_with("test_stream", "cursor.kinesis", 11)
+        self.assertEqual(self.cursor.committed_sequence_number, 11)
+
+        # Nothing new to checkpoint
+        self.cursor.commit(pending=False)
+        self.checkpoint_client.write_checkpoints.assert_called_once()
+
+    def test_skip_and_move(self):
+        self.cursor.start(10)
+        self.cursor.skip(10, Exception("bad payload"))
+        self.assertEqual(self.cursor.sequence_number, 11)
+
+        self.cursor.move_to(50)
+        self.assertEqual(self.cursor.sequence_number, 50)
+
+    def test_update_lag(self):
+        self.cursor.start(10)
+        self.cursor.update_lag(newest_sequence_number=60, head_sequence_number=61)
+        self.assertFalse(self.cursor.flagged)
+
+        # Too far behind the newest cursor
+        self.cursor.update_lag(newest_sequence_number=200, head_sequence_number=111)
+        self.assertTrue(self.cursor.flagged)
+
+        # Flagged until it is back within half of the maximum lag
+        self.cursor.move_to(50)
+        self.cursor.update_lag(newest_sequence_number=200, head_sequence_number=111)
+        self.assertTrue(self.cursor.flagged)
+        self.cursor.move_to(70)
+        self.cursor.update_lag(newest_sequence_number=200, head_sequence_number=111)
+        self.assertFalse(self.cursor.flagged)
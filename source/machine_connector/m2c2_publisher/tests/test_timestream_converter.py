@@ -6,6 +6,7 @@ import unittest
 from dateutil import parser
 from converters.timestream_converter import TimestreamConverter
 from utils.custom_exception import ConverterException
+from utils.metadata_template import MetadataTemplate
 
 
 class TestTimestreamConverter(unittest.TestCase):
@@ -47,6 +48,66 @@ class TestTimestreamConverter(unittest.TestCase):
             "value": "mock"
         }])
 
+    def test_convert_timestream_format_metadata_template(self):
+        converter = TimestreamConverter(MetadataTemplate.from_hierarchy(self.hierarchy))
+        payload = {
+            "messages": [{"quality": "Good", "value": 1, "timestamp": self.timestamp}],
+            **self.hierarchy
+        }
+
+        records = converter.convert_timestream_format(payload)
+        records[0]["site"] = "changed"
+
+        self.assertEqual(converter.convert_timestream_format(payload), [{
+            "site": "site",
+            "area": "area",
+            "process": "process",
+            "machine": "machine",
+            "tag": "MockTag",
+            "quality": "Good",
+            "timestamp": parser.parse(self.timestamp).timestamp() * 1000,
+            "value": 1
+        }])
+
+    def test_convert_multi_measure_format(self):
+        records = [
+            {"site": "site", "area": "area", "process": "process", "machine": machine, "tag": tag,
+             "quality": quality, "timestamp": timestamp, "value": value}
+            for machine, tag, quality, timestamp, value in [
+                ("machine", "tag-1", "Good", 1, 1.0),
+                ("machine", "tag-2", "Good", 1, "on"),
+                ("machine", "tag-3", "Bad", 1, 0),
+                ("machine", "tag-1", "Good", 2, 2.0),
+                ("other-machine", "tag-1", "Good", 1, 3.0)
+            ]
+        ]
+
+        multi_measure_records = self.timestream_converter.convert_multi_measure_format(records)
+
+        dimensions = {"site": "site", "area": "area", "process": "process"}
+        self.assertListEqual(multi_measure_records, [
+            {
+                **dimensions,
+                "machine": "machine",
+                "measures": [
+                    {"timestamp": 1, "quality": "Good", "values": {"tag-1": 1.0, "tag-2": "on"}},
+                    {"timestamp": 1, "quality": "Bad", "values": {"tag-3": 0}},
+                    {"timestamp": 2, "quality": "Good", "values": {"tag-1": 2.0}}
+                ]
+            },
+            {
+                **dimensions,
+                "machine": "other-machine",
+                "measures": [
+                    {"timestamp": 1, "quality": "Good", "values": {"tag-1": 3.0}}
+                ]
+            }
+        ])
+
+    def test_convert_multi_measure_format_error(self):
+        with self.assertRaises(ConverterException):
+            self.timestream_converter.convert_multi_measure_format([{"site": "site"}])
+
     def test_convert_timestream_format_error(self):
         with self.assertRaises(ConverterException):
             self.timestream_converter.convert_timestream_format({
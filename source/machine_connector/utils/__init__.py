@@ -1,9 +1,12 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from .client import AWSEndpointClient
+from .client import AWSEndpointClient, get_ipc_client
 from .pickle_checkpoint_manager import PickleCheckpointManager
 from .stream_manager_helper import StreamManagerHelperClient
 from .init_msg_metadata import InitMessage
+from .metadata_template import MetadataTemplate
+from .message_spool import MessageSpool
+from .metrics import MetricsRegistry, MetricsReporter, get_registry
 
 __version__ = "4.2.3"
@@ -4,16 +4,95 @@
 import logging
 import json
 import os
+import threading
 import awsiot.greengrasscoreipc
 
+from concurrent.futures import Future
+
 from awsiot.greengrasscoreipc.model import (
+    JsonMessage,
+    PublishMessage,
     PublishToIoTCoreRequest,
+    PublishToTopicRequest,
     QOS
 )
 from datetime import datetime
+from typing import Union
 from utils.custom_exception import FileException
 from utils.constants import WORK_BASE_DIR
 
+# Maximum number of IoT Core publishes waiting for their response, shared by the process
+IOT_PUBLISH_MAX_IN_FLIGHT = int(os.getenv("IOT_PUBLISH_MAX_IN_FLIGHT", "64"))
+# IoT Core publish QoS, 0 (at most once) or 1 (at least once)
+IOT_PUBLISH_QOS = os.getenv("IOT_PUBLISH_QOS", "0")
+# Seconds to wait for an in-flight slot before a publish is rejected
+IOT_PUBLISH_TIMEOUT = 10
+
+_ipc_client = None
+_ipc_client_lock = threading.Lock()
+
+
+def get_ipc_client():
+    """
+    Returns the Greengrass IPC client of the process.
+    The connection is opened on the first call and reused afterwards.
+    """
+    global _ipc_client
+
+    with _ipc_client_lock:
+        if _ipc_client is None:
+            _ipc_client = awsiot.greengrasscoreipc.connect()
+        return _ipc_client
+
+
+class _PublishPipeline:
+    """
+    Bounds the IoT Core publishes in flight on the shared IPC connection and accounts for their completions.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.published = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        if not self._slots.acquire(timeout=timeout):
+            with self._condition:
+                self.rejected += 1
+            return False
+
+        with self._condition:
+            self.in_flight += 1
+        return True
+
+    def release(self, succeeded: bool) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if succeeded:
+                self.published += 1
+            else:
+                self.failed += 1
+            self._condition.notify_all()
+        self._slots.release()
+
+    def wait(self, timeout: Union[float, None]) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self.in_flight == 0, timeout)
+
+
+_publish_pipeline = _PublishPipeline(IOT_PUBLISH_MAX_IN_FLIGHT)
+
+
+def _failed_future(err: Exception) -> Future:
+    future = Future()
+    future.set_exception(err)
+    return future
+
 
 class AWSEndpointClient:
     CONFIG_FILE_NAME = "connector-config.json"
@@ -26,8 +105,22 @@ class AWSEndpointClient:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
-        # Greengrass IPC client
-        self.ipc_client = awsiot.greengrasscoreipc.connect()
+        # Greengrass IPC client, shared by every client in the process
+        self._ipc_client = None
+
+    @property
+    def ipc_client(self):
+        """
+        The Greengrass IPC client connects on first use, so a client which never publishes,
+        e.g. in a publisher conversion worker, does not connect.
+        """
+        if self._ipc_client is None:
+            self._ipc_client = get_ipc_client()
+        return self._ipc_client
+
+    @ipc_client.setter
+    def ipc_client(self, ipc_client) -> None:
+        self._ipc_client = ipc_client
 
     def start_client(self, connection_name: str, connection_configuration: dict) -> None:
         """
@@ -46,26 +139,97 @@ class AWSEndpointClient:
         """
         self.is_running = False
 
-    def publish_message_to_iot_topic(self, topic: str, payload: dict) -> None:
+    def publish_message_to_iot_topic(self, topic: str, payload: Union[dict, bytes], qos: str = None) -> Future:
         """
         Publishes a message to the IoT topic.
         For more information, refer to
         https://docs.aws.amazon.com/greengrass/v2/developerguide/ipc-iot-core-mqtt.html#ipc-operation-publishtoiotcore
 
+        The publish is pipelined: it returns once the request is handed to the IPC connection,
+        and the response is handled asynchronously. When `IOT_PUBLISH_MAX_IN_FLIGHT` publishes are waiting
+        for their responses, it blocks until one completes.
+
         :param topic: The IoT topic to publish the payload.
-        :param payload: The payload to publish.
+        :param payload: The payload to publish, or the payload already serialized to JSON bytes.
+        :param qos: "0" (at most once) or "1" (at least once). Defaults to the `IOT_PUBLISH_QOS` environment variable.
+        :return: The future of the publish response. A publish which was rejected, or could not be handed
+            to the IPC connection, returns a future which already holds the error.
         """
+        if not _publish_pipeline.acquire(IOT_PUBLISH_TIMEOUT):
+            self.logger.error(
+                "Failed to publish message to the IoT topic: %s. Error: too many publishes in flight", topic)
+            return _failed_future(TimeoutError("too many publishes in flight"))
+
         try:
             request = PublishToIoTCoreRequest()
             request.topic_name = topic
-            request.payload = bytes(json.dumps(payload), "utf-8")
-            request.qos = QOS.AT_MOST_ONCE
+            request.payload = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+            request.qos = QOS.AT_LEAST_ONCE if (qos or IOT_PUBLISH_QOS) == "1" else QOS.AT_MOST_ONCE
 
             operation = self.ipc_client.new_publish_to_iot_core()
             operation.activate(request)
+            response = operation.get_response()
+            response.add_done_callback(
+                lambda future: self._on_publish_complete(topic, future))
+            return response
+        except Exception as err:
+            _publish_pipeline.release(False)
+            self.logger.error(
+                "Failed to publish message to the IoT topic: %s. Error: %s", topic, err
+            )
+            return _failed_future(err)
+
+    def publish_message_to_local_topic(self, topic: str, payload: dict) -> None:
+        """
+        Publishes a message to a local Greengrass publish/subscribe topic.
+        For more information, refer to
+        https://docs.aws.amazon.com/greengrass/v2/developerguide/ipc-publish-subscribe.html
+
+        :param topic: The local topic to publish the payload.
+        :param payload: The payload to publish.
+        """
+        try:
+            request = PublishToTopicRequest()
+            request.topic = topic
+            request.publish_message = PublishMessage(
+                json_message=JsonMessage(message=payload))
+
+            operation = self.ipc_client.new_publish_to_topic()
+            operation.activate(request)
         except Exception as err:
             self.logger.error(
-                f"Failed to publish message to the IoT topic: {topic}. Error: {err}"
+                "Failed to publish message to the local topic: %s. Error: %s", topic, err
+            )
+
+    def flush_publishes(self, timeout: float = None) -> bool:
+        """
+        Waits until every publish in flight has completed.
+
+        :param timeout: The maximum time to wait, `None` waits forever
+        :return: `True` when no publish is in flight
+        """
+        return _publish_pipeline.wait(timeout)
+
+    def get_publish_stats(self) -> dict:
+        """
+        Returns the IoT Core publish counters of the process.
+
+        :return: The number of published, failed, rejected and in-flight publishes
+        """
+        return {
+            "published": _publish_pipeline.published,
+            "failed": _publish_pipeline.failed,
+            "rejected": _publish_pipeline.rejected,
+            "in_flight": _publish_pipeline.in_flight
+        }
+
+    def _on_publish_complete(self, topic: str, future) -> None:
+        err = future.exception()
+        _publish_pipeline.release(err is None)
+
+        if err is not None:
+            self.logger.error(
+                "Failed to publish message to the IoT topic: %s. Error: %s", topic, err
             )
 
     def read_local_connection_configuration(self, connection_name: str) -> dict:
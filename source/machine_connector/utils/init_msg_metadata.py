@@ -1,25 +1,20 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import os
+from utils.metadata_template import MetadataTemplate
 
 
 class InitMessage:
 
     def __init__(self):
-        # Site name from Greengrass Lambda Environment variables
-        self.SITE_NAME = os.environ["SITE_NAME"]
-        # Area from Greengrass Lambda Environment variables
-        self.AREA = os.environ["AREA"]
-        # Process from Greengrass Lambda Environment variables
-        self.PROCESS = os.environ["PROCESS"]
-        # Machine name from Greengrass Lambda Environment variables
-        self.MACHINE_NAME = os.environ["MACHINE_NAME"]
+        # Site name, area, process and machine name from Greengrass Lambda Environment variables, read once
+        self.metadata_template = MetadataTemplate.from_environment()
+        self.SITE_NAME = self.metadata_template.site_name
+        self.AREA = self.metadata_template.area
+        self.PROCESS = self.metadata_template.process
+        self.MACHINE_NAME = self.metadata_template.machine_name
 
     def init_user_message(self) -> dict:
-        self.user_message = {}
-        self.user_message["siteName"] = self.SITE_NAME
-        self.user_message["area"] = self.AREA
-        self.user_message["process"] = self.PROCESS
-        self.user_message["machineName"] = self.MACHINE_NAME
+        # A copy, as the callers add the message to it
+        self.user_message = dict(self.metadata_template.user_message)
         return (self.user_message)
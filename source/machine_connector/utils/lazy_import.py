@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+"""
+    Defers heavy imports and client connections until they are used, so a component starts quickly.
+        OpenOPC = lazy_import("OpenOPC")
+        message_sender = LazyObject(MessageSender)
+    The first attribute access or call creates the object. `resolve_concurrently` creates several lazy objects
+    at once, e.g. to connect the clients and import the protocol library of a connector in parallel.
+    Module globals holding lazy objects can still be replaced in tests, e.g. with `mock.patch`.
+"""
+
+
+class LazyObject:
+    def __init__(self, factory: Callable):
+        """
+        :param factory: Creates the object on first use
+        """
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_object", None)
+        object.__setattr__(self, "_resolved", False)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._resolved
+
+    def resolve(self):
+        """
+        :return: The object, which is created on the first call only
+        """
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    object.__setattr__(self, "_object", self._factory())
+                    object.__setattr__(self, "_resolved", True)
+        return self._object
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.resolve(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyObject {self._object!r}>" if self._resolved else f"<LazyObject {self._factory!r} unresolved>"
+
+
+def lazy_import(module_name: str, attribute: str = None) -> LazyObject:
+    """
+    :param module_name: The module to import on first use
+    :param attribute: An attribute of the module, e.g. a class, instead of the module itself
+    :return: The lazy module or attribute
+    """
+    def factory():
+        module = importlib.import_module(module_name)
+        return getattr(module, attribute) if attribute else module
+
+    return LazyObject(factory)
+
+
+def resolve_concurrently(*lazy_objects) -> None:
+    """
+    Resolves the lazy objects in parallel threads, so slow imports and connections overlap.
+    Objects which are not lazy, e.g. mocks in tests, are skipped.
+    Every object is resolved before the first error, if any, is raised.
+
+    :param lazy_objects: The lazy objects
+    """
+    pending = [lazy_object for lazy_object in lazy_objects
+               if isinstance(lazy_object, LazyObject) and not lazy_object.is_resolved]
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="resolve") as executor:
+        futures = [executor.submit(lazy_object.resolve) for lazy_object in pending]
+
+    for future in futures:
+        future.result()
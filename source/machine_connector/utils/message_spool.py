@@ -0,0 +1,272 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+
+from typing import Callable, Union
+
+"""
+    This is a local write-ahead spool for messages which could not be written to Greengrass Stream Manager.
+    Messages are appended to segmented, append-only files in the spool directory:
+    {
+        "0000000001.seg": [header | payload], [header | payload], ...
+        "0000000002.seg": ...
+        "cursor": "{segment} {offset}"
+    }
+    Each record header holds the payload length and the CRC32 of the payload, and the payload is the JSON message.
+    Only the newest segment is appended to. Segments are deleted once they are replayed,
+    and the oldest segments are dropped when the spool grows beyond its size cap.
+    The replay position is persisted in the cursor file, so records are replayed at least once after a crash.
+"""
+
+# Record header: payload length, CRC32 of the payload
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE_NAME = "cursor"
+# Max size of a single segment file (in bytes)
+DEFAULT_SEGMENT_SIZE = 8388608  # 8MB
+# Max size of the whole spool (in bytes)
+DEFAULT_MAX_SIZE = 536870912  # 512MB
+
+
+class MessageSpool:
+    def __init__(self, spool_dir: str, segment_size: int = DEFAULT_SEGMENT_SIZE, max_size: int = DEFAULT_MAX_SIZE,
+                 fsync: bool = False):
+        """
+        :param spool_dir: The directory of the segment files
+        :param segment_size: The size at which a new segment is started
+        :param max_size: The size cap of the spool, the oldest segments are dropped beyond it
+        :param fsync: Whether every append is synced to the disk, not only flushed to the operating system
+        """
+        self.spool_dir = spool_dir
+        self.segment_size = segment_size
+        self.max_size = max_size
+        self.fsync = fsync
+
+        self.dropped_bytes = 0
+        self.corrupted_records = 0
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        self._lock = threading.RLock()
+        self._read_file = None
+        self._write_file = None
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._recover()
+
+    @property
+    def size(self) -> int:
+        """The size of the spool on the disk (in bytes)."""
+        return self._size
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._read_segment == self._write_segment and self._read_offset >= self._write_offset
+
+    def append(self, data: dict) -> None:
+        """
+        Appends a message to the newest segment.
+
+        :param data: The message to spool
+        """
+        payload = json.dumps(data).encode("utf-8")
+        record = RECORD_HEADER.pack(
+            len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            if self._write_offset > 0 and self._write_offset + len(record) > self.segment_size:
+                self._rotate()
+
+            self._write_file.write(record)
+            self._write_file.flush()
+            if self.fsync:
+                os.fsync(self._write_file.fileno())
+
+            self._write_offset += len(record)
+            self._size += len(record)
+            self._enforce_max_size()
+
+    def replay(self, write_callback: Callable[[dict], None], max_records: Union[int, None] = None) -> int:
+        """
+        Replays the spooled messages in order.
+        Replay stops at the first message the callback fails to write, and that message is replayed next time.
+
+        :param write_callback: Writes a message, and raises when it fails
+        :param max_records: The maximum number of messages to replay, `None` replays everything
+        :return: The number of messages replayed
+        :raises: The error of the write callback
+        """
+        replayed = 0
+
+        with self._lock:
+            try:
+                while max_records is None or replayed < max_records:
+                    record = self._next_record()
+                    if record is None:
+                        break
+
+                    data, next_offset = record
+                    write_callback(data)
+                    self._read_offset = next_offset
+                    replayed += 1
+            finally:
+                if replayed:
+                    self._write_cursor()
+
+        return replayed
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_cursor()
+            for file in (self._read_file, self._write_file):
+                if file:
+                    file.close()
+            self._read_file = None
+            self._write_file = None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.spool_dir, f"{segment:010d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> list:
+        return sorted(
+            int(file_name[:-len(SEGMENT_SUFFIX)])
+            for file_name in os.listdir(self.spool_dir)
+            if file_name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _read_cursor(self) -> tuple:
+        try:
+            with open(os.path.join(self.spool_dir, CURSOR_FILE_NAME)) as file:
+                segment, offset = file.read().split()
+                return int(segment), int(offset)
+        except Exception:
+            return None, 0
+
+    def _write_cursor(self) -> None:
+        cursor_file = os.path.join(self.spool_dir, CURSOR_FILE_NAME)
+        with open(f"{cursor_file}.tmp", "w") as file:
+            file.write(f"{self._read_segment} {self._read_offset}")
+        os.replace(f"{cursor_file}.tmp", cursor_file)
+
+    def _recover(self) -> None:
+        """
+        Restores the spool state from the disk.
+        A record torn by a crash during an append is truncated from the newest segment.
+        """
+        segments = self._list_segments() or [1]
+        cursor_segment, cursor_offset = self._read_cursor()
+
+        if cursor_segment not in segments:
+            cursor_segment, cursor_offset = segments[0], 0
+
+        for segment in [segment for segment in segments if segment < cursor_segment]:
+            os.remove(self._segment_path(segment))
+        segments = [segment for segment in segments if segment >= cursor_segment]
+
+        self._write_segment = segments[-1]
+        write_path = self._segment_path(self._write_segment)
+        self._write_offset = self._find_valid_end(write_path)
+
+        if os.path.exists(write_path) and os.path.getsize(write_path) > self._write_offset:
+            self.logger.warning(
+                "Truncating a torn record at offset {} of the spool segment {}".format(
+                    self._write_offset, write_path))
+            self.corrupted_records += 1
+            with open(write_path, "r+b") as file:
+                file.truncate(self._write_offset)
+
+        self._write_file = open(write_path, "ab")
+        self._read_segment = cursor_segment
+        self._read_offset = min(cursor_offset, self._write_offset) \
+            if cursor_segment == self._write_segment else cursor_offset
+        self._size = sum(os.path.getsize(self._segment_path(segment))
+                         for segment in segments)
+
+    def _find_valid_end(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+
+        valid_end = 0
+        with open(path, "rb") as file:
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return valid_end
+
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return valid_end
+
+                valid_end += RECORD_HEADER.size + length
+
+    def _rotate(self) -> None:
+        self._write_file.close()
+        self._write_segment += 1
+        self._write_offset = 0
+        self._write_file = open(self._segment_path(self._write_segment), "ab")
+
+    def _enforce_max_size(self) -> None:
+        while self._size > self.max_size and self._read_segment < self._write_segment:
+            dropped_path = self._segment_path(self._read_segment)
+            dropped_size = os.path.getsize(dropped_path)
+            self.logger.warning(
+                "The spool exceeded {} bytes, dropping the oldest segment {}".format(
+                    self.max_size, dropped_path))
+            self._advance_segment()
+            self.dropped_bytes += dropped_size
+
+    def _advance_segment(self) -> None:
+        if self._read_file:
+            self._read_file.close()
+            self._read_file = None
+
+        read_path = self._segment_path(self._read_segment)
+        self._size -= os.path.getsize(read_path)
+        os.remove(read_path)
+
+        self._read_segment += 1
+        self._read_offset = 0
+        self._write_cursor()
+
+    def _next_record(self) -> Union[tuple, None]:
+        while True:
+            if self._read_segment == self._write_segment and self._read_offset >= self._write_offset:
+                return None
+
+            if self._read_file is None:
+                self._read_file = open(
+                    self._segment_path(self._read_segment), "rb")
+
+            self._read_file.seek(self._read_offset)
+            header = self._read_file.read(RECORD_HEADER.size)
+
+            if len(header) == RECORD_HEADER.size:
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = self._read_file.read(length)
+
+                if len(payload) == length and zlib.crc32(payload) == crc:
+                    return json.loads(payload), self._read_offset + RECORD_HEADER.size + length
+
+            if self._read_segment == self._write_segment:
+                # Appends are complete records, so this only happens when the segment is corrupted on the disk.
+                self.corrupted_records += 1
+                self.logger.error(
+                    "Skipping a corrupted record at offset {} of the spool segment {}".format(
+                        self._read_offset, self._read_segment))
+                self._read_offset = self._write_offset
+                return None
+
+            if header:
+                self.corrupted_records += 1
+                self.logger.error(
+                    "Skipping the rest of the corrupted spool segment {} from offset {}".format(
+                        self._read_segment, self._read_offset))
+            self._advance_segment()
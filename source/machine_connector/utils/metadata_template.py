@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+from functools import lru_cache
+
+"""
+    The metadata of a connection, i.e. its site name, area, process and machine name, is the same for every message.
+    A `MetadataTemplate` is built once per connection, and holds the connection-level parts of the aliases,
+    topics, Timestream records and historian records. The converters only add the tag, and the per-tag
+    results are cached in a bounded LRU cache, as a connection has a limited set of tags.
+"""
+
+# Maximum number of tags with cached metadata per template and kind of metadata
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "4096"))
+
+
+class MetadataTemplate:
+    def __init__(self, site_name: str, area: str, process: str, machine_name: str, connection_name: str = None,
+                 cache_size: int = METADATA_CACHE_SIZE):
+        """
+        :param site_name: The site name
+        :param area: The area
+        :param process: The process
+        :param machine_name: The machine name
+        :param connection_name: The connection name, required for the topics and historian records
+        :param cache_size: The maximum number of tags with cached metadata per kind of metadata
+        """
+        self.site_name = site_name
+        self.area = area
+        self.process = process
+        self.machine_name = machine_name
+        self.connection_name = connection_name
+
+        self.alias_prefix = f"{site_name}/{area}/{process}/{machine_name}/"
+        self.topic_prefix = f"m2c2/data/{connection_name}/{machine_name}/"
+        # The payload metadata of the solution format
+        self.metadata = {
+            "site_name": site_name,
+            "area": area,
+            "process": process,
+            "machine_name": machine_name
+        }
+        # The dimensions of the Timestream records
+        self.timestream_dimensions = {
+            "site": site_name,
+            "area": area,
+            "process": process,
+            "machine": machine_name
+        }
+        # The metadata of the info and error messages of the connectors
+        self.user_message = {
+            "siteName": site_name,
+            "area": area,
+            "process": process,
+            "machineName": machine_name
+        }
+
+        # The cached results are shared, so the callers copy them before changing them.
+        self.alias = lru_cache(maxsize=cache_size)(self._alias)
+        self.topic = lru_cache(maxsize=cache_size)(self._topic)
+        self.tag_metadata = lru_cache(maxsize=cache_size)(self._tag_metadata)
+        self.timestream_tag_dimensions = lru_cache(maxsize=cache_size)(self._timestream_tag_dimensions)
+        self.historian_header = lru_cache(maxsize=cache_size)(self._historian_header)
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy: dict, connection_name: str = None) -> 'MetadataTemplate':
+        """
+        :param hierarchy: The site name, area, process and machine name of the connection
+        :param connection_name: The connection name
+        :return: The template of the connection
+        """
+        return cls(hierarchy["site_name"], hierarchy["area"], hierarchy["process"], hierarchy["machine_name"],
+                   connection_name)
+
+    @classmethod
+    def from_environment(cls) -> 'MetadataTemplate':
+        """
+        :return: The template from the `SITE_NAME`, `AREA`, `PROCESS`, `MACHINE_NAME` and `CONNECTION_NAME`
+            component environment variables
+        """
+        return cls(os.environ["SITE_NAME"], os.environ["AREA"], os.environ["PROCESS"], os.environ["MACHINE_NAME"],
+                   os.getenv("CONNECTION_NAME"))
+
+    def _alias(self, tag: str) -> str:
+        return self.alias_prefix + tag
+
+    def _topic(self, tag: str) -> str:
+        return self.topic_prefix + tag
+
+    def _tag_metadata(self, tag: str) -> dict:
+        return {**self.metadata, "tag": tag}
+
+    def _timestream_tag_dimensions(self, tag: str) -> dict:
+        return {**self.timestream_dimensions, "tag": tag}
+
+    def _historian_header(self, tag: str, collector_id: str) -> dict:
+        return {
+            "sourceId": self.connection_name,
+            "collectorId": collector_id,
+            "measurementId": tag,
+            "measureName": tag
+        }
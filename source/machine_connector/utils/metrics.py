@@ -0,0 +1,299 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import nullcontext
+from typing import Callable, Union
+
+"""
+    This is a lightweight metrics registry for counters, gauges and latency histograms.
+    Metrics are looked up once and kept by the instrumented code:
+        write_ms = get_registry().histogram("stream_manager.write_ms")
+        with write_ms.time():
+            ...
+    When metrics are disabled, the registry hands out shared no-op metrics, so instrumented code costs
+    a method call which does nothing.
+"""
+
+# Whether metrics are collected
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+# Histogram values are recorded in microseconds.
+# Values below 2^(SUB_BUCKET_BITS + 1) are exact, and larger values fall into
+# 2^SUB_BUCKET_BITS sub-buckets per power of two, so the relative error stays below 1 / 2^SUB_BUCKET_BITS.
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+EXACT_LIMIT = SUB_BUCKET_COUNT << 1
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value: Union[int, float]) -> None:
+        self.value = value
+
+
+class Histogram:
+    """
+    HDR-style histogram with log-linear buckets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def record(self, value_ms: float) -> None:
+        """
+        :param value_ms: The value in milliseconds
+        """
+        value = max(0, int(value_ms * 1000))
+        index = _bucket_index(value)
+
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            self._count += 1
+            self._sum += value
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    def time(self) -> "_Timer":
+        """
+        :return: A context manager which records the time spent in it
+        """
+        return _Timer(self)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """
+        :param reset: Whether the histogram starts over after the snapshot
+        :return: The count, and the min, mean, max and percentile values in milliseconds
+        """
+        with self._lock:
+            buckets, count, total, min_value, max_value = \
+                self._buckets, self._count, self._sum, self._min, self._max
+            if reset:
+                self._reset()
+
+        if count == 0:
+            return {"count": 0}
+
+        snapshot = {
+            "count": count,
+            "min": min_value / 1000,
+            "mean": total / count / 1000,
+            "max": max_value / 1000
+        }
+
+        indexes = sorted(buckets)
+        for name, percentile in PERCENTILES.items():
+            rank = max(1, int(percentile * count + 0.5))
+            seen = 0
+            for index in indexes:
+                seen += buckets[index]
+                if seen >= rank:
+                    snapshot[name] = min(_bucket_value(index), max_value) / 1000
+                    break
+
+        return snapshot
+
+    def _reset(self) -> None:
+        self._buckets = {}
+        self._count = 0
+        self._sum = 0
+        self._min = float("inf")
+        self._max = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.histogram.record((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NoopMetric:
+    """
+    Stands in for every metric type when metrics are disabled.
+    """
+    _timer = nullcontext()
+
+    def inc(self, amount: int = 1) -> None:
+        pass
+
+    def set(self, value) -> None:
+        pass
+
+    def record(self, value_ms: float) -> None:
+        pass
+
+    def time(self):
+        return self._timer
+
+
+NOOP_METRIC = _NoopMetric()
+
+
+def _bucket_index(value: int) -> int:
+    if value < EXACT_LIMIT:
+        return value
+
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return EXACT_LIMIT + (shift - 1) * SUB_BUCKET_COUNT + (value >> shift) - SUB_BUCKET_COUNT
+
+
+def _bucket_value(index: int) -> int:
+    """
+    :return: The middle of the values which fall into the bucket
+    """
+    if index < EXACT_LIMIT:
+        return index
+
+    shift = (index - EXACT_LIMIT) // SUB_BUCKET_COUNT + 1
+    sub_bucket = (index - EXACT_LIMIT) % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT
+    return (sub_bucket << shift) + (1 << shift) // 2
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        """
+        :param enabled: Whether metrics are collected. When it is `False`, every metric is a no-op.
+        """
+        self.enabled = enabled
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Union[Counter, _NoopMetric]:
+        return self._get(self._counters, name, Counter)
+
+    def gauge(self, name: str) -> Union[Gauge, _NoopMetric]:
+        return self._get(self._gauges, name, Gauge)
+
+    def histogram(self, name: str) -> Union[Histogram, _NoopMetric]:
+        return self._get(self._histograms, name, Histogram)
+
+    def snapshot(self, reset_histograms: bool = False) -> dict:
+        """
+        Counters are cumulative. Histograms are cumulative as well, unless they are reset on every snapshot.
+
+        :param reset_histograms: Whether the histograms start over after the snapshot
+        :return: The values of every metric
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+
+        return {
+            "timestamp": time.time(),
+            "counters": {name: counter.value for name, counter in counters.items()},
+            "gauges": {name: gauge.value for name, gauge in gauges.items()},
+            "histograms": {name: histogram.snapshot(reset_histograms) for name, histogram in histograms.items()}
+        }
+
+    def _get(self, metrics: dict, name: str, metric_class: type):
+        if not self.enabled:
+            return NOOP_METRIC
+
+        with self._lock:
+            metric = metrics.get(name)
+            if metric is None:
+                metric = metrics[name] = metric_class()
+            return metric
+
+
+class MetricsReporter:
+    """
+    Writes periodic snapshots of a registry to a local file and/or hands them to a publish callback.
+    """
+
+    def __init__(self, registry: MetricsRegistry, interval: float, file_path: str = None,
+                 publish_callback: Callable[[dict], None] = None):
+        """
+        :param registry: The metrics registry
+        :param interval: The time between snapshots in seconds
+        :param file_path: The file which holds the latest snapshot
+        :param publish_callback: Receives every snapshot, e.g. to publish it to a Greengrass IPC topic
+        """
+        self.registry = registry
+        self.interval = interval
+        self.file_path = file_path
+        self.publish_callback = publish_callback
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="MetricsReporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def report(self) -> dict:
+        """
+        Takes a snapshot, and writes and publishes it.
+        Histograms are reset, so their values cover the last interval.
+
+        :return: The snapshot
+        """
+        snapshot = self.registry.snapshot(reset_histograms=True)
+
+        try:
+            if self.file_path:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                with open(f"{self.file_path}.tmp", "w") as file:
+                    json.dump(snapshot, file)
+                os.replace(f"{self.file_path}.tmp", self.file_path)
+
+            if self.publish_callback:
+                self.publish_callback(snapshot)
+        except Exception as err:
+            self.logger.error(f"Failed to report the metrics. Error: {err}")
+
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.report()
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """
+    :return: The metrics registry of the process
+    """
+    return _registry
@@ -57,17 +57,8 @@ class PickleCheckpointManager:
     def write_checkpoint_db(self, stream_name: str, checkpoint_type: str, sequence: int) -> None:
         try:
             all_checkpoints = self._read_checkpoints()
-            if stream_name in all_checkpoints:
-                if checkpoint_type in all_checkpoints[stream_name]:
-                    all_checkpoints[stream_name][checkpoint_type] = sequence
-                else:
-                    all_checkpoints[stream_name] = {
-                        checkpoint_type: sequence
-                    }
-            else:
-                all_checkpoints[stream_name] = {
-                    checkpoint_type: sequence
-                }
+            # The other checkpoints of the stream are kept
+            all_checkpoints.setdefault(stream_name, {})[checkpoint_type] = sequence
             with open(self.checkpoint_file, 'wb') as write_file:
                 pickle.dump(all_checkpoints, write_file)
         except Exception as err:
@@ -88,6 +79,15 @@ class PickleCheckpointManager:
                 "There was an issue retrieving checkpoints for stream {}: {}".format(stream_name, err))
             raise
 
+    def retrieve_checkpoint(self, stream_name: str, checkpoint: str):
+        # Gets a named checkpoint of a stream, e.g. the checkpoint of a target cursor, None when it does not exist
+        try:
+            return self.read_checkpoint_db(stream_name).get(checkpoint)
+        except Exception as err:
+            self.logger.error(
+                "There was an issue retrieving the checkpoint {} for stream {}: {}".format(checkpoint, stream_name, err))
+            raise
+
     def write_checkpoints(self, stream_name: str, checkpoint: str, value: int) -> None:
         try:
             self.write_checkpoint_db(stream_name, checkpoint, value)
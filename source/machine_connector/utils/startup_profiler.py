@@ -0,0 +1,153 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+from utils.metrics import get_registry
+
+"""
+    Times the startup of a component, from the start of the process to the first sample it sends.
+        profiler = get_startup_profiler()
+        with profiler.phase("connect_clients"):
+            ...
+        profiler.mark("first_sample")
+    The phase durations and the marks are logged once the first sample is sent, and are set as
+    `startup.<name>_ms` gauges. `summarize_import_times` reads the output of `python -X importtime`,
+    see `benchmarks/bench_startup.py`.
+"""
+
+# The mark after which the startup report is logged
+FIRST_SAMPLE = "first_sample"
+
+
+def _process_start_time() -> float:
+    """
+    :return: The start of the process on the monotonic clock, or the current time when it is not known
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # The process name may hold spaces, so the fields are split after it. The start time is the 22nd field.
+            fields = file.read().rsplit(")", 1)[1].split()
+        start_seconds = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_seconds
+        return time.monotonic() - max(age, 0)
+    except (AttributeError, IndexError, OSError, ValueError):
+        return time.monotonic()
+
+
+class StartupProfiler:
+    def __init__(self, start_time: float = None):
+        """
+        :param start_time: The start on the monotonic clock, the start of the process by default
+        """
+        self.start_time = _process_start_time() if start_time is None else start_time
+        # Phase name: duration (in milliseconds)
+        self.phases = {}
+        # Mark name: time since the start (in milliseconds)
+        self.marks = {}
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel(logging.INFO)
+
+        self._lock = threading.Lock()
+        self._metrics = get_registry()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times a startup phase. A phase which runs again adds to its duration.
+
+        :param name: The phase name
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration_ms = (time.monotonic() - start) * 1000
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + duration_ms
+            self._metrics.gauge(f"startup.{name}_ms").set(self.phases[name])
+
+    def mark(self, name: str) -> None:
+        """
+        Records the time since the start when it happens for the first time. Later calls return right away.
+
+        :param name: The mark name
+        """
+        if name in self.marks:
+            return
+
+        with self._lock:
+            if name in self.marks:
+                return
+            self.marks[name] = (time.monotonic() - self.start_time) * 1000
+
+        self._metrics.gauge(f"startup.{name}_ms").set(self.marks[name])
+        if name == FIRST_SAMPLE:
+            self.logger.info("Startup: %s", self.format_report())
+
+    def report(self) -> dict:
+        with self._lock:
+            return {"phases": dict(self.phases), "marks": dict(self.marks)}
+
+    def format_report(self) -> str:
+        report = self.report()
+        marks = [f"{name} at {value:.0f} ms" for name, value in report["marks"].items()]
+        phases = [f"{name} {value:.0f} ms" for name, value in report["phases"].items()]
+        return ", ".join(marks + phases)
+
+
+def summarize_import_times(lines: list, top: int = 10, module: str = None) -> list:
+    """
+    Summarizes the output of `python -X importtime`, which has lines like
+        import time: self [us] | cumulative | imported package
+        import time:       255 |        981 |   encodings
+
+    :param lines: The output lines
+    :param top: The number of imports to return
+    :param module: The imported module, the last import by default
+    :return: `(module, cumulative milliseconds)` of the slowest imports made by the imported module itself
+    """
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        columns = line[len("import time:"):].split("|")
+        if len(columns) != 3 or not columns[1].strip().isdigit():
+            continue
+
+        name = columns[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((depth, name.strip(), int(columns[1]) / 1000))
+
+    roots = [index for index, (_, name, _) in enumerate(imports) if module is None or name == module]
+    if not roots:
+        return []
+
+    # The line of the imported module follows the lines of its imports, and its own imports are one level deeper.
+    # The interpreter startup, e.g. `site`, comes before it.
+    root = roots[-1]
+    root_depth = imports[root][0]
+    direct_imports = []
+    for depth, name, cumulative_ms in reversed(imports[:root]):
+        if depth <= root_depth:
+            break
+        if depth == root_depth + 1:
+            direct_imports.append((name, cumulative_ms))
+
+    return sorted(direct_imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+_profiler = StartupProfiler()
+
+
+def get_startup_profiler() -> StartupProfiler:
+    """
+    :return: The startup profiler of the process
+    """
+    return _profiler
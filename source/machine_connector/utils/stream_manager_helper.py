@@ -4,6 +4,7 @@
 import asyncio
 import json
 import logging
+import threading
 import backoff
 
 from greengrasssdk.stream_manager import (
@@ -19,12 +20,17 @@ from greengrasssdk.stream_manager import (
     StreamManagerException
 )
 from utils.custom_exception import StreamManagerHelperException
+from utils.metrics import get_registry
 
 
 class StreamManagerHelperClient:
     """
-    Contains helper functions to create, read, and write from Greengrass Stream Manager
+    Contains helper functions to create, read, and write from Greengrass Stream Manager.
+    The helper holds no state per call, so threads can share it.
     """
+    # Reconnects are rare, so the helpers share the lock
+    _connect_lock = threading.Lock()
+
     @backoff.on_exception(backoff.expo,
                           (StreamManagerException,
                            ConnectFailedException,
@@ -34,6 +40,12 @@ class StreamManagerHelperClient:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(logging.INFO)
 
+        metrics = get_registry()
+        self._read_ms = metrics.histogram("stream_manager.read_ms")
+        self._read_messages = metrics.counter("stream_manager.read_messages")
+        self._write_ms = metrics.histogram("stream_manager.write_ms")
+        self._write_errors = metrics.counter("stream_manager.write_errors")
+
         try:
             self.client = StreamManagerClient()
         except Exception as err:
@@ -42,9 +54,28 @@ class StreamManagerHelperClient:
             self.client = None
 
     def __del__(self):
-        if self.client:
+        if getattr(self, "client", None):
             self.client.close()
 
+    def is_connected(self) -> bool:
+        """
+        Checks the Stream Manager connection, and tries to connect again when the client is missing.
+        Stream Manager restarts with the Greengrass nucleus, so the first connection can fail.
+        """
+        if getattr(self, "client", None) is None:
+            # Only one of the threads which find the client missing connects
+            with self._connect_lock:
+                if getattr(self, "client", None) is None:
+                    try:
+                        self.client = StreamManagerClient()
+                        self.logger.info("Connected to Stream Manager")
+                    except Exception as err:
+                        self.logger.error(
+                            "Unable to connect to Stream Manager. Error: %s", str(err))
+                        self.client = None
+
+        return self.client is not None
+
     def list_streams(self):
         try:
             existing_streams = self.client.list_streams()
@@ -69,73 +100,110 @@ class StreamManagerHelperClient:
             # so `InvalidRequestException` will happens when new connection is deployed.
             pass
         except Exception as err:
-            self.error_msg = "Unknown error happened, so your Stream Manager might not be working: {}".format(
+            error_msg = "Unknown error happened, so your Stream Manager might not be working: {}".format(
                 str(err))
-            self.logger.error(self.error_msg)
+            self.logger.error(error_msg)
             raise
 
-    @backoff.on_exception(backoff.expo,
-                          NotEnoughMessagesException)
-    def read_from_stream(self, stream_name: str, sequence: int, read_msg_number: int):
+    def read_from_stream(self, stream_name: str, sequence: int, read_msg_number: int, max_message_count: int = None,
+                         read_timeout_millis: int = 0):
         """
-        This gets the values from the stream
+        This gets the values from the stream.
+        With a read timeout, the read blocks in Stream Manager until `read_msg_number` messages are available
+        or the timeout passes, so the caller does not need to poll.
+
+        :param stream_name: The stream name
+        :param sequence: The sequence number of the first message to read
+        :param read_msg_number: The minimum number of messages to read
+        :param max_message_count: The maximum number of messages to read, `None` for the Stream Manager default
+        :param read_timeout_millis: The maximum time to wait for the messages (in milliseconds), 0 returns right away
+        :return: The messages, or an empty list when the stream does not hold enough messages in time
         """
         try:
-            self.msg = self.client.read_messages(stream_name,
-                                                 ReadMessagesOptions(
-                                                     desired_start_sequence_number=sequence,
-                                                     min_message_count=read_msg_number
-                                                 )
-                                                 )
-            self.logger.debug("Message read from stream: {}".format(self.msg))
-            return (self.msg)
+            # The messages stay local, so threads which share the client can read different streams
+            with self._read_ms.time():
+                messages = self.client.read_messages(stream_name,
+                                                     ReadMessagesOptions(
+                                                         desired_start_sequence_number=sequence,
+                                                         min_message_count=read_msg_number,
+                                                         max_message_count=max_message_count,
+                                                         read_timeout_millis=read_timeout_millis
+                                                     )
+                                                     )
+            self._read_messages.inc(len(messages))
+            self.logger.debug("Read %d messages from stream %s", len(messages), stream_name)
+            return messages
         except NotEnoughMessagesException as err:
             self.logger.debug(
-                "Encountered an error when reading from stream {}: {}".format(stream_name, err))
-            self.msg = []
-            if "greater than the last sequence number" in err.message:
-                self.logger.debug("Trying to read sequence number {}. Current last sequence number in stream is {}".format(
-                    sequence,
-                    self.get_latest_sequence_number(stream_name)))
-            return (self.msg)
+                "Encountered an error when reading from stream %s: %s", stream_name, err)
+            # Describing the stream is only worth it when the message gets logged, and it must not fail the read
+            if self.logger.isEnabledFor(logging.DEBUG) and "greater than the last sequence number" in str(err):
+                try:
+                    self.logger.debug("Trying to read sequence number %s. Current last sequence number in stream is %s",
+                                      sequence, self.get_latest_sequence_number(stream_name))
+                except StreamManagerHelperException:
+                    pass
+            return []
         except Exception as err:
             # TODO: Retry reading
-            self.error_msg = "Encountered an error when trying to read from stream {}: {}".format(
+            error_msg = "Encountered an error when trying to read from stream {}: {}".format(
                 err, stream_name)
-            self.logger.debug(self.error_msg)
+            self.logger.debug(error_msg)
             raise
 
     def write_to_stream(self, stream_name: str, data: dict):
         try:
-            self.client.append_message(
-                stream_name=stream_name,
-                data=json.dumps(data).encode('utf-8')
-            )
+            if not self.is_connected():
+                raise StreamManagerHelperException(
+                    "Stream Manager is not connected")
+
+            with self._write_ms.time():
+                self.client.append_message(
+                    stream_name=stream_name,
+                    data=json.dumps(data).encode('utf-8')
+                )
             return
         except Exception as err:
-            self.error_msg = "Encountered an error when writing to stream {}: {}".format(
+            self._write_errors.inc()
+            error_msg = "Encountered an error when writing to stream {}: {}".format(
                 stream_name, err)
-            self.logger.error(self.error_msg)
-            raise StreamManagerHelperException(self.error_msg) from err
+            self.logger.error(error_msg)
+            raise StreamManagerHelperException(error_msg) from err
 
     def get_oldest_sequence_number(self, stream_name: str):
         try:
-            self.oldest_seq_num = self.client.describe_message_stream(
+            return self.client.describe_message_stream(
                 stream_name).storage_status.oldest_sequence_number
-            return (self.oldest_seq_num)
         except Exception as err:
-            self.error_msg = "Encountered an error when reading oldest sequence number from stream {}: {}".format(
+            error_msg = "Encountered an error when reading oldest sequence number from stream {}: {}".format(
                 stream_name, err)
-            self.logger.error(self.error_msg)
-            raise StreamManagerHelperException(self.error_msg) from err
+            self.logger.error(error_msg)
+            raise StreamManagerHelperException(error_msg) from err
 
     def get_latest_sequence_number(self, stream_name: str):
         try:
-            self.newest_seq_num = self.client.describe_message_stream(
+            return self.client.describe_message_stream(
                 stream_name).storage_status.newest_sequence_number
-            return (self.newest_seq_num)
         except Exception as err:
-            self.error_msg = "Encountered an error when reading newest sequence number from stream {}: {}".format(
+            error_msg = "Encountered an error when reading newest sequence number from stream {}: {}".format(
+                stream_name, err)
+            self.logger.error(error_msg)
+            raise StreamManagerHelperException(error_msg) from err
+
+    def get_stream_position(self, stream_name: str):
+        """
+        Gets the oldest and the newest sequence numbers with one stream description.
+        Both are `None` while the stream is empty.
+
+        :param stream_name: The stream name
+        :return: The oldest and the newest sequence numbers
+        """
+        try:
+            storage_status = self.client.describe_message_stream(
+                stream_name).storage_status
+            return (storage_status.oldest_sequence_number, storage_status.newest_sequence_number)
+        except Exception as err:
+            error_msg = "Encountered an error when reading the sequence numbers from stream {}: {}".format(
                 stream_name, err)
-            self.logger.error(self.error_msg)
-            raise StreamManagerHelperException(self.error_msg) from err
+            self.logger.error(error_msg)
+            raise StreamManagerHelperException(error_msg) from err
@@ -141,3 +141,43 @@ def test_write_local_connection_configuration_file_exception():
     with pytest.raises(Exception):
         aws_endpoint_client.write_local_connection_configuration_file(connection_name=connection_name,
                                                                       connection_configuration=connection_data)
+
+
+def test_ipc_client_is_shared():
+    from client import AWSEndpointClient
+    assert AWSEndpointClient().ipc_client is AWSEndpointClient().ipc_client
+
+
+def test_publish_pipeline_completion():
+    from concurrent.futures import Future
+    import client
+    pipeline = client._PublishPipeline(2)
+    with mock.patch.object(client, "_publish_pipeline", pipeline):
+        aws_endpoint_client = client.AWSEndpointClient()
+        aws_endpoint_client.ipc_client = mock.MagicMock()
+        responses = [Future(), Future()]
+        aws_endpoint_client.ipc_client.new_publish_to_iot_core.return_value.get_response.side_effect = responses
+        assert aws_endpoint_client.publish_message_to_iot_topic("test/topic1", {"key": "value"}) is responses[0]
+        aws_endpoint_client.publish_message_to_iot_topic("test/topic2", b'{"key": "value"}', qos="1")
+        assert aws_endpoint_client.get_publish_stats()["in_flight"] == 2
+        assert not aws_endpoint_client.flush_publishes(timeout=0)
+
+        responses[0].set_result(None)
+        responses[1].set_exception(Exception("Throttled"))
+
+        assert aws_endpoint_client.flush_publishes(timeout=0)
+        assert aws_endpoint_client.get_publish_stats() == {
+            "published": 1, "failed": 1, "rejected": 0, "in_flight": 0}
+
+
+def test_publish_pipeline_bounded():
+    import client
+    pipeline = client._PublishPipeline(1)
+    with mock.patch.object(client, "_publish_pipeline", pipeline), mock.patch.object(client, "IOT_PUBLISH_TIMEOUT", 0):
+        aws_endpoint_client = client.AWSEndpointClient()
+        aws_endpoint_client.ipc_client = mock.MagicMock()
+        aws_endpoint_client.publish_message_to_iot_topic("test/topic1", {"key": "value"})
+        response = aws_endpoint_client.publish_message_to_iot_topic("test/topic1", {"key": "value"})
+        assert aws_endpoint_client.ipc_client.new_publish_to_iot_core.call_count == 1
+        assert aws_endpoint_client.get_publish_stats()["rejected"] == 1
+        assert isinstance(response.exception(), TimeoutError)
@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import sys
+import threading
+import time
+from unittest import mock, TestCase
+from ..lazy_import import LazyObject, lazy_import, resolve_concurrently
+
+
+class TestLazyImport(TestCase):
+
+    def test_lazy_object(self):
+        # Arrange
+        factory = mock.MagicMock()
+        lazy_object = LazyObject(factory)
+
+        # Assert the object is not created until it is used
+        factory.assert_not_called()
+        self.assertFalse(lazy_object.is_resolved)
+
+        # Act
+        lazy_object.send("message")
+        lazy_object.name = "test"
+        lazy_object("argument")
+
+        # Assert
+        factory.assert_called_once()
+        self.assertTrue(lazy_object.is_resolved)
+        factory.return_value.send.assert_called_once_with("message")
+        self.assertEqual(factory.return_value.name, "test")
+        factory.return_value.assert_called_once_with("argument")
+
+    def test_lazy_import(self):
+        # Arrange
+        sys.modules.pop("colorsys", None)
+        lazy_module = lazy_import("colorsys")
+        lazy_function = lazy_import("colorsys", "rgb_to_hsv")
+
+        # Assert the module is not imported until it is used
+        self.assertNotIn("colorsys", sys.modules)
+
+        # Act, Assert
+        self.assertEqual(lazy_module.rgb_to_hsv(1, 0, 0), (0, 1, 1))
+        self.assertEqual(lazy_function(1, 0, 0), (0, 1, 1))
+        self.assertIn("colorsys", sys.modules)
+
+    def test_lazy_import_missing_module(self):
+        lazy_module = lazy_import("missing_module_for_test")
+
+        with self.assertRaises(ModuleNotFoundError):
+            lazy_module.attribute
+        self.assertFalse(lazy_module.is_resolved)
+
+    def test_resolve_concurrently(self):
+        # Arrange
+        thread_names = []
+        barrier = threading.Barrier(2, timeout=5)
+
+        def factory():
+            # Fails unless both factories run at the same time
+            barrier.wait()
+            thread_names.append(threading.current_thread().name)
+            return time.monotonic()
+
+        lazy_objects = [LazyObject(factory), LazyObject(factory)]
+
+        # Act
+        resolve_concurrently(*lazy_objects, mock.MagicMock())
+
+        # Assert
+        self.assertTrue(all(lazy_object.is_resolved for lazy_object in lazy_objects))
+        self.assertEqual(len(set(thread_names)), 2)
+
+    def test_resolve_concurrently_error(self):
+        # Arrange
+        failing_object = LazyObject(mock.MagicMock(side_effect=KeyError("socket")))
+        lazy_object = LazyObject(mock.MagicMock())
+
+        # Act, Assert
+        with self.assertRaises(KeyError):
+            resolve_concurrently(failing_object, lazy_object)
+        self.assertTrue(lazy_object.is_resolved)
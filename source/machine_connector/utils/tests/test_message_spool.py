@@ -0,0 +1,152 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import tempfile
+from unittest import mock, TestCase
+from ..message_spool import MessageSpool, RECORD_HEADER
+
+
+def build_data(index: int) -> dict:
+    return {"alias": f"tag-{index}", "messages": [{"value": index}]}
+
+
+class TestMessageSpool(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.spool_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append_and_replay(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir)
+        written = []
+        for i in range(3):
+            spool.append(build_data(i))
+
+        # Act
+        replayed = spool.replay(written.append)
+
+        # Assert
+        self.assertEqual(replayed, 3)
+        self.assertEqual(written, [build_data(i) for i in range(3)])
+        self.assertTrue(spool.is_empty())
+
+    def test_max_records(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir)
+        written = []
+        for i in range(3):
+            spool.append(build_data(i))
+
+        # Act
+        replayed = spool.replay(written.append, 2)
+
+        # Assert
+        self.assertEqual(replayed, 2)
+        self.assertFalse(spool.is_empty())
+
+    def test_rotate_segments(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir, segment_size=64)
+        written = []
+
+        # Act
+        for i in range(5):
+            spool.append(build_data(i))
+        segments = [file_name for file_name in os.listdir(self.spool_dir)
+                    if file_name.endswith(".seg")]
+        spool.replay(written.append)
+
+        # Assert
+        self.assertEqual(len(segments), 5)
+        self.assertEqual(written, [build_data(i) for i in range(5)])
+        self.assertEqual(len(os.listdir(self.spool_dir)), 2)
+
+    def test_max_size_drops_oldest_segments(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir, segment_size=64, max_size=128)
+        written = []
+
+        # Act
+        for i in range(5):
+            spool.append(build_data(i))
+        spool.replay(written.append)
+
+        # Assert
+        self.assertGreater(spool.dropped_bytes, 0)
+        self.assertLessEqual(spool.size, 128)
+        self.assertEqual(written[-1], build_data(4))
+        self.assertNotIn(build_data(0), written)
+
+    def test_replay_stops_on_failure(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir)
+        for i in range(3):
+            spool.append(build_data(i))
+        write_callback = mock.MagicMock(
+            side_effect=[None, Exception("Stream Manager is down")])
+
+        # Act
+        with self.assertRaises(Exception):
+            spool.replay(write_callback)
+        written = []
+        spool.replay(written.append)
+
+        # Assert
+        self.assertEqual(written, [build_data(1), build_data(2)])
+
+    def test_resume_after_restart(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir)
+        for i in range(3):
+            spool.append(build_data(i))
+        spool.replay(mock.MagicMock(), 1)
+        spool.close()
+
+        # Act
+        written = []
+        MessageSpool(self.spool_dir).replay(written.append)
+
+        # Assert
+        self.assertEqual(written, [build_data(1), build_data(2)])
+
+    def test_truncate_torn_record(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir)
+        spool.append(build_data(0))
+        spool.close()
+        segment_path = os.path.join(self.spool_dir, "0000000001.seg")
+        with open(segment_path, "ab") as file:
+            file.write(RECORD_HEADER.pack(100, 0) + b'{"alias"')
+
+        # Act
+        recovered_spool = MessageSpool(self.spool_dir)
+        recovered_spool.append(build_data(1))
+        written = []
+        recovered_spool.replay(written.append)
+
+        # Assert
+        self.assertEqual(recovered_spool.corrupted_records, 1)
+        self.assertEqual(written, [build_data(0), build_data(1)])
+
+    def test_skip_corrupted_segment(self):
+        # Arrange
+        spool = MessageSpool(self.spool_dir, segment_size=64)
+        for i in range(3):
+            spool.append(build_data(i))
+        segment_path = os.path.join(self.spool_dir, "0000000001.seg")
+        with open(segment_path, "r+b") as file:
+            file.seek(RECORD_HEADER.size)
+            file.write(b"X")
+
+        # Act
+        written = []
+        spool.replay(written.append)
+
+        # Assert
+        self.assertEqual(spool.corrupted_records, 1)
+        self.assertEqual(written, [build_data(1), build_data(2)])
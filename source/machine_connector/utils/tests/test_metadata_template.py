@@ -0,0 +1,59 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from unittest import mock, TestCase
+from ..metadata_template import MetadataTemplate
+
+
+class TestMetadataTemplate(TestCase):
+
+    def setUp(self):
+        self.template = MetadataTemplate("site", "area", "process", "machine", "connection")
+
+    def test_prefixes(self):
+        self.assertEqual(self.template.alias_prefix, "site/area/process/machine/")
+        self.assertEqual(self.template.topic_prefix, "m2c2/data/connection/machine/")
+        self.assertEqual(self.template.user_message, {
+            "siteName": "site", "area": "area", "process": "process", "machineName": "machine"})
+
+    def test_tag_metadata(self):
+        self.assertEqual(self.template.alias("tag"), "site/area/process/machine/tag")
+        self.assertEqual(self.template.topic("tag"), "m2c2/data/connection/machine/tag")
+        self.assertEqual(self.template.tag_metadata("tag"), {
+            "site_name": "site", "area": "area", "process": "process", "machine_name": "machine", "tag": "tag"})
+        self.assertEqual(self.template.timestream_tag_dimensions("tag"), {
+            "site": "site", "area": "area", "process": "process", "machine": "machine", "tag": "tag"})
+        self.assertEqual(self.template.historian_header("tag", "collector"), {
+            "sourceId": "connection", "collectorId": "collector", "measurementId": "tag", "measureName": "tag"})
+
+    def test_cache_is_bounded(self):
+        # Arrange
+        template = MetadataTemplate("site", "area", "process", "machine", "connection", cache_size=2)
+
+        # Act
+        first = template.tag_metadata("tag-1")
+        template.tag_metadata("tag-1")
+        template.tag_metadata("tag-2")
+        template.tag_metadata("tag-3")
+
+        # Assert, the cached metadata is reused until it is evicted
+        cache_info = template.tag_metadata.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.currsize, 2)
+        self.assertIsNot(template.tag_metadata("tag-1"), first)
+
+    def test_from_hierarchy(self):
+        template = MetadataTemplate.from_hierarchy(
+            {"site_name": "site", "area": "area", "process": "process", "machine_name": "machine"}, "connection")
+
+        self.assertEqual(template.alias_prefix, self.template.alias_prefix)
+        self.assertEqual(template.topic_prefix, self.template.topic_prefix)
+
+    @mock.patch.dict(os.environ, {"SITE_NAME": "site", "AREA": "area", "PROCESS": "process",
+                                  "MACHINE_NAME": "machine", "CONNECTION_NAME": "connection"})
+    def test_from_environment(self):
+        template = MetadataTemplate.from_environment()
+
+        self.assertEqual(template.metadata, self.template.metadata)
+        self.assertEqual(template.connection_name, "connection")
@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import tempfile
+from unittest import mock, TestCase
+from ..metrics import Histogram, MetricsRegistry, MetricsReporter, NOOP_METRIC
+
+
+class TestMetrics(TestCase):
+
+    def test_disabled_registry(self):
+        # Arrange
+        registry = MetricsRegistry(enabled=False)
+
+        # Act
+        counter = registry.counter("test.counter")
+        counter.inc()
+        with registry.histogram("test.histogram").time():
+            pass
+
+        # Assert
+        self.assertIs(counter, NOOP_METRIC)
+        self.assertEqual(registry.snapshot()["counters"], {})
+
+    def test_counter_and_gauge(self):
+        # Arrange
+        registry = MetricsRegistry(enabled=True)
+
+        # Act
+        registry.counter("test.counter").inc()
+        registry.counter("test.counter").inc(2)
+        registry.gauge("test.gauge").set(5)
+        snapshot = registry.snapshot()
+
+        # Assert
+        self.assertEqual(snapshot["counters"], {"test.counter": 3})
+        self.assertEqual(snapshot["gauges"], {"test.gauge": 5})
+
+    def test_histogram_percentiles(self):
+        # Arrange
+        histogram = Histogram()
+
+        # Act
+        for value_ms in range(1, 1001):
+            histogram.record(value_ms)
+        snapshot = histogram.snapshot()
+
+        # Assert
+        self.assertEqual(snapshot["count"], 1000)
+        self.assertEqual(snapshot["min"], 1)
+        self.assertEqual(snapshot["max"], 1000)
+        self.assertAlmostEqual(snapshot["mean"], 500.5)
+        self.assertAlmostEqual(snapshot["p50"], 500, delta=500 * 0.07)
+        self.assertAlmostEqual(snapshot["p99"], 990, delta=990 * 0.07)
+
+    def test_histogram_small_values_are_exact(self):
+        # Arrange
+        histogram = Histogram()
+
+        # Act
+        histogram.record(0.005)
+        histogram.record(0.005)
+        histogram.record(0.02)
+
+        # Assert
+        snapshot = histogram.snapshot(reset=True)
+        self.assertEqual(snapshot["p50"], 0.005)
+        self.assertEqual(snapshot["p999"], 0.02)
+        self.assertEqual(histogram.snapshot(), {"count": 0})
+
+    def test_reporter(self):
+        # Arrange
+        registry = MetricsRegistry(enabled=True)
+        registry.histogram("test.histogram").record(1)
+        publish_callback = mock.MagicMock()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "metrics", "metrics.json")
+            reporter = MetricsReporter(
+                registry, 60, file_path, publish_callback)
+
+            # Act
+            snapshot = reporter.report()
+
+            # Assert
+            with open(file_path) as file:
+                self.assertEqual(json.load(file), snapshot)
+        publish_callback.assert_called_once_with(snapshot)
+        self.assertEqual(snapshot["histograms"]["test.histogram"]["count"], 1)
+        self.assertEqual(registry.snapshot()["histograms"]["test.histogram"], {"count": 0})
@@ -3,6 +3,8 @@
 
 import datetime
 import logging
+import os
+import tempfile
 from unittest import mock, TestCase
 from ..pickle_checkpoint_manager import PickleCheckpointManager
 
@@ -102,3 +104,30 @@ class TestPickleCheckpointManager(TestCase):
         assert mock_file.call_count == 3
         mock_pickle_dump.assert_called_with(
             {'test-stream-name': {'trailing': 1}}, mock.ANY)
+
+    def test_write_checkpoints_keeps_other_checkpoints_after_restart(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Arrange
+            test_streammanager_filename = os.path.join(temp_dir, 'test-stream-checkpoints')
+            pcm = PickleCheckpointManager(test_streammanager_filename)
+
+            # Act
+            pcm.write_checkpoints('test-stream-name', 'trailing', 3)
+            pcm.write_checkpoints('test-stream-name', 'primary', 8)
+            restarted_pcm = PickleCheckpointManager(test_streammanager_filename)
+
+            # Assert
+            assert restarted_pcm.retrieve_checkpoints('test-stream-name') == (3, 8)
+
+    @mock.patch("os.path.getsize", return_value=1)
+    @mock.patch("pickle.load", return_value={'test-stream-name': {'trailing': 0, 'cursor.kinesis': 5}})
+    @mock.patch("builtins.open", new_callable=mock.mock_open, read_data="data")
+    def test_retrieve_checkpoint(self, mock_file, mock_pickle, mock_os_getsize):
+        # Arrange
+        test_streammanager_filename = 'test-stream-checkpoints'
+        pcm = PickleCheckpointManager(test_streammanager_filename)
+
+        # Act, Assert
+        self.assertEqual(pcm.retrieve_checkpoint('test-stream-name', 'cursor.kinesis'), 5)
+        self.assertIsNone(pcm.retrieve_checkpoint('test-stream-name', 'cursor.sitewise'))
+        self.assertIsNone(pcm.retrieve_checkpoint('other-stream-name', 'cursor.kinesis'))
@@ -0,0 +1,65 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+from unittest import mock, TestCase
+from ..startup_profiler import FIRST_SAMPLE, StartupProfiler, get_startup_profiler, summarize_import_times
+
+
+class TestStartupProfiler(TestCase):
+
+    def test_process_start(self):
+        # The process started before the profiler was created
+        self.assertLessEqual(get_startup_profiler().start_time, time.monotonic())
+
+    def test_phases_and_marks(self):
+        # Arrange
+        profiler = StartupProfiler(start_time=time.monotonic())
+
+        # Act
+        with profiler.phase("connect_clients"):
+            pass
+        with self.assertRaises(ValueError):
+            with profiler.phase("start_connection"):
+                raise ValueError("connection failed")
+        profiler.mark("imported")
+        imported = profiler.marks["imported"]
+        profiler.mark("imported")
+
+        # Assert
+        report = profiler.report()
+        self.assertEqual(set(report["phases"]), {"connect_clients", "start_connection"})
+        self.assertEqual(report["marks"], {"imported": imported})
+
+    def test_first_sample_report(self):
+        # Arrange
+        profiler = StartupProfiler(start_time=time.monotonic())
+        profiler.logger = mock.MagicMock()
+
+        # Act
+        profiler.mark(FIRST_SAMPLE)
+        profiler.mark(FIRST_SAMPLE)
+
+        # Assert
+        profiler.logger.info.assert_called_once()
+        self.assertIn("first_sample at", profiler.logger.info.call_args[0][1])
+
+    def test_summarize_import_times(self):
+        # Arrange
+        lines = [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       300 |        300 | site",
+            "import time:       100 |        100 |     awscrt",
+            "import time:      2000 |       2100 |   awsiot",
+            "import time:      5000 |       5000 |   OpenOPC",
+            "import time:       500 |       7600 | m2c2_opcda_connector",
+            "import time:      9000 |       9000 | multiprocessing",
+            "Unable to connect to Stream Manager."
+        ]
+
+        # Act, Assert
+        self.assertEqual(summarize_import_times(lines, module="m2c2_opcda_connector"),
+                         [("OpenOPC", 5.0), ("awsiot", 2.1)])
+        self.assertEqual(summarize_import_times(lines, top=1, module="m2c2_opcda_connector"), [("OpenOPC", 5.0)])
+        self.assertEqual(summarize_import_times(lines), [])
+        self.assertEqual(summarize_import_times(lines, module="missing"), [])
@@ -108,6 +108,17 @@ def test_write_to_stream():
     assert test_sm_client.client.append_message.called
 
 
+def test_write_to_stream_reconnect():
+    stream_name = "test_gg_stream"
+    data = {"test_key": "test-value"}
+    from stream_manager_helper import StreamManagerHelperClient
+    test_sm_client = StreamManagerHelperClient()
+    test_sm_client.client = None
+    test_sm_client.write_to_stream(stream_name=stream_name, data=data)
+    assert test_sm_client.is_connected()
+    assert test_sm_client.client.append_message.called
+
+
 def test_bad_data():
     stream_name = "test_gg_stream"
     data = b''
@@ -145,3 +156,14 @@ def test_get_last_sequence_number_no_stream():
     test_sm_client = StreamManagerHelperClient()
     with pytest.raises(Exception):
         test_sm_client.get_latest_sequence_number()
+
+
+def test_get_stream_position():
+    stream_name = "test_gg_stream"
+    from stream_manager_helper import StreamManagerHelperClient
+    test_sm_client = StreamManagerHelperClient()
+    storage_status = test_sm_client.client.describe_message_stream.return_value.storage_status
+    storage_status.oldest_sequence_number = 10
+    storage_status.newest_sequence_number = 20
+    assert test_sm_client.get_stream_position(stream_name=stream_name) == (10, 20)
+    test_sm_client.client.describe_message_stream.assert_called_with(stream_name)
@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest import TestCase
+from ..metrics import MetricsRegistry
+from ..trace import CAPTURE, TraceRecorder, TraceSampler, stamp
+
+
+class TestTrace(TestCase):
+
+    def test_sampler_disabled(self):
+        # Arrange
+        sampler = TraceSampler(sample_every=0)
+
+        # Act
+        traces = [sampler.start() for _ in range(10)]
+
+        # Assert
+        self.assertEqual(traces, [None] * 10)
+
+    def test_sampler_traces_every_nth_batch(self):
+        # Arrange
+        sampler = TraceSampler(sample_every=3)
+
+        # Act
+        traces = [sampler.start() for _ in range(7)]
+
+        # Assert
+        self.assertEqual([trace is not None for trace in traces], [True, False, False, True, False, False, True])
+        self.assertEqual(list(traces[0].keys()), [CAPTURE])
+
+    def test_stamp(self):
+        # Arrange
+        trace = {}
+
+        # Act
+        stamp(trace, "read", 5.0)
+        stamp(None, "read", 5.0)
+        stamp(trace, "route_start")
+
+        # Assert
+        self.assertEqual(trace["read"], 5.0)
+        self.assertGreater(trace["route_start"], 0)
+
+    def test_recorder(self):
+        # Arrange
+        registry = MetricsRegistry(enabled=True)
+        recorder = TraceRecorder("connection.test", registry)
+        # The trace did not go through the message queue, so it has no enqueue stage
+        trace = {
+            "capture": 1000.0,
+            "append": 1002.0,
+            "read": 1010.0,
+            "route_start": 1011.0,
+            "ack.kinesis": 1013.0,
+            "route_end": 1015.0
+        }
+
+        # Act
+        recorder.record(trace)
+        snapshot = registry.snapshot()
+
+        # Assert
+        histograms = snapshot["histograms"]
+        self.assertEqual(snapshot["counters"]["connection.test.trace.samples"], 1)
+        self.assertEqual(histograms["connection.test.trace.capture_to_append_ms"]["max"], 2)
+        self.assertEqual(histograms["connection.test.trace.append_to_read_ms"]["max"], 8)
+        self.assertEqual(histograms["connection.test.trace.read_to_route_start_ms"]["max"], 1)
+        self.assertEqual(histograms["connection.test.trace.route_start_to_route_end_ms"]["max"], 4)
+        self.assertEqual(histograms["connection.test.trace.ack.kinesis_ms"]["max"], 13)
+        self.assertEqual(histograms["connection.test.trace.end_to_end_ms"]["max"], 15)
+        self.assertNotIn("connection.test.trace.capture_to_enqueue_ms", histograms)
+
+    def test_recorder_disabled_registry(self):
+        # Arrange
+        registry = MetricsRegistry(enabled=False)
+        recorder = TraceRecorder(registry=registry)
+
+        # Act
+        recorder.record({"capture": 1000.0, "route_end": 1001.0})
+
+        # Assert
+        self.assertEqual(registry.snapshot()["histograms"], {})
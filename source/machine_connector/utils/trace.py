@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import itertools
+import os
+import threading
+import time
+
+from typing import Union
+
+from .metrics import MetricsRegistry, get_registry
+
+"""
+    Per-stage latency tracing of the samples, from the connector read to the target writes.
+    A connector traces every n-th message batch: the batch carries the time of every stage it went through,
+    in epoch milliseconds, under the `trace` key of the stream message:
+        {"alias": ..., "messages": [...], "trace": {"capture": 1700000000000.0, "enqueue": ..., "append": ...}}
+    The publisher removes the trace from the payload before the targets get it, adds its own stages,
+    and records the time between the stages in the histograms of the metrics registry,
+    so the metrics reporter exports their summaries with the other metrics.
+    The stages run in different processes, so they are stamped with the wall clock.
+"""
+
+# Every n-th message batch of a connector is traced, 0 disables the tracing
+TRACE_SAMPLE_EVERY = int(os.getenv("TRACE_SAMPLE_EVERY", "0"))
+
+# The key of the trace in the stream message
+TRACE_KEY = "trace"
+
+# The stages, in the order a sample goes through them
+# The connector built the message batch from the values it read
+CAPTURE = "capture"
+# The message sender got the message batch
+ENQUEUE = "enqueue"
+# The message sender appends the message batch to the connection stream
+APPEND = "append"
+# The publisher read the message from the connection stream
+READ = "read"
+# The payload router starts to convert the payload
+ROUTE_START = "route_start"
+# The payload router has sent the payload to every target
+ROUTE_END = "route_end"
+STAGES = [CAPTURE, ENQUEUE, APPEND, READ, ROUTE_START, ROUTE_END]
+# A target took the payload, e.g. `ack.kinesis`. A target which buffers its data takes it when it is buffered.
+ACK_PREFIX = "ack."
+
+
+def now_ms() -> float:
+    return time.time() * 1000
+
+
+def stamp(trace: Union[dict, None], stage: str, time_ms: float = None) -> None:
+    """
+    Stamps a stage of a trace. Nothing is stamped when the batch is not traced.
+
+    :param trace: The trace, `None` when the batch is not traced
+    :param stage: The stage
+    :param time_ms: The time of the stage (in epoch milliseconds), now by default
+    """
+    if trace is not None:
+        trace[stage] = now_ms() if time_ms is None else time_ms
+
+
+class TraceSampler:
+    """
+    Picks the message batches which are traced
+    """
+
+    def __init__(self, sample_every: int = TRACE_SAMPLE_EVERY):
+        """
+        :param sample_every: Every n-th message batch is traced, 0 traces none
+        """
+        self.sample_every = sample_every
+        self._count = itertools.count()
+
+    def start(self) -> Union[dict, None]:
+        """
+        :return: A new trace with the capture time, or `None` when the batch is not traced
+        """
+        if self.sample_every <= 0 or next(self._count) % self.sample_every:
+            return None
+        return {CAPTURE: now_ms()}
+
+
+class TraceRecorder:
+    """
+    Records the time between the stages of the traces:
+        - `trace.{stage}_to_{next stage}_ms` for the consecutive stages a trace went through,
+        - `trace.ack.{target}_ms` from the capture to the target writes,
+        - `trace.end_to_end_ms` from the capture to the end of the routing.
+    """
+
+    def __init__(self, metrics_prefix: str = None, registry: MetricsRegistry = None):
+        """
+        :param metrics_prefix: The prefix of the metric names
+        :param registry: The metrics registry, the registry of the process by default
+        """
+        self.prefix = f"{metrics_prefix}." if metrics_prefix else ""
+        self.registry = registry or get_registry()
+        self._samples = self.registry.counter(f"{self.prefix}trace.samples")
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: dict) -> None:
+        """
+        :param trace: The trace, with a time per stage (in epoch milliseconds)
+        """
+        self._samples.inc()
+
+        previous_stage = None
+        for stage in STAGES:
+            if stage not in trace:
+                continue
+            if previous_stage is not None:
+                self._histogram(f"{previous_stage}_to_{stage}").record(trace[stage] - trace[previous_stage])
+            previous_stage = stage
+
+        capture_time = trace.get(CAPTURE)
+        if capture_time is None:
+            return
+
+        for stage, stage_time in trace.items():
+            if stage.startswith(ACK_PREFIX):
+                self._histogram(stage).record(stage_time - capture_time)
+        if ROUTE_END in trace:
+            self._histogram("end_to_end").record(trace[ROUTE_END] - capture_time)
+
+    def _histogram(self, name: str):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms[name] = self.registry.histogram(f"{self.prefix}trace.{name}_ms")
+        return histogram